@@ -0,0 +1,192 @@
+"""
+Chọn model theo node và cascade hai tầng (fast -> strong).
+
+- Mỗi node dùng một tầng model: "fast" (rẻ, nhanh) cho node phân loại, viết lại câu hỏi và lần gọi tool đầu;
+  "writer" cho node viết câu trả lời; có thể gán model riêng cho từng node (NODE_MODELS).
+- Leo thang lên model "strong" khi:
+    low_confidence    : node phân loại trả về confidence < CASCADE_MIN_CONFIDENCE
+    invalid_output    : structured output không hợp lệ (parse / validate lỗi)
+    invalid_tool_call : tool call của model fast không parse được
+    tool_error        : tool vừa trả lỗi (nhánh retry agent -> tools -> agent), các lần gọi sau trong lượt dùng strong
+- Mọi lời gọi / leo thang được đếm theo node (escalation_stats) và gắn metadata model_tier / escalation_reason
+  vào span LLM của tracing.
+"""
+import threading
+from collections import Counter, defaultdict
+from pydantic import ValidationError
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables.config import ensure_config
+
+WRITER_NODES = ("final_answer", "output_guardrail")
+# Tầng mặc định của từng node khi bật cascade
+CASCADE_TIERS = {
+    "input_guardrail": "fast",
+    "agent_router": "fast",
+    "query_transform": "fast",
+    "agent": "fast",
+    "general_chat": "fast",
+    "planner": "strong",
+    "final_answer": "writer",
+    "output_guardrail": "writer",
+}
+TOOL_ERROR_PREFIXES = ("Lỗi", "Error")
+
+
+def is_tool_error(message) -> bool:
+    if not isinstance(message, ToolMessage):
+        return False
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    return getattr(message, "status", "success") == "error" or content.lstrip().startswith(TOOL_ERROR_PREFIXES)
+
+
+def tool_error_in_turn(messages) -> bool:
+    """Lượt hiện tại (từ câu hỏi cuối của người dùng) đã có tool nào trả lỗi chưa."""
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            return False
+        if is_tool_error(message):
+            return True
+    return False
+
+
+class EscalationStats:
+    """Đếm số lời gọi và số lần leo thang theo node (thread-safe)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = Counter()
+            self.escalations = Counter()
+            self.reasons = defaultdict(Counter)
+            self.tiers = defaultdict(Counter)
+
+    def record_call(self, node: str, tier: str):
+        with self._lock:
+            self.calls[node] += 1
+            self.tiers[node][tier] += 1
+
+    def record_escalation(self, node: str, reason: str):
+        with self._lock:
+            self.escalations[node] += 1
+            self.reasons[node][reason] += 1
+
+    def snapshot(self) -> dict:
+        """{node: {calls, escalations, rate, reasons, tiers}} - calls là số lần node gọi model (chưa tính leo thang)."""
+        with self._lock:
+            return {
+                node: {
+                    "calls": calls,
+                    "escalations": self.escalations[node],
+                    "rate": round(self.escalations[node] / calls, 4) if calls else 0.0,
+                    "reasons": dict(self.reasons[node]),
+                    "tiers": dict(self.tiers[node]),
+                }
+                for node, calls in sorted(self.calls.items())
+            }
+
+
+escalation_stats = EscalationStats()
+
+
+class ModelCascade:
+    """Model cho từng node; khi `enabled` thì node tầng fast được leo thang lên strong theo các điều kiện ở trên."""
+
+    def __init__(self, fast, strong, writer=None, node_models: dict = None, enabled: bool = True,
+                 min_confidence: float = 0.7, stats: EscalationStats = None):
+        unknown = set(node_models or {}) - set(CASCADE_TIERS)
+        if unknown:
+            raise ValueError(f"Lỗi: NODE_MODELS chứa node không tồn tại: {sorted(unknown)}")
+        unknown = {v for v in (node_models or {}).values() if isinstance(v, str)} - {"fast", "strong", "writer"}
+        if unknown:
+            raise ValueError(f"Lỗi: NODE_MODELS chỉ nhận tầng 'fast', 'strong', 'writer' hoặc model: {sorted(unknown)}")
+        self.models = {"fast": fast, "strong": strong, "writer": writer or strong}
+        self.node_models = node_models or {}
+        self.enabled = enabled
+        self.min_confidence = min_confidence
+        self.stats = stats or escalation_stats
+        self._bound = {}
+        self._bind_lock = threading.Lock()
+
+    def tier_of(self, node: str) -> str:
+        """Tầng model của node: "fast" / "strong" / "writer", hoặc "custom" nếu NODE_MODELS gán model riêng."""
+        if node in self.node_models:
+            choice = self.node_models[node]
+            return choice if isinstance(choice, str) else "custom"
+        if not self.enabled:
+            return "writer" if node in WRITER_NODES else "strong"
+        return CASCADE_TIERS.get(node, "strong")
+
+    def model_for(self, node: str):
+        tier = self.tier_of(node)
+        return self.node_models[node] if tier == "custom" else self.models[tier]
+
+    def can_escalate(self, node: str) -> bool:
+        return self.enabled and self.model_for(node) is not self.models["strong"]
+
+    @staticmethod
+    def _config(tier: str, reason: str = None) -> dict:
+        # Giữ config của node (callbacks, metadata langgraph_node...) và thêm tầng model cho tracing
+        config = ensure_config()
+        config["metadata"] = {**config.get("metadata", {}), "model_tier": tier}
+        if reason:
+            config["metadata"]["escalation_reason"] = reason
+        return config
+
+    def _escalate(self, node: str, reason: str):
+        self.stats.record_escalation(node, reason)
+        print(f"[Cascade] {node}: leo thang lên model strong ({reason})")
+
+    def _bind_tools(self, model, tools: list):
+        # Khóa theo cả danh sách tool: cùng model có thể được gọi với các bộ tool khác nhau
+        key = (id(model), tuple(tool.name for tool in tools))
+        with self._bind_lock:
+            if key not in self._bound:
+                self._bound[key] = model.bind_tools(tools)
+            return self._bound[key]
+
+    def invoke(self, node: str, prompt):
+        """Lời gọi văn bản thường (viết lại câu hỏi, trả lời, guardrail đầu ra): không leo thang."""
+        tier = self.tier_of(node)
+        self.stats.record_call(node, tier)
+        return self.model_for(node).invoke(prompt, config=self._config(tier))
+
+    def structured(self, node: str, schema, prompt):
+        """Structured output; leo thang khi không hợp lệ hoặc confidence thấp."""
+        tier = self.tier_of(node)
+        self.stats.record_call(node, tier)
+        reason = None
+        try:
+            result = self.model_for(node).with_structured_output(schema).invoke(prompt, config=self._config(tier))
+            # Schema có trường confidence nhưng model bỏ trống -> coi như confidence thấp (chỉ leo thang khi được phép)
+            confidence = getattr(result, "confidence", 1.0)
+            if confidence is None or confidence < self.min_confidence:
+                reason = "low_confidence"
+        except (ValidationError, OutputParserException):
+            if not self.can_escalate(node):
+                raise
+            reason = "invalid_output"
+
+        if reason and self.can_escalate(node):
+            self._escalate(node, reason)
+            result = self.models["strong"].with_structured_output(schema).invoke(
+                prompt, config=self._config("strong", reason))
+        return result
+
+    def invoke_with_tools(self, node: str, messages: list, tools: list) -> AIMessage:
+        """Bước gọi tool của agent: fast ở lần đầu, strong sau khi tool lỗi hoặc khi tool call không hợp lệ."""
+        tier = self.tier_of(node)
+        self.stats.record_call(node, tier)
+        if self.can_escalate(node) and tool_error_in_turn(messages):
+            self._escalate(node, "tool_error")
+            return self._bind_tools(self.models["strong"], tools).invoke(messages, config=self._config("strong", "tool_error"))
+
+        response = self._bind_tools(self.model_for(node), tools).invoke(messages, config=self._config(tier))
+        if response.invalid_tool_calls and self.can_escalate(node):
+            self._escalate(node, "invalid_tool_call")
+            response = self._bind_tools(self.models["strong"], tools).invoke(
+                messages, config=self._config("strong", "invalid_tool_call"))
+        return response
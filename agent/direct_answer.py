@@ -0,0 +1,179 @@
+"""
+Trả lời trực tiếp cho kết quả đơn giản: bỏ qua final_answer (llm_writer); câu trả lời vẫn đi qua output_guardrail
+trừ khi bật DIRECT_ANSWER_SKIP_OUTPUT_GUARDRAIL (khi đó mask_pii là lớp che dữ liệu nhạy cảm duy nhất).
+
+Lượt hiện tại được coi là đơn giản khi agent đã trả lời (không gọi thêm tool) dựa trên đúng một kết quả tool:
+- query_sql_db: một giá trị hoặc bảng nhỏ (<= DIRECT_ANSWER_MAX_ROWS dòng, <= DIRECT_ANSWER_MAX_COLUMNS cột);
+- search_policy_docs: agent tóm tắt thành một ý ngắn và biết được trang nguồn.
+Câu trả lời dựng từ gạch đầu dòng của agent bằng template theo ANSWER_LOCALE (định dạng số theo giá trị thật
+trong kết quả SQL, trích dẫn [Trang X]) và che email / số điện thoại như output_guardrail.
+"""
+import ast
+import re
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from config.settings import settings
+from agent.cascade import is_tool_error
+
+TEMPLATES = {
+    "vi": {"thousands": ".", "decimal": ",", "scalar": "{label} là {value}.", "table": "Kết quả:",
+           "citation": "[Trang {pages}]"},
+    "en": {"thousands": ",", "decimal": ".", "scalar": "{label} is {value}.", "table": "Results:",
+           "citation": "[Page {pages}]"},
+}
+DIRECT_TOOLS = ("query_sql_db", "search_policy_docs")
+
+BULLET_PATTERN = re.compile(r"^\s*(?:[-*•+]|\d+[.)])\s+")
+SOURCE_PATTERN = re.compile(r"\s*[(\[]?\s*(?:nguồn\s*:?\s*)?trang\s+(\d+(?:\s*(?:,|và|-)\s*\d+)*)\s*[)\]]?", re.IGNORECASE)
+TOOL_PAGES_PATTERN = re.compile(r"(?:\[NGUỒN: |; )TRANG ([\d, ]*\d)")
+COLUMNS_PATTERN = re.compile(r"\n(?:DATA_HANDLE: \S+ )?\(cột: (.*)\)\s*$")
+ID_COLUMN_PATTERN = re.compile(r"(^|_)(id|year|nam|code|ma)$", re.IGNORECASE)
+EMAIL_PATTERN = re.compile(r"\b([A-Za-z0-9])[A-Za-z0-9._%+-]*(@[A-Za-z0-9.-]+\.[A-Za-z]{2,})\b")
+PHONE_PATTERN = re.compile(r"(?<![\d.,])((?:\+84|0)\d{2})\d{4,5}(\d{3})(?!\d|[.,]\d)")
+
+
+def _turn(messages: list) -> list:
+    for i in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[i], HumanMessage):
+            return list(messages[i + 1:])
+    return list(messages)
+
+
+def _literal(node):
+    """Giá trị của một ô trong kết quả SQL: số, chuỗi, Decimal('..'); kiểu khác (ngày tháng...) -> None."""
+    if isinstance(node, ast.Constant):
+        return node.value
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub) and isinstance(node.operand, ast.Constant):
+        value = node.operand.value
+        return -value if isinstance(value, (int, float)) else None
+    if (isinstance(node, ast.Call) and getattr(node.func, "id", "") == "Decimal" and len(node.args) == 1
+            and isinstance(node.args[0], ast.Constant)):
+        try:
+            return Decimal(str(node.args[0].value))
+        except InvalidOperation:
+            return None
+    return None
+
+
+def parse_sql_result(content: str) -> Optional[tuple]:
+    """(rows, columns) từ output của query_sql_db; đọc bằng AST, không eval. None nếu không đọc được."""
+    columns_match = COLUMNS_PATTERN.search(content)
+    columns = [c.strip() for c in columns_match.group(1).split(",")] if columns_match else []
+    rows_text = content[:columns_match.start()] if columns_match else content
+    try:
+        node = ast.parse(rows_text.strip(), mode="eval").body
+    except (SyntaxError, ValueError):
+        return None
+    if not isinstance(node, ast.List) or not all(isinstance(row, ast.Tuple) for row in node.elts):
+        return None
+    return [[_literal(value) for value in row.elts] for row in node.elts], columns
+
+
+def format_number(value, locale: str = None) -> str:
+    """1250000.5 -> "1.250.000,50" (vi) / "1,250,000.50" (en); số nguyên không có phần thập phân."""
+    template = TEMPLATES[locale or settings.ANSWER_LOCALE]
+    number = float(value)
+    text = f"{number:,.0f}" if number == int(number) else f"{number:,.2f}"
+    return text.replace(",", "\0").replace(".", template["decimal"]).replace("\0", template["thousands"])
+
+
+def _raw_forms(value) -> list:
+    """Các cách LLM có thể chép nguyên văn một giá trị số trong kết quả SQL (dài trước)."""
+    forms = {str(value)}
+    if isinstance(value, (float, Decimal)):
+        forms.add(f"{value:f}".rstrip("0").rstrip("."))
+        if value == int(value):
+            forms.add(str(int(value)))
+    return sorted(forms, key=len, reverse=True)
+
+
+def _format_numbers(text: str, rows: list, columns: list, locale: str) -> str:
+    """Định dạng các số trong câu trả lời trùng với giá trị trong kết quả SQL (bỏ qua cột mã / năm)."""
+    for row in rows:
+        for i, value in enumerate(row):
+            if isinstance(value, bool) or not isinstance(value, (int, float, Decimal)):
+                continue
+            if i < len(columns) and ID_COLUMN_PATTERN.search(columns[i]):
+                continue
+            if abs(value) < 1000 and value == int(value):
+                continue
+            formatted = format_number(value, locale)
+            for raw in _raw_forms(value):
+                text = re.sub(rf"(?<![\d.,]){re.escape(raw)}(?![\d]|[.,]\d)", formatted, text)
+    return text
+
+
+def mask_pii(text: str) -> str:
+    """Che email / số điện thoại như output_guardrail: a***@gmail.com, 090****567."""
+    text = EMAIL_PATTERN.sub(lambda m: f"{m.group(1)}***{m.group(2)}", text)
+    return PHONE_PATTERN.sub(lambda m: f"{m.group(1)}****{m.group(2)}", text)
+
+
+def _lines(text: str) -> list:
+    return [BULLET_PATTERN.sub("", line).replace("**", "").strip() for line in text.splitlines() if line.strip()]
+
+
+def _render_sql(lines: list, content: str, locale: str) -> Optional[str]:
+    parsed = parse_sql_result(content)
+    if parsed is None:
+        return None
+    rows, columns = parsed
+    if not rows or len(rows) > settings.DIRECT_ANSWER_MAX_ROWS or len(rows[0]) > settings.DIRECT_ANSWER_MAX_COLUMNS:
+        return None
+    if len(lines) > settings.DIRECT_ANSWER_MAX_ROWS + 1:
+        return None
+    template = TEMPLATES[locale]
+    if len(lines) == 1:
+        label, sep, value = lines[0].partition(":")
+        if len(rows) == 1 and len(rows[0]) == 1 and sep and value.strip() and ":" not in value:
+            answer = template["scalar"].format(label=label.strip(), value=value.strip().rstrip("."))
+        else:
+            answer = lines[0].rstrip(".") + "."
+    else:
+        header = [] if lines[0].endswith(":") else [template["table"]]
+        answer = "\n".join(header + [line if line.endswith(":") else f"- {line}" for line in lines])
+    return _format_numbers(answer, rows, columns, locale)
+
+
+def _render_policy(lines: list, content: str, locale: str) -> Optional[str]:
+    if len(lines) != 1:
+        return None
+    sentence = lines[0]
+    pages = [p for match in SOURCE_PATTERN.finditer(sentence) for p in re.findall(r"\d+", match.group(1))]
+    tool_pages = {p for match in TOOL_PAGES_PATTERN.finditer(content) for p in re.findall(r"\d+", match.group(1))}
+    if not pages:
+        # Agent không ghi nguồn: chỉ trích được khi kết quả tìm kiếm nằm trên đúng một trang
+        if len(tool_pages) != 1:
+            return None
+        pages = sorted(tool_pages)
+    elif not set(pages) <= tool_pages:
+        return None
+    sentence = SOURCE_PATTERN.sub("", sentence).strip().rstrip(".;,: ")
+    if not sentence:
+        return None
+    citation = TEMPLATES[locale]["citation"].format(pages=", ".join(dict.fromkeys(pages)))
+    return f"{sentence} {citation}."
+
+
+def render_direct_answer(messages: list, locale: str = None) -> Optional[str]:
+    """Câu trả lời dựng bằng template nếu lượt hiện tại đủ đơn giản, ngược lại None (đi qua final_answer)."""
+    turn = _turn(messages)
+    if not turn or not isinstance(turn[-1], AIMessage) or turn[-1].tool_calls:
+        return None
+    text = turn[-1].content if isinstance(turn[-1].content, str) else ""
+    if not text.strip() or "GENERAL_CHAT" in text or len(text) > settings.DIRECT_ANSWER_MAX_CHARS:
+        return None
+    results = [m for m in turn if isinstance(m, ToolMessage) and not is_tool_error(m)]
+    if len(results) != 1 or results[0].name not in DIRECT_TOOLS:
+        return None
+
+    locale = locale or settings.ANSWER_LOCALE
+    content = results[0].content if isinstance(results[0].content, str) else str(results[0].content)
+    lines = _lines(text)
+    if results[0].name == "query_sql_db":
+        answer = _render_sql(lines, content, locale)
+    else:
+        answer = _render_policy(lines, content, locale)
+    return mask_pii(answer) if answer else None
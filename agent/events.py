@@ -0,0 +1,79 @@
+"""
+Chuyển sự kiện astream_events (v2) của graph thành sự kiện gọn, tuần tự hóa được (dict JSON)
+cho giao diện: dùng chung cho API server (SSE) và Streamlit.
+"""
+from typing import Callable, Optional
+
+STREAM_NODES = ("final_answer", "general_chat", "direct_answer")
+CHART_TOOLS = ("python_chart_maker", "render_chart")
+IGNORED_NAMES = ("__start__", "__end__")
+
+
+def _field(output, name: str, default=None):
+    if isinstance(output, dict):
+        return output.get(name, default)
+    return getattr(output, name, default)
+
+
+def map_event(event: dict, artifact_url: Optional[Callable[[str], str]] = None) -> Optional[dict]:
+    """Trả về một sự kiện UI hoặc None nếu sự kiện không cần hiển thị."""
+    kind = event["event"]
+    name = event.get("name", "")
+    node_name = event.get("metadata", {}).get("langgraph_node", "")
+    data = event.get("data", {})
+
+    if kind == "on_tool_start" and name not in IGNORED_NAMES:
+        mapped = {"type": "tool_start", "tool": name}
+        if name == "query_sql_db":
+            tool_input = data.get("input") or {}
+            if isinstance(tool_input, dict) and tool_input.get("query"):
+                mapped["sql"] = tool_input["query"]
+        return mapped
+
+    if kind == "on_tool_end" and name not in IGNORED_NAMES:
+        mapped = {"type": "tool_end", "tool": name}
+        if name in CHART_TOOLS:
+            # Mỗi lần vẽ trả về artifact riêng trong ToolMessage
+            artifact = getattr(data.get("output"), "artifact", None)
+            if artifact:
+                mapped["artifact"] = {
+                    "artifact_id": artifact["artifact_id"],
+                    "mime_type": artifact.get("mime_type", "image/png"),
+                    "cached": artifact.get("cached", False),
+                    "path": artifact["path"],
+                }
+                if artifact_url:
+                    mapped["artifact"]["url"] = artifact_url(artifact["artifact_id"])
+        return mapped
+
+    if kind == "on_chat_model_stream" and node_name in STREAM_NODES:
+        content = data["chunk"].content
+        return {"type": "token", "node": node_name, "content": content} if content else None
+
+    if kind != "on_chain_end" or name != node_name:
+        return None
+
+    output = data.get("output")
+    if output is None or isinstance(output, str):
+        return None
+    if node_name == "input_guardrail":
+        return {
+            "type": "input_guardrail",
+            "is_safe": _field(output, "is_safe", True),
+            "reasoning": _field(output, "reasoning", "Không có lý do"),
+        }
+    if node_name == "agent_router":
+        is_out = _field(output, "is_out_of_scope")
+        if is_out is None:
+            return None
+        return {"type": "router", "is_out_of_scope": is_out, "reasoning": _field(output, "reasoning", "Không có lý do")}
+    if node_name == "direct_answer":
+        # Câu trả lời dựng bằng template (không qua LLM) -> gửi nguyên câu như một token
+        messages = _field(output, "messages") or []
+        return {"type": "token", "node": node_name, "content": messages[-1].content} if messages else None
+    if node_name == "output_guardrail":
+        return {"type": "output_guardrail"}
+    if node_name == "query_transform":
+        transformed = _field(output, "transformed_query")
+        return {"type": "query_transform", "transformed_query": transformed} if transformed else None
+    return None
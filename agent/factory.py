@@ -0,0 +1,54 @@
+from langchain_openai import ChatOpenAI
+from config.settings import settings
+from agent.nodes import AgentNodes
+from agent.cascade import ModelCascade
+from agent.workflow import InsightAgentWorkflow
+
+
+def _chat_model(model: str, temperature: float) -> ChatOpenAI:
+    # stream_usage: vẫn nhận số token khi stream (tracing cần prompt/completion tokens)
+    return ChatOpenAI(model=model, temperature=temperature, streaming=True, stream_usage=True)
+
+
+def build_cascade(llm=None, llm_writer=None) -> ModelCascade:
+    """Model theo node từ settings: LLM_CASCADE_ENABLED bật tầng fast + leo thang, NODE_MODELS gán model riêng."""
+    strong = llm or _chat_model(settings.LLM_STRONG_MODEL, settings.LLM_TEMPERATURE)
+    writer = llm_writer or _chat_model(settings.LLM_STRONG_MODEL, settings.WRITER_TEMPERATURE)
+    fast = strong
+    if settings.LLM_CASCADE_ENABLED and llm is None:
+        fast = _chat_model(settings.LLM_FAST_MODEL, settings.LLM_TEMPERATURE)
+    node_models = {
+        node: choice if choice in ("fast", "strong", "writer") else _chat_model(choice, settings.LLM_TEMPERATURE)
+        for node, choice in settings.NODE_MODELS.items()
+    }
+    return ModelCascade(fast=fast, strong=strong, writer=writer, node_models=node_models,
+                        enabled=settings.LLM_CASCADE_ENABLED, min_confidence=settings.CASCADE_MIN_CONFIDENCE)
+
+
+def init_agent_app(llm=None, llm_writer=None, tools: list = None, db_schema: str = None,
+                   cascade: ModelCascade = None, direct_answer: bool = None, agent_mode: str = None):
+    """
+    Khởi tạo toàn bộ hệ thống Agent và trả về graph đã biên dịch.
+    Dùng chung cho API server, Streamlit (chế độ nhúng) và các script đánh giá;
+    llm / tools / db_schema có thể truyền vào để thay bằng bản giả lập (load test),
+    cascade truyền vào để dùng model fast / strong giả lập (benchmark cascade),
+    direct_answer ghi đè DIRECT_ANSWER_ENABLED (benchmark trả lời trực tiếp), agent_mode ghi đè AGENT_MODE.
+    """
+    cascade = cascade or build_cascade(llm, llm_writer)
+    llm = cascade.models["strong"]
+    llm_writer = cascade.models["writer"]
+
+    if tools is None or db_schema is None:
+        from tools import sql_service, insight_tools, warm_up_services
+        if tools is None:
+            tools = insight_tools
+            if settings.SERVICE_WARMUP_ENABLED:
+                # Kết nối DB / client API / sandbox khởi tạo song song ở nền trong lúc app dựng graph
+                warm_up_services()
+        if db_schema is None:
+            db_schema = sql_service.get_db_schema()
+
+    nodes = AgentNodes(llm=llm, llm_writer=llm_writer, tools=tools, db_schema=db_schema, cascade=cascade,
+                       direct_answer=direct_answer)
+    workflow = InsightAgentWorkflow(nodes=nodes, tools=tools, agent_mode=agent_mode)
+    return workflow.compile()
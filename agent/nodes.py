@@ -1,37 +1,49 @@
 from datetime import datetime
-from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
-from core.state import AgentState, GuardrailResponse, RouteResponse
+from config.settings import settings
+from core.state import AgentState, GuardrailResponse, RouteResponse, ToolPlan
+from agent.cascade import ModelCascade
+from agent.direct_answer import render_direct_answer
+from agent.planner import PlanExecutor, failed_results, plan_message, plan_turn, tool_specs
 from core.prompts import (
     SYSTEM_PROMPT_TEMPLATE, 
+    CHART_TOOLS_SPEC_PROMPT,
+    CHART_TOOLS_SCRIPT_PROMPT,
     INPUT_GUARDRAIL_PROMPT, 
     OUTPUT_GUARDRAIL_PROMPT,
     QUERY_TRANSFORM_PROMPT,
     ROUTER_SYSTEM_PROMPT,
     GENERAL_CHAT_PROMPT,
-    FINAL_ANSWER_PROMPT
+    FINAL_ANSWER_PROMPT,
+    PLANNER_PROMPT,
+    PLANNER_FEEDBACK_PROMPT
 )
 
 class AgentNodes:
     """Class chứa logic thực thi của từng node trong LangGraph."""
-    def __init__(self, llm, llm_writer, tools, db_schema: str):
+    def __init__(self, llm, llm_writer, tools, db_schema: str, cascade: ModelCascade = None,
+                 direct_answer: bool = None):
         self.llm = llm
         self.llm_writer = llm_writer
         self.tools = tools
         self.db_schema = db_schema
-        self.llm_with_tools = self.llm.bind_tools(self.tools)
+        # Không truyền cascade: mọi node dùng llm (node viết câu trả lời dùng llm_writer) như trước
+        self.cascade = cascade or ModelCascade(fast=llm, strong=llm, writer=llm_writer, enabled=False)
+        self.plan_executor = PlanExecutor(self.tools)
+        self.direct_answer_enabled = settings.DIRECT_ANSWER_ENABLED if direct_answer is None else direct_answer
 
     def _get_system_message(self):
         """Khởi tạo System Prompt với schema của DB."""
-        prompt = SYSTEM_PROMPT_TEMPLATE.format(schema_info=self.db_schema)
+        has_chart_spec = any(getattr(tool, "name", "") == "render_chart" for tool in self.tools)
+        chart_tools = CHART_TOOLS_SPEC_PROMPT if has_chart_spec else CHART_TOOLS_SCRIPT_PROMPT
+        prompt = SYSTEM_PROMPT_TEMPLATE.format(schema_info=self.db_schema, chart_tools=chart_tools)
         return SystemMessage(content=prompt)
 
     def input_guardrail(self, state: AgentState):
         last_user_message = state["messages"][-1].content
-        structured_llm = self.llm.with_structured_output(GuardrailResponse)
-        
         prompt = INPUT_GUARDRAIL_PROMPT.format(last_user_message=last_user_message)
-        check = structured_llm.invoke(prompt)
+        check = self.cascade.structured("input_guardrail", GuardrailResponse, prompt)
         
         return {
             "is_out_of_scope": not check.is_safe,
@@ -43,7 +55,7 @@ class AgentNodes:
         last_ai_message = state["messages"][-1].content
         prompt = OUTPUT_GUARDRAIL_PROMPT.format(last_ai_message=last_ai_message)
         
-        response = self.llm_writer.invoke(prompt)
+        response = self.cascade.invoke("output_guardrail", prompt)
         return {"messages": [response]}
 
     def query_transform(self, state: AgentState):
@@ -58,7 +70,7 @@ class AgentNodes:
             context=context
         )
         
-        transformed = self.llm.invoke(prompt)
+        transformed = self.cascade.invoke("query_transform", prompt)
         print("\n--- [QUERY TRANSFORM] ---")
         print(f"Gốc: {last_user_message}")
         print(f"Mới: {transformed.content}")
@@ -72,7 +84,6 @@ class AgentNodes:
         last_user_message = messages[-1].content
         today = datetime.now().strftime("%d/%m/%Y")
 
-        structured_llm = self.llm.with_structured_output(RouteResponse)
         prompt = ROUTER_SYSTEM_PROMPT.format(today=today)
         
         messages_to_invoke = [
@@ -80,7 +91,7 @@ class AgentNodes:
             HumanMessage(content=context)
         ]
         
-        result = structured_llm.invoke(messages_to_invoke)
+        result = self.cascade.structured("agent_router", RouteResponse, messages_to_invoke)
 
         print("\n--- [ROUTER LOG] ---")
         print(f"Câu hỏi: {last_user_message}")
@@ -109,8 +120,47 @@ class AgentNodes:
             sys_msg = self._get_system_message()
             messages = [sys_msg] + messages
 
-        response = self.llm_with_tools.invoke(messages)
-        return {"messages": [response], "retry_count": state["retry_count"] + 1}
+        response = self.cascade.invoke_with_tools("agent", messages, self.tools)
+        # Dựng câu trả lời template một lần ở đây; workflow chỉ đọc state để route, node direct_answer dùng lại
+        direct = None
+        if self.direct_answer_enabled and not response.tool_calls:
+            direct = render_direct_answer(list(state["messages"]) + [response])
+        return {"messages": [response], "retry_count": state["retry_count"] + 1, "direct_answer": direct}
+
+    def planner(self, state: AgentState):
+        """Một lần gọi LLM lập DAG các lần gọi tool (AGENT_MODE=plan); lỗi ở kế hoạch trước được đưa vào prompt."""
+        messages = state["messages"]
+        attempts, results = plan_turn(messages)
+        feedback = failed_results(results) if attempts else None
+        question = state.get("transformed_query") or messages[-1].content
+        prompt = PLANNER_PROMPT.format(
+            question=question,
+            today=datetime.now().strftime("%d/%m/%Y"),
+            schema_info=self.db_schema,
+            tool_specs=tool_specs(self.tools),
+            max_steps=settings.PLAN_MAX_STEPS,
+            feedback=PLANNER_FEEDBACK_PROMPT.format(results=feedback) if feedback else "",
+        )
+        retry_count = state.get("retry_count", 0) + 1
+
+        try:
+            plan = self.cascade.structured("planner", ToolPlan, prompt)
+            steps = self.plan_executor.prepare(plan)
+        except ValueError as e:
+            print(f"[Planner] Kế hoạch không hợp lệ, chuyển sang chế độ ReAct: {e}")
+            return {"plan": None, "retry_count": retry_count}
+
+        print("\n--- [PLANNER] ---")
+        print(f"Suy luận: {plan.reasoning}")
+        for step in steps:
+            print(f"{step['id']}: {step['tool']} {step['args']} <- {step['depends_on']}")
+        print("-----------------\n")
+        if not steps:
+            return {"plan": None, "retry_count": retry_count}
+        return {"messages": [plan_message(steps, plan.reasoning)], "plan": {"steps": steps}, "retry_count": retry_count}
+
+    def execute_plan(self, state: AgentState):
+        return {"messages": self.plan_executor.execute(state["plan"]["steps"])}
 
     def general_chat(self, state: AgentState):
         messages = state["messages"]
@@ -119,12 +169,16 @@ class AgentNodes:
         prompt = GENERAL_CHAT_PROMPT.format(reasoning=reasoning)
         general_prompt = SystemMessage(content=prompt)
 
-        response = self.llm.invoke([general_prompt] + messages)
+        response = self.cascade.invoke("general_chat", [general_prompt] + messages)
         return {"messages": [response]}
 
+    def direct_answer(self, state: AgentState):
+        """Kết quả đơn giản: trình bày câu trả lời template đã dựng ở node agent, không gọi llm_writer."""
+        return {"messages": [AIMessage(content=state["direct_answer"])]}
+
     def final_answer(self, state: AgentState):
         messages = state["messages"]
         final_system_prompt = SystemMessage(content=FINAL_ANSWER_PROMPT)
 
-        response = self.llm_writer.invoke([final_system_prompt] + messages)
+        response = self.cascade.invoke("final_answer", [final_system_prompt] + messages)
         return {"messages": [response]}
\ No newline at end of file
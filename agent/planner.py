@@ -0,0 +1,185 @@
+"""
+Plan-then-execute (AGENT_MODE=plan): một lần gọi LLM lập DAG các lần gọi tool, PlanExecutor chạy DAG.
+
+- Bước nào đủ điều kiện (các bước phụ thuộc đã xong) được chạy ngay, các bước độc lập chạy song song
+  (tối đa PLAN_MAX_WORKERS luồng, giữ context / callbacks của node nên tracing và UI vẫn thấy từng tool).
+- Kết quả được truyền sang bước sau qua placeholder trong args: {s1} (toàn bộ kết quả) hoặc
+  {s1.data_handle} (DATA_HANDLE của query_sql_db).
+- Bước lỗi làm các bước phụ thuộc bị bỏ qua; workflow chỉ gọi lại planner (re-plan) khi có bước lỗi.
+- Kết quả trả về dạng ToolMessage ghép với tool_calls của AIMessage do planner sinh ra, nên final_answer,
+  tracing và các bộ đánh giá xử lý như lượt ReAct thông thường.
+"""
+import re
+import json
+import uuid
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Optional
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.runnables.config import ensure_config, get_executor_for_config
+
+from config.settings import settings
+from core.state import ToolPlan
+from agent.cascade import is_tool_error
+
+PLANNER_NAME = "planner"
+PLACEHOLDER_PATTERN = re.compile(r"\{(\w+)(\.data_handle)?\}")
+DATA_HANDLE_PATTERN = re.compile(r"DATA_HANDLE: (\S+)")
+
+
+def plan_turn(messages: list) -> tuple:
+    """(số lần planner đã chạy, ToolMessage của kế hoạch gần nhất) trong lượt hiện tại."""
+    attempts, results = 0, []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            attempts, results = 0, []
+        elif isinstance(message, AIMessage) and message.name == PLANNER_NAME:
+            attempts, results = attempts + 1, []
+        elif isinstance(message, ToolMessage):
+            results.append(message)
+    return attempts, results
+
+
+def tool_specs(tools: list) -> str:
+    """Mô tả tool cho prompt của planner: tên, tham số, mô tả."""
+    specs = []
+    for tool in tools:
+        params = ", ".join(f"{name}: {schema.get('type', 'any')}" for name, schema in tool.args.items())
+        specs.append(f"- {tool.name}({params}): {' '.join((tool.description or '').split())}")
+    return "\n".join(specs)
+
+
+class PlanExecutor:
+    """Kiểm tra và thực thi ToolPlan trên danh sách tool của agent."""
+
+    def __init__(self, tools: list, max_steps: int = settings.PLAN_MAX_STEPS,
+                 max_workers: int = settings.PLAN_MAX_WORKERS):
+        self.tools = {tool.name: tool for tool in tools}
+        self.max_steps = max_steps
+        self.max_workers = max_workers
+
+    @staticmethod
+    def _placeholders(value) -> set:
+        if isinstance(value, str):
+            return {match.group(1) for match in PLACEHOLDER_PATTERN.finditer(value)}
+        if isinstance(value, dict):
+            return set().union(*(PlanExecutor._placeholders(v) for v in value.values()))
+        if isinstance(value, list):
+            return set().union(*(PlanExecutor._placeholders(v) for v in value))
+        return set()
+
+    def prepare(self, plan: ToolPlan) -> list:
+        """
+        Chuẩn hóa kế hoạch thành list step dict (id, tool, args, depends_on, call_id).
+        Placeholder tham chiếu bước khác được tính là phụ thuộc. Kế hoạch không hợp lệ -> ValueError.
+        """
+        if len(plan.steps) > self.max_steps:
+            raise ValueError(f"Lỗi: Kế hoạch có {len(plan.steps)} bước, tối đa {self.max_steps}.")
+        ids = [step.id for step in plan.steps]
+        if len(set(ids)) != len(ids):
+            raise ValueError("Lỗi: Mã bước (id) bị trùng.")
+        steps = []
+        for step in plan.steps:
+            if step.tool not in self.tools:
+                raise ValueError(f"Lỗi: Tool '{step.tool}' không tồn tại.")
+            try:
+                args = json.loads(step.args_json or "{}")
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Lỗi: args_json của bước {step.id} không phải JSON hợp lệ ({e}).")
+            if not isinstance(args, dict):
+                raise ValueError(f"Lỗi: args_json của bước {step.id} phải là object JSON.")
+            depends_on = set(step.depends_on) | (self._placeholders(args) & set(ids))
+            unknown = depends_on - set(ids)
+            if unknown or step.id in depends_on:
+                raise ValueError(f"Lỗi: Bước {step.id} phụ thuộc bước không hợp lệ: {sorted(unknown or {step.id})}.")
+            steps.append({"id": step.id, "tool": step.tool, "args": args, "depends_on": sorted(depends_on),
+                          "call_id": f"call_{uuid.uuid4().hex[:12]}"})
+
+        # Phát hiện chu trình (Kahn)
+        remaining = {step["id"]: set(step["depends_on"]) for step in steps}
+        while remaining:
+            ready = [step_id for step_id, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Lỗi: Kế hoạch có phụ thuộc vòng giữa các bước {sorted(remaining)}.")
+            for step_id in ready:
+                del remaining[step_id]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return steps
+
+    @staticmethod
+    def _resolve(value, outputs: dict):
+        """Thay placeholder {sX} / {sX.data_handle} bằng kết quả của bước tương ứng."""
+        if isinstance(value, str):
+            def replace(match):
+                if match.group(1) not in outputs:
+                    return match.group(0)
+                output = outputs[match.group(1)]
+                if match.group(2):
+                    handle = DATA_HANDLE_PATTERN.search(output)
+                    return handle.group(1) if handle else ""
+                return output
+            return PLACEHOLDER_PATTERN.sub(replace, value)
+        if isinstance(value, dict):
+            return {key: PlanExecutor._resolve(v, outputs) for key, v in value.items()}
+        if isinstance(value, list):
+            return [PlanExecutor._resolve(v, outputs) for v in value]
+        return value
+
+    def _run_step(self, step: dict, args: dict, config: dict) -> ToolMessage:
+        call = {"name": step["tool"], "args": args, "id": step["call_id"], "type": "tool_call"}
+        try:
+            result = self.tools[step["tool"]].invoke(call, config=config)
+        except Exception as e:
+            return ToolMessage(content=f"Lỗi: {e}", name=step["tool"], tool_call_id=step["call_id"], status="error")
+        if isinstance(result, ToolMessage):
+            return result
+        return ToolMessage(content=str(result), name=step["tool"], tool_call_id=step["call_id"])
+
+    def execute(self, steps: list, config: dict = None) -> list:
+        """Chạy các bước theo thứ tự phụ thuộc, song song khi có thể; trả về ToolMessage theo thứ tự kế hoạch."""
+        config = {**ensure_config(config), "max_concurrency": self.max_workers}
+        results, outputs = {}, {}
+        pending = {step["id"]: step for step in steps}
+        running = {}
+        with get_executor_for_config(config) as pool:
+            while pending or running:
+                for step_id, step in list(pending.items()):
+                    failed = [dep for dep in step["depends_on"] if dep in results and dep not in outputs]
+                    if failed:
+                        results[step_id] = ToolMessage(
+                            content=f"Lỗi: Bỏ qua vì bước {', '.join(failed)} bị lỗi.", name=step["tool"],
+                            tool_call_id=step["call_id"], status="error")
+                        del pending[step_id]
+                    elif all(dep in outputs for dep in step["depends_on"]):
+                        args = self._resolve(step["args"], outputs)
+                        running[pool.submit(self._run_step, step, args, config)] = step_id
+                        del pending[step_id]
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step_id = running.pop(future)
+                    message = future.result()
+                    results[step_id] = message
+                    if not is_tool_error(message):
+                        outputs[step_id] = message.content if isinstance(message.content, str) else str(message.content)
+        return [results[step["id"]] for step in steps]
+
+
+def plan_message(steps: list, reasoning: str) -> AIMessage:
+    """AIMessage của planner: mọi bước của kế hoạch là tool_calls (args giữ nguyên placeholder)."""
+    return AIMessage(content="", name=PLANNER_NAME,
+                     tool_calls=[{"name": step["tool"], "args": step["args"], "id": step["call_id"]} for step in steps],
+                     response_metadata={"plan_reasoning": reasoning})
+
+
+def failed_results(results: list) -> Optional[str]:
+    """Tóm tắt kết quả kế hoạch trước cho prompt re-plan, None nếu không có bước lỗi."""
+    if not any(is_tool_error(message) for message in results):
+        return None
+    lines = []
+    for message in results:
+        content = message.content if isinstance(message.content, str) else str(message.content)
+        status = "LỖI" if is_tool_error(message) else "OK"
+        lines.append(f"- {message.name} [{status}]: {content[:500]}")
+    return "\n".join(lines)
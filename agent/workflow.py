@@ -3,14 +3,18 @@ from langgraph.prebuilt import ToolNode
 from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.messages import ToolMessage
 
+from config.settings import settings
 from core.state import AgentState
 from agent.nodes import AgentNodes
+from agent.cascade import is_tool_error
+from agent.planner import plan_turn
 
 class InsightAgentWorkflow:
     """Class quản lý việc xây dựng và biên dịch LangGraph."""
     
-    def __init__(self, nodes: AgentNodes, tools: list):
+    def __init__(self, nodes: AgentNodes, tools: list, agent_mode: str = None):
         self.nodes = nodes
+        self.agent_mode = agent_mode or settings.AGENT_MODE
         self.tool_node = ToolNode(tools)
         self.memory = MemorySaver()
         self.workflow = StateGraph(AgentState)
@@ -28,6 +32,19 @@ class InsightAgentWorkflow:
             return "general_chat"
         return "query_transform"
 
+    @staticmethod
+    def _route_after_plan(state: AgentState):
+        # Không lập được kế hoạch (không hợp lệ / không cần tool) -> agent xử lý theo ReAct như thường
+        return "execute_plan" if state.get("plan") else "agent"
+
+    @staticmethod
+    def _route_after_execution(state: AgentState):
+        attempts, results = plan_turn(state["messages"])
+        if any(is_tool_error(message) for message in results):
+            # Chỉ lập lại kế hoạch khi có bước lỗi; hết lượt re-plan -> agent tự sửa theo ReAct
+            return "planner" if attempts <= settings.PLAN_MAX_REPLANS else "agent"
+        return "final_answer"
+
     @staticmethod
     def _node_router(state: AgentState):
         messages = state["messages"]
@@ -39,7 +56,9 @@ class InsightAgentWorkflow:
         if isinstance(last_message, ToolMessage) and ("Error" in last_message.content):
             if state.get("retry_count", 0) < 3:
                 return "agent"
-        
+
+        if state.get("direct_answer"):
+            return "direct_answer"
         return "final_answer"
 
     
@@ -50,6 +69,10 @@ class InsightAgentWorkflow:
         self.workflow.add_node("agent", self.nodes.agent)
         self.workflow.add_node("tools", self.tool_node)
         self.workflow.add_node("final_answer", self.nodes.final_answer)
+        self.workflow.add_node("direct_answer", self.nodes.direct_answer)
+        if self.agent_mode == "plan":
+            self.workflow.add_node("planner", self.nodes.planner)
+            self.workflow.add_node("execute_plan", self.nodes.execute_plan)
         self.workflow.add_node("general_chat", self.nodes.general_chat)
         self.workflow.add_node("output_guardrail", self.nodes.output_guardrail)
 
@@ -67,12 +90,25 @@ class InsightAgentWorkflow:
             {"general_chat": "general_chat", "query_transform": "query_transform"}
         )
 
-        self.workflow.add_edge("query_transform", "agent")
+        if self.agent_mode == "plan":
+            self.workflow.add_edge("query_transform", "planner")
+            self.workflow.add_conditional_edges(
+                "planner",
+                self._route_after_plan,
+                {"execute_plan": "execute_plan", "agent": "agent"}
+            )
+            self.workflow.add_conditional_edges(
+                "execute_plan",
+                self._route_after_execution,
+                {"planner": "planner", "agent": "agent", "final_answer": "final_answer"}
+            )
+        else:
+            self.workflow.add_edge("query_transform", "agent")
 
         self.workflow.add_conditional_edges(
             "agent", 
             self._node_router, 
-            {"tools": "tools", "final_answer": "final_answer"}
+            {"tools": "tools", "final_answer": "final_answer", "direct_answer": "direct_answer"}
         )
 
         self.workflow.add_edge("tools", "agent")
@@ -80,6 +116,11 @@ class InsightAgentWorkflow:
         self.workflow.add_edge("general_chat", "output_guardrail")
         
         self.workflow.add_edge("output_guardrail", END)
+        if settings.DIRECT_ANSWER_SKIP_OUTPUT_GUARDRAIL:
+            # Chỉ còn mask_pii (regex email / số điện thoại) bảo vệ câu trả lời template
+            self.workflow.add_edge("direct_answer", END)
+        else:
+            self.workflow.add_edge("direct_answer", "output_guardrail")
 
     def compile(self):
         """Biên dịch và trả về Graph App để sử dụng."""
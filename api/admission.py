@@ -0,0 +1,82 @@
+import asyncio
+import contextlib
+from config.settings import settings
+
+
+class AdmissionRejected(Exception):
+    """Server quá tải: request bị từ chối thay vì xếp hàng vô hạn."""
+
+    def __init__(self, reason: str, retry_after: int = 1):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Giới hạn số lượt chạy graph đồng thời trong một tiến trình server.
+    - Tối đa max_concurrent lượt chạy cùng lúc, tối đa max_queue request chờ.
+    - Hàng chờ đầy -> từ chối ngay; chờ quá queue_timeout -> từ chối (client nhận 503 + Retry-After).
+    """
+
+    def __init__(self, max_concurrent: int = settings.SERVER_MAX_CONCURRENT_RUNS,
+                 max_queue: int = settings.SERVER_MAX_QUEUE,
+                 queue_timeout: float = settings.SERVER_QUEUE_TIMEOUT_SECONDS):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.active = 0
+        self.waiting = 0
+        self.stats = {"admitted": 0, "completed": 0, "rejected_queue_full": 0, "rejected_timeout": 0}
+
+    @property
+    def saturated(self) -> bool:
+        return self.active >= self.max_concurrent and self.waiting >= self.max_queue
+
+    async def acquire(self):
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.stats["rejected_queue_full"] += 1
+            raise AdmissionRejected("Server đang quá tải (hàng chờ đã đầy), vui lòng thử lại sau.")
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.stats["rejected_timeout"] += 1
+            raise AdmissionRejected("Server đang quá tải (chờ quá lâu), vui lòng thử lại sau.",
+                                    retry_after=int(self.queue_timeout))
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        self.stats["admitted"] += 1
+
+    def release(self):
+        self.active -= 1
+        self.stats["completed"] += 1
+        self._semaphore.release()
+
+    def snapshot(self) -> dict:
+        return {"active": self.active, "waiting": self.waiting, "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue, **self.stats}
+
+
+class SessionLocks:
+    """Mỗi session (thread_id) chỉ chạy một lượt tại một thời điểm để lịch sử hội thoại không bị xen kẽ."""
+
+    def __init__(self):
+        self._locks = {}
+        self._users = {}
+
+    @contextlib.asynccontextmanager
+    async def hold(self, session_id: str):
+        lock = self._locks.setdefault(session_id, asyncio.Lock())
+        self._users[session_id] = self._users.get(session_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._users[session_id] -= 1
+            if self._users[session_id] == 0:
+                # Không còn ai dùng -> bỏ lock để dict không phình theo số session
+                del self._users[session_id]
+                del self._locks[session_id]
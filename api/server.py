@@ -0,0 +1,213 @@
+"""
+API server (ASGI) cho graph Insight Agent.
+
+Chạy: uvicorn api.server:app --host 0.0.0.0 --port 8000   (hoặc python -m api.server)
+
+- POST /v1/sessions          -> tạo session_id do server ký (= thread_id của checkpointer)
+- POST /v1/chat/stream       -> Server-Sent Events: tool_start / tool_end / token / ... / done
+- POST /v1/chat              -> chạy hết rồi trả JSON (script, load test)
+- GET  /v1/artifacts/{id}    -> ảnh biểu đồ
+- GET  /healthz, /readyz     -> liveness / readiness (graph đã dựng, hàng chờ chưa đầy)
+
+Mỗi tiến trình có graph + MemorySaver riêng: khi chạy nhiều worker (SERVER_WORKERS > 1)
+cần định tuyến sticky theo session_id ở load balancer để giữ lịch sử hội thoại
+(và đặt chung SERVER_SESSION_SECRET để worker nào cũng xác thực được session_id).
+"""
+import json
+import time
+import asyncio
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
+from langchain_core.messages import HumanMessage
+
+from config.settings import settings
+from agent.events import map_event
+from agent.cascade import escalation_stats
+from core.tracing import Tracer, tracer as default_tracer
+from api.admission import AdmissionController, AdmissionRejected, SessionLocks
+from api.sessions import SessionTokens
+
+
+class ChatRequest(BaseModel):
+    message: str = Field(min_length=1, description="Câu hỏi của người dùng.")
+    session_id: Optional[str] = Field(default=None, description="session_id do /v1/sessions cấp; bỏ trống để tạo session mới.")
+
+
+def _sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+
+def _default_graph_factory():
+    from agent.factory import init_agent_app
+    return init_agent_app()
+
+
+def _default_artifact_path(artifact_id: str):
+    from tools import artifact_store
+    return artifact_store.get(artifact_id)
+
+
+def create_app(graph_factory: Callable = _default_graph_factory,
+               artifact_path: Callable[[str], Optional[str]] = _default_artifact_path,
+               admission: AdmissionController = None,
+               worker_threads: int = settings.SERVER_WORKER_THREADS,
+               tracer: Tracer = None,
+               session_tokens: SessionTokens = None) -> FastAPI:
+    """Dựng ứng dụng FastAPI; graph_factory có thể thay bằng graph dùng LLM giả lập (load test)."""
+    tracer = tracer or default_tracer
+    session_tokens = session_tokens or SessionTokens()
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app: FastAPI):
+        loop = asyncio.get_running_loop()
+        # Các node đồng bộ (gọi LLM / tool) của graph chạy trên pool luồng này
+        executor = ThreadPoolExecutor(max_workers=worker_threads, thread_name_prefix="graph")
+        loop.set_default_executor(executor)
+        app.state.admission = admission or AdmissionController()
+        app.state.sessions = SessionLocks()
+        app.state.graph = None
+
+        def _on_built(future):
+            if future.exception():
+                print(f"[API] Không dựng được graph: {future.exception()}")
+            else:
+                app.state.graph = future.result()
+                print("[API] Graph đã sẵn sàng")
+
+        # Dựng graph (schema, kết nối...) trong luồng nền: /healthz trả lời ngay, /readyz chờ graph
+        loop.run_in_executor(None, graph_factory).add_done_callback(_on_built)
+        yield
+        tracer.flush()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    app = FastAPI(title="Insight Agent API", lifespan=lifespan)
+
+    def _artifact_url(artifact_id: str) -> str:
+        return f"/v1/artifacts/{artifact_id}"
+
+    async def _run(graph, message: str, session_id: str, queue_wait_ms: float = 0.0):
+        """Chạy graph cho một lượt hội thoại, sinh các sự kiện UI đã chuẩn hóa."""
+        config = tracer.config_for_run({"configurable": {"thread_id": session_id}},
+                                       session_id=session_id, queue_wait_ms=queue_wait_ms)
+        answer = ""
+        async for event in graph.astream_events({"messages": [HumanMessage(content=message)]}, config=config, version="v2"):
+            mapped = map_event(event, artifact_url=_artifact_url)
+            if mapped is None:
+                continue
+            if mapped["type"] == "token":
+                answer += mapped["content"]
+            yield mapped
+        yield {"type": "done", "session_id": session_id, "answer": answer}
+
+    def _resolve_session(session_id: Optional[str]) -> str:
+        """Chỉ nhận session_id do server cấp; không có thì cấp mới."""
+        if session_id is None:
+            return session_tokens.issue()
+        if not session_tokens.verify(session_id):
+            raise HTTPException(status_code=404, detail="Session không tồn tại, hãy tạo session mới qua /v1/sessions.")
+        return session_id
+
+    async def _admit(request: Request):
+        graph = request.app.state.graph
+        if graph is None:
+            raise HTTPException(status_code=503, detail="Agent đang khởi động, vui lòng thử lại sau.",
+                                headers={"Retry-After": "5"})
+        start = time.perf_counter()
+        try:
+            await request.app.state.admission.acquire()
+        except AdmissionRejected as e:
+            raise HTTPException(status_code=503, detail=e.reason, headers={"Retry-After": str(e.retry_after)})
+        return graph, round((time.perf_counter() - start) * 1000, 3)
+
+    @app.post("/v1/sessions")
+    async def create_session():
+        return {"session_id": session_tokens.issue()}
+
+    @app.post("/v1/chat/stream")
+    async def chat_stream(body: ChatRequest, request: Request):
+        session_id = _resolve_session(body.session_id)
+        graph, queue_wait_ms = await _admit(request)
+        released = False
+
+        def release_once():
+            # Generator có thể không bao giờ chạy (client ngắt sớm) -> background task trả slot
+            nonlocal released
+            if not released:
+                released = True
+                request.app.state.admission.release()
+
+        async def stream():
+            events = _run(graph, body.message, session_id, queue_wait_ms)
+            try:
+                async with request.app.state.sessions.hold(session_id):
+                    async for event in events:
+                        if await request.is_disconnected():
+                            break
+                        yield _sse(event)
+            except Exception as e:
+                yield _sse({"type": "error", "session_id": session_id, "error": str(e)})
+            finally:
+                # Client ngắt giữa chừng -> đóng hẳn astream_events để graph dừng và giải phóng tài nguyên
+                await events.aclose()
+                release_once()
+
+        return StreamingResponse(stream(), media_type="text/event-stream", background=BackgroundTask(release_once),
+                                 headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    @app.post("/v1/chat")
+    async def chat(body: ChatRequest, request: Request):
+        session_id = _resolve_session(body.session_id)
+        graph, queue_wait_ms = await _admit(request)
+        events = []
+        try:
+            async with request.app.state.sessions.hold(session_id):
+                async for event in _run(graph, body.message, session_id, queue_wait_ms):
+                    if event["type"] != "token":
+                        events.append(event)
+        except Exception as e:
+            return JSONResponse(status_code=500, content={"session_id": session_id, "error": str(e)})
+        finally:
+            request.app.state.admission.release()
+        return {"session_id": session_id, "answer": events[-1]["answer"], "events": events[:-1]}
+
+    @app.get("/v1/artifacts/{artifact_id}")
+    async def get_artifact(artifact_id: str):
+        path = artifact_path(artifact_id) if artifact_id.isalnum() else None
+        if not path:
+            raise HTTPException(status_code=404, detail="Artifact không tồn tại hoặc đã hết hạn.")
+        return FileResponse(path, media_type="image/png")
+
+    @app.get("/healthz")
+    async def healthz():
+        return {"status": "ok"}
+
+    @app.get("/readyz")
+    async def readyz(request: Request):
+        admission_state = request.app.state.admission
+        ready = request.app.state.graph is not None and not admission_state.saturated
+        body = {"ready": ready, "graph_loaded": request.app.state.graph is not None,
+                "admission": admission_state.snapshot(), "tracing": tracer.stats,
+                "cascade": escalation_stats.snapshot()}
+        try:
+            from core.database import db_manager
+            body["db_pools"] = db_manager.pool_stats()
+        except Exception as e:
+            body["db_pools_error"] = str(e)
+        return JSONResponse(status_code=200 if ready else 503, content=body)
+
+    return app
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    import uvicorn
+    uvicorn.run("api.server:app", host=settings.SERVER_HOST, port=settings.SERVER_PORT,
+                workers=settings.SERVER_WORKERS)
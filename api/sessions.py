@@ -0,0 +1,28 @@
+import hmac
+import uuid
+import hashlib
+import secrets
+from typing import Optional
+from config.settings import settings
+
+
+class SessionTokens:
+    """
+    session_id do server cấp: "<id ngẫu nhiên>.<HMAC-SHA256 của id>". Chỉ token có chữ ký hợp lệ mới được dùng
+    làm thread_id của checkpointer -> client không tự đặt / đoán được session_id để đọc lịch sử của người khác.
+    """
+
+    def __init__(self, secret: str = settings.SERVER_SESSION_SECRET):
+        # Không cấu hình secret -> sinh ngẫu nhiên cho tiến trình (MemorySaver cũng chỉ sống trong tiến trình)
+        self._key = (secret or secrets.token_hex(32)).encode("utf-8")
+
+    def _sign(self, session_key: str) -> str:
+        return hmac.new(self._key, session_key.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    def issue(self) -> str:
+        session_key = uuid.uuid4().hex
+        return f"{session_key}.{self._sign(session_key)}"
+
+    def verify(self, token: Optional[str]) -> bool:
+        session_key, _, signature = (token or "").partition(".")
+        return bool(session_key and signature) and hmac.compare_digest(signature, self._sign(session_key))
@@ -1,116 +1,108 @@
+import json
+import httpx
 import streamlit as st
-import asyncio
-from langchain_core.messages import HumanMessage
-from langchain_openai import ChatOpenAI
 from config.settings import settings
-from tools import sql_service, insight_tools
-from agent import AgentNodes, InsightAgentWorkflow
 
 st.set_page_config(page_title="Insight Agent Enterprise", layout="wide")
 
-@st.cache_resource
-def init_agent_app():
-    """
-    Khởi tạo toàn bộ hệ thống Agent
-    """
-    llm = ChatOpenAI(model=settings.LLM_MODEL, temperature=settings.LLM_TEMPERATURE, streaming=True)
-    llm_writer = ChatOpenAI(model=settings.LLM_MODEL, temperature=settings.WRITER_TEMPERATURE, streaming=True)
-    
-    tools = insight_tools
-    
-    db_schema = sql_service.get_db_schema()
-    
-    nodes = AgentNodes(llm=llm, llm_writer=llm_writer, tools=tools, db_schema=db_schema)
-    workflow = InsightAgentWorkflow(nodes=nodes, tools=tools)
-    return workflow.compile()
-
-graph_app = init_agent_app()
-
-async def run_chat_logic(user_input):
+# Streamlit chỉ là client mỏng: graph chạy ở API server (api/server.py), nhận sự kiện qua SSE
+API_URL = settings.AGENT_API_URL.rstrip("/")
+
+
+def get_session_id() -> str:
+    """Mỗi phiên trình duyệt một session (thread_id) riêng trên server."""
+    if "session_id" not in st.session_state:
+        response = httpx.post(f"{API_URL}/v1/sessions", timeout=10)
+        response.raise_for_status()
+        st.session_state.session_id = response.json()["session_id"]
+    return st.session_state.session_id
+
+
+def iter_sse(response: httpx.Response):
+    """Đọc luồng Server-Sent Events, mỗi sự kiện là một dict JSON."""
+    data_lines = []
+    for line in response.iter_lines():
+        if line.startswith("data:"):
+            data_lines.append(line[5:].strip())
+        elif not line and data_lines:
+            yield json.loads("\n".join(data_lines))
+            data_lines = []
+
+
+def render_event(event: dict, status_container):
+    kind = event["type"]
+    if kind == "tool_start":
+        status_container.write(f"Đang dùng công cụ: **{event['tool']}**...")
+        if event.get("sql"):
+            with status_container.expander("Xem câu lệnh SQL thực thi"):
+                st.code(event["sql"], language="sql")
+    elif kind == "tool_end":
+        status_container.write(f"**{event['tool']}** xong.")
+        artifact = event.get("artifact")
+        if artifact and artifact.get("url"):
+            image = httpx.get(f"{API_URL}{artifact['url']}", timeout=30)
+            if image.status_code == 200:
+                st.image(image.content, caption="Biểu đồ phân tích")
+    elif kind == "input_guardrail":
+        label = "An toàn" if event["is_safe"] else "Cảnh báo Bảo mật"
+        color = "green" if event["is_safe"] else "red"
+        status_container.write(f"**Kiểm duyệt đầu vào:** Đã kiểm duyệt - :{color}[{label}]")
+        status_container.write(f"**Lý do:** {event['reasoning']}")
+        status_container.write("---")
+    elif kind == "router":
+        status_label = "Ngoài phạm vi" if event["is_out_of_scope"] else "Trong phạm vi"
+        color = "orange" if event["is_out_of_scope"] else "green"
+        status_container.write(f"**Phân loại:** :{color}[{status_label}]")
+        status_container.write(f"**Lý do:** {event['reasoning']}")
+        status_container.write("---")
+    elif kind == "output_guardrail":
+        status_container.write("**Kiểm duyệt đầu ra:** Dữ liệu nhạy cảm đã được lọc.")
+    elif kind == "query_transform":
+        status_container.write(f"**Tối ưu câu hỏi:** _{event['transformed_query']}_")
+        status_container.write("---")
+
+
+def run_chat_logic(user_input):
     with st.chat_message("assistant"):
         status_container = st.status("Đang phân tích yêu cầu...", expanded=True)
         answer_placeholder = st.empty()
         full_response = ""
-        config = {"configurable": {"thread_id": "1"}}
-        
-        async for event in graph_app.astream_events(
-            {"messages": [HumanMessage(content=user_input)]},
-            config=config,
-            version="v2"
-        ):
-            kind = event["event"]
-            metadata = event.get("metadata", {})
-            node_name = metadata.get("langgraph_node", "")
-            
-            if kind == "on_tool_start":
-                tool_name = event['name']
-                if tool_name not in ["__start__", "__end__"]:
-                    status_container.write(f"Đang dùng công cụ: **{tool_name}**...")
-                    if tool_name == "query_sql_db":
-                        sql_query = event.get("data", {}).get("input", {}).get("query")
-                        if sql_query:
-                            with status_container.expander("Xem câu lệnh SQL thực thi"):
-                                st.code(sql_query, language="sql")
-            elif kind == "on_tool_end":
-                tool_name = event['name']
-                if tool_name not in ["__start__", "__end__"]:
-                    status_container.write(f"**{tool_name}** xong.")
-                    if tool_name == "python_chart_maker":
-                        st.image("static/chart_output.png", caption="Biểu đồ phân tích")
-            elif kind == "on_chat_model_stream":
-                if node_name in ["final_answer", "general_chat"]:
-                    content = event["data"]["chunk"].content
-                    if content:
-                        full_response += content
+        payload = {"message": user_input, "session_id": get_session_id()}
+
+        try:
+            with httpx.stream("POST", f"{API_URL}/v1/chat/stream", json=payload, timeout=httpx.Timeout(10, read=300)) as response:
+                if response.status_code != 200:
+                    response.read()
+                    try:
+                        detail = response.json().get("detail", response.text)
+                    except ValueError:
+                        detail = response.text
+                    status_container.update(label="Không xử lý được yêu cầu", state="error")
+                    st.error(detail)
+                    return
+                for event in iter_sse(response):
+                    if event["type"] == "token":
+                        full_response += event["content"]
                         answer_placeholder.markdown(full_response + "▌")
-            elif kind == "on_chain_end":
-                if node_name == "input_guardrail" and event["name"] == "input_guardrail":
-                    output = event["data"].get("output")
-                    if output and not isinstance(output, str):
-                        if isinstance(output, dict):
-                            is_safe = output.get("is_safe", True)
-                            reasoning = output.get("reasoning", "Không có lý do")
-                        else:
-                            is_safe = getattr(output, 'is_safe', True)
-                            reasoning = getattr(output, 'reasoning', "Không có lý do")
-                        label = "An toàn" if is_safe else "Cảnh báo Bảo mật"
-                        color = "green" if is_safe else "red"
-                        status_container.write(f"**Kiểm duyệt đầu vào:** Đã kiểm duyệt - :{color}[{label}]")
-                        status_container.write(f"**Lý do:** {reasoning}")
-                        status_container.write("---")
-                elif node_name == "agent_router" and event["name"] == "agent_router":
-                    output = event["data"].get("output")
-                    if output and not isinstance(output, str):
-                        try:
-                            is_out = getattr(output, 'is_out_of_scope', None)
-                            reasoning = getattr(output, 'reasoning', "Không có lý do")
-                            
-                            if is_out is None and isinstance(output, dict):
-                                is_out = output.get("is_out_of_scope")
-                                reasoning = output.get("reasoning", "Không có lý do")
-                            if is_out is not None:
-                                status_label = "Ngoài phạm vi" if is_out else "Trong phạm vi"
-                                color = "orange" if is_out else "green"
-                                
-                                status_container.write(f"**Phân loại:** :{color}[{status_label}]")
-                                status_container.write(f"**Lý do:** {reasoning}")
-                                status_container.write("---")
-                        except Exception as e:
-                            print(f"Lỗi hiển thị log: {e}")
-                elif node_name == "output_guardrail" and event["name"] == "output_guardrail":
-                    status_container.write("**Kiểm duyệt đầu ra:** Dữ liệu nhạy cảm đã được lọc.")
-                elif node_name == "query_transform" and event["name"] == "query_transform":
-                    output = event["data"].get("output")
-                    if output and isinstance(output, dict):
-                        transformed = output.get("transformed_query")
-                        if transformed:
-                            status_container.write(f"**Tối ưu câu hỏi:** _{transformed}_")
-                            status_container.write("---")
-            
+                    elif event["type"] == "error":
+                        st.error(f"Lỗi: {event['error']}")
+                    else:
+                        render_event(event, status_container)
+        except httpx.HTTPError as e:
+            status_container.update(label="Không kết nối được API server", state="error")
+            st.error(f"Không kết nối được Agent API ({API_URL}): {e}")
+            return
+
         status_container.update(label="Hoàn thành xử lý!", state="complete", expanded=False)
         answer_placeholder.markdown(full_response)
         st.session_state.messages.append({"role": "assistant", "content": full_response})
 
+with st.sidebar.expander("Trạng thái Agent API"):
+    try:
+        st.json(httpx.get(f"{API_URL}/readyz", timeout=5).json())
+    except httpx.HTTPError as e:
+        st.write(f"Không kết nối được {API_URL}: {e}")
+
 st.title("🤖 Insight Agent Enterprise (SQL + RAG + Python)")
 st.markdown("Hệ thống trợ lý ảo phân tích dữ liệu đa luồng.")
 
@@ -123,4 +115,4 @@ for msg in st.session_state.messages:
 if prompt := st.chat_input("VD: Doanh thu tháng này? Quy định nghỉ phép? Vẽ biểu đồ giá..."):
     st.session_state.messages.append({"role": "user", "content": prompt})
     st.chat_message("user").write(prompt)
-    asyncio.run(run_chat_logic(prompt))
\ No newline at end of file
+    run_chat_logic(prompt)
\ No newline at end of file
@@ -1,4 +1,5 @@
 import os
+import json
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,6 +9,17 @@ class Settings:
     
     # Database & API Keys
     DATABASE_URL: str = os.getenv("DATABASE_URL")
+
+    # Pool kết nối dùng chung (core/database.py): một engine cho mỗi (DSN, role)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT_SECONDS: float = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))
+    DB_POOL_RECYCLE_SECONDS: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "300"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+    DB_WRITE_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_WRITE_STATEMENT_TIMEOUT_MS", "0"))
+    DB_CONNECT_TIMEOUT_SECONDS: int = 10
+    DB_KEEPALIVES_IDLE_SECONDS: int = 30
     COHERE_API_KEY: str = os.getenv("COHERE_API_KEY")
     
     # Models Configuration
@@ -15,10 +27,142 @@ class Settings:
     LLM_TEMPERATURE: float = 0.0
     WRITER_TEMPERATURE: float = 0.2
     EMBEDDING_MODEL: str = "text-embedding-3-small"
+    EMBEDDING_DIMENSIONS: int = 1536
     RERANK_MODEL: str = "rerank-v3.5"
+
+    # Model cascade (agent/cascade.py): node phân loại / lần gọi tool đầu dùng model fast,
+    # leo thang lên model strong khi confidence thấp, output không hợp lệ hoặc tool lỗi
+    LLM_CASCADE_ENABLED: bool = os.getenv("LLM_CASCADE_ENABLED", "false").lower() == "true"
+    LLM_FAST_MODEL: str = os.getenv("LLM_FAST_MODEL", "gpt-4.1-nano")
+    LLM_STRONG_MODEL: str = os.getenv("LLM_STRONG_MODEL", LLM_MODEL)
+    CASCADE_MIN_CONFIDENCE: float = float(os.getenv("CASCADE_MIN_CONFIDENCE", "0.7"))
+    # Model riêng theo node: tên tầng ("fast" / "strong" / "writer") hoặc tên model, ví dụ: {"agent_router": "fast"}
+    NODE_MODELS: dict = json.loads(os.getenv("NODE_MODELS", "{}"))
+
+    # Trả lời trực tiếp (agent/direct_answer.py): kết quả đơn giản (một giá trị / bảng nhỏ từ SQL, một ý chính sách
+    # có nguồn) được trình bày bằng template, bỏ qua final_answer (llm_writer) nhưng vẫn qua output_guardrail.
+    # DIRECT_ANSWER_SKIP_OUTPUT_GUARDRAIL=true bỏ luôn output_guardrail: khi đó chỉ còn mask_pii (regex email /
+    # số điện thoại) che dữ liệu nhạy cảm, không có kiểm tra bằng LLM -> chỉ bật khi chấp nhận đảm bảo thấp hơn.
+    DIRECT_ANSWER_ENABLED: bool = os.getenv("DIRECT_ANSWER_ENABLED", "true").lower() == "true"
+    DIRECT_ANSWER_SKIP_OUTPUT_GUARDRAIL: bool = os.getenv("DIRECT_ANSWER_SKIP_OUTPUT_GUARDRAIL", "false").lower() == "true"
+    DIRECT_ANSWER_MAX_ROWS: int = 5
+    DIRECT_ANSWER_MAX_COLUMNS: int = 3
+    DIRECT_ANSWER_MAX_CHARS: int = 400
+    ANSWER_LOCALE: str = os.getenv("ANSWER_LOCALE", "vi")
+
+    # Chế độ agent: "react" (agent -> tools -> agent từng bước) hoặc "plan" (agent/planner.py: một lần gọi LLM lập
+    # DAG các lần gọi tool, các bước độc lập chạy song song, chỉ lập lại kế hoạch khi có bước lỗi)
+    AGENT_MODE: str = os.getenv("AGENT_MODE", "react")
+    PLAN_MAX_STEPS: int = 6
+    PLAN_MAX_REPLANS: int = int(os.getenv("PLAN_MAX_REPLANS", "1"))
+    PLAN_MAX_WORKERS: int = 4
     
     # Vector Store
     COLLECTION_NAME: str = "company_policies"
+    # Nhiều collection (mỗi họ tài liệu / phòng ban một shard), phân tách bằng dấu phẩy
+    RAG_COLLECTIONS: list = [
+        name.strip() for name in os.getenv("RAG_COLLECTIONS", COLLECTION_NAME).split(",") if name.strip()
+    ]
+    # Gợi ý từ khóa -> collection, ví dụ: {"finance_docs": ["hoàn ứng", "thanh toán"]}
+    COLLECTION_KEYWORDS: dict = json.loads(os.getenv("COLLECTION_KEYWORDS", "{}"))
+    ROUTER_MARGIN: float = float(os.getenv("ROUTER_MARGIN", "0.03"))
+    ROUTER_MAX_FANOUT: int = int(os.getenv("ROUTER_MAX_FANOUT", "3"))
+    ROUTER_REFRESH_SECONDS: int = 300
+
+    # ANN Index (pgvector): "hnsw", "ivfflat" hoặc "none" (quét tuần tự, kết quả chính xác)
+    VECTOR_INDEX_TYPE: str = os.getenv("VECTOR_INDEX_TYPE", "hnsw")
+    HNSW_M: int = int(os.getenv("HNSW_M", "16"))
+    HNSW_EF_CONSTRUCTION: int = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+    HNSW_EF_SEARCH: int = int(os.getenv("HNSW_EF_SEARCH", "40"))
+    IVFFLAT_LISTS: int = int(os.getenv("IVFFLAT_LISTS", "100"))
+    IVFFLAT_PROBES: int = int(os.getenv("IVFFLAT_PROBES", "10"))
+
+    # RAG Retriever: "pgvector" (truy vấn Postgres), "numpy" (ma trận trong tiến trình)
+    # hoặc "hybrid" (full-text + vector hợp nhất bằng RRF trong Postgres)
+    RAG_RETRIEVER: str = os.getenv("RAG_RETRIEVER", "pgvector")
+    RAG_CANDIDATE_K: int = 5
+    RAG_TOP_N: int = 3
+    RAG_RERANK_ENABLED: bool = os.getenv("RAG_RERANK_ENABLED", "true").lower() == "true"
+
+    # Adaptive Rerank: bỏ qua rerank khi khoảng cách điểm vector đủ rõ, cache kết quả rerank
+    RERANK_ADAPTIVE: bool = os.getenv("RERANK_ADAPTIVE", "true").lower() == "true"
+    RERANK_SKIP_MARGIN: float = float(os.getenv("RERANK_SKIP_MARGIN", "0.05"))
+    RERANK_POOL_MARGIN: float = float(os.getenv("RERANK_POOL_MARGIN", "0.01"))
+    RERANK_WIDE_POOL_K: int = 10
+    RERANK_CACHE_SIZE: int = 512
+    RERANK_CACHE_TTL_SECONDS: int = 3600
+
+    # Context Compression: nén ngữ cảnh RAG theo câu trong ngân sách token
+    RAG_COMPRESSION_ENABLED: bool = os.getenv("RAG_COMPRESSION_ENABLED", "false").lower() == "true"
+    RAG_CONTEXT_TOKEN_BUDGET: int = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "600"))
+    SENTENCE_EMBEDDING_CACHE_SIZE: int = 20000
+    LOCAL_INDEX_DIR: str = os.getenv("LOCAL_INDEX_DIR", ".cache/vector_index")
+    LOCAL_INDEX_REFRESH_SECONDS: int = int(os.getenv("LOCAL_INDEX_REFRESH_SECONDS", "300"))
+
+    # Hybrid Search (full-text tiếng Việt bỏ dấu + vector)
+    TEXT_SEARCH_CONFIG: str = "vi_unaccent"
+    HYBRID_CANDIDATE_K: int = 20
+    HYBRID_RRF_K: int = 60
+
+    # Near-duplicate detection khi ingest (MinHash/LSH)
+    DEDUP_ENABLED: bool = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+    DEDUP_THRESHOLD: float = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+    DEDUP_MAPPING_DIR: str = ".cache/dedup"
+
+    # Sandbox chạy code Python của LLM (pool tiến trình con đã nạp sẵn pandas/matplotlib)
+    SANDBOX_POOL_SIZE: int = int(os.getenv("SANDBOX_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+    SANDBOX_TIMEOUT_SECONDS: float = float(os.getenv("SANDBOX_TIMEOUT_SECONDS", "30"))
+    SANDBOX_CPU_SECONDS: int = int(os.getenv("SANDBOX_CPU_SECONDS", "20"))
+    SANDBOX_MEMORY_MB: int = int(os.getenv("SANDBOX_MEMORY_MB", "1024"))
+    SANDBOX_RECYCLE_RSS_MB: int = 768
+    SANDBOX_MAX_RUNS_PER_WORKER: int = 200
+    SANDBOX_QUEUE_TIMEOUT_SECONDS: float = 60
+
+    # Artifact biểu đồ (định danh theo nội dung) + data handle của kết quả SQL
+    ARTIFACT_DIR: str = os.getenv("ARTIFACT_DIR", "static/artifacts")
+    ARTIFACT_TTL_SECONDS: int = int(os.getenv("ARTIFACT_TTL_SECONDS", "86400"))
+    ARTIFACT_MAX_FILES: int = 1000
+    ARTIFACT_MAX_BYTES: int = int(os.getenv("ARTIFACT_MAX_MB", "500")) * 1024 * 1024
+    DATA_HANDLE_DIR: str = ".cache/data_handles"
+    DATA_HANDLE_TTL_SECONDS: int = 3600
+
+    # Chart spec: vẽ biểu đồ từ đặc tả JSON bằng bộ vẽ trong tiến trình (python_chart_maker là dự phòng)
+    CHART_SPEC_ENABLED: bool = os.getenv("CHART_SPEC_ENABLED", "true").lower() == "true"
+    CHART_RENDERER_FIGURES: int = 4
+
+    # Giảm dữ liệu trước khi vẽ: LTTB cho đường, lưới cho scatter, top-N + "Khác" cho cột/tròn
+    CHART_DOWNSAMPLE_ENABLED: bool = os.getenv("CHART_DOWNSAMPLE_ENABLED", "true").lower() == "true"
+    CHART_MAX_LINE_POINTS: int = 2000
+    CHART_SCATTER_GRID: int = 300
+    CHART_MAX_SCATTER_POINTS: int = 10000
+    CHART_MAX_CATEGORIES: int = 30
+    CHART_MAX_PIE_SLICES: int = 8
+    CHART_HIST_MAX_BINS: int = 60
+
+    # Khởi động nhanh: service khởi tạo khi dùng lần đầu, warm-up ở nền, schema snapshot trên đĩa
+    SERVICE_WARMUP_ENABLED: bool = os.getenv("SERVICE_WARMUP_ENABLED", "true").lower() == "true"
+    SCHEMA_CACHE_DIR: str = ".cache/schema"
+    SCHEMA_CACHE_TTL_SECONDS: int = int(os.getenv("SCHEMA_CACHE_TTL_SECONDS", "86400"))
+
+    # API server (api/server.py) + Streamlit thin client
+    SERVER_HOST: str = os.getenv("SERVER_HOST", "0.0.0.0")
+    SERVER_PORT: int = int(os.getenv("SERVER_PORT", "8000"))
+    SERVER_WORKERS: int = int(os.getenv("SERVER_WORKERS", "1"))
+    SERVER_MAX_CONCURRENT_RUNS: int = int(os.getenv("SERVER_MAX_CONCURRENT_RUNS", "8"))
+    SERVER_MAX_QUEUE: int = int(os.getenv("SERVER_MAX_QUEUE", "32"))
+    SERVER_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("SERVER_QUEUE_TIMEOUT_SECONDS", "30"))
+    SERVER_WORKER_THREADS: int = int(os.getenv("SERVER_WORKER_THREADS", "32"))
+    # Khóa ký session_id (api/sessions.py). Bỏ trống -> sinh ngẫu nhiên mỗi tiến trình (session mất khi restart)
+    SERVER_SESSION_SECRET: str = os.getenv("SERVER_SESSION_SECRET", "")
+    AGENT_API_URL: str = os.getenv("AGENT_API_URL", "http://localhost:8000")
+
+    # Tracing (core/tracing.py): span cho từng node / tool / LLM, xuất ra JSONL và OTLP/HTTP nếu có endpoint
+    TRACE_ENABLED: bool = os.getenv("TRACE_ENABLED", "true").lower() == "true"
+    TRACE_SAMPLE_RATE: float = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+    TRACE_JSONL_PATH: str = os.getenv("TRACE_JSONL_PATH", ".cache/traces/spans.jsonl")
+    TRACE_SERVICE_NAME: str = "insight-agent"
+    TRACE_FLUSH_SECONDS: float = 2.0
+    OTLP_ENDPOINT: str = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT", "")
 
     def __init__(self):
         self._validate_settings()
@@ -26,7 +170,26 @@ class Settings:
     def _validate_settings(self):
         if not self.DATABASE_URL:
             raise ValueError("Lỗi: Chưa cấu hình DATABASE_URL trong file .env")
+        if self.SERVER_MAX_CONCURRENT_RUNS < 1 or self.SERVER_MAX_QUEUE < 0:
+            raise ValueError("Lỗi: SERVER_MAX_CONCURRENT_RUNS phải >= 1 và SERVER_MAX_QUEUE phải >= 0.")
+        if not 0.0 <= self.TRACE_SAMPLE_RATE <= 1.0:
+            raise ValueError("Lỗi: TRACE_SAMPLE_RATE phải nằm trong khoảng [0, 1].")
+        if self.DB_POOL_SIZE < 1 or self.DB_MAX_OVERFLOW < 0:
+            raise ValueError("Lỗi: DB_POOL_SIZE phải >= 1 và DB_MAX_OVERFLOW phải >= 0.")
         if not self.COHERE_API_KEY:
             raise ValueError("Lỗi: Chưa cấu hình COHERE_API_KEY trong file .env")
+        if self.VECTOR_INDEX_TYPE not in ("hnsw", "ivfflat", "none"):
+            raise ValueError("Lỗi: VECTOR_INDEX_TYPE chỉ nhận 'hnsw', 'ivfflat' hoặc 'none'")
+        if self.RAG_RETRIEVER not in ("pgvector", "numpy", "hybrid"):
+            raise ValueError("Lỗi: RAG_RETRIEVER chỉ nhận 'pgvector', 'numpy' hoặc 'hybrid'")
+        unknown = set(self.COLLECTION_KEYWORDS) - set(self.RAG_COLLECTIONS)
+        if unknown:
+            raise ValueError(f"Lỗi: COLLECTION_KEYWORDS chứa collection không có trong RAG_COLLECTIONS: {sorted(unknown)}")
+        if self.AGENT_MODE not in ("react", "plan"):
+            raise ValueError("Lỗi: AGENT_MODE chỉ nhận 'react' hoặc 'plan'")
+        if self.ANSWER_LOCALE not in ("vi", "en"):
+            raise ValueError("Lỗi: ANSWER_LOCALE chỉ nhận 'vi' hoặc 'en'")
+        if not 0.0 <= self.CASCADE_MIN_CONFIDENCE <= 1.0:
+            raise ValueError("Lỗi: CASCADE_MIN_CONFIDENCE phải nằm trong khoảng [0, 1].")
 
 settings = Settings()
\ No newline at end of file
@@ -0,0 +1,123 @@
+import threading
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from config.settings import settings
+
+ROLE_READ = "read"
+ROLE_VECTOR = "vector"
+ROLE_WRITE = "write"
+
+# read: truy vấn SQL của agent + evaluator (transaction chỉ đọc, có statement timeout)
+# vector: tìm kiếm RAG (PGVector cần ghi khi khởi tạo bảng / collection)
+# write: nạp dữ liệu, tạo index (câu lệnh dài -> timeout riêng, mặc định không giới hạn)
+ROLE_PROFILES = {
+    ROLE_READ: {"read_only": True, "statement_timeout_ms": settings.DB_STATEMENT_TIMEOUT_MS},
+    ROLE_VECTOR: {"read_only": False, "statement_timeout_ms": settings.DB_STATEMENT_TIMEOUT_MS},
+    ROLE_WRITE: {"read_only": False, "statement_timeout_ms": settings.DB_WRITE_STATEMENT_TIMEOUT_MS},
+}
+
+
+class ConnectionManager:
+    """
+    Quản lý tập trung engine/pool kết nối Postgres: mỗi cặp (DSN, role) dùng chung đúng một engine.
+    Cấu hình pool (size, overflow, recycle, pre-ping), keepalive TCP và statement timeout lấy từ settings;
+    pre-ping + recycle + keepalive giúp không gặp lỗi kết nối bị Postgres serverless cắt khi để rảnh.
+    """
+
+    def __init__(self, pool_size: int = settings.DB_POOL_SIZE, max_overflow: int = settings.DB_MAX_OVERFLOW,
+                 pool_timeout: float = settings.DB_POOL_TIMEOUT_SECONDS,
+                 pool_recycle: int = settings.DB_POOL_RECYCLE_SECONDS,
+                 pre_ping: bool = settings.DB_POOL_PRE_PING):
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.pool_timeout = pool_timeout
+        self.pool_recycle = pool_recycle
+        self.pre_ping = pre_ping
+        self._engines = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _connect_args(dsn: str, role: str) -> dict:
+        if make_url(dsn).get_backend_name() != "postgresql":
+            return {}
+        profile = ROLE_PROFILES[role]
+        options = [f"-c statement_timeout={profile['statement_timeout_ms']}"]
+        if profile["read_only"]:
+            options.append("-c default_transaction_read_only=on")
+        return {
+            "options": " ".join(options),
+            "connect_timeout": settings.DB_CONNECT_TIMEOUT_SECONDS,
+            "keepalives": 1,
+            "keepalives_idle": settings.DB_KEEPALIVES_IDLE_SECONDS,
+            "keepalives_interval": 10,
+            "keepalives_count": 3,
+            "application_name": f"insight_agent_{role}",
+        }
+
+    def _track(self, engine: Engine, key: tuple):
+        counters = self._counters[key] = {"connects": 0, "checkouts": 0, "invalidated": 0}
+
+        @event.listens_for(engine, "connect")
+        def _on_connect(dbapi_connection, connection_record):
+            counters["connects"] += 1
+
+        @event.listens_for(engine, "checkout")
+        def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+            counters["checkouts"] += 1
+
+        @event.listens_for(engine, "invalidate")
+        def _on_invalidate(dbapi_connection, connection_record, exception):
+            # Kết nối chết (pre-ping thất bại / lỗi mạng) bị loại khỏi pool
+            counters["invalidated"] += 1
+
+    def get_engine(self, role: str = ROLE_READ, dsn: str = None) -> Engine:
+        if role not in ROLE_PROFILES:
+            raise ValueError(f"Lỗi: Role kết nối '{role}' không hợp lệ. Chọn một trong: {list(ROLE_PROFILES)}")
+        dsn = dsn or settings.DATABASE_URL
+        key = (dsn, role)
+        with self._lock:
+            engine = self._engines.get(key)
+            if engine is None:
+                engine = create_engine(
+                    dsn,
+                    pool_size=self.pool_size,
+                    max_overflow=self.max_overflow,
+                    pool_timeout=self.pool_timeout,
+                    pool_recycle=self.pool_recycle,
+                    pool_pre_ping=self.pre_ping,
+                    connect_args=self._connect_args(dsn, role),
+                )
+                self._track(engine, key)
+                self._engines[key] = engine
+            return engine
+
+    def pool_stats(self) -> list:
+        """Chỉ số pool của từng engine (không lộ DSN): kích thước, đang mượn, overflow, số lần kết nối lại..."""
+        stats = []
+        with self._lock:
+            items = list(self._engines.items())
+        for (dsn, role), engine in items:
+            pool = engine.pool
+            entry = {"role": role, "database": make_url(dsn).render_as_string(hide_password=True)}
+            for name in ("size", "checkedin", "checkedout", "overflow"):
+                method = getattr(pool, name, None)
+                if callable(method):
+                    entry[name] = method()
+            entry.update(self._counters[(dsn, role)])
+            stats.append(entry)
+        return stats
+
+    def dispose_all(self):
+        with self._lock:
+            for engine in self._engines.values():
+                engine.dispose()
+            self._engines.clear()
+            self._counters.clear()
+
+
+db_manager = ConnectionManager()
+
+
+def get_engine(role: str = ROLE_READ, dsn: str = None) -> Engine:
+    return db_manager.get_engine(role, dsn)
@@ -20,7 +20,7 @@ SYSTEM_PROMPT_TEMPLATE = """Bạn là bộ não trung tâm của hệ thống In
     1. query_sql_db: Lấy số liệu từ DB. Schema: {schema_info}.
     - LƯU Ý: Tuyệt đối KHÔNG dùng dấu chấm phẩy (;) cuối câu lệnh SQL.
     2. search_policy_docs: Tra cứu chính sách.
-    3. python_chart_maker: Vẽ biểu đồ.
+    {chart_tools}
     
     HƯỚNG DẪN QUAN TRỌNG:
     - Nếu cần thông tin -> Gọi Tool.
@@ -32,6 +32,15 @@ SYSTEM_PROMPT_TEMPLATE = """Bạn là bộ não trung tâm của hệ thống In
       * Số đơn: 50
     """
 
+# Mô tả tool vẽ biểu đồ, chèn vào {chart_tools} tùy theo tool render_chart có được bật hay không
+CHART_TOOLS_SPEC_PROMPT = """3. render_chart: Vẽ biểu đồ thông thường (bar/line/pie/scatter...) từ đặc tả JSON - ƯU TIÊN dùng tool này.
+    - Truyền DATA_HANDLE do query_sql_db trả về vào data_handle, chọn cột x/y (và group_by/agg/sort/limit nếu cần).
+    4. python_chart_maker: Chạy code Python vẽ biểu đồ - CHỈ dùng khi render_chart không diễn tả được biểu đồ.
+    - Nếu query_sql_db trả về DATA_HANDLE, hãy truyền nó vào tham số data_handle và dùng biến df trong code thay vì chép lại số liệu."""
+
+CHART_TOOLS_SCRIPT_PROMPT = """3. python_chart_maker: Vẽ biểu đồ.
+    - Nếu query_sql_db trả về DATA_HANDLE, hãy truyền nó vào tham số data_handle và dùng biến df trong code thay vì chép lại số liệu."""
+
 # ==========================================
 # GUARDRAIL PROMPTS
 # ==========================================
@@ -51,6 +60,7 @@ INPUT_GUARDRAIL_PROMPT = """Bạn là chuyên gia bảo mật AI.
     3. Yêu cầu vẽ biểu đồ ví dụ biểu đồ doanh thu, tính toán tỷ lệ tăng trưởng (Sử dụng Python).
 
     Nếu phát hiện bất kỳ vi phạm nào ở trên, hãy trả về is_safe = False, kèm lý do cụ thể trong reasoning và hành động phù hợp.
+    Luôn trả về confidence (0 đến 1): mức độ chắc chắn của bạn về đánh giá này, thấp nếu câu hỏi mập mờ, khó kết luận.
     """
 
 OUTPUT_GUARDRAIL_PROMPT = """Hãy kiểm tra câu trả lời sau có chứa thông tin nhạy cảm (Email, Số điện thoại cá nhân) không:
@@ -95,6 +105,41 @@ DANH MỤC NGOÀI PHẠM VI (is_out_of_scope = True):
 - Câu hỏi về các công ty công nghệ khác (OpenAI, Google) trừ khi hỏi về sự tương tác với dữ liệu nội bộ.
 
 BẮT BUỘC: Nếu câu hỏi có chứa từ khóa liên quan đến 'doanh thu', 'bán hàng', 'quy định', 'bao nhiêu' -> Phải trả về is_out_of_scope = False.
+
+Luôn trả về confidence (0 đến 1): mức độ chắc chắn của bạn về phân loại, thấp nếu câu hỏi mập mờ giữa hai danh mục.
+"""
+
+# ==========================================
+# PLAN-THEN-EXECUTE PROMPT
+# ==========================================
+
+PLANNER_PROMPT = """Bạn là bộ lập kế hoạch của hệ thống Insight Agent.
+Nhiệm vụ: Lập MỘT kế hoạch gọi tool (dạng DAG) để lấy đủ thông tin trả lời câu hỏi, các bước sẽ được thực thi tự động.
+
+Câu hỏi: "{question}"
+Ngày hiện tại: {today}
+
+Schema DB: {schema_info}
+
+Các tool có sẵn:
+{tool_specs}
+
+QUY TẮC:
+1. Mỗi bước gồm: id ngắn (s1, s2, ...), tên tool, args_json (object JSON chứa tham số của tool) và depends_on.
+2. Các bước độc lập (ví dụ: truy vấn SQL và tra cứu chính sách) để depends_on rỗng -> được chạy song song.
+3. Dùng kết quả của bước trước bằng placeholder trong args: "{{s1.data_handle}}" là DATA_HANDLE do query_sql_db
+   trả về (truyền vào data_handle của tool vẽ biểu đồ), "{{s1}}" là toàn bộ kết quả. Bước dùng placeholder phải có
+   bước đó trong depends_on.
+4. Tối đa {max_steps} bước. Tuyệt đối KHÔNG dùng dấu chấm phẩy (;) cuối câu lệnh SQL.
+5. Nếu câu hỏi không cần tool, trả về steps rỗng.
+{feedback}"""
+
+PLANNER_FEEDBACK_PROMPT = """
+KẾ HOẠCH TRƯỚC CÓ BƯỚC BỊ LỖI. Kết quả các bước đã chạy:
+{results}
+
+Hãy đọc kỹ thông báo lỗi, sửa lại (ví dụ: tên cột, điều kiện JOIN) và lập kế hoạch CHỈ cho phần còn thiếu.
+Không chạy lại bước đã thành công; nếu cần DATA_HANDLE của bước đã thành công, chép trực tiếp giá trị đó vào args.
 """
 
 # ==========================================
@@ -109,7 +154,7 @@ Nếu như tôi không cung cấp lý do, hãy trả lời một cách chung chu
 Còn đây là các Tool mà bạn có thể trả lời nếu người dùng hỏi bạn có thể giúp được gì:
 1. query_sql_db: Lấy số liệu từ DB.
 2. search_policy_docs: Tra cứu chính sách.
-3. python_chart_maker: Vẽ biểu đồ.
+3. render_chart / python_chart_maker: Vẽ biểu đồ.
 Hãy trả lời họ một cách tự nhiên, hữu ích dựa trên kiến thức chung của bạn.
 """
 
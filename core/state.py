@@ -1,4 +1,4 @@
-from typing import Annotated, TypedDict, Sequence
+from typing import Annotated, List, Optional, TypedDict, Sequence
 from pydantic import BaseModel, Field
 from langchain_core.messages import BaseMessage
 from langgraph.graph.message import add_messages
@@ -10,6 +10,8 @@ class AgentState(TypedDict):
     reasoning: str
     is_safe: bool
     transformed_query: str
+    plan: Optional[dict]
+    direct_answer: Optional[str]
 
 class RouteResponse(BaseModel):
     reasoning: str = Field(
@@ -18,8 +20,23 @@ class RouteResponse(BaseModel):
     is_out_of_scope: bool = Field(
         description="Kết quả cuối cùng: True nếu ngoài phạm vi, False nếu liên quan đến dữ liệu công ty."
     )
+    confidence: Optional[float] = Field(
+        default=None, ge=0.0, le=1.0,
+        description="Mức độ chắc chắn của phân loại, từ 0 đến 1."
+    )
     
 class GuardrailResponse(BaseModel):
     is_safe: bool = Field(description="True nếu yêu cầu/nội dung an toàn, False nếu vi phạm chính sách.")
     reasoning: str = Field(description="Lý do cụ thể nếu không an toàn (ví dụ: Prompt Injection, PII leakage).")
-    action: str = Field(description="Hành động: 'proceed', 'refuse', hoặc 'mask_data'.")
\ No newline at end of file
+    action: str = Field(description="Hành động: 'proceed', 'refuse', hoặc 'mask_data'.")
+    confidence: Optional[float] = Field(default=None, ge=0.0, le=1.0, description="Mức độ chắc chắn của đánh giá, từ 0 đến 1.")
+
+class ToolPlanStep(BaseModel):
+    id: str = Field(description="Mã ngắn của bước, ví dụ: s1, s2.")
+    tool: str = Field(description="Tên tool cần gọi.")
+    args_json: str = Field(description="Object JSON chứa tham số của tool, có thể dùng placeholder {s1} hoặc {s1.data_handle}.")
+    depends_on: List[str] = Field(description="Mã các bước phải hoàn thành trước bước này (rỗng nếu chạy độc lập).")
+
+class ToolPlan(BaseModel):
+    reasoning: str = Field(description="Phân tích ngắn gọn câu hỏi cần những thông tin nào.")
+    steps: List[ToolPlanStep] = Field(description="Các bước gọi tool (DAG); rỗng nếu không cần tool.")
\ No newline at end of file
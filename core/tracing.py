@@ -0,0 +1,369 @@
+"""
+Tracing cho graph: mỗi node, mỗi lần gọi tool và mỗi lần gọi LLM là một span
+(thời gian, thời gian chờ, token, cache hit, số lần thử lại).
+
+Span được thu qua LangChain callback (TracingCallbackHandler) và xuất ở luồng nền ra
+file JSONL và/hoặc OTLP/HTTP (JSON) - không chặn request. Lấy mẫu theo trace ngay ở điểm vào:
+trace không được chọn không gắn callback nên gần như không tốn chi phí.
+"""
+import os
+import json
+import time
+import queue
+import random
+import threading
+import urllib.request
+from contextvars import ContextVar
+from dataclasses import dataclass, field, asdict
+from typing import Optional
+from langchain_core.callbacks import BaseCallbackHandler
+from config.settings import settings
+
+
+@dataclass
+class Span:
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    kind: str
+    start_ns: int
+    end_ns: int = 0
+    duration_ms: float = 0.0
+    queue_wait_ms: float = 0.0
+    status: str = "ok"
+    error: Optional[str] = None
+    attributes: dict = field(default_factory=dict)
+
+
+class JsonlSpanExporter:
+    """Ghi mỗi span một dòng JSON (append)."""
+
+    def __init__(self, path: str = settings.TRACE_JSONL_PATH):
+        self.path = path
+
+    def export(self, spans: list):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(asdict(span), ensure_ascii=False, default=str) + "\n")
+
+
+class OtlpHttpSpanExporter:
+    """Gửi span tới collector OpenTelemetry qua OTLP/HTTP (mã hóa JSON), không cần SDK OpenTelemetry."""
+
+    KIND_CODES = {"graph": 2, "node": 1, "tool": 1, "llm": 3}  # SERVER / INTERNAL / CLIENT
+
+    def __init__(self, endpoint: str = settings.OTLP_ENDPOINT, service_name: str = settings.TRACE_SERVICE_NAME,
+                 timeout: float = 5):
+        self.url = endpoint.rstrip("/") + "/v1/traces"
+        self.service_name = service_name
+        self.timeout = timeout
+
+    @staticmethod
+    def _attribute(key: str, value) -> dict:
+        if isinstance(value, bool):
+            return {"key": key, "value": {"boolValue": value}}
+        if isinstance(value, int):
+            return {"key": key, "value": {"intValue": str(value)}}
+        if isinstance(value, float):
+            return {"key": key, "value": {"doubleValue": value}}
+        return {"key": key, "value": {"stringValue": str(value)}}
+
+    def _encode(self, span: Span) -> dict:
+        attributes = {"span.kind": span.kind, "queue_wait_ms": span.queue_wait_ms, **span.attributes}
+        encoded = {
+            "traceId": span.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            "kind": self.KIND_CODES.get(span.kind, 1),
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": [self._attribute(k, v) for k, v in attributes.items() if v is not None],
+            "status": {"code": 2, "message": span.error or ""} if span.status == "error" else {"code": 1},
+        }
+        if span.parent_id:
+            encoded["parentSpanId"] = span.parent_id
+        return encoded
+
+    def export(self, spans: list):
+        payload = {"resourceSpans": [{
+            "resource": {"attributes": [self._attribute("service.name", self.service_name)]},
+            "scopeSpans": [{"scope": {"name": "insight_agent.tracing"}, "spans": [self._encode(s) for s in spans]}],
+        }]}
+        request = urllib.request.Request(self.url, data=json.dumps(payload).encode("utf-8"),
+                                         headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout):
+            pass
+
+
+class Tracer:
+    """Giữ cấu hình lấy mẫu + hàng đợi xuất span; một luồng nền gom span theo lô rồi gọi các exporter."""
+
+    def __init__(self, exporters: list = None, sample_rate: float = settings.TRACE_SAMPLE_RATE,
+                 enabled: bool = settings.TRACE_ENABLED, flush_seconds: float = settings.TRACE_FLUSH_SECONDS,
+                 batch_size: int = 512):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        if exporters is None:
+            exporters = [JsonlSpanExporter()]
+            if settings.OTLP_ENDPOINT:
+                exporters.append(OtlpHttpSpanExporter())
+        self.exporters = exporters
+        self.stats = {"traces_sampled": 0, "traces_skipped": 0, "spans_exported": 0, "export_errors": 0}
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def should_sample(self) -> bool:
+        return bool(self.enabled and self.exporters) and random.random() < self.sample_rate
+
+    def config_for_run(self, config: dict = None, **metadata) -> dict:
+        """
+        Trả về config cho một lượt chạy graph: gắn callback tracing nếu trace được lấy mẫu.
+        metadata (VD: session_id, queue_wait_ms của admission control) được ghi vào span gốc.
+        """
+        config = dict(config or {})
+        if not self.should_sample():
+            self.stats["traces_skipped"] += 1
+            return config
+        self.stats["traces_sampled"] += 1
+        config["callbacks"] = list(config.get("callbacks") or []) + [TracingCallbackHandler(self, metadata)]
+        return config
+
+    def submit(self, spans: list):
+        self._ensure_worker()
+        self._queue.put(spans)
+
+    def _ensure_worker(self):
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, daemon=True, name="trace-exporter")
+                    self._worker.start()
+
+    def _run(self):
+        while True:
+            batch, waiters = [], []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_seconds
+            while True:
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.extend(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if batch:
+                self._export(batch)
+            for waiter in waiters:
+                waiter.set()
+
+    def _export(self, spans: list):
+        for exporter in self.exporters:
+            try:
+                exporter.export(spans)
+            except Exception as e:
+                self.stats["export_errors"] += 1
+                print(f"[Tracing] Lỗi xuất span ({type(exporter).__name__}): {e}")
+        self.stats["spans_exported"] += len(spans)
+
+    def flush(self, timeout: float = 10):
+        """Chờ luồng nền xuất hết span đang giữ (gọi trước khi tiến trình kết thúc)."""
+        if self._worker is None:
+            return
+        done = threading.Event()
+        self._queue.put(done)
+        done.wait(timeout)
+
+
+_current_tool_span: ContextVar = ContextVar("current_tool_span", default=None)
+
+
+def annotate(**attributes):
+    """
+    Ghi thêm thuộc tính (VD: cache_hit) vào span của tool đang chạy.
+    Không làm gì nếu lượt chạy không được trace.
+    """
+    span = _current_tool_span.get()
+    if span is not None:
+        span.attributes.update(attributes)
+
+
+def _new_id(n_bytes: int) -> str:
+    return os.urandom(n_bytes).hex()
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Dựng cây span cho một lượt chạy graph từ callback LangChain.
+    Chỉ giữ run gốc (graph), các node, tool và LLM; các runnable trung gian được bỏ qua
+    nhưng vẫn nối đúng cha - con qua ánh xạ run_id -> span gần nhất.
+    """
+
+    raise_error = False
+    # Chạy ngay trong task gọi tool (không qua executor) để ContextVar của annotate() được kế thừa
+    run_inline = True
+
+    def __init__(self, tracer: Tracer, metadata: dict = None):
+        self.tracer = tracer
+        self.metadata = metadata or {}
+        self.trace_id = _new_id(16)
+        self._spans = {}
+        self._parents = {}
+        self._finished = []
+        self._node_calls = {}
+        self._last_node_end_ns = None
+        self._lock = threading.Lock()
+
+    # --- quản lý span ---
+    def _resolve_parent(self, parent_run_id) -> Optional[Span]:
+        while parent_run_id is not None:
+            span = self._spans.get(parent_run_id)
+            if span is not None:
+                return span
+            parent_run_id = self._parents.get(parent_run_id)
+        return None
+
+    def _start(self, run_id, parent_run_id, name: str, kind: str, **attributes) -> Span:
+        with self._lock:
+            parent = self._resolve_parent(parent_run_id)
+            span = Span(trace_id=self.trace_id, span_id=_new_id(8), parent_id=parent.span_id if parent else None,
+                        name=name, kind=kind, start_ns=time.time_ns(), attributes=attributes)
+            self._spans[run_id] = span
+            return span
+
+    def _skip(self, run_id, parent_run_id):
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+
+    def _end(self, run_id, error: BaseException = None) -> Optional[Span]:
+        with self._lock:
+            span = self._spans.pop(run_id, None)
+            self._parents.pop(run_id, None)
+            if span is None:
+                return None
+            span.end_ns = time.time_ns()
+            span.duration_ms = round((span.end_ns - span.start_ns) / 1e6, 3)
+            if error is not None:
+                span.status = "error"
+                span.error = f"{type(error).__name__}: {error}"[:500]
+            self._finished.append(span)
+            if span.kind == "node":
+                self._last_node_end_ns = span.end_ns
+            done = span.kind == "graph"
+        if done:
+            self.tracer.submit(self._finished)
+            self._finished = []
+        return span
+
+    # --- graph / node ---
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, tags=None, metadata=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name", "chain")
+        metadata = metadata or {}
+        if parent_run_id is None:
+            span = self._start(run_id, None, name, "graph", **self.metadata)
+            span.queue_wait_ms = float(self.metadata.get("queue_wait_ms", 0.0))
+            return
+        node = metadata.get("langgraph_node")
+        if node and node == name:
+            with self._lock:
+                attempt = self._node_calls.get(node, 0)
+                self._node_calls[node] = attempt + 1
+            span = self._start(run_id, parent_run_id, node, "node", step=metadata.get("langgraph_step"), retry_count=attempt)
+            # Thời gian chờ lịch (thread pool bận) giữa node trước kết thúc và node này bắt đầu
+            previous_end = self._last_node_end_ns
+            if previous_end:
+                span.queue_wait_ms = round(max(0, span.start_ns - previous_end) / 1e6, 3)
+            return
+        self._skip(run_id, parent_run_id)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        span = self._spans.get(run_id)
+        if span is not None and span.kind == "node" and isinstance(outputs, dict) and "retry_count" in outputs:
+            span.attributes["state_retry_count"] = outputs["retry_count"]
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    # --- tool ---
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name", "tool")
+        with self._lock:
+            parent = self._resolve_parent(parent_run_id)
+        span = self._start(run_id, parent_run_id, name, "tool", node=(metadata or {}).get("langgraph_node"))
+        if parent is not None:
+            # Chờ trong executor của ToolNode (nhiều tool chạy song song)
+            span.queue_wait_ms = round(max(0, span.start_ns - parent.start_ns) / 1e6, 3)
+        _current_tool_span.set(span)
+
+    def _pop_tool(self, run_id):
+        span = self._spans.get(run_id)
+        if span is not None and _current_tool_span.get() is span:
+            _current_tool_span.set(None)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._pop_tool(run_id)
+        span = self._spans.get(run_id)
+        artifact = getattr(output, "artifact", None)
+        if span is not None and isinstance(artifact, dict) and "cached" in artifact:
+            span.attributes["cache_hit"] = artifact["cached"]
+        self._end(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._pop_tool(run_id)
+        self._end(run_id, error)
+
+    # --- LLM ---
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        invocation = kwargs.get("invocation_params") or {}
+        metadata = metadata or {}
+        model = invocation.get("model") or invocation.get("model_name") or metadata.get("ls_model_name")
+        # Tầng model / lý do leo thang do agent/cascade.py gắn vào metadata
+        cascade = {key: metadata[key] for key in ("model_tier", "escalation_reason") if key in metadata}
+        self._start(run_id, parent_run_id, kwargs.get("name") or model or "chat_model", "llm", model=model,
+                    node=metadata.get("langgraph_node"), **cascade)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        self._start(run_id, parent_run_id, kwargs.get("name") or "llm", "llm", node=(metadata or {}).get("langgraph_node"))
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        span = self._spans.get(run_id)
+        if span is not None:
+            span.attributes.update(self._token_usage(response))
+        self._end(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, error)
+
+    @staticmethod
+    def _token_usage(response) -> dict:
+        """Token từ usage_metadata của message (kể cả khi stream) hoặc llm_output['token_usage']."""
+        usage = {}
+        for generations in response.generations or []:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if metadata:
+                    usage["prompt_tokens"] = usage.get("prompt_tokens", 0) + metadata.get("input_tokens", 0)
+                    usage["completion_tokens"] = usage.get("completion_tokens", 0) + metadata.get("output_tokens", 0)
+                    cached = (metadata.get("input_token_details") or {}).get("cache_read")
+                    if cached is not None:
+                        usage["cached_prompt_tokens"] = usage.get("cached_prompt_tokens", 0) + cached
+        if not usage and response.llm_output:
+            token_usage = response.llm_output.get("token_usage") or {}
+            if token_usage:
+                usage["prompt_tokens"] = token_usage.get("prompt_tokens", 0)
+                usage["completion_tokens"] = token_usage.get("completion_tokens", 0)
+        if "cached_prompt_tokens" in usage:
+            usage["cache_hit"] = usage["cached_prompt_tokens"] > 0
+        return usage
+
+
+tracer = Tracer()
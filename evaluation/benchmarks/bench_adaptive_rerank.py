@@ -0,0 +1,90 @@
+import argparse
+import sys
+import os
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from datasets import Dataset
+from ragas import evaluate
+from ragas.metrics import context_precision, context_recall
+from config.settings import settings
+from tools.rag_tool import PolicyRAGService
+from bench_hybrid_retrieval import load_cases, split_contexts
+
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+RESET = '\033[0m'
+
+def run_mode(name, service, cases, passes):
+    """Chạy bộ câu hỏi nhiều lượt (lượt sau kiểm tra hiệu quả cache), RAGAS chấm trên lượt đầu."""
+    ragas_data = {"question": [], "contexts": [], "ground_truth": []}
+    latencies = []
+    for pass_idx in range(passes):
+        for idx, case in enumerate(cases, 1):
+            start = time.perf_counter()
+            output = service.search_policy_docs(case["question"])
+            latencies.append((time.perf_counter() - start) * 1000)
+            if pass_idx == 0:
+                ragas_data["question"].append(case["question"])
+                ragas_data["contexts"].append(split_contexts(output))
+                ragas_data["ground_truth"].append(case["ground_truth"])
+            print(f"  [{name}] lượt {pass_idx + 1}: {idx}/{len(cases)}", end="\r")
+    print()
+    return ragas_data, latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo số lần gọi Cohere rerank tránh được nhờ adaptive rerank.")
+    parser.add_argument("--passes", type=int, default=2, help="Số lượt chạy lặp lại bộ câu hỏi")
+    parser.add_argument("--skip-ragas", action="store_true")
+    args = parser.parse_args()
+
+    cases = load_cases()
+    evaluator_llm = ChatOpenAI(model=settings.LLM_MODEL, temperature=settings.LLM_TEMPERATURE)
+    evaluator_embeddings = OpenAIEmbeddings(model=settings.EMBEDDING_MODEL)
+
+    rows = []
+    for name, adaptive in (("always-rerank", False), ("adaptive", True)):
+        print(f"{YELLOW}Đang chạy chế độ: {name}{RESET}")
+        service = PolicyRAGService(use_rerank=True, adaptive_rerank=adaptive)
+        if not adaptive:
+            service.rerank_cache.max_size = 0
+        ragas_data, latencies = run_mode(name, service, cases, args.passes)
+        stats = service.rerank_stats
+        row = {
+            "mode": name,
+            "queries": stats["queries"],
+            "rerank_calls": stats["rerank_calls"],
+            "skipped_by_margin": stats["skipped_by_margin"],
+            "cache_hits": stats["cache_hits"],
+            "widened_pool": stats["widened_pool"],
+            "p50_ms": np.percentile(latencies, 50),
+            "p95_ms": np.percentile(latencies, 95),
+        }
+        if not args.skip_ragas:
+            result = evaluate(
+                Dataset.from_dict(ragas_data),
+                metrics=[context_precision, context_recall],
+                llm=evaluator_llm,
+                embeddings=evaluator_embeddings,
+            ).to_pandas()
+            row["context_precision"] = result["context_precision"].mean()
+            row["context_recall"] = result["context_recall"].mean()
+        rows.append(row)
+
+    df = pd.DataFrame(rows)
+    baseline_calls, adaptive_calls = df["rerank_calls"].iloc[0], df["rerank_calls"].iloc[1]
+    report_file = os.path.join(os.path.dirname(__file__), '../reports/adaptive_rerank_report.csv')
+    df.to_csv(report_file, index=False, encoding='utf-8-sig')
+
+    print(f"\n{YELLOW}KẾT QUẢ ({len(cases)} câu hỏi x {args.passes} lượt){RESET}")
+    print(df.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    avoided = 1 - adaptive_calls / baseline_calls if baseline_calls else 0.0
+    print(f"\nSố lần gọi rerank tránh được: {GREEN}{baseline_calls - adaptive_calls} ({avoided:.1%}){RESET}")
+    print(f"{GREEN}Đã lưu báo cáo tại: {report_file}{RESET}")
+
+if __name__ == "__main__":
+    main()
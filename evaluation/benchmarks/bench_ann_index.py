@@ -0,0 +1,130 @@
+import argparse
+import sys
+import os
+import time
+import numpy as np
+from sqlalchemy import text
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from config.settings import settings
+from core.database import get_engine, ROLE_WRITE
+from tools.vector_index import VectorIndexManager
+
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+RESET = '\033[0m'
+
+BENCH_TABLE = "bench_ann_vectors"
+
+def to_vector_literal(vec) -> str:
+    return "[" + ",".join(f"{v:.6f}" for v in vec) + "]"
+
+def make_synthetic_vectors(rng, n, dim, n_clusters=256):
+    """Sinh vector theo hỗn hợp Gauss (gần với phân bố embedding thật hơn là nhiễu đều)."""
+    centers = rng.standard_normal((n_clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, n_clusters, size=n)
+    vectors = centers[labels] + 0.35 * rng.standard_normal((n, dim)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def build_collection(engine, n, dim, batch_size, seed):
+    rng = np.random.default_rng(seed)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        conn.execute(text(f"DROP TABLE IF EXISTS {BENCH_TABLE}"))
+        conn.execute(text(f"CREATE TABLE {BENCH_TABLE} (id BIGINT PRIMARY KEY, embedding vector({dim}))"))
+
+    print(f"{YELLOW}Đang sinh {n:,} vector ({dim} chiều)...{RESET}")
+    start = time.perf_counter()
+    for offset in range(0, n, batch_size):
+        size = min(batch_size, n - offset)
+        batch = make_synthetic_vectors(rng, size, dim)
+        rows = [{"id": offset + i, "e": to_vector_literal(v)} for i, v in enumerate(batch)]
+        with engine.begin() as conn:
+            conn.execute(text(f"INSERT INTO {BENCH_TABLE} (id, embedding) VALUES (:id, CAST(:e AS vector))"), rows)
+        print(f"  {offset + size:,}/{n:,}", end="\r")
+    print(f"\nNạp dữ liệu xong sau {time.perf_counter() - start:.1f}s")
+
+def sample_queries(engine, n_queries, dim, seed):
+    """Lấy các truy vấn lân cận điểm dữ liệu thật (thêm nhiễu nhẹ) để recall có ý nghĩa."""
+    rng = np.random.default_rng(seed + 1)
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(f"SELECT embedding::text FROM {BENCH_TABLE} ORDER BY random() LIMIT :n"), {"n": n_queries}
+        ).fetchall()
+    base = np.array([np.array(r[0].strip("[]").split(","), dtype=np.float32) for r in rows])
+    noisy = base + 0.05 * rng.standard_normal(base.shape).astype(np.float32)
+    return noisy / np.linalg.norm(noisy, axis=1, keepdims=True)
+
+def run_queries(engine, queries, k, setup_statements):
+    """Chạy lần lượt các truy vấn top-k, trả về (danh sách id, danh sách latency ms)."""
+    sql = text(f"SELECT id FROM {BENCH_TABLE} ORDER BY embedding <=> CAST(:q AS vector) LIMIT :k")
+    results, latencies = [], []
+    with engine.connect() as conn:
+        for q in queries:
+            with conn.begin():
+                for statement in setup_statements:
+                    conn.execute(text(statement))
+                start = time.perf_counter()
+                ids = [r[0] for r in conn.execute(sql, {"q": to_vector_literal(q), "k": k})]
+                latencies.append((time.perf_counter() - start) * 1000)
+            results.append(ids)
+    return results, latencies
+
+def recall_at_k(exact, approx):
+    hits = sum(len(set(e) & set(a)) for e, a in zip(exact, approx))
+    return hits / sum(len(e) for e in exact)
+
+def report_row(label, latencies, recall=None):
+    p50, p95 = np.percentile(latencies, [50, 95])
+    recall_str = f"{recall:.4f}" if recall is not None else "1.0000 (chuẩn)"
+    print(f"{label:<28} | p50 {p50:8.2f} ms | p95 {p95:8.2f} ms | recall {recall_str}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark recall/latency của index ANN pgvector so với tìm kiếm chính xác.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=128)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--index-type", choices=["hnsw", "ivfflat"], default=settings.VECTOR_INDEX_TYPE if settings.VECTOR_INDEX_TYPE != "none" else "hnsw")
+    parser.add_argument("--sweep", type=int, nargs="+", default=None,
+                        help="Các giá trị ef_search (HNSW) hoặc probes (IVFFlat) cần đo")
+    parser.add_argument("--skip-load", action="store_true", help="Dùng lại bảng benchmark đã nạp")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    engine = get_engine(ROLE_WRITE)
+    if not args.skip_load:
+        build_collection(engine, args.rows, args.dim, args.batch_size, args.seed)
+
+    manager = VectorIndexManager(engine, index_type=args.index_type, table_name=BENCH_TABLE)
+    manager.drop_index()
+    queries = sample_queries(engine, args.queries, args.dim, args.seed)
+
+    print(f"\n{YELLOW}Đang đo tìm kiếm chính xác (sequential scan)...{RESET}")
+    exact_ids, exact_latencies = run_queries(
+        engine, queries, args.k, ["SET LOCAL enable_indexscan = off", "SET LOCAL max_parallel_workers_per_gather = 0"]
+    )
+
+    start = time.perf_counter()
+    manager.create_index()
+    print(f"Tạo index {args.index_type.upper()} mất {time.perf_counter() - start:.1f}s")
+
+    if args.index_type == "hnsw":
+        sweep = args.sweep or [10, 20, 40, 80, 160, 320]
+        knob = "hnsw.ef_search"
+    else:
+        sweep = args.sweep or [1, 5, 10, 20, 50, 100]
+        knob = "ivfflat.probes"
+
+    print(f"\n{YELLOW}KẾT QUẢ ({args.rows:,} vector, {args.dim} chiều, top-{args.k}, {args.queries} truy vấn){RESET}")
+    report_row("exact", exact_latencies)
+    for value in sweep:
+        approx_ids, latencies = run_queries(engine, queries, args.k, [f"SET LOCAL {knob} = {value}"])
+        report_row(f"{args.index_type} {knob}={value}", latencies, recall_at_k(exact_ids, approx_ids))
+
+    print(f"\n{GREEN}Gợi ý: chọn giá trị nhỏ nhất đạt recall mong muốn và đặt vào config/settings.py.{RESET}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import argparse
+import sys
+import os
+import time
+import tempfile
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from tools import downsampling
+from tools.chart_renderer import ChartRenderer, ChartSpec
+
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+RESET = '\033[0m'
+
+
+def make_dataframe(n_rows: int, n_categories: int, seed: int = 0) -> tuple:
+    """Dữ liệu giả lập kiểu kết quả SQL lớn: chuỗi thời gian theo giây, hai cột số tương quan, cột danh mục."""
+    rng = np.random.default_rng(seed)
+    trend = np.cumsum(rng.normal(0, 1, n_rows))
+    revenue = trend + 20 * np.sin(np.arange(n_rows) / (n_rows / 50))
+    # Vài đỉnh đột biến: LTTB phải giữ lại được
+    spikes = rng.choice(n_rows, 5, replace=False)
+    revenue[spikes] += 300
+    price = rng.lognormal(4, 0.6, n_rows)
+    return pd.DataFrame({
+        "ts": pd.date_range("2024-01-01", periods=n_rows, freq="s"),
+        "revenue": revenue,
+        "price": price,
+        "cost": price * rng.uniform(0.5, 0.9, n_rows),
+        "product": pd.Series(rng.zipf(1.3, n_rows) % n_categories).map(lambda i: f"SP {i:05d}"),
+    }), spikes
+
+
+SPECS = [
+    ("line (chuỗi thời gian)", dict(chart_type="line", x="ts", y="revenue", title="Doanh thu theo thời gian")),
+    ("scatter", dict(chart_type="scatter", x="price", y="cost", title="Giá bán - giá vốn")),
+    ("bar (nhiều danh mục)", dict(chart_type="bar", x="product", y="revenue", agg="sum", sort="y_desc", title="Doanh thu theo sản phẩm")),
+    ("pie", dict(chart_type="pie", x="product", agg="count", title="Tỷ lệ đơn theo sản phẩm")),
+    ("hist", dict(chart_type="hist", x="price", title="Phân phối giá")),
+]
+
+
+def render(renderer: ChartRenderer, spec: dict, df: pd.DataFrame, path: str, repeats: int) -> tuple:
+    latencies = []
+    data = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        data = renderer.render(ChartSpec(**spec), df, path)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return float(np.median(latencies)), os.path.getsize(path), len(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo thời gian vẽ và dung lượng PNG khi rút gọn dữ liệu lớn trước khi vẽ.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--categories", type=int, default=5000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    out_dir = tempfile.mkdtemp(prefix="downsample_bench_")
+    print(f"{YELLOW}Sinh {args.rows:,} dòng dữ liệu ({args.categories:,} sản phẩm)...{RESET}")
+    df, spikes = make_dataframe(args.rows, args.categories)
+
+    start = time.perf_counter()
+    keep = downsampling.lttb_indices(df["ts"].values, df["revenue"].values, 2000)
+    lttb_ms = (time.perf_counter() - start) * 1000
+    kept_spikes = int(np.isin(spikes, keep).sum())
+
+    full = ChartRenderer(pool_size=1, downsample=False)
+    reduced = ChartRenderer(pool_size=1, downsample=True)
+
+    rows = []
+    for label, spec in SPECS:
+        print(f"{YELLOW}[{label}] vẽ toàn bộ dữ liệu...{RESET}")
+        before = render(full, spec, df, os.path.join(out_dir, f"{spec['chart_type']}_full.png"), args.repeats)
+        print(f"{YELLOW}[{label}] vẽ sau khi rút gọn...{RESET}")
+        after = render(reduced, spec, df, os.path.join(out_dir, f"{spec['chart_type']}_reduced.png"), args.repeats)
+        rows.append((label, before, after))
+
+    print(f"\n{YELLOW}KẾT QUẢ ({args.rows:,} dòng, median {args.repeats} lần, ảnh tại {out_dir}){RESET}")
+    print(f"LTTB 1 series -> 2000 điểm: {lttb_ms:.0f} ms, giữ {kept_spikes}/{len(spikes)} đỉnh đột biến")
+    print(f"{'Biểu đồ':<24}{'Điểm vẽ':>20}{'Render (ms)':>22}{'PNG (KB)':>20}")
+    for label, (ms_before, size_before, n_before), (ms_after, size_after, n_after) in rows:
+        print(
+            f"{label:<24}{n_before:>9,} -> {n_after:<8,}"
+            f"{ms_before:>9.0f} -> {GREEN}{ms_after:<8.0f}{RESET}"
+            f"{size_before / 1024:>9.1f} -> {GREEN}{size_after / 1024:<8.1f}{RESET}"
+        )
+
+
+if __name__ == "__main__":
+    main()
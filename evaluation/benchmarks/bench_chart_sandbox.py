@@ -0,0 +1,147 @@
+import argparse
+import sys
+import os
+import time
+import tempfile
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from langchain_experimental.utilities import PythonREPL
+from tools.sandbox_pool import SandboxPool
+
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+RESET = '\033[0m'
+
+# Các đoạn code tiêu biểu mà agent sinh ra cho chart_ground_truth (dữ liệu SQL được nhúng sẵn)
+CHART_SNIPPETS = [
+    """
+import pandas as pd
+df = pd.DataFrame({'year': [2020, 2021, 2022, 2023, 2024], 'new_customers': [120, 340, 560, 610, 720]})
+plt.figure(figsize=(10, 6))
+plt.plot(df['year'], df['new_customers'], marker='o')
+plt.title('Tăng trưởng khách hàng mới theo năm')
+plt.xlabel('Năm')
+plt.ylabel('Số khách hàng')
+plt.grid(True)
+""",
+    """
+import pandas as pd
+df = pd.DataFrame({'category': ['Điện tử', 'Thời trang', 'Gia dụng', 'Sách', 'Thể thao'], 'count': [42, 35, 28, 17, 12]})
+plt.figure(figsize=(8, 8))
+plt.pie(df['count'], labels=df['category'], autopct='%1.1f%%')
+plt.title('Tỷ lệ sản phẩm theo danh mục')
+""",
+    """
+import pandas as pd
+df = pd.DataFrame({'product': [f'SP {i}' for i in range(5)], 'price': [2500, 2100, 1800, 1500, 1200]})
+plt.figure(figsize=(10, 6))
+plt.barh(df['product'], df['price'], color='skyblue')
+plt.title('Top 5 sản phẩm giá cao nhất')
+plt.gca().invert_yaxis()
+""",
+    """
+import numpy as np
+import pandas as pd
+rng = np.random.default_rng(0)
+df = pd.DataFrame({'price': rng.uniform(10, 1000, 500)})
+df['cost'] = df['price'] * rng.uniform(0.5, 0.9, 500)
+plt.figure(figsize=(10, 6))
+plt.scatter(df['price'], df['cost'], alpha=0.5)
+plt.title('Tương quan giá bán - giá vốn')
+""",
+]
+
+# Wrapper cũ của PythonChartService (REPL trong tiến trình, import lại mỗi lần gọi)
+LEGACY_TEMPLATE = """
+import matplotlib.pyplot as plt
+import pandas as pd
+import os
+
+{code}
+
+if plt.get_fignums():
+    plt.savefig('{save_path}', bbox_inches='tight')
+    plt.close()
+    print("SUCCESSS_CHART_SAVED")
+else:
+    print("NO_CHART_CREATED")
+"""
+
+def run_legacy(repl, code, save_path):
+    output = repl.run(LEGACY_TEMPLATE.format(code=code, save_path=save_path))
+    return "SUCCESSS_CHART_SAVED" in output
+
+def run_pool(pool, code, save_path):
+    result = pool.run(code, save_path=save_path)
+    return result["ok"] and result["chart_saved"]
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    ok = fn(*args)
+    return (time.perf_counter() - start) * 1000, ok
+
+def sequential(fn, target, runs, out_dir, label):
+    latencies, failures = [], 0
+    for i in range(runs):
+        latency, ok = timed(fn, target, CHART_SNIPPETS[i % len(CHART_SNIPPETS)], os.path.join(out_dir, f"{label}_{i}.png"))
+        latencies.append(latency)
+        failures += not ok
+    return latencies, failures
+
+def concurrent(fn, target, n_requests, out_dir, label):
+    def task(i):
+        return timed(fn, target, CHART_SNIPPETS[i % len(CHART_SNIPPETS)], os.path.join(out_dir, f"{label}_c{i}.png"))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n_requests) as executor:
+        results = list(executor.map(task, range(n_requests)))
+    wall = time.perf_counter() - start
+    latencies = [latency for latency, _ in results]
+    failures = sum(not ok for _, ok in results)
+    return latencies, failures, wall
+
+def report_row(label, latencies, failures, extra=""):
+    p50, p95 = np.percentile(latencies, [50, 95])
+    print(f"{label:<34} | p50 {p50:8.1f} ms | p95 {p95:8.1f} ms | lỗi {failures:>3} {extra}")
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh latency vẽ biểu đồ: REPL trong tiến trình vs pool sandbox.")
+    parser.add_argument("--runs", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--pool-size", type=int, default=None, help="Mặc định: settings.SANDBOX_POOL_SIZE")
+    args = parser.parse_args()
+
+    out_dir = tempfile.mkdtemp(prefix="chart_bench_")
+
+    print(f"{YELLOW}[Trước] PythonREPL trong tiến trình...{RESET}")
+    repl = PythonREPL()
+    cold_ms, _ = timed(run_legacy, repl, CHART_SNIPPETS[0], os.path.join(out_dir, "legacy_cold.png"))
+    legacy_latencies, legacy_failures = sequential(run_legacy, repl, args.runs, out_dir, "legacy")
+    stdout = sys.stdout
+    legacy_conc, legacy_conc_failures, legacy_wall = concurrent(run_legacy, repl, args.concurrency, out_dir, "legacy")
+    # PythonREPL đổi sys.stdout toàn cục; chạy đồng thời có thể để lại stdout trỏ vào buffer của luồng khác
+    sys.stdout = stdout
+
+    print(f"{YELLOW}[Sau] Pool sandbox...{RESET}")
+    start = time.perf_counter()
+    pool = SandboxPool(size=args.pool_size) if args.pool_size else SandboxPool()
+    ready = pool.warm_up()
+    startup_s = time.perf_counter() - start
+    pool_latencies, pool_failures = sequential(run_pool, pool, args.runs, out_dir, "pool")
+    pool_conc, pool_conc_failures, pool_wall = concurrent(run_pool, pool, args.concurrency, out_dir, "pool")
+    pool.close()
+
+    print(f"\n{YELLOW}KẾT QUẢ ({args.runs} lần tuần tự, {args.concurrency} yêu cầu đồng thời, ảnh tại {out_dir}){RESET}")
+    print(f"REPL lần gọi đầu (import pandas/matplotlib): {cold_ms:.0f} ms | pool khởi động {ready} worker: {startup_s:.1f}s (trước request đầu tiên)")
+    report_row("REPL tuần tự", legacy_latencies, legacy_failures)
+    report_row("Pool tuần tự", pool_latencies, pool_failures)
+    report_row(f"REPL {args.concurrency} đồng thời", legacy_conc, legacy_conc_failures, f"| wall {legacy_wall:.2f}s")
+    report_row(f"Pool {args.concurrency} đồng thời", pool_conc, pool_conc_failures, f"| wall {pool_wall:.2f}s")
+    print(f"Pool stats: {pool.stats}")
+    print(f"\n{GREEN}Lưu ý: REPL dùng chung globals + pyplot giữa các luồng, lỗi khi chạy đồng thời là lỗi chồng chéo trạng thái.{RESET}")
+
+if __name__ == "__main__":
+    main()
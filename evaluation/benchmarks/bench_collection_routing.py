@@ -0,0 +1,161 @@
+import argparse
+import sys
+import os
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from langchain_core.embeddings import FakeEmbeddings
+from langchain_postgres import PGVector
+from config.settings import settings
+from core.database import get_engine, ROLE_WRITE
+from tools.vector_index import VectorIndexManager
+from tools.collection_router import CollectionRouter
+
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+RESET = '\033[0m'
+
+BASELINE_COLLECTION = "bench_all"
+
+def make_shard_vectors(rng, n_shards, rows_per_shard, dim, clusters_per_shard=32):
+    """
+    Mỗi shard (họ tài liệu) có một hướng chủ đề riêng, các cụm của shard lệch quanh hướng đó.
+    Gần với kho HR / tài chính / IT / pháp chế thật hơn là chia ngẫu nhiên.
+    """
+    topics = rng.standard_normal((n_shards, dim)).astype(np.float32)
+    shards = []
+    for s in range(n_shards):
+        centers = topics[s] + 0.8 * rng.standard_normal((clusters_per_shard, dim)).astype(np.float32)
+        labels = rng.integers(0, clusters_per_shard, size=rows_per_shard)
+        vectors = centers[labels] + 0.6 * rng.standard_normal((rows_per_shard, dim)).astype(np.float32)
+        shards.append(vectors / np.linalg.norm(vectors, axis=1, keepdims=True))
+    return shards
+
+def make_store(engine, name, dim):
+    return PGVector(
+        embeddings=FakeEmbeddings(size=dim),
+        collection_name=name,
+        connection=engine,
+        embedding_length=dim,
+        use_jsonb=True,
+    )
+
+def load_collection(store, ids, vectors, batch_size):
+    store.delete_collection()
+    store.create_collection()
+    for offset in range(0, len(ids), batch_size):
+        batch_ids = ids[offset:offset + batch_size]
+        store.add_embeddings(
+            texts=batch_ids,
+            embeddings=vectors[offset:offset + batch_size].tolist(),
+            metadatas=[{} for _ in batch_ids],
+            ids=batch_ids,
+        )
+        print(f"  {store.collection_name}: {offset + len(batch_ids):,}/{len(ids):,}", end="\r")
+    print()
+
+def make_queries(rng, shards, n_queries, ambiguous_ratio):
+    """Truy vấn rõ ràng = điểm dữ liệu + nhiễu; truy vấn mơ hồ = trộn hai điểm của hai shard khác nhau."""
+    queries, kinds = [], []
+    for i in range(n_queries):
+        a = rng.integers(len(shards))
+        vec = shards[a][rng.integers(len(shards[a]))]
+        kind = "rõ ràng"
+        if len(shards) > 1 and i < n_queries * ambiguous_ratio:
+            b = (a + rng.integers(1, len(shards))) % len(shards)
+            vec = vec + shards[b][rng.integers(len(shards[b]))]
+            kind = "mơ hồ"
+        vec = vec + 0.05 * rng.standard_normal(vec.shape).astype(np.float32)
+        queries.append(vec / np.linalg.norm(vec))
+        kinds.append(kind)
+    return np.array(queries), kinds
+
+def exact_topk(all_vectors, all_ids, queries, k):
+    sims = queries @ all_vectors.T
+    top = np.argpartition(-sims, k, axis=1)[:, :k]
+    return [[all_ids[j] for j in row] for row in top]
+
+def recall(exact, approx):
+    return np.mean([len(set(e) & set(a)) / len(e) for e, a in zip(exact, approx)])
+
+def report_row(label, latencies, recall_value, extra=""):
+    p50, p95 = np.percentile(latencies, [50, 95])
+    print(f"{label:<24} | p50 {p50:8.2f} ms | p95 {p95:8.2f} ms | recall {recall_value:.4f} {extra}")
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh RAG nhiều collection có định tuyến với một collection chung.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Tổng số chunk (chia đều cho các shard)")
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--ambiguous-ratio", type=float, default=0.2)
+    parser.add_argument("--k", type=int, default=settings.RAG_CANDIDATE_K)
+    parser.add_argument("--batch-size", type=int, default=2_000)
+    parser.add_argument("--skip-load", action="store_true", help="Dùng lại dữ liệu benchmark đã nạp")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    shard_names = [f"bench_shard_{s}" for s in range(args.shards)]
+    shards = make_shard_vectors(rng, args.shards, args.rows // args.shards, args.dim)
+    shard_ids = [[f"{name}-{i}" for i in range(len(vectors))] for name, vectors in zip(shard_names, shards)]
+
+    engine = VectorIndexManager.attach_runtime_settings(get_engine(ROLE_WRITE))
+    stores = {name: make_store(engine, name, args.dim) for name in shard_names}
+    baseline = make_store(engine, BASELINE_COLLECTION, args.dim)
+
+    if not args.skip_load:
+        print(f"{YELLOW}Đang nạp {args.rows:,} chunk vào {args.shards} shard + collection gộp...{RESET}")
+        for name, ids, vectors in zip(shard_names, shard_ids, shards):
+            load_collection(stores[name], ids, vectors, args.batch_size)
+        all_ids = [f"all-{i}" for ids in shard_ids for i in ids]
+        load_collection(baseline, all_ids, np.vstack(shards), args.batch_size)
+        for name in shard_names + [BASELINE_COLLECTION]:
+            VectorIndexManager(engine, collection_name=name).create_index()
+
+    router = CollectionRouter(engine, shard_names, keywords={})
+    start = time.perf_counter()
+    router.refresh()
+    print(f"Tính centroid {args.shards} shard mất {(time.perf_counter() - start) * 1000:.0f} ms (chỉ khi ingest_version đổi)")
+
+    queries, kinds = make_queries(rng, shards, args.queries, args.ambiguous_ratio)
+    exact = exact_topk(np.vstack(shards), [i for ids in shard_ids for i in ids], queries, args.k)
+
+    baseline_ids, baseline_latencies = [], []
+    for q in queries:
+        start = time.perf_counter()
+        hits = baseline.similarity_search_with_score_by_vector(q.tolist(), k=args.k)
+        baseline_latencies.append((time.perf_counter() - start) * 1000)
+        baseline_ids.append([doc.id[len("all-"):] for doc, _ in hits])
+
+    pool = ThreadPoolExecutor(max_workers=args.shards)
+    routed_ids, routed_latencies, fanouts = [], [], []
+    for q in queries:
+        start = time.perf_counter()
+        targets = router.route("", q)
+        futures = [pool.submit(stores[name].similarity_search_with_score_by_vector, q.tolist(), args.k) for name in targets]
+        hits = sorted((hit for f in futures for hit in f.result()), key=lambda hit: hit[1])[:args.k]
+        routed_latencies.append((time.perf_counter() - start) * 1000)
+        routed_ids.append([doc.id for doc, _ in hits])
+        fanouts.append(len(targets))
+    pool.shutdown()
+
+    print(f"\n{YELLOW}KẾT QUẢ ({args.rows:,} chunk, {args.shards} shard, {args.dim} chiều, top-{args.k}, "
+          f"{settings.VECTOR_INDEX_TYPE.upper()}){RESET}")
+    report_row("1 collection (baseline)", baseline_latencies, recall(exact, baseline_ids))
+    report_row("định tuyến + fan-out", routed_latencies, recall(exact, routed_ids),
+               f"| trung bình {np.mean(fanouts):.2f} shard/truy vấn")
+    for kind in ("rõ ràng", "mơ hồ"):
+        idx = [i for i, k in enumerate(kinds) if k == kind]
+        if idx:
+            print(f"  truy vấn {kind:<8} ({len(idx):>3}) | recall baseline {recall([exact[i] for i in idx], [baseline_ids[i] for i in idx]):.4f} "
+                  f"| recall định tuyến {recall([exact[i] for i in idx], [routed_ids[i] for i in idx]):.4f} "
+                  f"| {np.mean([fanouts[i] for i in idx]):.2f} shard")
+    print(f"Router: {router.stats}")
+    print(f"\n{GREEN}Gợi ý: tăng ROUTER_MARGIN nếu recall truy vấn mơ hồ thấp, giảm nếu fan-out quá nhiều.{RESET}")
+
+if __name__ == "__main__":
+    main()
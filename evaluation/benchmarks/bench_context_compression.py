@@ -0,0 +1,96 @@
+import argparse
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from datasets import Dataset
+from ragas import evaluate
+from ragas.metrics import faithfulness, context_recall
+from config.settings import settings
+from core.prompts import FINAL_ANSWER_PROMPT
+from tools.rag_tool import PolicyRAGService
+from tools.context_compressor import ContextCompressor
+from bench_hybrid_retrieval import load_cases, split_contexts
+
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+RESET = '\033[0m'
+
+def answer_with_context(llm, question, context):
+    """Sinh câu trả lời từ ngữ cảnh, trả về (câu trả lời, số prompt token thực tế)."""
+    response = llm.invoke([
+        SystemMessage(content=FINAL_ANSWER_PROMPT),
+        HumanMessage(content=f"Câu hỏi: {question}\n\nDữ liệu tra cứu:\n{context}"),
+    ])
+    usage = response.usage_metadata or {}
+    return response.content, usage.get("input_tokens", 0)
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo token tiết kiệm và ảnh hưởng chất lượng của context compression.")
+    parser.add_argument("--budget", type=int, default=settings.RAG_CONTEXT_TOKEN_BUDGET)
+    parser.add_argument("--skip-ragas", action="store_true")
+    args = parser.parse_args()
+
+    cases = load_cases()
+    service = PolicyRAGService(compress_context=False)
+    compressor = ContextCompressor(service.embeddings, token_budget=args.budget)
+    llm = ChatOpenAI(model=settings.LLM_MODEL, temperature=settings.WRITER_TEMPERATURE)
+
+    variants = {"full": {"question": [], "answer": [], "contexts": [], "ground_truth": [], "prompt_tokens": []},
+                "compressed": {"question": [], "answer": [], "contexts": [], "ground_truth": [], "prompt_tokens": []}}
+
+    for idx, case in enumerate(cases, 1):
+        question = case["question"]
+        docs = service._select_documents(question)
+        contexts = {
+            "full": service._format_docs(docs),
+            "compressed": service._format_docs(compressor.compress(question, docs)),
+        }
+        for name, context in contexts.items():
+            answer, prompt_tokens = answer_with_context(llm, question, context)
+            data = variants[name]
+            data["question"].append(question)
+            data["answer"].append(answer)
+            data["contexts"].append(split_contexts(context))
+            data["ground_truth"].append(case["ground_truth"])
+            data["prompt_tokens"].append(prompt_tokens)
+        print(f"  {idx}/{len(cases)}", end="\r")
+    print()
+
+    rows = []
+    for name, data in variants.items():
+        row = {
+            "variant": name,
+            "mean_prompt_tokens": float(np.mean(data["prompt_tokens"])),
+            "total_prompt_tokens": int(np.sum(data["prompt_tokens"])),
+        }
+        if not args.skip_ragas:
+            ragas_input = {k: v for k, v in data.items() if k != "prompt_tokens"}
+            result = evaluate(
+                Dataset.from_dict(ragas_input),
+                metrics=[faithfulness, context_recall],
+                llm=ChatOpenAI(model=settings.LLM_MODEL, temperature=settings.LLM_TEMPERATURE),
+                embeddings=OpenAIEmbeddings(model=settings.EMBEDDING_MODEL),
+            ).to_pandas()
+            row["faithfulness"] = result["faithfulness"].mean()
+            row["context_recall"] = result["context_recall"].mean()
+        rows.append(row)
+
+    df = pd.DataFrame(rows)
+    report_file = os.path.join(os.path.dirname(__file__), '../reports/context_compression_report.csv')
+    df.to_csv(report_file, index=False, encoding='utf-8-sig')
+
+    stats = compressor.stats
+    saved = 1 - stats["tokens_after"] / stats["tokens_before"] if stats["tokens_before"] else 0.0
+    print(f"\n{YELLOW}KẾT QUẢ ({len(cases)} câu hỏi, ngân sách {args.budget} token){RESET}")
+    print(df.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    print(f"Token ngữ cảnh: {stats['tokens_before']} -> {stats['tokens_after']} ({GREEN}tiết kiệm {saved:.1%}{RESET})")
+    print(f"{GREEN}Đã lưu báo cáo tại: {report_file}{RESET}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import argparse
+import sys
+import os
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from scripts.pdf_pipeline import ParallelPDFPipeline
+from scripts.chunk_dedup import ChunkDeduplicator
+from config.settings import settings
+
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+RESET = '\033[0m'
+
+def index_footprint(chunks, dimensions):
+    """Ước lượng dung lượng lưu trữ: vector float32 + nội dung văn bản (chưa tính overhead của index)."""
+    vector_bytes = len(chunks) * dimensions * 4
+    text_bytes = sum(len(c.page_content.encode("utf-8")) for c in chunks)
+    return vector_bytes, text_bytes
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo mức giảm số chunk / dung lượng index khi loại chunk gần trùng.")
+    parser.add_argument("--source", default=os.path.join(os.path.dirname(__file__), '../../data/policy.pdf'))
+    parser.add_argument("--thresholds", default="0.7,0.8,0.85,0.9,0.95")
+    parser.add_argument("--mapping", default=None, help="Ghi ánh xạ trùng lặp (ngưỡng cấu hình) ra file JSON")
+    args = parser.parse_args()
+
+    print(f"{YELLOW}Đang trích xuất + cắt chunk: {args.source}...{RESET}")
+    chunks = list(ParallelPDFPipeline(args.source).iter_chunks())
+    vector_bytes, text_bytes = index_footprint(chunks, settings.EMBEDDING_DIMENSIONS)
+    chars = sum(len(c.page_content) for c in chunks)
+    print(f"Gốc: {len(chunks):,} chunks | {chars:,} ký tự cần embed | "
+          f"vector {vector_bytes / 1e6:.2f} MB + text {text_bytes / 1e6:.2f} MB")
+
+    print(f"\n{YELLOW}KẾT QUẢ THEO NGƯỠNG JACCARD{RESET}")
+    for threshold in [float(t) for t in args.thresholds.split(",")]:
+        dedup = ChunkDeduplicator(threshold=threshold)
+        start = time.perf_counter()
+        kept = dedup.filter([c.model_copy(deep=True) for c in chunks])
+        elapsed = time.perf_counter() - start
+        kept_vector, kept_text = index_footprint(kept, settings.EMBEDDING_DIMENSIONS)
+        kept_chars = sum(len(c.page_content) for c in kept)
+        stats = dedup.stats
+        print(f"ngưỡng={threshold:.2f} | giữ {stats['canonical_chunks']:,}/{stats['total_chunks']:,} "
+              f"(-{stats['reduction']:.1%}) | ký tự embed -{1 - kept_chars / max(chars, 1):.1%} | "
+              f"index {(kept_vector + kept_text) / 1e6:.2f} MB | {elapsed * 1000:.0f} ms")
+        if args.mapping and threshold == settings.DEDUP_THRESHOLD:
+            dedup.save_mapping(args.mapping)
+
+    print(f"\n{GREEN}Hoàn tất.{RESET} Chất lượng truy xuất: ingest lại với DEDUP_ENABLED=true/false "
+          f"rồi chạy evaluation/evaluation_src/eval_rag.py (báo cáo *_nodedup.csv để so sánh).")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import sys
+import os
+import re
+import asyncio
+import contextlib
+import numpy as np
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import HumanMessage
+from langchain_core.tools import StructuredTool
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../evaluation_src')))
+
+from agent.factory import init_agent_app
+from perf_metrics import PerfCollector
+from fake_backends import SUITE_FILES, FakeChatModel, Latency, ScenarioBook, load_scenarios
+
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+RESET = '\033[0m'
+
+LIMIT_PATTERN = re.compile(r"(?i)\blimit\s+(\d+)")
+AGGREGATE_PATTERN = re.compile(r"(?i)\b(sum|avg)\s*\(")
+
+
+def fake_rows(query: str) -> list:
+    """Hình dạng kết quả theo câu SQL: LIMIT n -> n dòng, GROUP BY -> 12 dòng, còn lại -> một giá trị."""
+    limit = LIMIT_PATTERN.search(query)
+    if limit:
+        return [(f"Sản phẩm {i}", Decimal(f"{1999.5 - i * 100:.2f}")) for i in range(int(limit.group(1)))]
+    if re.search(r"(?i)\bgroup\s+by\b", query):
+        return [(f"2024-{m:02d}", Decimal(f"{1250000 + m * 1000}.50")) for m in range(1, 13)]
+    if AGGREGATE_PATTERN.search(query):
+        return [(Decimal("1250000.50"),)]
+    return [(1250,)]
+
+
+def make_tools(latency: str) -> list:
+    delay = Latency(latency)
+
+    def query_sql_db(query: str) -> str:
+        """Thực thi lệnh SQL (giả lập, định dạng output như tool thật)."""
+        delay.sleep()
+        rows = fake_rows(query)
+        columns = ", ".join(f"col_{i}" for i in range(len(rows[0])))
+        return f"{rows}\nDATA_HANDLE: df_fake{abs(hash(query)) % 10**8} (cột: {columns})"
+
+    return [StructuredTool.from_function(func=query_sql_db, name="query_sql_db", description=query_sql_db.__doc__)]
+
+
+def bullet_answer(scenario) -> str:
+    """Câu trả lời dạng gạch đầu dòng như system prompt yêu cầu agent trả về."""
+    rows = fake_rows(scenario.tool_calls[0][1]["query"]) if scenario.tool_calls else [(1250,)]
+    if len(rows[0]) == 1:
+        return f"* Kết quả: {rows[0][0]}"
+    return "\n".join(f"* {row[0]}: {row[1]}" for row in rows)
+
+
+async def run_case(graph, scenario, label: str, semaphore: asyncio.Semaphore) -> dict:
+    async with semaphore:
+        collector = PerfCollector()
+        config = {"configurable": {"thread_id": f"{label}-{scenario.case_id}"}, "callbacks": [collector]}
+        async for mode, chunk in graph.astream({"messages": [HumanMessage(content=scenario.question)]},
+                                               config=config, stream_mode=["messages", "values"]):
+            if mode == "messages":
+                collector.observe_chunk(*chunk)
+        return {"case_id": scenario.case_id, **collector.summary()}
+
+
+async def run_config(graph, scenarios: list, label: str, concurrency: int) -> dict:
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=max(8, concurrency * 4)))
+    semaphore = asyncio.Semaphore(concurrency)
+    rows = await asyncio.gather(*(run_case(graph, s, label, semaphore) for s in scenarios))
+    return {row["case_id"]: row for row in rows}
+
+
+def report(label: str, rows: dict):
+    wall = [r["Wall_s"] * 1000 for r in rows.values()]
+    ttft = [r["TTFT_s"] * 1000 for r in rows.values() if r["TTFT_s"] != ""]
+    direct = sum(r["Direct_Answer"] for r in rows.values())
+    print(f"\n{YELLOW}{label}{RESET}")
+    print(f"  Trả lời trực tiếp: {direct}/{len(rows)} ({direct / len(rows):.0%})")
+    print(f"  Wall  p50 {np.percentile(wall, 50):7.0f}  p95 {np.percentile(wall, 95):7.0f} ms")
+    if ttft:
+        print(f"  TTFT  p50 {np.percentile(ttft, 50):7.0f}  p95 {np.percentile(ttft, 95):7.0f} ms")
+    print(f"  LLM calls trung bình / câu: {np.mean([r['LLM_Calls'] for r in rows.values()]):.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo đường tắt trả lời trực tiếp trên bộ câu hỏi SQL (model giả lập).")
+    parser.add_argument("--suite", default="sql", choices=list(SUITE_FILES))
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", default="lognormal:600:0.3", help="Latency LLM (guardrail / router / agent)")
+    parser.add_argument("--writer-latency", default="lognormal:1500:0.3", help="Latency LLM viết câu trả lời")
+    parser.add_argument("--tool-latency", default="const:30")
+    parser.add_argument("--verbose", action="store_true", help="Hiện log của các node")
+    args = parser.parse_args()
+
+    scenarios = load_scenarios([args.suite])
+    for scenario in scenarios:
+        scenario.answer = bullet_answer(scenario)
+    book = ScenarioBook(scenarios)
+    llm = FakeChatModel(latency=args.llm_latency, book=book)
+    writer = FakeChatModel(latency=args.writer_latency, book=book)
+    tools = make_tools(args.tool_latency)
+    print(f"{YELLOW}{len(scenarios)} câu hỏi ({args.suite}), LLM {args.llm_latency}, writer {args.writer_latency}...{RESET}")
+
+    results = {}
+    quiet = open(os.devnull, "w") if not args.verbose else None
+    for label, enabled in (("Luôn qua final_answer", False), ("Trả lời trực tiếp khi kết quả đơn giản", True)):
+        graph = init_agent_app(llm=llm, llm_writer=writer, tools=tools, db_schema="(schema giả lập)",
+                               direct_answer=enabled)
+        with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+            results[enabled] = asyncio.run(run_config(graph, scenarios, label, args.concurrency))
+        report(label, results[enabled])
+
+    shortcut = [case_id for case_id, row in results[True].items() if row["Direct_Answer"]]
+    if shortcut:
+        saved = [(results[False][c]["Wall_s"] - results[True][c]["Wall_s"]) * 1000 for c in shortcut]
+        total_before = sum(r["Wall_s"] for r in results[False].values())
+        total_after = sum(r["Wall_s"] for r in results[True].values())
+        print(f"\n{GREEN}Tiết kiệm trên {len(shortcut)} câu đi đường tắt: p50 {np.percentile(saved, 50):.0f} ms / câu; "
+              f"tổng thời gian cả bộ {total_before:.1f}s -> {total_after:.1f}s ({1 - total_after / total_before:.0%}){RESET}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+import argparse
+import sys
+import os
+import gc
+import time
+import random
+import asyncio
+import resource
+import contextlib
+import numpy as np
+from dataclasses import asdict
+from langchain_core.messages import HumanMessage
+from langchain_core.tools import StructuredTool
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from config.settings import settings
+from agent.factory import init_agent_app
+from core.tracing import Tracer
+from scripts.trace_summary import summarize
+from fake_backends import SUITE_FILES, FakeChatModel, FakeEmbeddings, FakeRerankClient, Latency, ScenarioBook, load_scenarios
+
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+RESET = '\033[0m'
+
+
+class MemorySpanExporter:
+    """Giữ span trong bộ nhớ để thống kê latency theo node sau khi chạy."""
+
+    def __init__(self):
+        self.spans = []
+
+    def export(self, spans: list):
+        self.spans.extend(asdict(span) for span in spans)
+
+
+def rss_mb() -> float:
+    """RSS hiện tại (Linux: /proc/self/statm), nơi khác dùng RSS đỉnh."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_fake_tools(latency: str, chart_tool: str) -> list:
+    """Tool giả lập (không cần Postgres / sandbox) cùng tên và tham số với tool thật."""
+    delay = Latency(latency)
+
+    def query_sql_db(query: str) -> str:
+        """Thực thi lệnh SQL (giả lập)."""
+        delay.sleep()
+        return f"[('2024-01', 1250000.0), ('2024-02', 1310000.0)]\nDATA_HANDLE: fake{random.randrange(10**6)} (cột: month, revenue)"
+
+    def search_policy_docs(query: str) -> str:
+        """Tìm tài liệu chính sách (giả lập)."""
+        delay.sleep()
+        return "[Trang 3] Nhân viên được xét tăng lương cơ bản 1 lần/năm."
+
+    def render_chart(chart_type: str, x: str, y: str = "", data_handle: str = "", title: str = "") -> str:
+        """Vẽ biểu đồ từ đặc tả (giả lập)."""
+        delay.sleep()
+        return "Đã vẽ biểu đồ thành công (giả lập)."
+
+    def python_chart_maker(code: str, data_handle: str = "") -> str:
+        """Chạy code vẽ biểu đồ (giả lập)."""
+        delay.sleep()
+        return "Đã vẽ biểu đồ thành công (giả lập)."
+
+    chart_func = render_chart if chart_tool == "render_chart" else python_chart_maker
+    return [StructuredTool.from_function(func=f, name=f.__name__, description=f.__doc__)
+            for f in (query_sql_db, search_policy_docs, chart_func)]
+
+
+def make_real_tools(embed_latency: str, rerank_latency: str) -> tuple:
+    """Tool thật trên Postgres cục bộ; chỉ embeddings (OpenAI) và rerank (Cohere) được thay bằng bản giả lập."""
+    from tools import SQLDatabaseService, PolicyRAGService, PythonChartService, ChartSpecService, ArtifactStore, DataHandleStore
+    artifacts, handles = ArtifactStore(), DataHandleStore()
+    sql_service = SQLDatabaseService(data_handles=handles)
+    rag_service = PolicyRAGService(embeddings=FakeEmbeddings(settings.EMBEDDING_DIMENSIONS, embed_latency),
+                                   rerank_client=FakeRerankClient(rerank_latency))
+    tools = [sql_service.get_tool(), rag_service.get_tool(),
+             PythonChartService(artifacts=artifacts, data_handles=handles).get_tool()]
+    if settings.CHART_SPEC_ENABLED:
+        tools.append(ChartSpecService(artifacts=artifacts, data_handles=handles).get_tool())
+    return tools, sql_service.get_db_schema(), rag_service
+
+
+class LoopMonitor:
+    """Đo độ trễ event loop (ngủ interval rồi xem thức dậy muộn bao nhiêu) và lấy mẫu RSS."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.lags_ms = []
+        self.rss = []
+
+    async def run(self, stop: asyncio.Event):
+        while not stop.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags_ms.append(max(0.0, (time.perf_counter() - start - self.interval) * 1000))
+            if len(self.lags_ms) % 10 == 0:
+                self.rss.append(rss_mb())
+
+
+async def simulated_user(user_id: int, graph, tracer: Tracer, mix: list, deadline: float, think: Latency,
+                         results: list):
+    """Một người dùng: hỏi lần lượt các câu ngẫu nhiên trong mix, mỗi câu một session (thread_id) mới."""
+    rng = random.Random(user_id)
+    turn = 0
+    while time.perf_counter() < deadline:
+        scenario = rng.choice(mix)
+        session_id = f"user{user_id}-{turn}"
+        config = tracer.config_for_run({"configurable": {"thread_id": session_id}}, session_id=session_id,
+                                       suite=scenario.suite)
+        start = time.perf_counter()
+        first_token, status = None, "ok"
+        try:
+            async for event in graph.astream_events({"messages": [HumanMessage(content=scenario.question)]},
+                                                    config=config, version="v2"):
+                if first_token is None and event["event"] == "on_chat_model_stream":
+                    first_token = (time.perf_counter() - start) * 1000
+        except Exception as e:
+            status = f"{type(e).__name__}: {e}"
+        results.append({"suite": scenario.suite, "case_id": scenario.case_id, "status": status,
+                        "latency_ms": (time.perf_counter() - start) * 1000, "ttft_ms": first_token})
+        turn += 1
+        delay = think.sample_ms()
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+
+async def run_load(graph, tracer: Tracer, mix: list, users: int, duration: float, think: Latency):
+    results = []
+    monitor = LoopMonitor()
+    stop = asyncio.Event()
+    monitor_task = asyncio.create_task(monitor.run(stop))
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(simulated_user(i, graph, tracer, mix, deadline, think, results) for i in range(users)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor_task
+    return results, elapsed, monitor
+
+
+def percentiles(values: list) -> str:
+    if not values:
+        return "-"
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return f"p50 {p50:7.0f}  p95 {p95:7.0f}  p99 {p99:7.0f} ms"
+
+
+def report(results: list, elapsed: float, monitor: LoopMonitor, spans: list, memory: dict):
+    ok = [r for r in results if r["status"] == "ok"]
+    print(f"\n{YELLOW}THÔNG LƯỢNG{RESET}")
+    print(f"  {len(results)} request trong {elapsed:.1f}s -> {GREEN}{len(ok) / elapsed:.2f} req/s{RESET} "
+          f"({len(results) - len(ok)} lỗi)")
+    print(f"  Latency toàn bộ: {percentiles([r['latency_ms'] for r in ok])}")
+    print(f"  Token đầu tiên:  {percentiles([r['ttft_ms'] for r in ok if r['ttft_ms'] is not None])}")
+
+    print(f"\n{YELLOW}THEO BỘ CÂU HỎI{RESET}")
+    for suite in SUITE_FILES:
+        rows = [r for r in results if r["suite"] == suite]
+        if rows:
+            errors = sum(1 for r in rows if r["status"] != "ok")
+            print(f"  {suite:<9} n={len(rows):<5} lỗi={errors:<3} {percentiles([r['latency_ms'] for r in rows if r['status'] == 'ok'])}")
+    for error in sorted({r["status"] for r in results if r["status"] != "ok"})[:5]:
+        print(f"  Lỗi: {error[:160]}")
+
+    print(f"\n{YELLOW}THEO NODE / TOOL / LLM (từ trace){RESET}")
+    for row in summarize(spans, kinds=("node", "tool", "llm")):
+        print(f"  {row['kind']:<5} {row['name'][:22]:<22} n={row['count']:<6} p50 {row['p50_ms']:7.0f}  "
+              f"p95 {row['p95_ms']:7.0f}  p99 {row['p99_ms']:7.0f} ms  chờ {row['queue_wait_ms']:6.1f} ms")
+
+    print(f"\n{YELLOW}EVENT LOOP & BỘ NHỚ{RESET}")
+    lags = monitor.lags_ms
+    if lags:
+        print(f"  Độ trễ event loop: p50 {np.percentile(lags, 50):.1f} ms, p99 {np.percentile(lags, 99):.1f} ms, "
+              f"max {max(lags):.1f} ms")
+    growth = memory["end"] - memory["start"]
+    per_100 = growth / len(results) * 100 if results else 0.0
+    print(f"  RSS: đầu {memory['start']:.0f} MB, đỉnh {max(monitor.rss + [memory['end']]):.0f} MB, "
+          f"cuối (sau gc) {memory['end']:.0f} MB -> tăng {growth:+.1f} MB ({per_100:+.2f} MB / 100 request)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test graph (không qua HTTP) với LLM / embeddings / rerank giả lập.")
+    parser.add_argument("--users", type=int, default=8, help="Số người dùng giả lập chạy đồng thời")
+    parser.add_argument("--duration", type=float, default=30, help="Thời gian chạy (giây)")
+    parser.add_argument("--suites", nargs="+", default=list(SUITE_FILES), choices=list(SUITE_FILES),
+                        help="Bộ câu hỏi (ground truth) dùng làm tập câu hỏi")
+    parser.add_argument("--llm-latency", default="lognormal:600:0.4", help="Phân phối latency LLM (VD: const:50)")
+    parser.add_argument("--writer-latency", default=None, help="Latency LLM viết câu trả lời (mặc định như --llm-latency)")
+    parser.add_argument("--embed-latency", default="const:40")
+    parser.add_argument("--rerank-latency", default="lognormal:120:0.3")
+    parser.add_argument("--think-time", default="const:0", help="Thời gian nghỉ giữa hai câu hỏi của một người dùng")
+    parser.add_argument("--fake-tools", action="store_true", help="Dùng tool giả lập (không cần Postgres)")
+    parser.add_argument("--tool-latency", default="lognormal:40:0.5", help="Latency của tool giả lập")
+    parser.add_argument("--verbose", action="store_true", help="Hiện log của các node")
+    args = parser.parse_args()
+
+    chart_tool = "render_chart" if settings.CHART_SPEC_ENABLED else "python_chart_maker"
+    scenarios = load_scenarios(args.suites, chart_tool=chart_tool)
+    book = ScenarioBook(scenarios)
+    llm = FakeChatModel(latency=args.llm_latency, book=book)
+    writer = FakeChatModel(latency=args.writer_latency or args.llm_latency, book=book)
+
+    rag_service = None
+    if args.fake_tools:
+        tools, db_schema = make_fake_tools(args.tool_latency, chart_tool), "(schema giả lập)"
+    else:
+        tools, db_schema, rag_service = make_real_tools(args.embed_latency, args.rerank_latency)
+    graph = init_agent_app(llm=llm, llm_writer=writer, tools=tools, db_schema=db_schema)
+
+    exporter = MemorySpanExporter()
+    tracer = Tracer(exporters=[exporter], sample_rate=1.0, flush_seconds=0.5)
+    print(f"{YELLOW}{args.users} người dùng trong {args.duration:.0f}s, {len(scenarios)} câu hỏi ({', '.join(args.suites)}), "
+          f"LLM {args.llm_latency}, tool {'giả lập' if args.fake_tools else 'thật (Postgres)'}...{RESET}")
+
+    gc.collect()
+    memory = {"start": rss_mb()}
+    quiet = open(os.devnull, "w") if not args.verbose else None
+    with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+        results, elapsed, monitor = asyncio.run(run_load(graph, tracer, scenarios, args.users, args.duration,
+                                                         Latency(args.think_time)))
+    tracer.flush()
+    gc.collect()
+    memory["end"] = rss_mb()
+
+    report(results, elapsed, monitor, exporter.spans, memory)
+    if rag_service is not None and rag_service.initialized:
+        print(f"  RAG: {rag_service.rerank_stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+import argparse
+import json
+import sys
+import os
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from datasets import Dataset
+from ragas import evaluate
+from ragas.metrics import context_precision, context_recall
+from config.settings import settings
+from tools.rag_tool import PolicyRAGService
+
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+RESET = '\033[0m'
+
+MODES = {
+    "vector+rerank": {"retriever": "pgvector", "use_rerank": True},
+    "hybrid": {"retriever": "hybrid", "use_rerank": False},
+    "hybrid+rerank": {"retriever": "hybrid", "use_rerank": True},
+}
+
+def load_cases():
+    path = os.path.join(os.path.dirname(__file__), '../ground_truth/rag_ground_truth.json')
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def split_contexts(tool_output: str):
+    """Tách output của search_policy_docs thành từng đoạn ngữ cảnh theo header [NGUỒN: ...]."""
+    parts = [p.strip() for p in tool_output.split("[NGUỒN:") if p.strip()]
+    return ["[NGUỒN:" + p for p in parts] or ["Không có ngữ cảnh nào được truy xuất."]
+
+def run_mode(name, service, cases):
+    ragas_data = {"question": [], "contexts": [], "ground_truth": []}
+    latencies = []
+    for idx, case in enumerate(cases, 1):
+        start = time.perf_counter()
+        output = service.search_policy_docs(case["question"])
+        latencies.append((time.perf_counter() - start) * 1000)
+        ragas_data["question"].append(case["question"])
+        ragas_data["contexts"].append(split_contexts(output))
+        ragas_data["ground_truth"].append(case["ground_truth"])
+        print(f"  [{name}] {idx}/{len(cases)}", end="\r")
+    print()
+    return ragas_data, latencies
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh hybrid retrieval (RRF trong Postgres) với vector + Cohere rerank.")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--skip-ragas", action="store_true", help="Chỉ đo latency, không chạy RAGAS")
+    args = parser.parse_args()
+
+    cases = load_cases()
+    evaluator_llm = ChatOpenAI(model=settings.LLM_MODEL, temperature=settings.LLM_TEMPERATURE)
+    evaluator_embeddings = OpenAIEmbeddings(model=settings.EMBEDDING_MODEL)
+
+    rows = []
+    for name in args.modes:
+        print(f"{YELLOW}Đang chạy chế độ: {name}{RESET}")
+        service = PolicyRAGService(**MODES[name])
+        ragas_data, latencies = run_mode(name, service, cases)
+        row = {
+            "mode": name,
+            "p50_ms": np.percentile(latencies, 50),
+            "p95_ms": np.percentile(latencies, 95),
+            "mean_ms": float(np.mean(latencies)),
+        }
+        if not args.skip_ragas:
+            result = evaluate(
+                Dataset.from_dict(ragas_data),
+                metrics=[context_precision, context_recall],
+                llm=evaluator_llm,
+                embeddings=evaluator_embeddings,
+            ).to_pandas()
+            row["context_precision"] = result["context_precision"].mean()
+            row["context_recall"] = result["context_recall"].mean()
+        rows.append(row)
+
+    df = pd.DataFrame(rows)
+    report_file = os.path.join(os.path.dirname(__file__), '../reports/hybrid_retrieval_report.csv')
+    df.to_csv(report_file, index=False, encoding='utf-8-sig')
+    print(f"\n{YELLOW}KẾT QUẢ ({len(cases)} câu hỏi){RESET}")
+    print(df.to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    print(f"\n{GREEN}Đã lưu báo cáo tại: {report_file}{RESET}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import argparse
+import json
+import sys
+import os
+import time
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from langchain_openai import OpenAIEmbeddings
+from langchain_postgres import PGVector
+from config.settings import settings
+from core.database import get_engine, ROLE_VECTOR
+from tools.vector_index import VectorIndexManager
+from tools.local_vector_index import LocalVectorIndex
+
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+RESET = '\033[0m'
+
+def load_questions():
+    path = os.path.join(os.path.dirname(__file__), '../ground_truth/rag_ground_truth.json')
+    with open(path, 'r', encoding='utf-8') as f:
+        return [case["question"] for case in json.load(f)]
+
+def measure(search_fn, query_vectors, k, repeats):
+    latencies, results = [], []
+    for _ in range(repeats):
+        for vec in query_vectors:
+            start = time.perf_counter()
+            docs = search_fn(vec, k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            results.append([d.id for d in docs])
+    return latencies, results
+
+def report_row(label, latencies):
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"{label:<10} | p50 {p50:9.3f} ms | p95 {p95:9.3f} ms | p99 {p99:9.3f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh latency retriever PGVector và NumPy (trong tiến trình).")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    embeddings = OpenAIEmbeddings(model=settings.EMBEDDING_MODEL)
+    engine = VectorIndexManager.attach_runtime_settings(get_engine(ROLE_VECTOR))
+    vector_store = PGVector(
+        embeddings=embeddings,
+        collection_name=settings.COLLECTION_NAME,
+        connection=engine,
+        embedding_length=settings.EMBEDDING_DIMENSIONS,
+        use_jsonb=True,
+    )
+    local_index = LocalVectorIndex(vector_store)
+    local_index.ensure_fresh()
+
+    questions = load_questions()
+    print(f"{YELLOW}Đang embed {len(questions)} câu hỏi (không tính vào latency)...{RESET}")
+    query_vectors = embeddings.embed_documents(questions)
+
+    pg_latencies, pg_ids = measure(lambda v, k: vector_store.similarity_search_by_vector(v, k=k), query_vectors, args.k, args.repeats)
+    np_latencies, np_ids = measure(lambda v, k: local_index.similarity_search_by_vector(v, k=k), query_vectors, args.k, args.repeats)
+
+    overlap = np.mean([len(set(a) & set(b)) / max(len(a), 1) for a, b in zip(pg_ids, np_ids)])
+
+    print(f"\n{YELLOW}KẾT QUẢ ({len(questions)} câu hỏi x {args.repeats} lần, top-{args.k}){RESET}")
+    report_row("pgvector", pg_latencies)
+    report_row("numpy", np_latencies)
+    print(f"Tỉ lệ trùng kết quả top-{args.k}: {GREEN}{overlap:.4f}{RESET}")
+    print(f"Tăng tốc (p50): {GREEN}{np.percentile(pg_latencies, 50) / np.percentile(np_latencies, 50):.1f}x{RESET}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,362 @@
+import argparse
+import json
+import sys
+import os
+import gc
+import time
+import platform
+import tempfile
+import contextlib
+from types import SimpleNamespace
+import numpy as np
+import fitz
+from sqlalchemy import create_engine
+from langchain_core.documents import Document
+from langchain_core.messages import HumanMessage
+from langchain_community.utilities import SQLDatabase
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from tools.sql_tool import SQLDatabaseService
+from tools.rag_tool import PolicyRAGService
+from tools.python_tool import PythonChartService
+from tools.sandbox_pool import SandboxPool
+from tools.artifact_store import ArtifactStore
+from tools.data_handles import DataHandleStore
+from scripts.seed_rag import PolicyDocumentIngestor
+from scripts.pdf_pipeline import ParallelPDFPipeline
+from fake_backends import FakeEmbeddings, FakeRerankClient
+from bench_server_load import make_stub_graph
+from bench_pdf_ingest import SEED_PDF, build_synthetic_corpus
+
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+RED = '\033[91m'
+RESET = '\033[0m'
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baselines', 'micro.json')
+LATEST_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../reports/micro_latest.json'))
+
+
+def measure(fn, repeat: int, warmup: int = 1, units: int = 1) -> dict:
+    """
+    Chạy fn `repeat` lần (sau `warmup` lần bỏ qua). units = số đơn vị xử lý mỗi lần (dòng, ký tự, trang...).
+    Tắt GC trong lúc đo (như timeit) để một lần dọn rác ngẫu nhiên không làm lệch median.
+    """
+    for _ in range(warmup):
+        fn()
+    timings = []
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        gc.enable()
+    median = float(np.median(timings))
+    return {"median_ms": round(median, 4), "p95_ms": round(float(np.percentile(timings, 95)), 4),
+            "min_ms": round(min(timings), 4), "runs": repeat,
+            "units_per_s": round(units / (median / 1000), 1) if median > 0 else None}
+
+
+# --- Fixture ---
+
+def sql_fixture(rows: int, workdir: str) -> SQLDatabaseService:
+    """SQLite cục bộ với bảng orders `rows` dòng; data handle ghi vào thư mục tạm."""
+    engine = create_engine(f"sqlite:///{os.path.join(workdir, f'orders_{rows}.db')}")
+    rng = np.random.default_rng(rows)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE orders (order_id INTEGER, customer_name TEXT, order_date TEXT, "
+                             "status TEXT, total_amount REAL)")
+        conn.exec_driver_sql("INSERT INTO orders VALUES (?, ?, ?, ?, ?)", [
+            (i, f"Khách hàng {rng.integers(1, 5000)}", f"2024-{rng.integers(1, 13):02d}-{rng.integers(1, 29):02d}",
+             ("completed", "pending", "cancelled")[i % 3], round(float(rng.uniform(10, 5000)), 2))
+            for i in range(rows)
+        ])
+    handles = DataHandleStore(ArtifactStore(root=os.path.join(workdir, f"handles_{rows}"), suffix=".pkl"))
+    service = SQLDatabaseService(data_handles=handles)
+    # Gán sẵn thuộc tính lazy -> không đụng tới Postgres
+    service.db = SQLDatabase(engine)
+    return service
+
+
+class FixtureVectorIndex:
+    """Index brute-force trong bộ nhớ, cùng giao diện với LocalVectorIndex (không cần PGVector)."""
+
+    def __init__(self, docs: list, embeddings: FakeEmbeddings):
+        self.docs = docs
+        self.matrix = np.asarray(embeddings.embed_documents([d.page_content for d in docs]), dtype=np.float32)
+
+    def similarity_search_with_score_by_vector(self, embedding, k: int = 4):
+        scores = self.matrix @ np.asarray(embedding, dtype=np.float32)
+        top = np.argsort(-scores)[:k]
+        return [(self.docs[i], float(scores[i])) for i in top]
+
+
+def policy_text() -> str:
+    with fitz.open(SEED_PDF) as pdf:
+        return "\n".join(page.get_text() for page in pdf)
+
+
+def rag_fixture(n_chunks: int, use_rerank: bool) -> PolicyRAGService:
+    """PolicyRAGService với retriever numpy trên index cục bộ, embeddings / rerank giả lập không trễ."""
+    paragraphs = [p.strip() for p in policy_text().split("\n") if len(p.strip()) > 20] or ["Chính sách nghỉ phép năm."]
+    docs = [Document(page_content=f"{paragraphs[i % len(paragraphs)]} (mục {i})", id=f"chunk-{i}",
+                     metadata={"page": i % 3}) for i in range(n_chunks)]
+    embeddings = FakeEmbeddings(dimensions=1536, latency="const:0")
+    service = PolicyRAGService(retriever="numpy", use_rerank=use_rerank, adaptive_rerank=False, compress_context=False,
+                               collections=["policy_docs"], embeddings=embeddings,
+                               rerank_client=FakeRerankClient(latency="const:0"))
+    service.rerank_cache.max_size = 0
+    service.embeddings = embeddings
+    service.vector_stores = {}
+    service.local_indexes = {"policy_docs": FixtureVectorIndex(docs, embeddings)}
+    service.hybrid_indexes = {}
+    service.router = None
+    service._shard_pool = None
+    service.co = service._rerank_override
+    service.compressor = None
+    return service
+
+
+CHART_CODE = """
+import matplotlib.pyplot as plt
+plt.figure(figsize=(8, 4))
+plt.bar(["T1", "T2", "T3", "T4"], [120, 135, 150, {value}])
+plt.title("Doanh thu theo tháng")
+"""
+
+
+# --- Benchmark ---
+
+def bench_sql(repeat: int, workdir: str) -> dict:
+    results = {}
+    for rows in (10, 1_000, 10_000):
+        service = sql_fixture(rows, workdir)
+        query = "SELECT order_id, customer_name, order_date, status, total_amount FROM orders"
+        results[f"sql.query_format.{rows}_rows"] = measure(lambda: service.query_sql_db(query),
+                                                           repeat=max(repeat // (rows // 1000 + 1), 3), units=rows)
+        raw = service.db._execute(query)
+        results[f"sql.format_rows.{rows}_rows"] = measure(lambda: service._format_rows(raw),
+                                                          repeat=max(repeat // (rows // 1000 + 1), 3), units=rows)
+    return results
+
+
+def bench_rag(repeat: int, workdir: str) -> dict:
+    questions = ["Nhân viên được nghỉ phép bao nhiêu ngày?", "Quy định tăng lương hằng năm",
+                 "Chính sách thưởng cuối năm", "Phụ cấp ăn trưa"]
+    results = {}
+    for n_chunks in (500, 5_000):
+        for use_rerank in (False, True):
+            service = rag_fixture(n_chunks, use_rerank)
+            cycle = iter(range(10**9))
+            label = "rerank" if use_rerank else "vector"
+            results[f"rag.search.{label}.{n_chunks}_chunks"] = measure(
+                lambda: service.search_policy_docs(questions[next(cycle) % len(questions)]), repeat=repeat)
+    return results
+
+
+def bench_chart(repeat: int, workdir: str) -> dict:
+    artifacts = ArtifactStore(root=os.path.join(workdir, "charts"))
+    handles = DataHandleStore(ArtifactStore(root=os.path.join(workdir, "chart_handles"), suffix=".pkl"))
+    cold_repeat = max(repeat // 10, 2)
+    cold_timings = []
+    for i in range(cold_repeat):
+        # Cold: service + pool mới, lần vẽ đầu phải chờ tiến trình sandbox nạp pandas / matplotlib
+        service = PythonChartService(pool=None, artifacts=artifacts, data_handles=handles)
+        service._pool_override = SandboxPool(size=1)
+        start = time.perf_counter()
+        service.python_chart_maker(CHART_CODE.format(value=1000 + i))
+        cold_timings.append((time.perf_counter() - start) * 1000)
+        service.pool.close()
+
+    service = PythonChartService(pool=SandboxPool(size=1), artifacts=artifacts, data_handles=handles)
+    service.pool.warm_up()
+    values = iter(range(10**6))
+    results = {
+        "chart.python_chart_maker.cold": {
+            "median_ms": round(float(np.median(cold_timings)), 4),
+            "p95_ms": round(float(np.percentile(cold_timings, 95)), 4),
+            "min_ms": round(min(cold_timings), 4), "runs": cold_repeat, "units_per_s": None,
+        },
+        # Warm: pool sẵn sàng, code khác nhau mỗi lần (không trúng cache artifact)
+        "chart.python_chart_maker.warm": measure(
+            lambda: service.python_chart_maker(CHART_CODE.format(value=next(values))), repeat=repeat),
+        "chart.python_chart_maker.cached": measure(
+            lambda: service.python_chart_maker(CHART_CODE.format(value=0)), repeat=repeat),
+    }
+    service.pool.close()
+    return results
+
+
+def bench_ingest(repeat: int, workdir: str) -> dict:
+    text = policy_text()
+    corpus = (text + "\n") * max(1, 1_000_000 // max(len(text), 1))
+    corpus_dir = os.path.join(workdir, "pdf_corpus")
+    build_synthetic_corpus(corpus_dir, total_pages=60, pages_per_file=30)
+    # load_and_split chỉ dùng pdf_path + pipeline; bỏ qua __init__ vì nó kết nối PGVector / OpenAI
+    ingestor = SimpleNamespace(pdf_path=corpus_dir, pipeline=ParallelPDFPipeline(corpus_dir, workers=1))
+    chunks = PolicyDocumentIngestor.load_and_split(ingestor)
+    return {
+        "ingest.advanced_clean_text.1mb": measure(lambda: PolicyDocumentIngestor.advanced_clean_text(corpus),
+                                                  repeat=max(repeat // 4, 3), units=len(corpus)),
+        "ingest.load_and_split.60_pages": measure(lambda: PolicyDocumentIngestor.load_and_split(ingestor),
+                                                  repeat=max(repeat // 10, 3), units=60),
+        "_ingest_chunks": len(chunks),
+    }
+
+
+def bench_graph(repeat: int, workdir: str) -> dict:
+    graph = make_stub_graph(latency_ms=0, tool_latency_ms=0)
+    counter = iter(range(10**9))
+
+    def run():
+        config = {"configurable": {"thread_id": f"micro-{next(counter)}"}}
+        return graph.invoke({"messages": [HumanMessage(content="Doanh thu tháng này?")]}, config=config)
+
+    config = {"configurable": {"thread_id": "micro-steps"}}
+    steps = sum(1 for _ in graph.stream({"messages": [HumanMessage(content="Doanh thu tháng này?")]},
+                                        config=config, stream_mode="updates"))
+    invoke = measure(run, repeat=repeat, warmup=2)
+    per_node = {key: (round(value / steps, 4) if key.endswith("_ms") else value) for key, value in invoke.items()}
+    per_node["units_per_s"] = round(steps / (invoke["median_ms"] / 1000), 1)
+    return {"graph.invoke.noop_llm": invoke, "graph.per_node.noop_llm": per_node, "_graph_steps": steps}
+
+
+BENCHMARKS = {"sql": bench_sql, "rag": bench_rag, "chart": bench_chart, "ingest": bench_ingest, "graph": bench_graph}
+
+
+# --- Chạy / lưu / so sánh ---
+
+def environment() -> dict:
+    return {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count(),
+            "platform": platform.platform(terse=True)}
+
+
+def run_suite(groups: list, repeat: int, rounds: int = 3, verbose: bool = False) -> dict:
+    """
+    Chạy cả bộ `rounds` lượt; mỗi benchmark giữ min_ms tốt nhất và median của các median.
+    Nhiễu nền (tiến trình khác, CPU bị chia sẻ) chỉ làm chậm đi, nên lượt tốt nhất gần chi phí thật nhất.
+    """
+    per_round = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for round_idx in range(rounds):
+            results = {}
+            round_dir = os.path.join(workdir, f"round{round_idx}")
+            os.makedirs(round_dir)
+            for group in groups:
+                print(f"{YELLOW}Đang đo: {group} (lượt {round_idx + 1}/{rounds})...{RESET}")
+                quiet = open(os.devnull, "w") if not verbose else None
+                with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+                    group_results = BENCHMARKS[group](repeat, round_dir)
+                results.update({name: value for name, value in group_results.items() if not name.startswith("_")})
+            per_round.append(results)
+
+    merged = {}
+    for name in per_round[0]:
+        samples = [results[name] for results in per_round]
+        best = dict(min(samples, key=lambda stats: stats["min_ms"]))
+        best["median_ms"] = round(float(np.median([stats["median_ms"] for stats in samples])), 4)
+        best["rounds"] = rounds
+        merged[name] = best
+    return {"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "environment": environment(), "results": merged}
+
+
+def save(report: dict, path: str):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def print_results(report: dict):
+    print(f"\n{'Benchmark':<42} {'median ms':>11} {'p95 ms':>11} {'đơn vị/s':>14}")
+    for name, stats in sorted(report["results"].items()):
+        throughput = f"{stats['units_per_s']:,.0f}" if stats.get("units_per_s") else "-"
+        print(f"{name:<42} {stats['median_ms']:>11.3f} {stats['p95_ms']:>11.3f} {throughput:>14}")
+
+
+def compare(baseline: dict, current: dict, threshold: float, min_delta_ms: float, metric: str = "min_ms") -> list:
+    """
+    So `metric` hiện tại với baseline. Hồi quy = chậm hơn quá `threshold` (tỉ lệ) VÀ quá `min_delta_ms`
+    (bỏ qua dao động vài micro giây của các phép đo rất nhỏ). Trả về danh sách benchmark bị hồi quy.
+    Mặc định so min_ms: trên máy dùng chung, median dao động tới vài chục % giữa các lần chạy, min ổn định hơn nhiều.
+    """
+    if baseline.get("environment") != current.get("environment"):
+        print(f"{YELLOW}Cảnh báo: môi trường khác baseline ({baseline.get('environment')} vs "
+              f"{current.get('environment')}), kết quả chỉ mang tính tham khảo.{RESET}")
+
+    regressions = []
+    print(f"\n{'Benchmark':<42} {'baseline ms':>12} {'hiện tại ms':>12} {'thay đổi':>10}  ({metric})")
+    for name in sorted(set(baseline["results"]) | set(current["results"])):
+        base, now = baseline["results"].get(name), current["results"].get(name)
+        if base is None or now is None:
+            print(f"{name:<42} {'(mới)' if base is None else '(không chạy)':>12}")
+            continue
+        change = (now[metric] - base[metric]) / base[metric] if base[metric] else 0.0
+        regressed = change > threshold and now[metric] - base[metric] > min_delta_ms
+        color = RED if regressed else (GREEN if change < -threshold else RESET)
+        print(f"{name:<42} {base[metric]:>12.3f} {now[metric]:>12.3f} {color}{change:>+9.1%}{RESET}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark các hot path của tool (fixture cục bộ) và so với baseline.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for command in ("run", "compare"):
+        p = sub.add_parser(command)
+        p.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS), help="Nhóm benchmark cần chạy")
+        p.add_argument("--repeat", type=int, default=30, help="Số lần đo mỗi benchmark (cold chart / PDF ít hơn)")
+        p.add_argument("--baseline", default=BASELINE_PATH)
+        p.add_argument("--output", default=LATEST_PATH, help="File JSON lưu kết quả lần chạy này")
+        p.add_argument("--rounds", type=int, default=3, help="Số lượt chạy cả bộ, giữ lượt tốt nhất")
+        p.add_argument("--verbose", action="store_true", help="Hiện log của các tool")
+    sub.choices["run"].add_argument("--save-baseline", action="store_true", help="Ghi kết quả làm baseline mới")
+    sub.choices["compare"].add_argument("--results", default=None,
+                                        help="So file kết quả có sẵn thay vì chạy lại (VD: evaluation/reports/micro_latest.json)")
+    sub.choices["compare"].add_argument("--threshold", type=float, default=0.25, help="Ngưỡng hồi quy (0.25 = chậm hơn 25%%)")
+    sub.choices["compare"].add_argument("--metric", choices=["min_ms", "median_ms", "p95_ms"], default="min_ms")
+    sub.choices["compare"].add_argument("--min-delta-ms", type=float, default=0.05, help="Bỏ qua chênh lệch tuyệt đối nhỏ hơn")
+    args = parser.parse_args()
+
+    if args.command == "compare" and args.results:
+        current = load(args.results)
+    else:
+        current = run_suite(args.only, args.repeat, args.rounds, args.verbose)
+        save(current, args.output)
+        print_results(current)
+        print(f"\nĐã lưu kết quả: {args.output}")
+
+    if args.command == "run":
+        if args.save_baseline:
+            if os.path.exists(args.baseline):
+                # Chỉ thay các benchmark vừa chạy, giữ nguyên phần còn lại của baseline
+                merged = load(args.baseline)
+                merged["results"].update(current["results"])
+                merged.update(created_at=current["created_at"], environment=current["environment"])
+                current = merged
+            save(current, args.baseline)
+            print(f"{GREEN}Đã cập nhật baseline: {args.baseline}{RESET}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"{RED}Chưa có baseline ({args.baseline}). Chạy: run --save-baseline{RESET}")
+        sys.exit(2)
+    regressions = compare(load(args.baseline), current, args.threshold, args.min_delta_ms, args.metric)
+    if regressions:
+        print(f"\n{RED}{len(regressions)} benchmark chậm hơn baseline quá {args.threshold:.0%}: {', '.join(regressions)}{RESET}")
+        sys.exit(1)
+    print(f"\n{GREEN}Không có hồi quy (ngưỡng {args.threshold:.0%}).{RESET}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import argparse
+import sys
+import os
+import re
+import time
+import random
+import contextlib
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import HumanMessage, ToolMessage
+from langchain_core.tools import StructuredTool
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from agent.factory import init_agent_app
+from agent.cascade import EscalationStats, ModelCascade, is_tool_error
+from fake_backends import SUITE_FILES, FakeChatModel, Latency, ScenarioBook, load_scenarios
+
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+RESET = '\033[0m'
+
+BROKEN_SQL = re.compile(r"(?i)\bselec\b")
+
+
+def make_tools(latency: str) -> list:
+    """Tool giả lập; query_sql_db trả lỗi như tool thật khi SQL sai cú pháp (SQL do model fast sinh hỏng)."""
+    delay = Latency(latency)
+
+    def query_sql_db(query: str) -> str:
+        """Thực thi lệnh SQL (giả lập)."""
+        delay.sleep()
+        if BROKEN_SQL.search(query):
+            return 'Lỗi SQL: syntax error at or near "SELEC". Hãy kiểm tra lại cú pháp hoặc tên bảng.'
+        return f"[('2024-01', 1250000.0)]\nDATA_HANDLE: fake{random.randrange(10**6)} (cột: month, revenue)"
+
+    def search_policy_docs(query: str) -> str:
+        """Tìm tài liệu chính sách (giả lập)."""
+        delay.sleep()
+        return "[Trang 3] Nhân viên được xét tăng lương cơ bản 1 lần/năm."
+
+    def render_chart(chart_type: str, x: str, y: str = "", data_handle: str = "", title: str = "") -> str:
+        """Vẽ biểu đồ từ đặc tả (giả lập)."""
+        delay.sleep()
+        return "Đã vẽ biểu đồ thành công (giả lập)."
+
+    return [StructuredTool.from_function(func=f, name=f.__name__, description=f.__doc__)
+            for f in (query_sql_db, search_policy_docs, render_chart)]
+
+
+def run_config(graph, scenarios: list, concurrency: int, label: str) -> list:
+    def one(i_scenario):
+        i, scenario = i_scenario
+        config = {"configurable": {"thread_id": f"{label}-{i}"}}
+        start = time.perf_counter()
+        status = "ok"
+        tool_errors = 0
+        try:
+            result = graph.invoke({"messages": [HumanMessage(content=scenario.question)]}, config=config)
+            tool_errors = sum(1 for m in result["messages"] if isinstance(m, ToolMessage) and is_tool_error(m))
+        except Exception as e:
+            status = f"{type(e).__name__}: {e}"
+        return {"suite": scenario.suite, "status": status, "tool_errors": tool_errors,
+                "latency_ms": (time.perf_counter() - start) * 1000}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(one, enumerate(scenarios)))
+
+
+def model_calls(stats: EscalationStats) -> dict:
+    """Số lời gọi theo tầng: tầng ban đầu của mỗi node + mỗi lần leo thang là một lời gọi strong."""
+    calls = {"fast": 0, "strong": 0, "writer": 0}
+    for node in stats.snapshot().values():
+        for tier, count in node["tiers"].items():
+            calls[tier] = calls.get(tier, 0) + count
+        calls["strong"] += node["escalations"]
+    return calls
+
+
+def report(label: str, results: list, stats: EscalationStats, baseline_p50: float = None):
+    ok = [r["latency_ms"] for r in results if r["status"] == "ok"]
+    errors = [r for r in results if r["status"] != "ok"]
+    p50, p95 = np.percentile(ok, [50, 95]) if ok else (0.0, 0.0)
+    speedup = f" -> {GREEN}{baseline_p50 / p50:.2f}x{RESET}" if baseline_p50 and p50 else ""
+    calls = model_calls(stats)
+    print(f"\n{YELLOW}{label}{RESET}")
+    print(f"  Latency / câu: p50 {p50:7.0f}  p95 {p95:7.0f} ms{speedup}  ({len(errors)} lỗi)")
+    print(f"  Lời gọi model: fast {calls['fast']}, strong {calls['strong']}, writer {calls['writer']}  |  "
+          f"tool lỗi {sum(r['tool_errors'] for r in results)}")
+    for node, row in stats.snapshot().items():
+        if row["escalations"]:
+            reasons = ", ".join(f"{k}={v}" for k, v in row["reasons"].items())
+            print(f"  Leo thang {node:<16} {row['escalations']:>4}/{row['calls']:<4} ({row['rate']:.1%})  {reasons}")
+    for error in sorted({r["status"] for r in errors})[:3]:
+        print(f"  Lỗi: {error[:160]}")
+    return p50
+
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh một model strong cho mọi node với cascade fast -> strong (model giả lập).")
+    parser.add_argument("--suites", nargs="+", default=["sql", "rag", "multihop", "edge"], choices=list(SUITE_FILES))
+    parser.add_argument("--limit", type=int, default=40, help="Số câu hỏi tối đa")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--fast-latency", default="lognormal:250:0.3", help="Latency model fast")
+    parser.add_argument("--strong-latency", default="lognormal:900:0.3", help="Latency model strong / writer")
+    parser.add_argument("--tool-latency", default="const:20")
+    parser.add_argument("--low-confidence-rate", type=float, default=0.1, help="Tỉ lệ phân loại confidence thấp của model fast")
+    parser.add_argument("--invalid-output-rate", type=float, default=0.05, help="Tỉ lệ structured output hỏng của model fast")
+    parser.add_argument("--sql-error-rate", type=float, default=0.15, help="Tỉ lệ SQL sai ở lần gọi đầu của model fast")
+    parser.add_argument("--min-confidence", type=float, default=0.7)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Hiện log của các node")
+    args = parser.parse_args()
+
+    scenarios = load_scenarios(args.suites, chart_tool="render_chart")
+    random.Random(args.seed).shuffle(scenarios)
+    scenarios = scenarios[:args.limit]
+    book = ScenarioBook(scenarios)
+    tools = make_tools(args.tool_latency)
+    strong = FakeChatModel(latency=args.strong_latency, book=book)
+    fast = FakeChatModel(latency=args.fast_latency, book=book, low_confidence_rate=args.low_confidence_rate,
+                         invalid_output_rate=args.invalid_output_rate, sql_error_rate=args.sql_error_rate)
+
+    configs = [
+        ("Một model strong cho mọi node", dict(fast=strong, strong=strong, writer=strong, enabled=False)),
+        ("Cascade fast -> strong", dict(fast=fast, strong=strong, writer=strong, enabled=True)),
+    ]
+    print(f"{YELLOW}{len(scenarios)} câu hỏi ({', '.join(args.suites)}), {args.concurrency} luồng, "
+          f"fast {args.fast_latency}, strong {args.strong_latency}...{RESET}")
+
+    baseline_p50 = None
+    quiet = open(os.devnull, "w") if not args.verbose else None
+    for label, options in configs:
+        random.seed(args.seed)
+        stats = EscalationStats()
+        cascade = ModelCascade(**options, min_confidence=args.min_confidence, stats=stats)
+        graph = init_agent_app(tools=tools, db_schema="(schema giả lập)", cascade=cascade)
+        with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+            results = run_config(graph, scenarios, args.concurrency, label)
+        p50 = report(label, results, stats, baseline_p50)
+        baseline_p50 = baseline_p50 or p50
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import sys
+import os
+import time
+import resource
+import tempfile
+import fitz
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from scripts.pdf_pipeline import ParallelPDFPipeline
+
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+RESET = '\033[0m'
+
+SEED_PDF = os.path.join(os.path.dirname(__file__), '../../data/policy.pdf')
+
+def build_synthetic_corpus(target_dir, total_pages, pages_per_file):
+    """Sinh kho PDF tổng hợp bằng cách lặp lại các trang của data/policy.pdf (nội dung tiếng Việt thật)."""
+    os.makedirs(target_dir, exist_ok=True)
+    seed = fitz.open(SEED_PDF)
+    written, file_idx = 0, 0
+    while written < total_pages:
+        doc = fitz.open()
+        while doc.page_count < pages_per_file and written < total_pages:
+            to_page = min(seed.page_count, pages_per_file - doc.page_count, total_pages - written) - 1
+            doc.insert_pdf(seed, from_page=0, to_page=to_page)
+            written += to_page + 1
+        doc.save(os.path.join(target_dir, f"synthetic_{file_idx:04d}.pdf"))
+        doc.close()
+        file_idx += 1
+    seed.close()
+    return file_idx
+
+def worker_counts(max_workers):
+    counts, n = [], 1
+    while n < max_workers:
+        counts.append(n)
+        n *= 2
+    counts.append(max_workers)
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo thông lượng trang/giây của pipeline ingest PDF theo số core.")
+    parser.add_argument("--pages", type=int, default=10_000)
+    parser.add_argument("--pages-per-file", type=int, default=500)
+    parser.add_argument("--corpus-dir", default=None, help="Thư mục corpus (mặc định: thư mục tạm)")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    corpus_dir = args.corpus_dir or os.path.join(tempfile.gettempdir(), "insight_agent_pdf_corpus")
+    print(f"{YELLOW}Đang sinh kho {args.pages:,} trang tại {corpus_dir}...{RESET}")
+    n_files = build_synthetic_corpus(corpus_dir, args.pages, args.pages_per_file)
+
+    print(f"\n{YELLOW}KẾT QUẢ ({n_files} file, {args.pages:,} trang, trích xuất + làm sạch + cắt chunk){RESET}")
+    baseline = None
+    for workers in worker_counts(args.max_workers):
+        pipeline = ParallelPDFPipeline(corpus_dir, workers=workers)
+        start = time.perf_counter()
+        stats = pipeline.run(lambda batch: None)
+        elapsed = time.perf_counter() - start
+        pages_per_sec = stats["pages"] / elapsed
+        baseline = baseline or pages_per_sec
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"workers={workers:<3} | {pages_per_sec:9.1f} trang/s | x{pages_per_sec / baseline:4.1f} | "
+              f"{stats['chunks']:,} chunks | peak RSS tiến trình chính {peak_rss_mb:.0f} MB")
+
+    print(f"\n{GREEN}Hoàn tất.{RESET}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+import argparse
+import sys
+import os
+import time
+import random
+import contextlib
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from langchain_core.messages import HumanMessage, ToolMessage
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from agent.factory import init_agent_app
+from agent.cascade import EscalationStats, ModelCascade, is_tool_error
+from bench_model_cascade import make_tools
+from fake_backends import SUITE_FILES, FakeChatModel, ScenarioBook, load_scenarios
+
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+RESET = '\033[0m'
+
+
+def run_config(graph, scenarios: list, concurrency: int, label: str) -> list:
+    def one(i_scenario):
+        i, scenario = i_scenario
+        config = {"configurable": {"thread_id": f"{label}-{i}"}}
+        start = time.perf_counter()
+        status, tool_calls, tool_errors = "ok", 0, 0
+        try:
+            result = graph.invoke({"messages": [HumanMessage(content=scenario.question)]}, config=config)
+            tools = [m for m in result["messages"] if isinstance(m, ToolMessage)]
+            tool_calls, tool_errors = len(tools), sum(1 for m in tools if is_tool_error(m))
+        except Exception as e:
+            status = f"{type(e).__name__}: {e}"
+        return {"case_id": scenario.case_id, "status": status, "tool_calls": tool_calls, "tool_errors": tool_errors,
+                "latency_ms": (time.perf_counter() - start) * 1000}
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(one, enumerate(scenarios)))
+
+
+def llm_calls(stats: EscalationStats) -> dict:
+    """Số lời gọi LLM theo node (mỗi lần leo thang là thêm một lời gọi)."""
+    return {node: row["calls"] + row["escalations"] for node, row in stats.snapshot().items()}
+
+
+def report(label: str, results: list, stats: EscalationStats, baseline: dict = None) -> dict:
+    ok = [r["latency_ms"] for r in results if r["status"] == "ok"]
+    errors = [r for r in results if r["status"] != "ok"]
+    p50, p95 = np.percentile(ok, [50, 95]) if ok else (0.0, 0.0)
+    calls = llm_calls(stats)
+    per_question = sum(calls.values()) / len(results)
+    speedup = f" -> {GREEN}{baseline['p50'] / p50:.2f}x{RESET}" if baseline and p50 else ""
+    print(f"\n{YELLOW}{label}{RESET}")
+    print(f"  Wall / câu: p50 {p50:7.0f}  p95 {p95:7.0f} ms{speedup}  ({len(errors)} lỗi)")
+    print(f"  LLM calls / câu: {per_question:.2f}"
+          + (f" (ReAct {baseline['llm_calls']:.2f})" if baseline else ""))
+    print(f"  Theo node: {', '.join(f'{node}={count}' for node, count in calls.items())}")
+    print(f"  Tool calls {sum(r['tool_calls'] for r in results)}, tool lỗi {sum(r['tool_errors'] for r in results)}")
+    for error in sorted({r["status"] for r in errors})[:3]:
+        print(f"  Lỗi: {error[:160]}")
+    return {"p50": p50, "llm_calls": per_question}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh vòng ReAct với plan-then-execute (AGENT_MODE=plan) trên câu hỏi nhiều bước (model giả lập).")
+    parser.add_argument("--suites", nargs="+", default=["multihop"], choices=list(SUITE_FILES))
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--llm-latency", default="lognormal:900:0.3", help="Latency LLM (mọi node)")
+    parser.add_argument("--tool-latency", default="lognormal:400:0.3", help="Latency tool (SQL / RAG / biểu đồ)")
+    parser.add_argument("--sql-error-rate", type=float, default=0.1, help="Tỉ lệ SQL sai ở lần gọi / kế hoạch đầu")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="Hiện log của các node")
+    args = parser.parse_args()
+
+    scenarios = [s for s in load_scenarios(args.suites, chart_tool="render_chart") if s.tool_calls]
+    book = ScenarioBook(scenarios)
+    llm = FakeChatModel(latency=args.llm_latency, book=book, sql_error_rate=args.sql_error_rate)
+    tools = make_tools(args.tool_latency)
+    print(f"{YELLOW}{len(scenarios)} câu hỏi cần tool ({', '.join(args.suites)}), {args.concurrency} luồng, "
+          f"LLM {args.llm_latency}, tool {args.tool_latency}...{RESET}")
+
+    baseline = None
+    quiet = open(os.devnull, "w") if not args.verbose else None
+    for label, mode in (("ReAct (agent -> tools -> agent)", "react"), ("Plan-then-execute", "plan")):
+        random.seed(args.seed)
+        stats = EscalationStats()
+        cascade = ModelCascade(fast=llm, strong=llm, writer=llm, enabled=False, stats=stats)
+        graph = init_agent_app(tools=tools, db_schema="(schema giả lập)", cascade=cascade, direct_answer=False,
+                               agent_mode=mode)
+        with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+            results = run_config(graph, scenarios, args.concurrency, label)
+        baseline = baseline or report(label, results, stats)
+        if mode == "plan":
+            report(label, results, stats, baseline)
+
+
+if __name__ == "__main__":
+    main()
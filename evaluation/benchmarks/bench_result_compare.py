@@ -0,0 +1,90 @@
+import argparse
+import sys
+import os
+import time
+import tempfile
+from decimal import Decimal
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../evaluation_src')))
+
+from result_compare import compare_dataframes
+
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+RESET = '\033[0m'
+
+
+def legacy_compare(df_expected, df_agent):
+    """Cách so cũ của eval_sql: sort toàn bộ theo mọi cột rồi equals (không có dung sai số)."""
+    if df_expected.shape != df_agent.shape:
+        return False
+    try:
+        left = df_expected.sort_values(by=df_expected.columns.tolist()).reset_index(drop=True)
+        right = df_agent.sort_values(by=df_agent.columns.tolist()).reset_index(drop=True)
+        right.columns = left.columns
+        return left.equals(right)
+    except Exception:
+        return False
+
+
+def make_result(rows: int, seed: int = 0) -> pd.DataFrame:
+    """Bảng giống kết quả SQL báo cáo: mã KH, tên sản phẩm, ngày, số lượng, doanh thu."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "customer_id": rng.integers(1, rows // 5 + 2, rows),
+        "product_name": pd.Series(rng.integers(0, 500, rows)).map(lambda i: f"Sản phẩm {i}"),
+        "order_date": pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 365, rows), unit="D"),
+        "quantity": rng.integers(1, 50, rows),
+        "revenue": np.round(rng.uniform(10, 5000, rows), 2),
+    })
+
+
+def agent_variant(expected: pd.DataFrame, noise: bool) -> pd.DataFrame:
+    """Cùng dữ liệu, khác thứ tự dòng và alias cột; noise=True cộng sai số float kiểu SUM/AVG."""
+    agent = expected.sample(frac=1.0, random_state=1).reset_index(drop=True)
+    agent.columns = [f"col_{i}" for i in range(agent.shape[1])]
+    if noise:
+        agent["col_4"] = agent["col_4"] * (1 + 1e-12)
+    return agent
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="So sánh tốc độ so khớp kết quả SQL: sort+equals vs hash vector hóa.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"\n{'Số dòng':>10} {'Trường hợp':<22} {'sort+equals':>16} {'hash':>16} {'nhanh hơn':>10}")
+    for rows in args.rows:
+        expected = make_result(rows)
+        for label, noise in (("đảo thứ tự", False), ("đảo thứ tự + sai số", True)):
+            agent = agent_variant(expected, noise)
+            legacy_ms, legacy_ok = timed(legacy_compare, expected, agent)
+            hash_ms, (hash_ok, _) = timed(compare_dataframes, expected, agent)
+            color = GREEN if hash_ok else YELLOW
+            print(f"{rows:>10,} {label:<22} {legacy_ms:>9.0f} ms {str(legacy_ok):>5} "
+                  f"{hash_ms:>9.0f} ms {color}{str(hash_ok):>5}{RESET} {legacy_ms / hash_ms:>9.1f}x")
+
+    # Snapshot Parquet vs chạy lại: đo thời gian đọc một kết quả chuẩn lớn từ Parquet (Decimal -> float)
+    rows = args.rows[-1]
+    expected = make_result(rows)
+    expected["revenue"] = expected["revenue"].map(lambda v: Decimal(f"{v:.2f}")).astype(float)
+    with tempfile.TemporaryDirectory() as snapshot_dir:
+        path = os.path.join(snapshot_dir, "case.parquet")
+        write_ms, _ = timed(lambda: expected.to_parquet(path, index=False))
+        read_ms, loaded = timed(pd.read_parquet, path)
+        size_mb = os.path.getsize(path) / 1024 / 1024
+    print(f"\nSnapshot Parquet {rows:,} dòng: ghi {write_ms:.0f} ms, đọc {read_ms:.0f} ms, {size_mb:.1f} MB, "
+          f"khớp bản gốc: {compare_dataframes(expected, loaded)[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import argparse
+import sys
+import os
+import time
+import socket
+import asyncio
+import threading
+import contextlib
+import numpy as np
+import httpx
+import uvicorn
+from langchain_core.tools import StructuredTool
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from agent.factory import init_agent_app
+from api.server import create_app
+from api.admission import AdmissionController
+from fake_backends import FakeChatModel, Scenario, ScenarioBook
+
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+RESET = '\033[0m'
+
+STUB_SCHEMA = "CREATE TABLE orders (order_id INT, customer_id INT, order_date DATE, total_amount NUMERIC)"
+STUB_ANSWER = "Tổng doanh thu tháng này là 1.250.000.000 VNĐ, tăng 12% so với tháng trước."
+
+
+def make_stub_graph(latency_ms: float, tool_latency_ms: float):
+    def query_sql_db(query: str) -> str:
+        """Thực thi lệnh SQL (giả lập)."""
+        time.sleep(tool_latency_ms / 1000)
+        return "[(Decimal('1250000000'),)]"
+
+    tool = StructuredTool.from_function(func=query_sql_db, name="query_sql_db", description="SQL giả lập")
+    # Mọi câu hỏi: gọi query_sql_db một lần rồi trả lời, guardrail / router luôn "an toàn / trong phạm vi"
+    stub = Scenario(case_id="", suite="stub", question="", answer=STUB_ANSWER,
+                    tool_calls=[("query_sql_db", {"query": "SELECT SUM(total_amount) FROM orders"})])
+    llm = FakeChatModel(latency=f"const:{latency_ms}", book=ScenarioBook([], default=stub))
+    return init_agent_app(llm=llm, llm_writer=llm, tools=[tool], db_schema=STUB_SCHEMA)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/readyz", timeout=1).status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("Server không sẵn sàng sau 30s")
+
+
+async def one_request(client: httpx.AsyncClient, base_url: str, message: str) -> dict:
+    start = time.perf_counter()
+    first_token = None
+    async with client.stream("POST", f"{base_url}/v1/chat/stream", json={"message": message}) as response:
+        if response.status_code != 200:
+            await response.aread()
+            return {"status": response.status_code, "latency_ms": (time.perf_counter() - start) * 1000}
+        done = False
+        async for line in response.aiter_lines():
+            if line.startswith("event: token") and first_token is None:
+                first_token = (time.perf_counter() - start) * 1000
+            elif line.startswith("event: done"):
+                done = True
+    return {"status": 200 if done else 500, "latency_ms": (time.perf_counter() - start) * 1000,
+            "ttft_ms": first_token}
+
+
+async def sustained(base_url: str, concurrency: int, duration: float) -> tuple:
+    """concurrency client chạy vòng lặp liên tục trong duration giây (closed-loop)."""
+    results = []
+    deadline = time.perf_counter() + duration
+
+    async def client_loop(client):
+        while time.perf_counter() < deadline:
+            results.append(await one_request(client, base_url, "Doanh thu tháng này là bao nhiêu?"))
+
+    limits = httpx.Limits(max_connections=concurrency * 2)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+async def burst(base_url: str, n_requests: int) -> list:
+    """Bắn n request cùng lúc để kiểm tra admission control (phần vượt hàng chờ bị 503 ngay)."""
+    limits = httpx.Limits(max_connections=n_requests)
+    async with httpx.AsyncClient(timeout=120, limits=limits) as client:
+        return await asyncio.gather(*(one_request(client, base_url, "Câu hỏi burst") for _ in range(n_requests)))
+
+
+def report(label: str, results: list, elapsed: float = None):
+    ok = [r for r in results if r["status"] == 200]
+    rejected = [r for r in results if r["status"] == 503]
+    latencies = [r["latency_ms"] for r in ok]
+    ttft = [r["ttft_ms"] for r in ok if r.get("ttft_ms") is not None]
+    line = f"{label:<28} ok={len(ok):<5} 503={len(rejected):<5} lỗi khác={len(results) - len(ok) - len(rejected):<4}"
+    if elapsed:
+        line += f" {GREEN}{len(ok) / elapsed:6.1f} req/s{RESET}"
+    if latencies:
+        line += f" | p50 {np.percentile(latencies, 50):.0f} ms, p95 {np.percentile(latencies, 95):.0f} ms"
+    if ttft:
+        line += f" | TTFT p50 {np.percentile(ttft, 50):.0f} ms"
+    if rejected:
+        line += f" | 503 p50 {np.percentile([r['latency_ms'] for r in rejected], 50):.0f} ms"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test API server (SSE) với LLM giả lập.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--duration", type=float, default=15, help="Số giây cho mỗi mức concurrency")
+    parser.add_argument("--llm-latency-ms", type=float, default=50)
+    parser.add_argument("--tool-latency-ms", type=float, default=20)
+    parser.add_argument("--max-concurrent", type=int, default=8)
+    parser.add_argument("--max-queue", type=int, default=32)
+    parser.add_argument("--burst", type=int, default=100)
+    parser.add_argument("--verbose", action="store_true", help="Hiện log của các node")
+    args = parser.parse_args()
+
+    graph = make_stub_graph(args.llm_latency_ms, args.tool_latency_ms)
+    admission = AdmissionController(max_concurrent=args.max_concurrent, max_queue=args.max_queue, queue_timeout=30)
+    app = create_app(graph_factory=lambda: graph, artifact_path=lambda _: None, admission=admission)
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    server = start_server(app, port)
+
+    stdout = sys.stdout
+    quiet = open(os.devnull, "w") if not args.verbose else None
+    rows = []
+    with contextlib.redirect_stdout(quiet) if quiet else contextlib.nullcontext():
+        for concurrency in args.concurrency:
+            print(f"{YELLOW}[Sustained] {concurrency} client trong {args.duration:.0f}s...{RESET}", file=stdout)
+            rows.append((f"sustained c={concurrency}", *asyncio.run(sustained(base_url, concurrency, args.duration))))
+        print(f"{YELLOW}[Burst] {args.burst} request cùng lúc...{RESET}", file=stdout)
+        burst_results = asyncio.run(burst(base_url, args.burst))
+
+    print(f"\n{YELLOW}KẾT QUẢ (LLM giả lập {args.llm_latency_ms:.0f} ms/lần gọi, 7 lần gọi LLM + 1 tool mỗi request, "
+          f"max_concurrent={args.max_concurrent}, max_queue={args.max_queue}){RESET}")
+    for label, results, elapsed in rows:
+        report(label, results, elapsed)
+    report(f"burst n={args.burst}", burst_results)
+    print(f"Admission: {admission.snapshot()}")
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
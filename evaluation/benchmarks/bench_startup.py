@@ -0,0 +1,94 @@
+import argparse
+import sys
+import os
+import json
+import time
+import subprocess
+import numpy as np
+
+START = time.perf_counter()
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+RESET = '\033[0m'
+
+MODES = {
+    "eager": "Trước: khởi tạo mọi service khi import + reflect schema",
+    "lazy_cold": "Sau: lazy + warm-up nền, chưa có schema snapshot",
+    "lazy_warm": "Sau: lazy + warm-up nền, có schema snapshot",
+}
+
+
+def first_request(kind: str, sql_service, rag_service) -> str:
+    if kind == "rag":
+        return rag_service.search_policy_docs("Chính sách nghỉ phép năm")
+    return sql_service.query_sql_db("SELECT COUNT(*) FROM orders")
+
+
+def child(mode: str, request: str):
+    """Chạy trong tiến trình mới để mỗi lần đo đều là khởi động lạnh (không có module / kết nối sẵn)."""
+    from tools import sql_service, rag_service, lazy_services, warm_up_services
+    import_ms = (time.perf_counter() - START) * 1000
+
+    if mode == "eager":
+        # Mô phỏng hành vi cũ: dựng mọi kết nối tuần tự rồi reflect + query dòng mẫu
+        for service in lazy_services:
+            service.ensure_initialized()
+        sql_service.db.get_table_info()
+    else:
+        if mode == "lazy_cold" and os.path.exists(sql_service.schema_cache.path):
+            os.remove(sql_service.schema_cache.path)
+        warm_up_services()
+        sql_service.get_db_schema()
+    ready_ms = (time.perf_counter() - START) * 1000
+
+    first_request(request, sql_service, rag_service)
+    first_ms = (time.perf_counter() - START) * 1000
+    print(json.dumps({"import_ms": import_ms, "ready_ms": ready_ms, "first_request_ms": first_ms}))
+    # Không chờ thread warm-up / worker sandbox còn lại
+    os._exit(0)
+
+
+def measure(mode: str, request: str) -> dict:
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", mode, "--request", request],
+        capture_output=True, text=True, encoding="utf-8",
+    )
+    lines = [line for line in result.stdout.splitlines() if line.startswith("{")]
+    if result.returncode != 0 or not lines:
+        raise RuntimeError(f"Lỗi khi đo chế độ {mode}:\n{result.stderr[-2000:]}")
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo time-to-first-request: khởi tạo eager vs lazy + schema snapshot.")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--request", choices=["sql", "rag"], default="sql", help="Loại request đầu tiên")
+    parser.add_argument("--child", choices=list(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.request)
+        return
+
+    results = {}
+    for mode, label in MODES.items():
+        print(f"{YELLOW}[{label}] {args.runs} lần...{RESET}")
+        results[mode] = [measure(mode, args.request) for _ in range(args.runs)]
+
+    print(f"\n{YELLOW}KẾT QUẢ (median {args.runs} lần, request đầu tiên: {args.request}){RESET}")
+    print(f"{'Chế độ':<55}{'Import (ms)':>14}{'Sẵn sàng (ms)':>16}{'TTFR (ms)':>12}")
+    baseline = np.median([r["first_request_ms"] for r in results["eager"]])
+    for mode, label in MODES.items():
+        runs = results[mode]
+        import_ms = np.median([r["import_ms"] for r in runs])
+        ready_ms = np.median([r["ready_ms"] for r in runs])
+        first_ms = np.median([r["first_request_ms"] for r in runs])
+        color = GREEN if first_ms < baseline else ""
+        print(f"{label:<55}{import_ms:>14.0f}{ready_ms:>16.0f}{color}{first_ms:>12.0f}{RESET}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import sys
+import os
+import time
+import asyncio
+import tempfile
+import contextlib
+import numpy as np
+from langchain_core.messages import HumanMessage
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from core.tracing import Tracer, JsonlSpanExporter
+from bench_server_load import make_stub_graph
+
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+RESET = '\033[0m'
+
+
+async def run_once(graph, tracer: Tracer, session_id: str) -> float:
+    """Một lượt chạy graph như api/server.py (astream_events + config của tracer), trả về ms."""
+    config = tracer.config_for_run({"configurable": {"thread_id": session_id}}, session_id=session_id)
+    start = time.perf_counter()
+    async for _ in graph.astream_events({"messages": [HumanMessage(content="Doanh thu tháng này?")]},
+                                        config=config, version="v2"):
+        pass
+    return (time.perf_counter() - start) * 1000
+
+
+async def measure(graph, tracers: dict, runs: int) -> dict:
+    """Chạy xen kẽ các cấu hình (vòng tròn) để nhiễu của máy chia đều cho mọi cấu hình."""
+    timings = {label: [] for label in tracers}
+    for i in range(runs):
+        for label, tracer in tracers.items():
+            timings[label].append(await run_once(graph, tracer, f"{label}-{i}"))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Đo chi phí của tracing (span node / tool / LLM) theo tỉ lệ lấy mẫu.")
+    parser.add_argument("--runs", type=int, default=40, help="Số lượt chạy graph cho mỗi cấu hình")
+    parser.add_argument("--llm-latency-ms", type=float, default=50)
+    parser.add_argument("--tool-latency-ms", type=float, default=20)
+    parser.add_argument("--sample-rates", type=float, nargs="+", default=[0.1, 1.0])
+    args = parser.parse_args()
+
+    graph = make_stub_graph(args.llm_latency_ms, args.tool_latency_ms)
+    trace_dir = tempfile.mkdtemp(prefix="traces_")
+    tracers = {"tắt tracing": Tracer(exporters=[], enabled=False)}
+    for rate in args.sample_rates:
+        exporter = JsonlSpanExporter(os.path.join(trace_dir, f"spans_{rate}.jsonl"))
+        tracers[f"lấy mẫu {rate:.0%}"] = Tracer(exporters=[exporter], sample_rate=rate)
+
+    print(f"{YELLOW}Đo {args.runs} lượt / cấu hình (LLM giả lập {args.llm_latency_ms:.0f} ms, "
+          f"tool {args.tool_latency_ms:.0f} ms)...{RESET}")
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        asyncio.run(measure(graph, tracers, 2))
+        timings = asyncio.run(measure(graph, tracers, args.runs))
+    for tracer in tracers.values():
+        tracer.flush()
+
+    baseline = np.median(timings["tắt tracing"])
+    print(f"\n{'Cấu hình':<16} {'p50 ms':>9} {'p95 ms':>9} {'chênh p50':>11} {'trace':>6} {'span':>6}")
+    for label, values in timings.items():
+        tracer = tracers[label]
+        p50, p95 = np.median(values), np.percentile(values, 95)
+        overhead = (p50 - baseline) / baseline * 100
+        color = GREEN if overhead < 1 else YELLOW
+        print(f"{label:<16} {p50:>9.1f} {p95:>9.1f} {color}{overhead:>+10.2f}%{RESET} "
+              f"{tracer.stats['traces_sampled']:>6} {tracer.stats['spans_exported']:>6}")
+    print(f"\nFile span: {trace_dir}  (xem: python -m scripts.trace_summary <file>)")
+
+
+if __name__ == "__main__":
+    main()
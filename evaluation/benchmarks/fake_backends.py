@@ -0,0 +1,338 @@
+"""
+Backend giả lập cho load test / benchmark: chat model, embeddings và Cohere rerank không gọi API thật.
+
+- Latency: độ trễ theo phân phối cấu hình được ("const:50", "uniform:20:80", "normal:50:10", "lognormal:50:0.5").
+- FakeChatModel: trả lời theo kịch bản (Scenario) dựng từ evaluation/ground_truth/*.json - guardrail / router
+  theo nhãn của case, gọi tool theo kế hoạch có sẵn (SQL kỳ vọng, tìm tài liệu, vẽ biểu đồ từ DATA_HANDLE).
+- FakeEmbeddings: vector chuẩn hóa, xác định theo nội dung (cùng câu -> cùng vector).
+- FakeRerankClient: cùng giao diện cohere.Client.rerank, xếp hạng theo độ trùng từ.
+"""
+import os
+import re
+import json
+import time
+import uuid
+import random
+import hashlib
+import numpy as np
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, List, Optional
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+GROUND_TRUTH_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../ground_truth'))
+SUITE_FILES = {
+    "sql": "sql_ground_truth.json",
+    "rag": "rag_ground_truth.json",
+    "chart": "chart_ground_truth.json",
+    "multihop": "multihop.json",
+    "edge": "edge_cases_ground_truth.json",
+}
+DATA_HANDLE_PATTERN = re.compile(r"DATA_HANDLE: (\S+)")
+MARKER_PATTERN = re.compile(r"\[case:([\w-]+)\]")
+TOKEN_PATTERN = re.compile(r"\w+")
+
+CHART_SQL = ("SELECT DATE_TRUNC('month', order_date) AS month, SUM(total_amount) AS revenue "
+             "FROM orders GROUP BY 1 ORDER BY 1")
+CHART_CODE = "import matplotlib.pyplot as plt\nplt.plot(df['month'], df['revenue'])\nplt.title('Doanh thu theo tháng')"
+
+
+class Latency:
+    """Độ trễ (ms) lấy mẫu theo phân phối; spec dạng "tên:tham_số[:tham_số]"."""
+
+    def __init__(self, spec: str = "const:0"):
+        name, *params = spec.split(":")
+        params = [float(p) for p in params]
+        if name == "const":
+            self._sample = lambda: params[0]
+        elif name == "uniform":
+            self._sample = lambda: random.uniform(params[0], params[1])
+        elif name == "normal":
+            self._sample = lambda: max(0.0, random.gauss(params[0], params[1]))
+        elif name == "lognormal":
+            # params[0] = trung vị (ms), params[1] = sigma -> đuôi dài như latency API thật
+            self._sample = lambda: params[0] * float(np.exp(random.gauss(0.0, params[1])))
+        else:
+            raise ValueError(f"Phân phối latency không hỗ trợ: {name} (const / uniform / normal / lognormal)")
+        self.spec = spec
+
+    def sample_ms(self) -> float:
+        return self._sample()
+
+    def sleep(self):
+        delay = self._sample()
+        if delay > 0:
+            time.sleep(delay / 1000)
+
+
+@dataclass
+class Scenario:
+    """Một câu hỏi mẫu và cách LLM giả lập xử lý nó."""
+    case_id: str
+    suite: str
+    question: str
+    tool_calls: list = field(default_factory=list)  # [(tên tool, args)], args có thể chứa "{data_handle}"
+    is_safe: bool = True
+    is_out_of_scope: bool = False
+    answer: str = "Đây là câu trả lời giả lập."
+
+    def reply(self) -> str:
+        # Gắn mã case (ở cuối, không phá định dạng gạch đầu dòng) để các lượt gọi sau (sau query_transform)
+        # vẫn nhận ra kịch bản
+        return f"{self.answer} [case:{self.case_id}]" if self.case_id else self.answer
+
+
+def _chart_call(chart_tool: str) -> tuple:
+    if chart_tool == "render_chart":
+        return ("render_chart", {"chart_type": "line", "x": "month", "y": "revenue",
+                                 "data_handle": "{data_handle}", "title": "Doanh thu theo tháng"})
+    return ("python_chart_maker", {"code": CHART_CODE, "data_handle": "{data_handle}"})
+
+
+def _plan_for(case: dict, suite: str, chart_tool: str) -> list:
+    if suite == "sql":
+        return [("query_sql_db", {"query": case.get("expected_sql") or "SELECT COUNT(*) FROM orders"})]
+    if suite == "rag":
+        return [("search_policy_docs", {"query": case["question"]})]
+    if suite == "chart":
+        return [("query_sql_db", {"query": CHART_SQL}), _chart_call(chart_tool)]
+    if suite == "multihop":
+        plan = []
+        expected = case.get("expected_tool") or []
+        for tool in [expected] if isinstance(expected, str) else expected:
+            if tool == "query_sql_db":
+                plan.append(("query_sql_db", {"query": CHART_SQL}))
+            elif tool == "search_policy_docs":
+                plan.append(("search_policy_docs", {"query": case["question"]}))
+            elif tool in ("python_chart_maker", "render_chart"):
+                plan.append(_chart_call(chart_tool))
+        return plan
+    return []
+
+
+def load_scenarios(suites: list = tuple(SUITE_FILES), chart_tool: str = "render_chart") -> list:
+    """Dựng kịch bản từ các file ground truth (edge case: guardrail / router theo expected_behavior)."""
+    scenarios = []
+    for suite in suites:
+        with open(os.path.join(GROUND_TRUTH_DIR, SUITE_FILES[suite]), encoding="utf-8") as f:
+            cases = json.load(f)
+        for case in cases:
+            expected = case.get("expected_behavior", "")
+            scenarios.append(Scenario(
+                case_id=case["id"],
+                suite=suite,
+                question=case["question"],
+                tool_calls=_plan_for(case, suite, chart_tool),
+                is_safe=expected != "is_safe=False",
+                is_out_of_scope=expected == "is_out_of_scope=True",
+                answer=case.get("ground_truth") or "Đây là câu trả lời giả lập dựa trên dữ liệu hệ thống.",
+            ))
+    return scenarios
+
+
+class ScenarioBook:
+    """Tra kịch bản từ nội dung prompt: theo mã [case:...] hoặc theo câu hỏi gốc nằm trong prompt."""
+
+    def __init__(self, scenarios: list, default: Scenario = None):
+        self.by_id = {s.case_id: s for s in scenarios}
+        self.scenarios = scenarios
+        self.default = default or Scenario(case_id="", suite="default", question="")
+
+    def find(self, texts: list) -> Scenario:
+        for text in reversed(texts):
+            marker = MARKER_PATTERN.search(text)
+            if marker and marker.group(1) in self.by_id:
+                return self.by_id[marker.group(1)]
+            for scenario in self.scenarios:
+                if scenario.question and scenario.question in text:
+                    return scenario
+        return self.default
+
+
+def _texts(prompt) -> list:
+    if isinstance(prompt, str):
+        return [prompt]
+    if hasattr(prompt, "to_messages"):
+        prompt = prompt.to_messages()
+    return [m.content if isinstance(m.content, str) else str(m.content) for m in prompt]
+
+
+def _approx_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model giả lập: trễ theo `latency`, stream từng từ, gọi tool theo kế hoạch của kịch bản
+    (mỗi bước một tool call, args "{data_handle}" lấy từ ToolMessage gần nhất), rồi trả lời.
+    Có usage_metadata ước lượng để tracing đếm được token.
+
+    Mô phỏng model rẻ cho benchmark cascade: `low_confidence_rate` / `invalid_output_rate` là tỉ lệ structured
+    output có confidence thấp / không hợp lệ, `sql_error_rate` là tỉ lệ lần gọi query_sql_db đầu tiên của lượt
+    sinh SQL sai (tool trả lỗi, agent phải thử lại). Structured output có trường `steps` (ToolPlan) được dựng
+    từ tool_calls của kịch bản.
+    """
+
+    latency: str = "const:50"
+    book: Any = None
+    tool_names: List[str] = []
+    confidence: float = 0.95
+    low_confidence_rate: float = 0.0
+    invalid_output_rate: float = 0.0
+    sql_error_rate: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _scenario(self, texts: list) -> Scenario:
+        return (self.book or ScenarioBook([])).find(texts)
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"tool_names": [tool.name for tool in tools]})
+
+    def with_structured_output(self, schema, **kwargs):
+        def _respond(prompt):
+            Latency(self.latency).sleep()
+            scenario = self._scenario(_texts(prompt))
+            confidence = 0.4 if random.random() < self.low_confidence_rate else self.confidence
+            payload = {
+                "is_safe": scenario.is_safe,
+                "is_out_of_scope": scenario.is_out_of_scope,
+                "reasoning": f"Kịch bản giả lập ({scenario.suite})",
+                "action": "proceed" if scenario.is_safe else "refuse",
+                "confidence": confidence,
+            }
+            if "steps" in schema.model_fields:
+                payload["steps"] = self._plan_steps(scenario, replan="[LỖI]" in " ".join(_texts(prompt)))
+            if random.random() < self.invalid_output_rate:
+                payload.pop("reasoning")
+            return schema.model_validate(payload)
+        return RunnableLambda(_respond)
+
+    def _plan_steps(self, scenario: Scenario, replan: bool) -> list:
+        """
+        Kế hoạch (AGENT_MODE=plan) dựng từ tool_calls của kịch bản: các bước độc lập, riêng bước vẽ biểu đồ
+        phụ thuộc query_sql_db liền trước ("{data_handle}" -> "{sK.data_handle}").
+        Lần lập kế hoạch đầu có thể sinh SQL sai theo `sql_error_rate`.
+        """
+        steps, last_sql = [], None
+        for i, (name, args) in enumerate(scenario.tool_calls, start=1):
+            step_id = f"s{i}"
+            depends_on = [last_sql] if last_sql and "{data_handle}" in json.dumps(args) else []
+            handle = f"{{{last_sql}.data_handle}}" if depends_on else ""
+            args = {key: value.replace("{data_handle}", handle) if isinstance(value, str) else value
+                    for key, value in args.items()}
+            if name == "query_sql_db":
+                last_sql = step_id
+                if not replan and random.random() < self.sql_error_rate:
+                    args = {**args, "query": re.sub(r"(?i)\bselect\b", "SELEC", args.get("query", ""), count=1)}
+            steps.append({"id": step_id, "tool": name, "args_json": json.dumps(args, ensure_ascii=False),
+                          "depends_on": depends_on})
+        return steps
+
+    def _next_tool_call(self, messages: List[BaseMessage], scenario: Scenario) -> Optional[dict]:
+        if not self.tool_names:
+            return None
+        turn = []
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                break
+            turn.append(message)
+        # Bước đã xong = số tool trả kết quả không lỗi (tool lỗi -> gọi lại đúng bước đó)
+        failed = [m for m in turn if isinstance(m, ToolMessage) and str(m.content).startswith(("Lỗi", "Error"))]
+        step = sum(1 for m in turn if isinstance(m, ToolMessage)) - len(failed)
+        plan = [call for call in scenario.tool_calls if call[0] in self.tool_names]
+        if step >= len(plan):
+            return None
+        name, args = plan[step]
+        handles = [h for m in turn if isinstance(m, ToolMessage) for h in DATA_HANDLE_PATTERN.findall(str(m.content))]
+        handle = handles[0] if handles else ""
+        args = {key: value.replace("{data_handle}", handle) if isinstance(value, str) else value
+                for key, value in args.items()}
+        if name == "query_sql_db" and not failed and random.random() < self.sql_error_rate:
+            args = {**args, "query": re.sub(r"(?i)\bselect\b", "SELEC", args.get("query", ""), count=1)}
+        return {"name": name, "args": args, "id": f"call_{uuid.uuid4().hex[:8]}"}
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        texts = _texts(messages)
+        scenario = self._scenario(texts)
+        call = self._next_tool_call(messages, scenario)
+        content = "" if call else scenario.reply()
+        usage = {"input_tokens": sum(_approx_tokens(t) for t in texts), "output_tokens": _approx_tokens(content or "x")}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        return AIMessage(content=content, tool_calls=[call] if call else [], usage_metadata=usage)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        Latency(self.latency).sleep()
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any):
+        Latency(self.latency).sleep()
+        reply = self._reply(messages)
+        if reply.tool_calls:
+            yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=reply.usage_metadata, tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"], ensure_ascii=False), "id": call["id"], "index": 0}
+                for call in reply.tool_calls
+            ]))
+            return
+        words = reply.content.split(" ")
+        for i, word in enumerate(words):
+            last = i == len(words) - 1
+            chunk = ChatGenerationChunk(message=AIMessageChunk(
+                content=word if last else word + " ", usage_metadata=reply.usage_metadata if last else None))
+            if run_manager:
+                run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+
+
+class FakeEmbeddings(Embeddings):
+    """Embedding giả lập: vector đơn vị sinh từ hash của văn bản; một lần trễ cho mỗi request (như gọi API theo batch)."""
+
+    def __init__(self, dimensions: int = 1536, latency: str = "const:30"):
+        self.dimensions = dimensions
+        self.latency = Latency(latency)
+        self.calls = 0
+
+    def _vector(self, text: str) -> list:
+        seed = int.from_bytes(hashlib.md5(text.encode("utf-8")).digest()[:8], "little")
+        vector = np.random.default_rng(seed).standard_normal(self.dimensions).astype(np.float32)
+        return (vector / np.linalg.norm(vector)).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.calls += 1
+        self.latency.sleep()
+        return [self._vector(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        self.latency.sleep()
+        return self._vector(text)
+
+
+class FakeRerankClient:
+    """Thay cho cohere.Client: rerank() trả về đối tượng có .results[i].index / .relevance_score."""
+
+    def __init__(self, latency: str = "const:80"):
+        self.latency = Latency(latency)
+        self.calls = 0
+
+    def rerank(self, query: str, documents: list, top_n: int = None, model: str = None, **kwargs):
+        self.calls += 1
+        self.latency.sleep()
+        query_tokens = set(TOKEN_PATTERN.findall(query.lower()))
+        scores = []
+        for i, doc in enumerate(documents):
+            text = doc if isinstance(doc, str) else doc.get("text", "")
+            doc_tokens = set(TOKEN_PATTERN.findall(text.lower()))
+            union = query_tokens | doc_tokens
+            scores.append((len(query_tokens & doc_tokens) / len(union) if union else 0.0, i))
+        scores.sort(reverse=True)
+        results = [SimpleNamespace(index=i, relevance_score=score) for score, i in scores[:top_n or len(scores)]]
+        return SimpleNamespace(results=results)
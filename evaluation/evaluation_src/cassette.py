@@ -0,0 +1,202 @@
+"""
+Cassette ghi / phát lại các lời gọi model (OpenAI chat + embeddings, Cohere rerank) cho eval và test.
+
+Chặn ở tầng transport của httpx (SDK openai và cohere đều gửi request qua httpx), nên mọi lời gọi đi
+ra các host model đều được ghi lại - kể cả response stream (SSE, tool call) và lời gọi của RAGAS.
+Request khác (Postgres, API nội bộ...) đi thẳng như bình thường.
+
+Chế độ:
+- record:         luôn gọi API thật, ghi đè cassette.
+- replay:         chỉ phát lại, không ra mạng; request chưa ghi -> HTTP 400 (SDK báo lỗi ngay, không retry).
+- record_missing: phát lại nếu đã có, gọi API thật và ghi thêm nếu chưa có.
+
+Dùng:
+    with Cassette("sql", mode="replay"):
+        agent_app.invoke(...)
+"""
+import os
+import re
+import json
+import base64
+import hashlib
+import threading
+from urllib.parse import urlsplit, parse_qsl, urlencode
+import httpx
+
+CASSETTE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../cassettes'))
+MODES = ("off", "record", "replay", "record_missing")
+MODEL_HOSTS = ("api.openai.com", "api.cohere.com", "api.cohere.ai")
+# Nội dung thay đổi theo ngày chạy (VD: "Hôm nay là 19/10/2026" trong prompt query_transform)
+DEFAULT_SCRUBBERS = ((re.compile(r"\b\d{1,2}/\d{1,2}/\d{4}\b"), "<date>"),
+                     (re.compile(r"\b\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\S*"), "<timestamp>"))
+# Header của response cần giữ; body đã được httpx giải nén nên bỏ content-encoding / content-length
+KEPT_HEADERS = ("content-type", "x-request-id", "openai-processing-ms")
+
+
+class Cassette:
+    """Một cassette = một file JSONL, mỗi dòng là một cặp (fingerprint request -> response)."""
+
+    _active = None
+    _install_lock = threading.Lock()
+
+    def __init__(self, name: str, mode: str = "replay", cassette_dir: str = CASSETTE_DIR,
+                 hosts: tuple = MODEL_HOSTS, scrubbers: tuple = DEFAULT_SCRUBBERS):
+        if mode not in MODES:
+            raise ValueError(f"Chế độ cassette không hợp lệ: {mode} ({' / '.join(MODES)})")
+        self.name = name
+        self.mode = mode
+        self.path = os.path.join(cassette_dir, f"{name}.jsonl")
+        self.hosts = hosts
+        self.scrubbers = scrubbers
+        self.stats = {"replayed": 0, "recorded": 0, "missed": 0, "passthrough": 0}
+        self._interactions = {}
+        self._cursor = {}
+        self._lock = threading.Lock()
+        self._originals = None
+
+    # --- fingerprint ---
+    def _scrub(self, text: str) -> str:
+        for pattern, replacement in self.scrubbers:
+            text = pattern.sub(replacement, text)
+        return text
+
+    def fingerprint(self, request: httpx.Request) -> str:
+        """Hash của method + host/path + query đã sắp xếp + body JSON chuẩn hóa (không gồm header / API key)."""
+        url = urlsplit(str(request.url))
+        query = urlencode(sorted(parse_qsl(url.query)))
+        body = request.content or b""
+        try:
+            body = json.dumps(json.loads(body), sort_keys=True, ensure_ascii=False)
+        except ValueError:
+            body = body.decode("utf-8", errors="replace")
+        key = f"{request.method} {url.netloc}{url.path}?{query}\n{self._scrub(body)}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    # --- lưu trữ ---
+    def load(self):
+        self._interactions, self._cursor = {}, {}
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self._interactions.setdefault(record["fingerprint"], []).append(record["response"])
+
+    def _append(self, fingerprint: str, request: httpx.Request, response: dict):
+        record = {"fingerprint": fingerprint,
+                  "request": {"method": request.method, "url": str(request.url).split("?")[0]},
+                  "response": response}
+        with self._lock:
+            self._interactions.setdefault(fingerprint, []).append(response)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.stats["recorded"] += 1
+
+    def _next(self, fingerprint: str):
+        """Request giống hệt nhau được phát lại theo thứ tự đã ghi (hết thì lặp lại response cuối)."""
+        with self._lock:
+            responses = self._interactions.get(fingerprint)
+            if not responses:
+                return None
+            index = self._cursor.get(fingerprint, 0)
+            self._cursor[fingerprint] = index + 1
+            return responses[min(index, len(responses) - 1)]
+
+    # --- chuyển đổi response ---
+    @staticmethod
+    def _serialize(response: httpx.Response) -> dict:
+        content = response.content
+        try:
+            body = {"text": content.decode("utf-8")}
+        except UnicodeDecodeError:
+            body = {"base64": base64.b64encode(content).decode("ascii")}
+        headers = {k: v for k, v in response.headers.items() if k.lower() in KEPT_HEADERS}
+        return {"status": response.status_code, "headers": headers, **body}
+
+    @staticmethod
+    def _build(request: httpx.Request, recorded: dict) -> httpx.Response:
+        content = recorded["text"].encode("utf-8") if "text" in recorded else base64.b64decode(recorded["base64"])
+        return httpx.Response(recorded["status"], headers=recorded["headers"], content=content, request=request)
+
+    def _miss(self, request: httpx.Request) -> httpx.Response:
+        self.stats["missed"] += 1
+        message = f"Cassette '{self.name}' không có request {request.method} {request.url.path} (chế độ replay)."
+        return httpx.Response(400, headers={"x-should-retry": "false"}, request=request,
+                              json={"error": {"message": message, "type": "cassette_miss"}})
+
+    def _intercepts(self, request: httpx.Request) -> bool:
+        return request.url.host in self.hosts
+
+    # --- transport ---
+    def _lookup(self, request: httpx.Request):
+        fingerprint = self.fingerprint(request)
+        if self.mode in ("replay", "record_missing"):
+            recorded = self._next(fingerprint)
+            if recorded is not None:
+                self.stats["replayed"] += 1
+                return fingerprint, self._build(request, recorded)
+            if self.mode == "replay":
+                return fingerprint, self._miss(request)
+        return fingerprint, None
+
+    def _handle(self, transport, request: httpx.Request) -> httpx.Response:
+        if not self._intercepts(request):
+            self.stats["passthrough"] += 1
+            return self._originals[0](transport, request)
+        fingerprint, response = self._lookup(request)
+        if response is not None:
+            return response
+        live = self._originals[0](transport, request)
+        live.read()
+        recorded = self._serialize(live)
+        self._append(fingerprint, request, recorded)
+        return self._build(request, recorded)
+
+    async def _handle_async(self, transport, request: httpx.Request) -> httpx.Response:
+        if not self._intercepts(request):
+            self.stats["passthrough"] += 1
+            return await self._originals[1](transport, request)
+        fingerprint, response = self._lookup(request)
+        if response is not None:
+            return response
+        live = await self._originals[1](transport, request)
+        await live.aread()
+        recorded = self._serialize(live)
+        self._append(fingerprint, request, recorded)
+        return self._build(request, recorded)
+
+    # --- context manager ---
+    def __enter__(self):
+        if self.mode == "off":
+            return self
+        with Cassette._install_lock:
+            if Cassette._active is not None:
+                raise RuntimeError(f"Cassette '{Cassette._active.name}' đang hoạt động, không lồng cassette.")
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            if self.mode == "record" and os.path.exists(self.path):
+                os.remove(self.path)
+            self.load()
+            self._originals = (httpx.HTTPTransport.handle_request, httpx.AsyncHTTPTransport.handle_async_request)
+            cassette = self
+
+            def handle_request(transport, request):
+                return cassette._handle(transport, request)
+
+            async def handle_async_request(transport, request):
+                return await cassette._handle_async(transport, request)
+
+            httpx.HTTPTransport.handle_request = handle_request
+            httpx.AsyncHTTPTransport.handle_async_request = handle_async_request
+            Cassette._active = self
+        return self
+
+    def __exit__(self, *exc):
+        if self._originals is None:
+            return False
+        with Cassette._install_lock:
+            httpx.HTTPTransport.handle_request, httpx.AsyncHTTPTransport.handle_async_request = self._originals
+            self._originals = None
+            Cassette._active = None
+        print(f"[Cassette] {self.name} ({self.mode}): {self.stats}")
+        return False
@@ -1,123 +1,75 @@
-import json
-import uuid
 import sys
 import os
-import csv
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from langchain_core.messages import HumanMessage, AIMessage
-from app import init_agent_app
+from langchain_core.messages import AIMessage
+from eval_runner import EvalRunner, EvalSuite, REPORT_DIR, build_arg_parser
 
-GREEN = '\033[92m'
-RED = '\033[91m'
-YELLOW = '\033[93m'
-RESET = '\033[0m'
+def expected_tools_of(case):
+    expected_tools = case["expected_tool"]
+    if isinstance(expected_tools, str):
+        expected_tools = [expected_tools]
+    return expected_tools
 
-def load_ground_truth(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+def case_row(case):
+    return {
+        "ID": case["id"],
+        "Complexity": case.get("complexity", "expert"),
+        "Question": case["question"],
+        "Expected_Tools": " -> ".join(expected_tools_of(case)),
+        "Actual_Tools_Called": "NONE",
+        "Retry_Count": 0,
+    }
 
-def run_eval_pipeline():
-    print(f"{YELLOW}Đang khởi tạo Insight Agent App...{RESET}")
-    agent_app = init_agent_app()
-    
-    base_dir = os.path.dirname(__file__)
-    data_path = os.path.join(base_dir, '../ground_truth/multihop.json')
-    report_dir = os.path.join(base_dir, '../reports')
-    
-    os.makedirs(report_dir, exist_ok=True)
-    report_file = os.path.join(report_dir, 'multihop_report.csv')
-    
-    test_cases = load_ground_truth(data_path)
-    total_cases = len(test_cases)
-    passed_cases = 0
-    report_data = []
+def score_case(case, result_state):
+    """Agent phải gọi đủ chuỗi tool kỳ vọng; câu hỏi có bẫy lỗi phải có ít nhất một lần tự sửa (retry)."""
+    expected_tools = expected_tools_of(case)
+    messages = result_state.get("messages", [])
+    retry_count = result_state.get("retry_count", 0)
+    final_message = messages[-1].content if messages else ""
 
-    print(f"\n{YELLOW}BẮT ĐẦU ĐÁNH GIÁ MULTI-HOP (TƯ DUY ĐA BƯỚC)...{RESET}\n")
+    tools_called_in_order = []
+    for msg in messages:
+        if isinstance(msg, AIMessage) and msg.tool_calls:
+            for tc in msg.tool_calls:
+                tools_called_in_order.append(tc['name'])
 
-    for idx, case in enumerate(test_cases, 1):
-        case_id = case.get("id", f"multihop_{idx}")
-        question = case["question"]
-        expected_tools = case["expected_tool"]
-        
-        if isinstance(expected_tools, str):
-            expected_tools = [expected_tools]
-            
-        complexity = case.get("complexity", "expert")
-        
-        print(f"[{idx}/{total_cases}] Chạy Test: {case_id}")
-        
-        config = {"configurable": {"thread_id": str(uuid.uuid4())}}
-        initial_state = {"messages": [HumanMessage(content=question)]}
-        
-        eval_status = "FAIL"
-        eval_reason = ""
-        tools_called_in_order = []
-        retry_count = 0
-        final_message = ""
-        
-        try:
-            result_state = agent_app.invoke(initial_state, config=config)
-            messages = result_state.get("messages", [])
-            retry_count = result_state.get("retry_count", 0)
-            
-            if messages:
-                final_message = messages[-1].content
-            
-            for msg in messages:
-                if isinstance(msg, AIMessage) and msg.tool_calls:
-                    for tc in msg.tool_calls:
-                        tools_called_in_order.append(tc['name'])
-            
-            missing_tools = [t for t in expected_tools if t not in tools_called_in_order]
-            
-            if not missing_tools:
-                eval_status = "PASS"
-                passed_cases += 1
-                eval_reason = f"Đã gọi đủ chuỗi Tools. Retry: {retry_count} lần."
-            else:
-                eval_reason = f"Thiếu tư duy gọi tool: {missing_tools}. Đã gọi: {tools_called_in_order}."
-                
-            if "lỗi" in case.get("evaluation_criteria", "").lower() and retry_count == 0:
-                eval_status = "FAIL"
-                eval_reason = "Không phát hiện thấy quá trình tự sửa lỗi (Retry = 0) dù câu hỏi có bẫy."
-                if eval_status == "PASS": 
-                    passed_cases -= 1
+    missing_tools = [t for t in expected_tools if t not in tools_called_in_order]
 
-        except Exception as e:
-            eval_reason = f"Lỗi System/LangGraph: {str(e)}"
-            eval_status = "ERROR"
+    if not missing_tools:
+        eval_status = "PASS"
+        eval_reason = f"Đã gọi đủ chuỗi Tools. Retry: {retry_count} lần."
+    else:
+        eval_status = "FAIL"
+        eval_reason = f"Thiếu tư duy gọi tool: {missing_tools}. Đã gọi: {tools_called_in_order}."
 
-        if eval_status == "PASS":
-            print(f"{GREEN}PASS{RESET} (Tools called: {tools_called_in_order} | Retries: {retry_count})")
-        else:
-            print(f"{RED}{eval_status}{RESET} - Lý do: {eval_reason}")
+    if "lỗi" in case.get("evaluation_criteria", "").lower() and retry_count == 0:
+        eval_status = "FAIL"
+        eval_reason = "Không phát hiện thấy quá trình tự sửa lỗi (Retry = 0) dù câu hỏi có bẫy."
 
-        report_data.append({
-            "ID": case_id,
-            "Complexity": complexity,
-            "Question": question,
-            "Expected_Tools": " -> ".join(expected_tools),
-            "Actual_Tools_Called": " -> ".join(tools_called_in_order) if tools_called_in_order else "NONE",
-            "Retry_Count": retry_count,
-            "Status": eval_status,
-            "Reason": eval_reason,
-            "Final_Answer": final_message.replace('\n', ' ')
-        })
+    return {
+        "Actual_Tools_Called": " -> ".join(tools_called_in_order) if tools_called_in_order else "NONE",
+        "Retry_Count": retry_count,
+        "Status": eval_status,
+        "Reason": eval_reason,
+        "Final_Answer": final_message.replace('\n', ' ')
+    }
 
-    print(f"\n{YELLOW}Đang lưu báo cáo Multi-hop ra file CSV...{RESET}")
-    headers = ["ID", "Complexity", "Question", "Expected_Tools", "Actual_Tools_Called", "Retry_Count", "Status", "Reason", "Final_Answer"]
-    
-    with open(report_file, 'w', encoding='utf-8-sig', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        writer.writeheader()
-        writer.writerows(report_data)
+SUITE = EvalSuite(
+    name="multihop",
+    ground_truth="multihop.json",
+    report_file=os.path.join(REPORT_DIR, 'multihop_report.csv'),
+    headers=["ID", "Complexity", "Question", "Expected_Tools", "Actual_Tools_Called", "Retry_Count", "Status", "Reason", "Final_Answer"],
+    case_row=case_row,
+    score=score_case,
+    pass_threshold=60,
+)
 
-    accuracy = (passed_cases / total_cases) * 100
-    print(f"\n{YELLOW}TỔNG KẾT MULTI-HOP (TOOL CHAINING):{RESET}")
-    print(f"File Report đã lưu tại: {report_file}")
-    print(f"Độ chính xác: {GREEN if accuracy >= 60 else RED}{accuracy:.2f}%{RESET}\n")
+def run_eval_pipeline(runner: EvalRunner = None):
+    runner = runner or EvalRunner()
+    return runner.run(SUITE)
 
 if __name__ == "__main__":
-    run_eval_pipeline()
\ No newline at end of file
+    args = build_arg_parser("Đánh giá Multi-hop (tư duy đa bước / tool chaining).").parse_args()
+    run_eval_pipeline(EvalRunner.from_args(args))
\ No newline at end of file
@@ -1,15 +1,12 @@
-import json
-import uuid
 import sys
 import os
 import pandas as pd
-from config.settings import settings
 
-sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from langchain_core.messages import HumanMessage, ToolMessage
+from config.settings import settings
+from langchain_core.messages import ToolMessage
 from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from app import init_agent_app
 from datasets import Dataset
 from ragas import evaluate
 from ragas.metrics import (
@@ -18,130 +15,106 @@ from ragas.metrics import (
     context_precision,
     context_recall
 )
+from eval_runner import EvalRunner, EvalSuite, REPORT_DIR, build_arg_parser
+from perf_metrics import PERF_COLUMNS
 
-GREEN = '\033[92m'
 RED = '\033[91m'
 YELLOW = '\033[93m'
 RESET = '\033[0m'
 
-def load_json(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
-
-def run_eval_pipeline():
-    USE_CACHE = True 
-
-    base_dir = os.path.dirname(__file__)
-    data_path = os.path.join(base_dir, '../ground_truth/rag_ground_truth.json')
-    report_dir = os.path.join(base_dir, '../reports')
-    os.makedirs(report_dir, exist_ok=True)
-    
-    report_file = os.path.join(report_dir, 'rag_report_ragas.csv')
-    
-    intermediate_file = os.path.join(report_dir, 'ragas_intermediate_cache.json')
-    
-    ragas_data = {
-        "question": [], "answer": [], "contexts": [], "ground_truth": []
+def case_row(case):
+    return {
+        "ID": case["id"],
+        "Complexity": case.get("complexity", ""),
+        "Question": case["question"],
+        "Ground_Truth": case["ground_truth"],
     }
-    meta_data = []
-
-    if USE_CACHE and os.path.exists(intermediate_file):
-        print(f"\n{YELLOW}ĐANG SỬ DỤNG DỮ LIỆU CACHE TRUNG GIAN (BỎ QUA BƯỚC 1)...{RESET}")
-        cached_data = load_json(intermediate_file)
-        ragas_data = cached_data["ragas_data"]
-        meta_data = cached_data["meta_data"]
-        print(f"Đã load {len(ragas_data['question'])} record từ file cache.")
-    
-    else:
-        print(f"{YELLOW}Đang khởi tạo Insight Agent App...{RESET}")
-        agent_app = init_agent_app()
-        test_cases = load_json(data_path)
-        total_cases = len(test_cases)
-
-        print(f"\n{YELLOW}BƯỚC 1/2: CHẠY AGENT ĐỂ THU THẬP TRACES (RAG)...{RESET}\n")
-
-        for idx, case in enumerate(test_cases, 1):
-            case_id = case.get("id", f"rag_{idx}")
-            question = case["question"]
-            expected_tool = case.get("expected_tool", "search_policy_docs")
-            ground_truth = case["ground_truth"]
-            
-            print(f"[{idx}/{total_cases}] Đang chạy Agent: {case_id}")
-            
-            config = {"configurable": {"thread_id": str(uuid.uuid4())}}
-            initial_state = {"messages": [HumanMessage(content=question)]}
-            
-            agent_answer = "ERROR"
-            retrieved_contexts = []
-            
-            try:
-                result_state = agent_app.invoke(initial_state, config=config)
-                messages = result_state.get("messages", [])
-                
-                if len(messages) >= 2:
-                    agent_answer = messages[-2].content
-                elif messages:
-                    agent_answer = messages[-1].content
-                agent_answer = agent_answer.strip().strip('"').strip("'")
-                
-                for msg in messages:
-                    if isinstance(msg, ToolMessage) and msg.name == expected_tool:
-                        retrieved_contexts.append(msg.content)
-                
-                if not retrieved_contexts:
-                    retrieved_contexts = ["Không có ngữ cảnh nào được truy xuất."]
-
-            except Exception as e:
-                agent_answer = f"Lỗi System: {str(e)}"
-                retrieved_contexts = ["ERROR"]
-                print(f"   {RED}Lỗi chạy Agent: {e}{RESET}")
-
-            ragas_data["question"].append(question)
-            ragas_data["answer"].append(agent_answer)
-            ragas_data["contexts"].append(retrieved_contexts) 
-            ragas_data["ground_truth"].append(ground_truth)
-            meta_data.append({"ID": case_id, "Complexity": case.get("complexity", "")})
-
-        print(f"\n{YELLOW}Đang lưu dữ liệu trung gian ra file JSON...{RESET}")
-        with open(intermediate_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                "ragas_data": ragas_data,
-                "meta_data": meta_data
-            }, f, ensure_ascii=False, indent=4)
-        print(f"Đã lưu cache tại: {intermediate_file}")
-
-
-    print(f"\n{YELLOW}BƯỚC 2/2: KHỞI ĐỘNG RAGAS LLM-AS-A-JUDGE...{RESET}")
-    
+
+def collect_trace(case, result_state):
+    """Bước 1: lấy câu trả lời và ngữ cảnh tool RAG trả về (chưa chấm, RAGAS chấm ở bước 2)."""
+    expected_tool = case.get("expected_tool", "search_policy_docs")
+    messages = result_state.get("messages", [])
+
+    agent_answer = "ERROR"
+    if len(messages) >= 2:
+        agent_answer = messages[-2].content
+    elif messages:
+        agent_answer = messages[-1].content
+    agent_answer = agent_answer.strip().strip('"').strip("'")
+
+    retrieved_contexts = [msg.content for msg in messages
+                          if isinstance(msg, ToolMessage) and msg.name == expected_tool]
+    if not retrieved_contexts:
+        retrieved_contexts = ["Không có ngữ cảnh nào được truy xuất."]
+
+    return {"Answer": agent_answer, "Contexts": retrieved_contexts, "Status": "OK"}
+
+mode_suffix = "" if settings.RAG_RETRIEVER == "pgvector" else f"_{settings.RAG_RETRIEVER}"
+if settings.RAG_COMPRESSION_ENABLED:
+    mode_suffix += "_compressed"
+if not settings.DEDUP_ENABLED:
+    # So sánh chất lượng truy xuất với kho được ingest không qua dedup (DEDUP_ENABLED=false)
+    mode_suffix += "_nodedup"
+
+# Mỗi cấu hình truy xuất có checkpoint riêng: câu trả lời của cấu hình này không bị dùng lại cho cấu hình khác
+SUITE = EvalSuite(
+    name=f"rag{mode_suffix}",
+    ground_truth="rag_ground_truth.json",
+    headers=["ID", "Complexity", "Question", "Ground_Truth", "Answer", "Contexts", "Status"],
+    case_row=case_row,
+    score=collect_trace,
+)
+
+def run_eval_pipeline(runner: EvalRunner = None):
+    report_file = os.path.join(REPORT_DIR, f'rag_report_ragas{mode_suffix}.csv')
+    runner = runner or EvalRunner()
+
+    print(f"\n{YELLOW}BƯỚC 1/2: CHẠY AGENT ĐỂ THU THẬP TRACES (RAG)...{RESET}")
+    rows = runner.run(SUITE)
+    rows = [row for row in rows if row["Status"] == "OK"]
+    if not rows:
+        print(f"\n{RED}Không có case nào chạy thành công, bỏ qua bước chấm điểm.{RESET}")
+        return
+
+    print(f"\n{YELLOW}BƯỚC 2/2: KHỞI ĐỘNG RAGAS LLM-AS-A-JUDGE ({len(rows)} case)...{RESET}")
+
     try:
-        dataset = Dataset.from_dict(ragas_data)
+        dataset = Dataset.from_dict({
+            "question": [row["Question"] for row in rows],
+            "answer": [row["Answer"] for row in rows],
+            "contexts": [row["Contexts"] for row in rows],
+            "ground_truth": [row["Ground_Truth"] for row in rows],
+        })
         metrics = [
             faithfulness,
             answer_relevancy,
             context_precision,
             context_recall
         ]
-        
+
         evaluator_llm = ChatOpenAI(model=settings.LLM_MODEL, temperature=settings.LLM_TEMPERATURE)
         evaluator_embeddings = OpenAIEmbeddings(model=settings.EMBEDDING_MODEL)
-        
-        result = evaluate(
-            dataset, 
-            metrics=metrics,
-            llm=evaluator_llm,               
-            embeddings=evaluator_embeddings  
-        )
+
+        with runner.cassette(f"{SUITE.name}_ragas"):
+            result = evaluate(
+                dataset,
+                metrics=metrics,
+                llm=evaluator_llm,
+                embeddings=evaluator_embeddings
+            )
         df_result = result.to_pandas()
-        
-        df_meta = pd.DataFrame(meta_data)
+
+        df_meta = pd.DataFrame([{"ID": row["ID"], "Complexity": row["Complexity"],
+                                 **{column: row.get(column, "") for column in PERF_COLUMNS}} for row in rows])
         df_final = pd.concat([df_meta, df_result], axis=1)
-        
+
         df_final.to_csv(report_file, index=False, encoding='utf-8-sig')
 
-        print(f"\n{YELLOW}TỔNG KẾT RAGAS XONG{RESET}")
+        print(f"\n{YELLOW}TỔNG KẾT RAGAS XONG: {report_file}{RESET}")
 
     except Exception as e:
         print(f"\n{RED}BƯỚC 2 GẶP LỖI: {str(e)}{RESET}")
 
 if __name__ == "__main__":
-    run_eval_pipeline()
\ No newline at end of file
+    args = build_arg_parser("Đánh giá RAG bằng RAGAS (thu thập trace song song, có checkpoint).").parse_args()
+    run_eval_pipeline(EvalRunner.from_args(args))
\ No newline at end of file
@@ -0,0 +1,232 @@
+"""
+Runner dùng chung cho các bộ đánh giá (sql / rag / chart / multihop / edge cases).
+
+- Chạy các case song song có giới hạn (ainvoke, mỗi case một thread_id riêng).
+- Mỗi case xong được ghi ngay vào checkpoint JSONL: chạy lại chỉ thực thi case còn thiếu
+  hoặc bị lỗi (ERROR), case đã chấm giữ nguyên kết quả. Case bị sửa trong ground truth được chạy lại.
+- Mỗi bộ tự định nghĩa cột báo cáo (case_row), cách chấm (score) và phần tổng kết riêng (summarize).
+- Tùy chọn cassette (record / replay / record_missing): lời gọi LLM / embeddings / rerank được ghi lại
+  và phát lại offline (xem cassette.py).
+- Mỗi case ghi thêm số liệu hiệu năng (PERF_COLUMNS: thời gian, TTFT, số lần gọi LLM / tool, token),
+  calculate_result.py tổng hợp p50 / p95 và so với lần báo cáo trước.
+"""
+import os
+import csv
+import json
+import time
+import uuid
+import asyncio
+import hashlib
+import argparse
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional
+from langchain_core.messages import HumanMessage
+from cassette import Cassette, MODES as CASSETTE_MODES
+from perf_metrics import PerfCollector, PERF_COLUMNS
+
+GREEN = '\033[92m'
+RED = '\033[91m'
+YELLOW = '\033[93m'
+RESET = '\033[0m'
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GROUND_TRUTH_DIR = os.path.join(BASE_DIR, '../ground_truth')
+REPORT_DIR = os.path.join(BASE_DIR, '../reports')
+CHECKPOINT_DIR = os.path.join(REPORT_DIR, 'checkpoints')
+
+
+@dataclass
+class EvalSuite:
+    """Cấu hình một bộ đánh giá."""
+    name: str
+    ground_truth: str                      # tên file trong evaluation/ground_truth
+    headers: list                          # cột của file CSV báo cáo
+    case_row: Callable                     # (case) -> các cột cố định (ID, Question...)
+    score: Callable                        # (case, result_state) -> các cột kết quả, có "Status"
+    report_file: Optional[str] = None      # None -> không ghi CSV (VD: RAG ghi báo cáo sau RAGAS)
+    on_error: Optional[Callable] = None    # (case, lỗi) -> các cột khi graph lỗi
+    summarize: Optional[Callable] = None   # (rows) -> in phần tổng kết riêng của bộ
+    pass_threshold: float = 70
+
+    def load_cases(self) -> list:
+        with open(os.path.join(GROUND_TRUTH_DIR, self.ground_truth), 'r', encoding='utf-8') as f:
+            cases = json.load(f)
+        for idx, case in enumerate(cases, 1):
+            case.setdefault("id", f"{self.name}_{idx}")
+        return cases
+
+
+def case_fingerprint(case: dict) -> str:
+    return hashlib.md5(json.dumps(case, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class CaseCheckpoint:
+    """File JSONL chỉ ghi thêm: mỗi dòng là kết quả một case; dòng sau ghi đè dòng trước cùng case_id."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> dict:
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # dòng cuối dở dang do tiến trình bị dừng giữa chừng
+                records[record["case_id"]] = record
+        return records
+
+    def append(self, record: dict):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+
+    def reset(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class EvalRunner:
+    """Chạy một EvalSuite với concurrency giới hạn và checkpoint theo case."""
+
+    def __init__(self, agent_app=None, concurrency: int = 4, resume: bool = True, rerun_failed: bool = False,
+                 limit: int = None, checkpoint_dir: str = CHECKPOINT_DIR, cassette_mode: str = "off"):
+        self.agent_app = agent_app
+        self.concurrency = concurrency
+        self.resume = resume
+        self.rerun_failed = rerun_failed
+        self.limit = limit
+        self.checkpoint_dir = checkpoint_dir
+        self.cassette_mode = cassette_mode
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace, agent_app=None) -> "EvalRunner":
+        return cls(agent_app=agent_app, concurrency=args.concurrency, resume=not args.fresh,
+                   rerun_failed=args.rerun_failed, limit=args.limit, cassette_mode=args.cassette)
+
+    def cassette(self, name: str):
+        """Cassette cho một phần của lượt đánh giá (tắt -> context rỗng)."""
+        if self.cassette_mode == "off":
+            return contextlib.nullcontext()
+        return Cassette(name, mode=self.cassette_mode)
+
+    def _needs_run(self, case: dict, record: Optional[dict]) -> bool:
+        if record is None or record.get("fingerprint") != case_fingerprint(case):
+            return True
+        if record["status"] == "ERROR":
+            return True
+        return self.rerun_failed and record["status"] == "FAIL"
+
+    async def _invoke(self, question: str, config: dict, collector: PerfCollector) -> dict:
+        """Chạy graph ở chế độ stream (như API server) để đo được TTFT; trả về state cuối."""
+        config = {**config, "callbacks": [collector]}
+        state = None
+        async for mode, chunk in self.agent_app.astream({"messages": [HumanMessage(content=question)]},
+                                                        config=config, stream_mode=["messages", "values"]):
+            if mode == "messages":
+                collector.observe_chunk(*chunk)
+            else:
+                state = chunk
+        return state
+
+    async def _run_case(self, suite: EvalSuite, case: dict, semaphore: asyncio.Semaphore,
+                        checkpoint: CaseCheckpoint, progress: dict) -> dict:
+        async with semaphore:
+            row = dict(suite.case_row(case))
+            config = {"configurable": {"thread_id": f"{suite.name}-{case['id']}-{uuid.uuid4().hex[:8]}"}}
+            start = time.perf_counter()
+            collector = PerfCollector()
+            try:
+                state = await self._invoke(case["question"], config, collector)
+                perf = collector.summary()
+                # Chấm điểm có thể truy vấn DB / copy file -> chạy ngoài event loop
+                row.update(await asyncio.to_thread(suite.score, case, state))
+            except Exception as e:
+                perf = collector.summary()
+                row.update(suite.on_error(case, e) if suite.on_error else
+                           {"Status": "ERROR", "Reason": f"Lỗi System/LangGraph: {str(e)}"})
+            elapsed = time.perf_counter() - start
+            # Wall_s chỉ tính thời gian chạy graph, không gồm bước chấm điểm
+            row.update(perf)
+
+        record = {"case_id": case["id"], "fingerprint": case_fingerprint(case), "status": row["Status"],
+                  "elapsed_s": round(elapsed, 3), "row": row}
+        checkpoint.append(record)
+        progress["done"] += 1
+        color = GREEN if row["Status"] in ("PASS", "OK") else RED
+        reason = f" - {row['Reason']}" if row["Status"] not in ("PASS", "OK") and row.get("Reason") else ""
+        print(f"[{progress['done']}/{progress['total']}] {case['id']}: {color}{row['Status']}{RESET} "
+              f"({elapsed:.1f}s){reason}")
+        return record
+
+    async def _run_pending(self, suite: EvalSuite, pending: list, checkpoint: CaseCheckpoint) -> list:
+        loop = asyncio.get_running_loop()
+        # Node của graph là hàm đồng bộ -> ainvoke chạy chúng trên executor mặc định, cần đủ luồng
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=max(8, self.concurrency * 4)))
+        semaphore = asyncio.Semaphore(self.concurrency)
+        progress = {"done": 0, "total": len(pending)}
+        return await asyncio.gather(*(self._run_case(suite, case, semaphore, checkpoint, progress) for case in pending))
+
+    def run(self, suite: EvalSuite) -> list:
+        """Chạy các case còn thiếu / lỗi, ghi báo cáo CSV theo thứ tự ground truth, trả về danh sách dòng."""
+        cases = suite.load_cases()[:self.limit]
+        os.makedirs(self.checkpoint_dir, exist_ok=True)
+        checkpoint = CaseCheckpoint(os.path.join(self.checkpoint_dir, f"{suite.name}.jsonl"))
+        if not self.resume:
+            checkpoint.reset()
+        records = checkpoint.load()
+        pending = [case for case in cases if self._needs_run(case, records.get(case["id"]))]
+
+        print(f"\n{YELLOW}BỘ ĐÁNH GIÁ {suite.name.upper()}: {len(cases)} case, {len(cases) - len(pending)} đã có trong checkpoint, "
+              f"chạy {len(pending)} case (concurrency={self.concurrency})...{RESET}\n")
+        wall = 0.0
+        if pending:
+            if self.agent_app is None:
+                from agent.factory import init_agent_app
+                print(f"{YELLOW}Đang khởi tạo Insight Agent App...{RESET}")
+                self.agent_app = init_agent_app()
+            start = time.perf_counter()
+            with self.cassette(suite.name):
+                for record in asyncio.run(self._run_pending(suite, pending, checkpoint)):
+                    records[record["case_id"]] = record
+            wall = time.perf_counter() - start
+
+        rows = [records[case["id"]]["row"] for case in cases]
+        if suite.report_file:
+            os.makedirs(os.path.dirname(suite.report_file), exist_ok=True)
+            with open(suite.report_file, 'w', encoding='utf-8-sig', newline='') as f:
+                headers = suite.headers + [column for column in PERF_COLUMNS if column not in suite.headers]
+                writer = csv.DictWriter(f, fieldnames=headers, extrasaction="ignore", restval="")
+                writer.writeheader()
+                writer.writerows(rows)
+            print(f"\n{YELLOW}File Report đã lưu tại: {suite.report_file}{RESET}")
+
+        if pending:
+            case_time = sum(records[case["id"]]["elapsed_s"] for case in pending)
+            print(f"Thời gian: {wall:.1f}s cho {len(pending)} case (tổng thời gian từng case {case_time:.1f}s "
+                  f"-> nhanh hơn chạy tuần tự ~{case_time / max(wall, 1e-9):.1f} lần)")
+        if any(row["Status"] in ("PASS", "FAIL") for row in rows):
+            accuracy = sum(1 for row in rows if row["Status"] == "PASS") / len(rows) * 100
+            print(f"Độ chính xác: {GREEN if accuracy >= suite.pass_threshold else RED}{accuracy:.2f}%{RESET}")
+        errors = sum(1 for row in rows if row["Status"] == "ERROR")
+        if errors:
+            print(f"{RED}{errors} case lỗi hệ thống - chạy lại lệnh để thực thi lại các case này.{RESET}")
+        if suite.summarize:
+            suite.summarize(rows)
+        return rows
+
+
+def build_arg_parser(description: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--concurrency", type=int, default=4, help="Số case chạy đồng thời")
+    parser.add_argument("--fresh", action="store_true", help="Bỏ checkpoint cũ, chạy lại toàn bộ")
+    parser.add_argument("--rerun-failed", action="store_true", help="Chạy lại cả các case FAIL (mặc định chỉ ERROR)")
+    parser.add_argument("--limit", type=int, default=None, help="Chỉ chạy N case đầu tiên")
+    parser.add_argument("--cassette", choices=CASSETTE_MODES, default=os.getenv("EVAL_CASSETTE", "off"),
+                        help="Ghi / phát lại lời gọi model (evaluation/cassettes/<bộ>.jsonl); replay kèm --fresh để chạy offline")
+    return parser
@@ -1,153 +1,83 @@
-import json
-import uuid
 import sys
 import os
-import csv
 import pandas as pd
-from sqlalchemy import create_engine
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from langchain_core.messages import HumanMessage
-from app import init_agent_app
-from config.settings import settings
+from core.database import get_engine, ROLE_READ
+from eval_runner import EvalRunner, EvalSuite, REPORT_DIR, build_arg_parser
+from result_compare import compare_dataframes
+from sql_snapshots import ExpectedResultStore
+from perf_metrics import print_direct_answer_summary
 
-GREEN = '\033[92m'
-RED = '\033[91m'
-YELLOW = '\033[93m'
-RESET = '\033[0m'
+db_engine = get_engine(ROLE_READ)
+expected_store = ExpectedResultStore(db_engine)
 
-db_engine = create_engine(settings.DATABASE_URL)
+def case_row(case):
+    return {
+        "ID": case["id"],
+        "Complexity": case.get("complexity", "unknown"),
+        "Question": case["question"],
+        "Expected_SQL": case["expected_sql"],
+        "Agent_SQL": "NONE",
+    }
 
-def load_ground_truth(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        return json.load(f)
+def score_case(case, result_state):
+    """Chạy lại SQL của Agent trên DB, so khớp với kết quả chuẩn đã snapshot (Parquet)."""
+    agent_sql = None
+    final_message = ""
+    eval_status = "FAIL"
 
-def compare_dataframes(df_expected, df_agent):
-    """
-    Hàm so sánh 2 DataFrame thông minh:
-    1. Bỏ qua thứ tự dòng (sort toàn bộ dữ liệu).
-    2. Bỏ qua tên cột (ép tên cột df_agent theo df_expected) vì LLM hay dùng AS alias.
-    """
-    if df_expected.shape != df_agent.shape:
-        return False, f"Khác số lượng dòng/cột. Chuẩn: {df_expected.shape}, Agent: {df_agent.shape}"
-    
-    try:
-        cols_expected = df_expected.columns.tolist()
-        cols_agent = df_agent.columns.tolist()
-        
-        df_expected_sorted = df_expected.sort_values(by=cols_expected).reset_index(drop=True)
-        df_agent_sorted = df_agent.sort_values(by=cols_agent).reset_index(drop=True)
-        
-        df_agent_sorted.columns = df_expected_sorted.columns
-        
-        is_match = df_expected_sorted.equals(df_agent_sorted)
-        if is_match:
-            return True, "Dữ liệu khớp hoàn toàn."
-        else:
-            return False, "Dữ liệu không khớp."
-    except Exception as e:
-        return False, f"Lỗi khi so sánh bảng: {str(e)}"
+    if result_state.get("messages"):
+        final_message = result_state["messages"][-1].content
 
-def run_eval_pipeline():
-    print(f"{YELLOW}Đang khởi tạo Insight Agent App & Kết nối Database...{RESET}")
-    agent_app = init_agent_app()
-    
-    base_dir = os.path.dirname(__file__)
-    data_path = os.path.join(base_dir, '../ground_truth/sql_ground_truth.json')
-    report_dir = os.path.join(base_dir, '../reports')
-    
-    os.makedirs(report_dir, exist_ok=True)
-    report_file = os.path.join(report_dir, 'sql_report.csv')
-    
-    test_cases = load_ground_truth(data_path)
-    total_cases = len(test_cases)
-    passed_cases = 0
-    report_data = []
+    for msg in result_state["messages"]:
+        if hasattr(msg, 'tool_calls') and msg.tool_calls:
+            for tc in msg.tool_calls:
+                if tc['name'] == 'query_sql_db':
+                    agent_sql = tc['args'].get('query')
 
-    print(f"\n{YELLOW}BẮT ĐẦU ĐÁNH GIÁ DATA MATCH (SQL TEXT-TO-SQL)...{RESET}\n")
-
-    for idx, case in enumerate(test_cases, 1):
-        case_id = case.get("id", f"sql_{idx}")
-        question = case["question"]
-        expected_sql = case["expected_sql"]
-        complexity = case.get("complexity", "unknown")
-        
-        print(f"[{idx}/{total_cases}] Chạy Test: {case_id} ({complexity.upper()})")
-        
-        config = {"configurable": {"thread_id": str(uuid.uuid4())}}
-        initial_state = {"messages": [HumanMessage(content=question)]}
-        
-        agent_sql = None
-        eval_status = "FAIL"
-        eval_reason = ""
-        final_message = ""
-        
+    if not agent_sql:
+        eval_reason = "Agent KHÔNG gọi tool query_sql_db."
+    else:
         try:
-            result_state = agent_app.invoke(initial_state, config=config)
-            
-            if result_state.get("messages"):
-                final_message = result_state["messages"][-1].content
-            
-            for msg in result_state["messages"]:
-                if hasattr(msg, 'tool_calls') and msg.tool_calls:
-                    for tc in msg.tool_calls:
-                        if tc['name'] == 'query_sql_db':
-                            agent_sql = tc['args'].get('query')
-            
-            if not agent_sql:
-                eval_reason = "Agent KHÔNG gọi tool query_sql_db."
-            else:
-                try:
-                    df_expected = pd.read_sql_query(expected_sql, db_engine)
-                    df_agent = pd.read_sql_query(agent_sql, db_engine)
-                    
-                    is_match, reason = compare_dataframes(df_expected, df_agent)
-                    
-                    if is_match:
-                        eval_status = "PASS"
-                        passed_cases += 1
-                        eval_reason = "Khớp dữ liệu (Exact Match)"
-                    else:
-                        eval_reason = f"Sai dữ liệu: {reason}"
-                        
-                except Exception as db_err:
-                    eval_reason = f"Lỗi thực thi SQL của Agent: {str(db_err)[:100]}..."
+            df_expected = expected_store.get(case)
+            df_agent = pd.read_sql_query(agent_sql, db_engine)
 
-        except Exception as e:
-            eval_reason = f"Lỗi System/LangGraph: {str(e)}"
-            eval_status = "ERROR"
+            is_match, reason = compare_dataframes(df_expected, df_agent)
+
+            if is_match:
+                eval_status = "PASS"
+                eval_reason = "Khớp dữ liệu (Exact Match)"
+            else:
+                eval_reason = f"Sai dữ liệu: {reason}"
 
-        if eval_status == "PASS":
-            print(f"{GREEN}PASS{RESET}")
-        else:
-            print(f"{RED}{eval_status}{RESET} - Lý do: {eval_reason}")
-            print(f"   Expected SQL: {expected_sql}")
-            print(f"   Agent SQL: {agent_sql}")
+        except Exception as db_err:
+            eval_reason = f"Lỗi thực thi SQL của Agent: {str(db_err)[:100]}..."
 
-        report_data.append({
-            "ID": case_id,
-            "Complexity": complexity,
-            "Question": question,
-            "Expected_SQL": expected_sql,
-            "Agent_SQL": agent_sql if agent_sql else "NONE",
-            "Status": eval_status,
-            "Reason": eval_reason,
-            "Agent_Response": final_message.replace('\n', ' ')
-        })
+    return {
+        "Agent_SQL": agent_sql if agent_sql else "NONE",
+        "Status": eval_status,
+        "Reason": eval_reason,
+        "Agent_Response": final_message.replace('\n', ' ')
+    }
 
-    print(f"\n{YELLOW}Đang lưu báo cáo SQL ra file CSV...{RESET}")
-    headers = ["ID", "Complexity", "Question", "Expected_SQL", "Agent_SQL", "Status", "Reason", "Agent_Response"]
-    
-    with open(report_file, 'w', encoding='utf-8-sig', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        writer.writeheader()
-        writer.writerows(report_data)
+SUITE = EvalSuite(
+    name="sql",
+    ground_truth="sql_ground_truth.json",
+    report_file=os.path.join(REPORT_DIR, 'sql_report.csv'),
+    headers=["ID", "Complexity", "Question", "Expected_SQL", "Agent_SQL", "Status", "Reason", "Agent_Response"],
+    case_row=case_row,
+    score=score_case,
+    pass_threshold=70,
+    summarize=print_direct_answer_summary,
+)
 
-    accuracy = (passed_cases / total_cases) * 100
-    print(f"\n{YELLOW}TỔNG KẾT DATA MATCH (SQL):{RESET}")
-    print(f"File Report đã lưu tại: {report_file}")
-    print(f"Độ chính xác: {GREEN if accuracy >= 70 else RED}{accuracy:.2f}%{RESET}\n")
+def run_eval_pipeline(runner: EvalRunner = None):
+    runner = runner or EvalRunner()
+    expected_store.ensure(SUITE.load_cases())
+    return runner.run(SUITE)
 
 if __name__ == "__main__":
-    run_eval_pipeline()
\ No newline at end of file
+    args = build_arg_parser("Đánh giá Data Match (Text-to-SQL).").parse_args()
+    run_eval_pipeline(EvalRunner.from_args(args))
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""
+Số liệu hiệu năng theo case cho các bộ đánh giá: thời gian, TTFT, số lần gọi LLM / tool, token.
+
+PerfCollector là callback handler gắn vào config của một lượt chạy graph (mỗi case một collector).
+Graph được chạy bằng astream(stream_mode="messages") nên LLM stream như trên API server, và TTFT
+là lúc token đầu tiên của câu trả lời (node final_answer / general_chat / direct_answer) tới tay người dùng.
+Direct_Answer = 1 nếu câu trả lời đi đường tắt template (agent/direct_answer.py), không qua final_answer.
+"""
+import time
+import statistics
+from typing import Any, Optional
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from agent.events import STREAM_NODES
+
+# Cột được thêm vào báo cáo CSV của mọi bộ đánh giá
+PERF_COLUMNS = ["Wall_s", "TTFT_s", "LLM_Calls", "Prompt_Tokens", "Completion_Tokens", "Tool_Calls", "Direct_Answer"]
+
+
+class PerfCollector(BaseCallbackHandler):
+    """Đếm lời gọi LLM / tool và token của một case. Chạy inline (không qua executor) để đếm không bị trễ."""
+
+    run_inline = True
+    raise_error = False
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+        self.llm_calls = 0
+        self.tool_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.direct_answer = False
+
+    def on_chat_model_start(self, serialized: dict, messages: list, *, run_id: UUID, **kwargs: Any):
+        self.llm_calls += 1
+
+    def on_llm_start(self, serialized: dict, prompts: list, *, run_id: UUID, **kwargs: Any):
+        self.llm_calls += 1
+
+    def on_chain_start(self, serialized: dict, inputs: Any, *, run_id: UUID, metadata: Optional[dict] = None,
+                       **kwargs: Any):
+        if kwargs.get("name") == "direct_answer" and (metadata or {}).get("langgraph_node") == "direct_answer":
+            self.direct_answer = True
+
+    def on_tool_start(self, serialized: dict, input_str: str, *, run_id: UUID, **kwargs: Any):
+        self.tool_calls += 1
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        usage = None
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None) or usage
+        if usage:
+            self.prompt_tokens += usage.get("input_tokens", 0)
+            self.completion_tokens += usage.get("output_tokens", 0)
+            return
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        self.prompt_tokens += token_usage.get("prompt_tokens", 0)
+        self.completion_tokens += token_usage.get("completion_tokens", 0)
+
+    def observe_chunk(self, chunk, metadata: dict):
+        """Gọi với mỗi (chunk, metadata) của stream_mode="messages"."""
+        if self.first_token_at is None and metadata.get("langgraph_node") in STREAM_NODES and chunk.content:
+            self.first_token_at = time.perf_counter()
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self.start
+        ttft = self.first_token_at - self.start if self.first_token_at is not None else ""
+        return {
+            "Wall_s": round(elapsed, 3),
+            "TTFT_s": round(ttft, 3) if ttft != "" else "",
+            "LLM_Calls": self.llm_calls,
+            "Prompt_Tokens": self.prompt_tokens,
+            "Completion_Tokens": self.completion_tokens,
+            "Tool_Calls": self.tool_calls,
+            "Direct_Answer": int(self.direct_answer),
+        }
+
+
+def print_direct_answer_summary(rows: list):
+    """Tỉ lệ case đi đường tắt trả lời trực tiếp và thời gian / số lần gọi LLM của hai nhánh."""
+    paths = {"trực tiếp": [], "final_answer": []}
+    for row in rows:
+        if row.get("Wall_s") in (None, ""):
+            continue
+        paths["trực tiếp" if row.get("Direct_Answer") else "final_answer"].append(row)
+    measured = sum(len(v) for v in paths.values())
+    if not measured:
+        return
+    print(f"Trả lời trực tiếp (bỏ qua final_answer): {len(paths['trực tiếp'])}/{measured} case "
+          f"({len(paths['trực tiếp']) / measured:.0%})")
+    for name, path_rows in paths.items():
+        if path_rows:
+            print(f"  {name:<13}: Wall p50 {statistics.median(float(r['Wall_s']) for r in path_rows):.2f}s, "
+                  f"LLM calls trung bình {statistics.mean(int(r['LLM_Calls']) for r in path_rows):.1f}")
@@ -0,0 +1,123 @@
+"""
+So sánh hai bảng kết quả SQL không phụ thuộc thứ tự dòng, tên cột (LLM hay đặt alias) và cách biểu diễn số.
+
+1. Chuẩn hóa từng cột bằng phép toán vector: số (int / float / Decimal) -> float làm tròn, thời gian -> int64 ns,
+   còn lại -> chuỗi; NULL của mọi kiểu về cùng một giá trị.
+2. Băm mỗi dòng (pd.util.hash_pandas_object) và so hai multiset hash (chỉ sort một vector uint64),
+   không sort toàn bảng theo mọi cột như trước.
+3. Dòng lệch hash (thường rất ít, VD: 0.30000000000000004 vs 0.3 sát ranh giới làm tròn) mới được so
+   chi tiết với dung sai rtol / atol.
+"""
+import numbers
+import numpy as np
+import pandas as pd
+
+NULL_TOKEN = "\x00NULL"
+MAX_RESIDUAL_ROWS = 100_000
+
+
+def _numeric(column: pd.Series):
+    """float64 nếu cột là số (kể cả Decimal từ psycopg2 / Parquet), ngược lại None."""
+    if pd.api.types.is_bool_dtype(column) or pd.api.types.is_numeric_dtype(column):
+        return column.astype("float64")
+    if column.dtype == object:
+        # Chỉ nhìn giá trị khác NULL đầu tiên: thử to_numeric trên cả cột chữ rất chậm (1M dòng ~3s)
+        first = column.first_valid_index()
+        if first is not None and isinstance(column[first], numbers.Number) and not isinstance(column[first], bool):
+            return pd.to_numeric(column, errors="coerce").astype("float64")
+    return None
+
+
+def canonicalize(df: pd.DataFrame, decimals: int = 6) -> tuple:
+    """Trả về (bảng đã chuẩn hóa với cột đánh số 0..n-1, danh sách vị trí cột số)."""
+    canonical = {}
+    numeric_columns = []
+    for position in range(df.shape[1]):
+        column = df.iloc[:, position]
+        if pd.api.types.is_datetime64_any_dtype(column):
+            if getattr(column.dt, "tz", None) is not None:
+                column = column.dt.tz_convert("UTC").dt.tz_localize(None)
+            canonical[position] = column.astype("int64").where(column.notna(), np.iinfo("int64").min)
+            continue
+        values = _numeric(column)
+        if values is not None:
+            numeric_columns.append(position)
+            # Làm tròn để 12.5 (Decimal) và 12.500000000001 (float) có cùng hash; -0.0 -> 0.0
+            canonical[position] = values.round(decimals) + 0.0
+            continue
+        canonical[position] = column.where(column.notna(), NULL_TOKEN).astype(str)
+    return pd.DataFrame(canonical, index=pd.RangeIndex(len(df))), numeric_columns
+
+
+def _row_hashes(canonical: pd.DataFrame) -> pd.Series:
+    return pd.util.hash_pandas_object(canonical, index=False)
+
+
+def _counts(keys: np.ndarray, unique: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    index = np.minimum(np.searchsorted(unique, keys), len(unique) - 1)
+    return np.where(unique[index] == keys, counts[index], 0)
+
+
+def _residual(expected_hashes: pd.Series, agent_hashes: pd.Series) -> tuple:
+    """
+    So multiset hash của hai bảng. Chỉ sort vector hash uint64 (1M dòng ~15ms), không sort bảng.
+    Trả về vị trí các dòng thuộc những hash có số lần xuất hiện lệch nhau ở hai bên; hai phần dư
+    luôn cùng số dòng vì tổng số dòng bằng nhau.
+    """
+    expected_sorted = np.sort(expected_hashes.to_numpy())
+    agent_sorted = np.sort(agent_hashes.to_numpy())
+    if np.array_equal(expected_sorted, agent_sorted):
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    expected_unique, expected_counts = np.unique(expected_sorted, return_counts=True)
+    agent_unique, agent_counts = np.unique(agent_sorted, return_counts=True)
+    keys = np.union1d(expected_unique, agent_unique)
+    mismatched = keys[_counts(keys, expected_unique, expected_counts) != _counts(keys, agent_unique, agent_counts)]
+    return (np.flatnonzero(expected_hashes.isin(mismatched).to_numpy()),
+            np.flatnonzero(agent_hashes.isin(mismatched).to_numpy()))
+
+
+def _close_enough(expected: pd.DataFrame, agent: pd.DataFrame, numeric_columns: list, rtol: float, atol: float) -> bool:
+    """So các dòng lệch hash: sort phần dư (nhỏ) rồi so cột số bằng isclose, cột khác bằng ==."""
+    expected = expected.sort_values(by=list(expected.columns)).reset_index(drop=True)
+    agent = agent.sort_values(by=list(agent.columns)).reset_index(drop=True)
+    for position in expected.columns:
+        left, right = expected[position].to_numpy(), agent[position].to_numpy()
+        if position in numeric_columns:
+            if not np.allclose(left, right, rtol=rtol, atol=atol, equal_nan=True):
+                return False
+        elif not np.array_equal(left, right):
+            return False
+    return True
+
+
+def compare_dataframes(df_expected: pd.DataFrame, df_agent: pd.DataFrame, rtol: float = 1e-6,
+                       atol: float = 1e-6, decimals: int = 6) -> tuple:
+    """
+    So sánh 2 DataFrame:
+    1. Bỏ qua thứ tự dòng (so multiset hash của dòng).
+    2. Bỏ qua tên cột (so theo vị trí cột) vì LLM hay dùng AS alias.
+    3. Số so với dung sai (Decimal vs float, làm tròn khác nhau).
+    Trả về (khớp hay không, lý do).
+    """
+    if df_expected.shape != df_agent.shape:
+        return False, f"Khác số lượng dòng/cột. Chuẩn: {df_expected.shape}, Agent: {df_agent.shape}"
+
+    try:
+        expected, expected_numeric = canonicalize(df_expected, decimals)
+        agent, agent_numeric = canonicalize(df_agent, decimals)
+        if expected_numeric != agent_numeric:
+            return False, "Kiểu dữ liệu các cột không khớp (số / chữ)."
+
+        expected_hashes, agent_hashes = _row_hashes(expected), _row_hashes(agent)
+        missing, extra = _residual(expected_hashes, agent_hashes)
+        if len(missing) == 0:
+            return True, "Dữ liệu khớp hoàn toàn."
+
+        if not expected_numeric or len(missing) > MAX_RESIDUAL_ROWS:
+            return False, f"Dữ liệu không khớp ({len(missing)}/{len(df_expected)} dòng khác)."
+        if _close_enough(expected.iloc[missing], agent.iloc[extra], expected_numeric, rtol, atol):
+            return True, f"Dữ liệu khớp trong dung sai số học ({len(missing)} dòng lệch làm tròn)."
+        return False, f"Dữ liệu không khớp ({len(missing)}/{len(df_expected)} dòng khác)."
+    except Exception as e:
+        return False, f"Lỗi khi so sánh bảng: {str(e)}"
@@ -0,0 +1,115 @@
+"""
+Snapshot kết quả chuẩn (expected_sql) của bộ eval Text-to-SQL dưới dạng Parquet.
+
+Mỗi lần eval trước đây đều chạy lại toàn bộ expected_sql trên DB. Kết quả chuẩn chỉ đổi khi dữ liệu seed
+(hoặc schema, hoặc chính câu SQL chuẩn) đổi, nên ta lưu sẵn và gắn kèm "data version":
+- data_version: md5 của fingerprint schema + (số dòng, tổng hash nội dung) của từng bảng.
+- manifest.json: {data_version, cases: {case_id: {sql_hash, rows, file}}}.
+Khi data_version khác hoặc expected_sql của case đổi -> chỉ sinh lại các snapshot bị cũ.
+"""
+import os
+import json
+import hashlib
+import pandas as pd
+from sqlalchemy import text
+
+SNAPSHOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../ground_truth/sql_snapshots'))
+
+YELLOW = '\033[93m'
+RESET = '\033[0m'
+
+
+class ExpectedResultStore:
+    SCHEMA_FINGERPRINT_SQL = text("""
+        SELECT md5(coalesce(string_agg(
+                   table_name || '.' || column_name || ':' || data_type || ':' || is_nullable,
+                   ',' ORDER BY table_name, ordinal_position), ''))
+        FROM information_schema.columns
+        WHERE table_schema = current_schema()
+    """)
+    TABLES_SQL = text("""
+        SELECT table_name FROM information_schema.tables
+        WHERE table_schema = current_schema() AND table_type = 'BASE TABLE'
+        ORDER BY table_name
+    """)
+
+    def __init__(self, engine, snapshot_dir: str = SNAPSHOT_DIR):
+        self.engine = engine
+        self.snapshot_dir = snapshot_dir
+        self.manifest_path = os.path.join(snapshot_dir, "manifest.json")
+        self._frames = {}
+
+    # --- data version ---
+    def data_version(self) -> str:
+        """Đổi khi schema hoặc nội dung bất kỳ bảng nào đổi (thêm / sửa / xóa dòng)."""
+        parts = []
+        with self.engine.connect() as conn:
+            parts.append(conn.execute(self.SCHEMA_FINGERPRINT_SQL).scalar() or "")
+            for table in conn.execute(self.TABLES_SQL).scalars():
+                # Tổng hashtext của từng dòng: không phụ thuộc thứ tự vật lý, không cần ORDER BY
+                count, checksum = conn.execute(text(
+                    f'SELECT count(*), coalesce(sum(hashtext(t::text)::bigint), 0) FROM "{table}" t'
+                )).one()
+                parts.append(f"{table}:{count}:{checksum}")
+        return hashlib.md5("|".join(parts).encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def sql_hash(sql: str) -> str:
+        return hashlib.md5(" ".join(sql.split()).encode("utf-8")).hexdigest()
+
+    # --- manifest ---
+    def _load_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"data_version": None, "cases": {}}
+
+    def _save_manifest(self, manifest: dict):
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        with open(self.manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+    def _path(self, case_id) -> str:
+        return os.path.join(self.snapshot_dir, f"{case_id}.parquet")
+
+    # --- snapshot ---
+    def _is_fresh(self, manifest: dict, data_version: str, case: dict) -> bool:
+        entry = manifest["cases"].get(str(case["id"]))
+        return (manifest.get("data_version") == data_version and entry is not None
+                and entry.get("sql_hash") == self.sql_hash(case["expected_sql"])
+                and os.path.exists(self._path(case["id"])))
+
+    def ensure(self, cases: list) -> int:
+        """Sinh lại snapshot cho các case bị cũ / thiếu. Trả về số snapshot đã sinh lại."""
+        data_version = self.data_version()
+        manifest = self._load_manifest()
+        stale = [case for case in cases if not self._is_fresh(manifest, data_version, case)]
+        if not stale:
+            print(f"Snapshot kết quả chuẩn còn mới (data version {data_version[:8]}).")
+            return 0
+
+        if manifest.get("data_version") != data_version:
+            manifest["cases"] = {}
+        print(f"{YELLOW}Sinh lại {len(stale)}/{len(cases)} snapshot kết quả chuẩn (data version {data_version[:8]}).{RESET}")
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        for case in stale:
+            df = pd.read_sql_query(case["expected_sql"], self.engine)
+            df.to_parquet(self._path(case["id"]), index=False)
+            manifest["cases"][str(case["id"])] = {"sql_hash": self.sql_hash(case["expected_sql"]),
+                                                  "rows": len(df), "file": os.path.basename(self._path(case["id"]))}
+            self._frames.pop(str(case["id"]), None)
+        manifest["data_version"] = data_version
+        self._save_manifest(manifest)
+        return len(stale)
+
+    def get(self, case: dict) -> pd.DataFrame:
+        """Kết quả chuẩn của case (đọc Parquet một lần, giữ trong bộ nhớ)."""
+        key = str(case["id"])
+        if key not in self._frames:
+            path = self._path(case["id"])
+            if os.path.exists(path):
+                self._frames[key] = pd.read_parquet(path)
+            else:
+                self._frames[key] = pd.read_sql_query(case["expected_sql"], self.engine)
+        return self._frames[key]
@@ -1,68 +1,169 @@
+import os
+import json
 import pandas as pd
 
-chart = pd.read_csv("chart_report.csv")
-edge = pd.read_csv("edge_cases_report.csv")
-multihop = pd.read_csv("multihop_report.csv")
-sql = pd.read_csv("sql_report.csv")
-ragas = pd.read_csv("rag_report_ragas.csv")
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SUMMARY_FILE = os.path.join(BASE_DIR, "evaluation_summary.json")
+
+SUITES = {
+    "Chart": "chart_report.csv",
+    "Edge Cases": "edge_cases_report.csv",
+    "Multihop": "multihop_report.csv",
+    "SQL": "sql_report.csv",
+}
+RAG_SUITE = ("RAG", "rag_report_ragas.csv")
+
+metrics = [
+    "faithfulness",
+    "answer_relevancy",
+    "context_precision",
+    "context_recall"
+]
+
+# Cột hiệu năng do eval_runner ghi cho từng case (báo cáo cũ chưa có -> bỏ qua)
+LATENCY_COLUMNS = {"WALL_S": "Wall", "TTFT_S": "TTFT"}
+COUNT_COLUMNS = {"LLM_CALLS": "LLM calls", "PROMPT_TOKENS": "Prompt tokens",
+                 "COMPLETION_TOKENS": "Completion tokens", "TOOL_CALLS": "Tool calls",
+                 "DIRECT_ANSWER": "Direct answers"}
 
 def normalize_columns(df):
     df.columns = df.columns.str.strip().str.upper()
     return df
 
-chart = normalize_columns(chart)
-edge = normalize_columns(edge)
-multihop = normalize_columns(multihop)
-sql = normalize_columns(sql)
-
 def compute_accuracy(df):
     total = len(df)
     passed = (df["STATUS"] == "PASS").sum()
     accuracy = passed / total
     return passed, total, accuracy
 
-acc_chart = compute_accuracy(chart)
-acc_edge = compute_accuracy(edge)
-acc_multihop = compute_accuracy(multihop)
-acc_sql = compute_accuracy(sql)
-
-metrics = [
-    "faithfulness",
-    "answer_relevancy",
-    "context_precision",
-    "context_recall"
-]
-
+def compute_perf(df):
+    """p50 / p95 thời gian (giây) và tổng / trung bình số lần gọi, token của một bộ."""
+    perf = {}
+    for column, label in LATENCY_COLUMNS.items():
+        if column in df.columns:
+            values = pd.to_numeric(df[column], errors="coerce").dropna()
+            if len(values):
+                perf[label] = {"p50": float(values.quantile(0.5)), "p95": float(values.quantile(0.95)),
+                               "total": float(values.sum())}
+    for column, label in COUNT_COLUMNS.items():
+        if column in df.columns:
+            values = pd.to_numeric(df[column], errors="coerce").dropna()
+            if len(values):
+                perf[label] = {"total": int(values.sum()), "mean": float(values.mean())}
+    return perf
+
+def load_previous():
+    try:
+        with open(SUMMARY_FILE, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def delta(current, previous, fmt, pct=False):
+    """Chuỗi thay đổi so với lần trước, rỗng nếu lần trước không có số liệu."""
+    if previous is None:
+        return ""
+    change = current - previous
+    if pct and previous:
+        return f"  (Δ {change:+{fmt}}, {change / previous:+.1%})"
+    return f"  (Δ {change:+{fmt}})"
+
+reports = {}
+for name, file in SUITES.items():
+    path = os.path.join(BASE_DIR, file)
+    if os.path.exists(path):
+        reports[name] = normalize_columns(pd.read_csv(path))
+
+ragas = pd.read_csv(os.path.join(BASE_DIR, RAG_SUITE[1]))
 ragas_mean = ragas[metrics].mean()
 
+summary = {"accuracy": {}, "ragas": {m: float(ragas_mean[m]) for m in metrics}, "perf": {}}
+for name, df in reports.items():
+    passed, total, accuracy = compute_accuracy(df)
+    summary["accuracy"][name] = {"passed": int(passed), "total": int(total), "accuracy": float(accuracy)}
+for name, df in list(reports.items()) + [(RAG_SUITE[0], normalize_columns(ragas.copy()))]:
+    perf = compute_perf(df)
+    if perf:
+        summary["perf"][name] = perf
+
+previous = load_previous()
+prev_accuracy = (previous or {}).get("accuracy", {})
+prev_ragas = (previous or {}).get("ragas", {})
+prev_perf = (previous or {}).get("perf", {})
+
+accuracy_lines = []
+for name, acc in summary["accuracy"].items():
+    prev = prev_accuracy.get(name, {}).get("accuracy")
+    accuracy_lines.append(
+        f"{name + ' Task':<17}: {acc['passed']}/{acc['total']}  | Accuracy = {acc['accuracy']:.4f} "
+        f"({acc['accuracy']*100:.2f}%){delta(acc['accuracy'] * 100, prev * 100 if prev is not None else None, '.2f')}"
+    )
+
+ragas_labels = {"faithfulness": "Faithfulness", "answer_relevancy": "Answer Relevancy",
+                "context_precision": "Context Precision", "context_recall": "Context Recall"}
+ragas_lines = [f"{ragas_labels[m]:<19}: {summary['ragas'][m]:.4f}{delta(summary['ragas'][m], prev_ragas.get(m), '.4f')}"
+               for m in metrics]
+
+perf_lines = []
+for name, perf in summary["perf"].items():
+    perf_lines.append(f"{name}:")
+    prev = prev_perf.get(name, {})
+    for label in LATENCY_COLUMNS.values():
+        if label in perf:
+            stats, before = perf[label], prev.get(label, {})
+            perf_lines.append(
+                f"  {label + ' (s)':<19}: p50 = {stats['p50']:.2f}{delta(stats['p50'], before.get('p50'), '.2f', pct=True)}"
+                f" | p95 = {stats['p95']:.2f}{delta(stats['p95'], before.get('p95'), '.2f', pct=True)}"
+                f" | tổng = {stats['total']:.1f}"
+            )
+    for label in COUNT_COLUMNS.values():
+        if label in perf:
+            stats, before = perf[label], prev.get(label, {})
+            perf_lines.append(
+                f"  {label:<19}: tổng = {stats['total']}{delta(stats['total'], before.get('total'), 'd', pct=True)}"
+                f" | trung bình / case = {stats['mean']:.1f}"
+            )
+if not perf_lines:
+    perf_lines.append("(Báo cáo chưa có cột hiệu năng - chạy lại các bộ đánh giá để ghi số liệu.)")
+
+previous_note = f"So với báo cáo trước: {previous['created_at']}" if previous else "Chưa có báo cáo trước để so sánh."
+newline = "\n"
+
 report = f"""
 ================ EVALUATION REPORT ================
 
+{previous_note}
+
 1. Accuracy (PASS / TOTAL)
 
-Chart Task       : {acc_chart[0]}/{acc_chart[1]}  | Accuracy = {acc_chart[2]:.4f} ({acc_chart[2]*100:.2f}%)
-Edge Cases Task  : {acc_edge[0]}/{acc_edge[1]}  | Accuracy = {acc_edge[2]:.4f} ({acc_edge[2]*100:.2f}%)
-Multihop Task    : {acc_multihop[0]}/{acc_multihop[1]}  | Accuracy = {acc_multihop[2]:.4f} ({acc_multihop[2]*100:.2f}%)
-SQL Task         : {acc_sql[0]}/{acc_sql[1]}  | Accuracy = {acc_sql[2]:.4f} ({acc_sql[2]*100:.2f}%)
+{newline.join(accuracy_lines)}
 
 ---------------------------------------------------
 
 2. RAGAS Metrics For RAG (Average)
 
-Faithfulness       : {ragas_mean['faithfulness']:.4f}
-Answer Relevancy   : {ragas_mean['answer_relevancy']:.4f}
-Context Precision  : {ragas_mean['context_precision']:.4f}
-Context Recall     : {ragas_mean['context_recall']:.4f}
+{newline.join(ragas_lines)}
+
+---------------------------------------------------
+
+3. Performance (per case: p50 / p95, totals)
+
+{newline.join(perf_lines)}
 
 ---------------------------------------------------
 
 Total RAGAS Samples: {len(ragas)}
-Total Evaluation Samples: {len(chart) + len(edge) + len(multihop) + len(sql) + len(ragas)}
+Total Evaluation Samples: {sum(len(df) for df in reports.values()) + len(ragas)}
 
 ===================================================
 """
 
-with open("evaluation_report.txt", "w", encoding="utf-8") as f:
+summary["created_at"] = pd.Timestamp.now().strftime("%Y-%m-%d %H:%M:%S")
+
+with open(os.path.join(BASE_DIR, "evaluation_report.txt"), "w", encoding="utf-8") as f:
     f.write(report)
 
+with open(SUMMARY_FILE, "w", encoding="utf-8") as f:
+    json.dump(summary, f, ensure_ascii=False, indent=2)
+
 print(report)
\ No newline at end of file
@@ -0,0 +1,133 @@
+import os
+import re
+import json
+import uuid
+import zlib
+import numpy as np
+from collections import defaultdict
+
+MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+class ChunkDeduplicator:
+    """
+    Phát hiện chunk gần trùng lặp bằng MinHash + LSH (banding) trên shingle theo từ.
+    Chạy theo luồng: mỗi batch chunk đi qua `filter()`, chunk trùng bị loại và trích dẫn (nguồn, trang)
+    của nó được gộp vào chunk gốc (canonical). Chỉ giữ chữ ký MinHash + trích dẫn của canonical
+    trong bộ nhớ (không giữ nội dung). Ánh xạ trùng lặp được ghi lại để kiểm tra về sau.
+    """
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 128, bands: int = 32,
+                 shingle_size: int = 3, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm phải chia hết cho bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, int(MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, int(MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._buckets = [defaultdict(list) for _ in range(bands)]
+        self._signatures = []
+        self._canonicals = []
+        self.duplicates = []
+        self._merged_ids = set()
+
+    def _shingle_hashes(self, text: str) -> np.ndarray:
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        if len(tokens) < self.shingle_size:
+            shingles = [" ".join(tokens)]
+        else:
+            shingles = {" ".join(tokens[i:i + self.shingle_size]) for i in range(len(tokens) - self.shingle_size + 1)}
+        return np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash vector hoá: (a*h + b) mod p trên toàn bộ shingle, lấy min theo từng hoán vị."""
+        hashes = self._shingle_hashes(text)
+        return ((np.outer(hashes, self._a) + self._b) % MERSENNE_PRIME).min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def _find_canonical(self, signature: np.ndarray):
+        best_idx, best_similarity = None, 0.0
+        seen = set()
+        for band, key in self._band_keys(signature):
+            for idx in self._buckets[band].get(key, ()):
+                if idx in seen:
+                    continue
+                seen.add(idx)
+                similarity = float(np.mean(self._signatures[idx] == signature))
+                if similarity > best_similarity:
+                    best_idx, best_similarity = idx, similarity
+        if best_similarity >= self.threshold:
+            return best_idx, best_similarity
+        return None, best_similarity
+
+    def filter(self, chunks: list) -> list:
+        """Trả về các chunk canonical mới trong batch (đã gán id), chunk trùng được gộp trích dẫn."""
+        kept = []
+        for chunk in chunks:
+            signature = self.signature(chunk.page_content)
+            idx, similarity = self._find_canonical(signature)
+            if idx is not None:
+                canonical = self._canonicals[idx]
+                self._merge_citation(canonical, chunk)
+                self._merged_ids.add(canonical["id"])
+                self.duplicates.append({
+                    "canonical_id": canonical["id"],
+                    "source": chunk.metadata.get("source"),
+                    "page": chunk.metadata.get("page"),
+                    "similarity": round(similarity, 4),
+                    "preview": chunk.page_content[:120],
+                })
+                continue
+
+            chunk.id = chunk.id or str(uuid.uuid4())
+            chunk.metadata["citations"] = [self._citation(chunk)]
+            idx = len(self._canonicals)
+            self._canonicals.append({"id": chunk.id, "citations": chunk.metadata["citations"]})
+            self._signatures.append(signature)
+            for band, key in self._band_keys(signature):
+                self._buckets[band][key].append(idx)
+            kept.append(chunk)
+        return kept
+
+    @staticmethod
+    def _citation(chunk) -> list:
+        """Trích dẫn [nguồn, trang] (list để lưu được vào metadata JSON)."""
+        return [chunk.metadata.get("source") or "", chunk.metadata.get("page", 0)]
+
+    @classmethod
+    def _merge_citation(cls, canonical: dict, duplicate):
+        """
+        Gộp cặp (nguồn, trang) của chunk trùng vào canonical. Danh sách được sửa tại chỗ nên
+        chunk canonical còn nằm trong batch chưa ghi xuống DB cũng nhận được trích dẫn mới.
+        """
+        citation = cls._citation(duplicate)
+        if citation not in canonical["citations"]:
+            canonical["citations"].append(citation)
+            canonical["citations"].sort()
+
+    def merged_canonicals(self) -> list:
+        """Các canonical đã nhận thêm trích dẫn (cần cập nhật metadata sau khi ghi xuống DB)."""
+        return [c for c in self._canonicals if c["id"] in self._merged_ids]
+
+    @property
+    def stats(self) -> dict:
+        total = len(self._canonicals) + len(self.duplicates)
+        return {
+            "total_chunks": total,
+            "canonical_chunks": len(self._canonicals),
+            "duplicates": len(self.duplicates),
+            "reduction": len(self.duplicates) / total if total else 0.0,
+        }
+
+    def save_mapping(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"stats": self.stats, "duplicates": self.duplicates}, f, ensure_ascii=False, indent=2)
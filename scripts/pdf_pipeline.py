@@ -0,0 +1,162 @@
+import os
+import re
+import glob
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import fitz
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+UPPERCASE_SPACING_PATTERN = re.compile(r'(?<=[A-ZÀ-Ỹ])\s+(?=[A-ZÀ-Ỹ])')
+SOFT_LINEBREAK_PATTERN = re.compile(r'(?<=[a-zà-ỹ])\n(?=[a-zà-ỹ])')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+def clean_text(text: str) -> str:
+    """Hàm làm sạch cho tiếng Việt và PDF (regex biên dịch sẵn ở cấp module)."""
+    text = UPPERCASE_SPACING_PATTERN.sub('', text)
+    text = text.replace('\x00', '').replace('…', '...')
+    text = SOFT_LINEBREAK_PATTERN.sub(' ', text)
+    text = WHITESPACE_PATTERN.sub(' ', text).strip()
+    return text
+
+
+def extract_page_range(pdf_path: str, start: int, stop: int) -> list:
+    """Chạy trong process con: đọc và làm sạch các trang [start, stop) của một file PDF."""
+    with fitz.open(pdf_path) as doc:
+        total_pages = doc.page_count
+        return [
+            {
+                "text": clean_text(doc[page_idx].get_text()),
+                "metadata": {"source": pdf_path, "file_path": pdf_path, "page": page_idx, "total_pages": total_pages},
+            }
+            for page_idx in range(start, stop)
+        ]
+
+
+class ParallelPDFPipeline:
+    """
+    Front-end ingest nhiều PDF: trích xuất + làm sạch trang song song bằng process pool,
+    cắt chunk theo luồng và đẩy xuống downstream qua hàng đợi có giới hạn,
+    nên bộ nhớ giữ ổn định bất kể kích thước kho tài liệu.
+    """
+
+    def __init__(self, source: str, workers: int = None, pages_per_task: int = 16,
+                 queue_size: int = 8, batch_size: int = 64, chunk_size: int = 1000, chunk_overlap: int = 200):
+        self.source = source
+        self.workers = workers or os.cpu_count() or 1
+        self.pages_per_task = pages_per_task
+        self.max_inflight = self.workers * 2
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size, 
+            chunk_overlap=chunk_overlap,
+            separators=["\n\n", "\n", ". ", "; ", " - ", " ", ""]
+        )
+        self.stats = {"files": 0, "pages": 0, "chunks": 0}
+
+    def list_pdf_paths(self) -> list:
+        """Nhận đường dẫn file, thư mục (quét đệ quy) hoặc glob pattern."""
+        if os.path.isdir(self.source):
+            pattern = os.path.join(self.source, "**", "*.pdf")
+            paths = glob.glob(pattern, recursive=True)
+        elif any(ch in self.source for ch in "*?["):
+            paths = glob.glob(self.source, recursive=True)
+        else:
+            paths = [self.source] if os.path.exists(self.source) else []
+        if not paths:
+            raise FileNotFoundError(f"Không tìm thấy file PDF nào tại: {self.source}")
+        return sorted(paths)
+
+    def _iter_tasks(self):
+        for pdf_path in self.list_pdf_paths():
+            with fitz.open(pdf_path) as doc:
+                page_count = doc.page_count
+            self.stats["files"] += 1
+            for start in range(0, page_count, self.pages_per_task):
+                yield pdf_path, start, min(start + self.pages_per_task, page_count)
+
+    def iter_pages(self):
+        """
+        Sinh từng trang đã làm sạch theo đúng thứ tự file/trang.
+        Số tác vụ đang chạy bị giới hạn (max_inflight) nên không đọc trước toàn bộ kho tài liệu.
+        """
+        tasks = self._iter_tasks()
+        inflight = deque()
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for task in tasks:
+                inflight.append(executor.submit(extract_page_range, *task))
+                if len(inflight) >= self.max_inflight:
+                    yield from self._pages_from(inflight.popleft())
+            while inflight:
+                yield from self._pages_from(inflight.popleft())
+
+    def _pages_from(self, future):
+        for page in future.result():
+            self.stats["pages"] += 1
+            yield Document(page_content=page["text"], metadata=page["metadata"])
+
+    def iter_chunks(self):
+        for page in self.iter_pages():
+            for chunk in self.text_splitter.split_documents([page]):
+                self.stats["chunks"] += 1
+                yield chunk
+
+    def iter_batches(self):
+        batch = []
+        for chunk in self.iter_chunks():
+            batch.append(chunk)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def run(self, consumer) -> dict:
+        """
+        Chạy pipeline: thread producer đẩy từng batch chunk vào hàng đợi có giới hạn,
+        thread gọi hàm này tiêu thụ bằng `consumer(batch)` (ví dụ: embed + ghi vào Vector DB).
+        Khi consumer chậm, hàng đợi đầy sẽ chặn producer (backpressure).
+        """
+        batches = queue.Queue(maxsize=self.queue_size)
+        done = object()
+        errors = []
+        stop = threading.Event()
+
+        def produce():
+            try:
+                for batch in self.iter_batches():
+                    while not stop.is_set():
+                        try:
+                            batches.put(batch, timeout=0.5)
+                            break
+                        except queue.Full:
+                            continue
+                    if stop.is_set():
+                        return
+            except Exception as e:
+                errors.append(e)
+            finally:
+                batches.put(done)
+
+        producer = threading.Thread(target=produce, name="pdf-pipeline-producer", daemon=True)
+        producer.start()
+        try:
+            while True:
+                batch = batches.get()
+                if batch is done:
+                    break
+                consumer(batch)
+        finally:
+            stop.set()
+            while producer.is_alive():
+                try:
+                    batches.get_nowait()
+                except queue.Empty:
+                    producer.join(timeout=0.1)
+        if errors:
+            raise errors[0]
+        return dict(self.stats)
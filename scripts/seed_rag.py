@@ -1,74 +1,143 @@
+import argparse
 import os
-import re
-from langchain_community.document_loaders import PyMuPDFLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+import uuid
 from langchain_openai import OpenAIEmbeddings
 from langchain_postgres import PGVector
+from sqlalchemy import update
+from sqlalchemy.orm import Session
 from config.settings import settings
+from core.database import get_engine, ROLE_WRITE
+from scripts.pdf_pipeline import ParallelPDFPipeline, clean_text
+from scripts.chunk_dedup import ChunkDeduplicator
+from tools.vector_index import VectorIndexManager
+from tools.local_vector_index import LocalVectorIndex
+from tools.hybrid_search import HybridSearchIndex
 
 class PolicyDocumentIngestor:
     """Class quản lý việc đọc, làm sạch và nhúng (embed) tài liệu PDF vào Vector DB."""
     
-    def __init__(self, pdf_path: str = "./data/policy.pdf"):
+    def __init__(self, pdf_path: str = "./data/policy.pdf", workers: int = None, dedup: bool = None,
+                 collection_name: str = settings.COLLECTION_NAME, hybrid: bool = None):
         self.pdf_path = pdf_path
+        self.collection_name = collection_name
+        # Cột tsvector + index GIN chỉ cần cho retriever hybrid (thêm cột sinh tự động sẽ ghi lại toàn bảng)
+        self.hybrid = settings.RAG_RETRIEVER == "hybrid" if hybrid is None else hybrid
+        use_dedup = settings.DEDUP_ENABLED if dedup is None else dedup
+        self.deduplicator = ChunkDeduplicator(threshold=settings.DEDUP_THRESHOLD) if use_dedup else None
+        self.pipeline = ParallelPDFPipeline(pdf_path, workers=workers)
         self.embeddings = OpenAIEmbeddings(model=settings.EMBEDDING_MODEL)
+        self.engine = get_engine(ROLE_WRITE)
         self.vector_store = PGVector(
             embeddings=self.embeddings,
-            collection_name=settings.COLLECTION_NAME,
-            connection=settings.DATABASE_URL,
+            collection_name=self.collection_name,
+            connection=self.engine,
+            embedding_length=settings.EMBEDDING_DIMENSIONS,
             use_jsonb=True,
         )
+        self.index_manager = VectorIndexManager(self.engine, collection_name=self.collection_name)
 
     @staticmethod
     def advanced_clean_text(text: str) -> str:
         """Hàm làm sạch cho tiếng Việt và PDF."""
-        text = re.sub(r'(?<=[A-ZÀ-Ỹ])\s+(?=[A-ZÀ-Ỹ])', '', text) 
-        text = text.replace('\x00', '').replace('…', '...')
-        text = re.sub(r'(?<=[a-zà-ỹ])\n(?=[a-zà-ỹ])', ' ', text)
-        text = re.sub(r'\s+', ' ', text).strip()
-        return text
+        return clean_text(text)
 
     def load_and_split(self):
-        if not os.path.exists(self.pdf_path):
-            raise FileNotFoundError(f"Không tìm thấy file: {self.pdf_path}")
-
-        print(f"Đang đọc file: {self.pdf_path}...")
-        loader = PyMuPDFLoader(self.pdf_path)
-        documents = loader.load()
-        
-        for doc in documents:
-            doc.page_content = self.advanced_clean_text(doc.page_content)
-
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000, 
-            chunk_overlap=200,
-            separators=["\n\n", "\n", ". ", "; ", " - ", " ", ""]
-        )
-        
-        chunks = text_splitter.split_documents(documents)
+        """Đọc toàn bộ chunk vào bộ nhớ (dùng cho debug / kho tài liệu nhỏ)."""
+        print(f"Đang đọc tài liệu: {self.pdf_path}...")
+        chunks = list(self.pipeline.iter_chunks())
         print(f"Đã cắt thành {len(chunks)} đoạn (chunks) chất lượng cao.")
         return chunks
 
-    def ingest_to_db(self, chunks):
-        print("Đang làm sạch Database cũ...")
-        self.vector_store.drop_tables()
+    def _reset_collection(self) -> str:
+        # Chỉ xóa collection đang nạp, các collection (shard) khác giữ nguyên
+        print(f"Đang làm sạch collection cũ: {self.collection_name}...")
+        self.vector_store.create_tables_if_not_exists()
+        # DB nạp bởi phiên bản cũ còn cột embedding chưa khai báo số chiều -> index ANN không tạo được
+        self.index_manager.ensure_typed_column(settings.EMBEDDING_DIMENSIONS)
+        self.vector_store.delete_collection()
         
         print("Đang khởi tạo bảng Vector...")
-        self.vector_store.create_tables_if_not_exists()
+        ingest_version = uuid.uuid4().hex
+        self.vector_store.collection_metadata = {"ingest_version": ingest_version}
         self.vector_store.create_collection()
+        return ingest_version
+
+    def _write_chunks(self, batch):
+        """Loại chunk gần trùng (nếu bật) rồi embed + ghi batch vào Vector DB."""
+        if self.deduplicator is not None:
+            batch = self.deduplicator.filter(batch)
+        if batch:
+            self.vector_store.add_documents(batch, ids=[doc.id for doc in batch])
+
+    def _finalize_dedup(self):
+        """
+        Cập nhật trích dẫn (citations: các cặp [nguồn, trang]) cho các chunk canonical đã được ghi trước khi
+        gặp bản trùng, và lưu ánh xạ trùng lặp để kiểm tra.
+        """
+        if self.deduplicator is None:
+            return
+
+        merged = self.deduplicator.merged_canonicals()
+        if merged:
+            store = self.vector_store.EmbeddingStore
+            with Session(self.engine) as session:
+                for canonical in merged:
+                    cmetadata = store.cmetadata.op("||")({"citations": canonical["citations"]})
+                    session.execute(update(store).where(store.id == canonical["id"]).values(cmetadata=cmetadata))
+                session.commit()
+
+        mapping_path = os.path.join(settings.DEDUP_MAPPING_DIR, f"{self.collection_name}.json")
+        self.deduplicator.save_mapping(mapping_path)
+        stats = self.deduplicator.stats
+        print(f"Dedup: giữ {stats['canonical_chunks']}/{stats['total_chunks']} chunks "
+              f"(loại {stats['duplicates']} bản gần trùng, giảm {stats['reduction']:.1%}). Ánh xạ: {mapping_path}")
+
+    def _finalize_indexes(self, ingest_version: str):
+        self.index_manager.create_index()
+        if self.hybrid:
+            HybridSearchIndex(self.engine, self.collection_name).setup()
+
+        if settings.RAG_RETRIEVER == "numpy":
+            LocalVectorIndex(self.vector_store).rebuild(ingest_version)
+        print("Hoàn tất nhúng dữ liệu!")
+
+    def ingest_to_db(self, chunks):
+        ingest_version = self._reset_collection()
         
         print("Đang Embed và lưu vào Neon DB...")
-        self.vector_store.add_documents(chunks)
-        print("Hoàn tất nhúng dữ liệu!")
+        self._write_chunks(chunks)
+        self._finalize_dedup()
+        self._finalize_indexes(ingest_version)
+
+    def ingest_streaming(self):
+        """Ingest theo luồng: trang được xử lý song song, chunk được embed theo từng batch."""
+        ingest_version = self._reset_collection()
+
+        print(f"Đang Embed và lưu vào Neon DB (stream từ {self.pdf_path}, {self.pipeline.workers} worker)...")
+        stats = self.pipeline.run(self._write_chunks)
+        print(f"Đã xử lý {stats['files']} file, {stats['pages']} trang, {stats['chunks']} chunks.")
+        self._finalize_dedup()
+        self._finalize_indexes(ingest_version)
 
     def run(self):
         """Hàm kích hoạt toàn bộ quy trình."""
         try:
-            chunks = self.load_and_split()
-            self.ingest_to_db(chunks)
+            self.ingest_streaming()
         except Exception as e:
             print(f"Lỗi trong quá trình ingest: {e}")
 
 if __name__ == "__main__":
-    ingestor = PolicyDocumentIngestor()
+    parser = argparse.ArgumentParser(description="Nạp tài liệu chính sách PDF vào Vector DB.")
+    parser.add_argument("--source", default="./data/policy.pdf", help="File PDF, thư mục hoặc glob pattern")
+    parser.add_argument("--workers", type=int, default=None, help="Số process trích xuất PDF (mặc định: số CPU)")
+    parser.add_argument("--no-dedup", action="store_true", help="Tắt loại bỏ chunk gần trùng")
+    parser.add_argument("--collection", default=settings.COLLECTION_NAME,
+                        help="Collection (shard) nhận tài liệu, nên nằm trong RAG_COLLECTIONS")
+    parser.add_argument("--hybrid", action="store_true",
+                        help="Dựng cột tsvector + index GIN cho retriever hybrid (mặc định: khi RAG_RETRIEVER=hybrid)")
+    args = parser.parse_args()
+
+    ingestor = PolicyDocumentIngestor(pdf_path=args.source, workers=args.workers,
+                                      dedup=False if args.no_dedup else None, collection_name=args.collection,
+                                      hybrid=True if args.hybrid else None)
     ingestor.run()
\ No newline at end of file
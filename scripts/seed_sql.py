@@ -1,13 +1,13 @@
 import random
 from faker import Faker
-from sqlalchemy import create_engine, text
-from config.settings import settings
+from sqlalchemy import text
+from core.database import get_engine, ROLE_WRITE
 
 class SQLDatabaseSeeder:
     """Class quản lý việc tạo Schema và sinh dữ liệu mẫu cho Database bán hàng."""
     
     def __init__(self):
-        self.engine = create_engine(settings.DATABASE_URL)
+        self.engine = get_engine(ROLE_WRITE)
         self.fake = Faker()
 
     def create_schema(self):
@@ -0,0 +1,116 @@
+import argparse
+import json
+import numpy as np
+from collections import defaultdict
+
+DEFAULT_TRACE_FILE = ".cache/traces/spans.jsonl"
+
+
+def load_spans(path: str) -> list:
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                spans.append(json.loads(line))
+    return spans
+
+
+def summarize(spans: list, kinds: tuple = ("graph", "node", "tool", "llm")) -> list:
+    """Gom span theo (kind, name): số lần, p50/p95/p99, thời gian chờ, token, tỉ lệ cache hit, lỗi."""
+    groups = defaultdict(list)
+    for span in spans:
+        if span["kind"] in kinds:
+            groups[(span["kind"], span["name"])].append(span)
+
+    rows = []
+    for (kind, name), items in groups.items():
+        durations = np.array([s["duration_ms"] for s in items])
+        attributes = [s.get("attributes") or {} for s in items]
+        cache_flags = [a["cache_hit"] for a in attributes if "cache_hit" in a]
+        p50, p95, p99 = np.percentile(durations, [50, 95, 99])
+        rows.append({
+            "kind": kind,
+            "name": name,
+            "count": len(items),
+            "p50_ms": p50,
+            "p95_ms": p95,
+            "p99_ms": p99,
+            "total_ms": durations.sum(),
+            "queue_wait_ms": np.mean([s.get("queue_wait_ms", 0.0) for s in items]),
+            "prompt_tokens": sum(a.get("prompt_tokens", 0) for a in attributes),
+            "completion_tokens": sum(a.get("completion_tokens", 0) for a in attributes),
+            "cache_hit_rate": np.mean(cache_flags) if cache_flags else None,
+            "retries": sum(1 for a in attributes if a.get("retry_count", 0) > 0),
+            "errors": sum(1 for s in items if s.get("status") == "error"),
+        })
+    order = {kind: i for i, kind in enumerate(kinds)}
+    return sorted(rows, key=lambda r: (order[r["kind"]], -r["total_ms"]))
+
+
+def llm_by_node(spans: list) -> dict:
+    """Token và thời gian gọi LLM theo node của graph (node nào tốn nhiều nhất)."""
+    usage = defaultdict(lambda: {"calls": 0, "duration_ms": 0.0, "prompt_tokens": 0, "completion_tokens": 0})
+    for span in spans:
+        if span["kind"] != "llm":
+            continue
+        attributes = span.get("attributes") or {}
+        entry = usage[attributes.get("node") or "?"]
+        entry["calls"] += 1
+        entry["duration_ms"] += span["duration_ms"]
+        entry["prompt_tokens"] += attributes.get("prompt_tokens", 0)
+        entry["completion_tokens"] += attributes.get("completion_tokens", 0)
+    return dict(usage)
+
+
+def slowest_traces(spans: list, top: int) -> list:
+    """Các trace chậm nhất kèm thời gian của từng node theo thứ tự chạy."""
+    roots = sorted((s for s in spans if s["kind"] == "graph"), key=lambda s: -s["duration_ms"])[:top]
+    nodes = defaultdict(list)
+    for span in spans:
+        if span["kind"] == "node":
+            nodes[span["trace_id"]].append(span)
+    return [(root, sorted(nodes[root["trace_id"]], key=lambda s: s["start_ns"])) for root in roots]
+
+
+def print_report(spans: list, top: int):
+    traces = {s["trace_id"] for s in spans}
+    print(f"Tổng cộng {len(spans)} span trong {len(traces)} trace.\n")
+
+    header = (f"{'kind':<6} {'name':<28} {'n':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'chờ ms':>8} "
+              f"{'tok vào':>9} {'tok ra':>8} {'cache':>6} {'retry':>6} {'lỗi':>5}")
+    print(header)
+    print("-" * len(header))
+    for row in summarize(spans):
+        cache = f"{row['cache_hit_rate']:.0%}" if row["cache_hit_rate"] is not None else "-"
+        print(f"{row['kind']:<6} {row['name'][:28]:<28} {row['count']:>6} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} "
+              f"{row['p99_ms']:>9.1f} {row['queue_wait_ms']:>8.1f} {row['prompt_tokens']:>9} "
+              f"{row['completion_tokens']:>8} {cache:>6} {row['retries']:>6} {row['errors']:>5}")
+
+    usage = llm_by_node(spans)
+    if usage:
+        print("\nGọi LLM theo node:")
+        for node, entry in sorted(usage.items(), key=lambda item: -item[1]["duration_ms"]):
+            print(f"  {node:<20} {entry['calls']:>5} lần  {entry['duration_ms']:>10.0f} ms  "
+                  f"{entry['prompt_tokens']:>8} tok vào  {entry['completion_tokens']:>7} tok ra")
+
+    if top:
+        print(f"\n{top} trace chậm nhất:")
+        for root, nodes in slowest_traces(spans, top):
+            breakdown = " -> ".join(f"{n['name']} {n['duration_ms']:.0f}" for n in nodes)
+            print(f"  {root['trace_id'][:12]} {root['duration_ms']:>8.0f} ms (chờ {root.get('queue_wait_ms', 0):.0f} ms): {breakdown}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Thống kê p50/p95/p99 theo node / tool / LLM từ file trace JSONL.")
+    parser.add_argument("trace_file", nargs="?", default=DEFAULT_TRACE_FILE, help="File span JSONL (TRACE_JSONL_PATH)")
+    parser.add_argument("--top", type=int, default=5, help="Số trace chậm nhất cần liệt kê (0 để tắt)")
+    parser.add_argument("--json", action="store_true", help="In bảng thống kê dạng JSON")
+    args = parser.parse_args()
+
+    spans = load_spans(args.trace_file)
+    if args.json:
+        print(json.dumps({"spans": summarize(spans), "llm_by_node": llm_by_node(spans)}, ensure_ascii=False,
+                         indent=2, default=float))
+    else:
+        print_report(spans, args.top)
@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+
+from api.admission import AdmissionController, AdmissionRejected, SessionLocks
+from api.sessions import SessionTokens
+
+
+def test_admission_queues_then_admits_after_release():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=1)
+        await controller.acquire()
+        waiter = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0)
+        assert controller.waiting == 1 and controller.saturated
+
+        controller.release()
+        await waiter
+        assert controller.active == 1 and controller.waiting == 0
+        return controller.snapshot()
+
+    snapshot = asyncio.run(scenario())
+    assert snapshot["admitted"] == 2 and snapshot["completed"] == 1
+
+
+def test_admission_rejects_when_queue_full():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=0, queue_timeout=1)
+        await controller.acquire()
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire()
+        return controller.stats
+
+    assert asyncio.run(scenario())["rejected_queue_full"] == 1
+
+
+def test_admission_rejects_after_queue_timeout():
+    async def scenario():
+        controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=0.05)
+        await controller.acquire()
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire()
+        return controller
+
+    controller = asyncio.run(scenario())
+    assert controller.stats["rejected_timeout"] == 1
+    assert controller.waiting == 0
+
+
+def test_session_locks_serialize_turns_and_clean_up():
+    async def scenario():
+        locks, order = SessionLocks(), []
+
+        async def turn(name):
+            async with locks.hold("s1"):
+                order.append(f"{name}-start")
+                await asyncio.sleep(0.01)
+                order.append(f"{name}-end")
+
+        await asyncio.gather(turn("a"), turn("b"))
+        return locks, order
+
+    locks, order = asyncio.run(scenario())
+    assert order == ["a-start", "a-end", "b-start", "b-end"]
+    assert locks._locks == {} and locks._users == {}
+
+
+def test_session_tokens_accept_only_issued_ids():
+    tokens = SessionTokens(secret="secret")
+    issued = tokens.issue()
+
+    assert tokens.verify(issued)
+    assert SessionTokens(secret="secret").verify(issued)
+    assert not SessionTokens(secret="other").verify(issued)
+    assert not tokens.verify(issued.split(".")[0])
+    assert not tokens.verify(issued[:-1] + ("0" if issued[-1] != "0" else "1"))
+    assert not tokens.verify(None)
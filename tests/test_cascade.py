@@ -0,0 +1,93 @@
+import pytest
+from pydantic import ValidationError
+from langchain_core.runnables import RunnableLambda
+
+from agent.cascade import EscalationStats, ModelCascade
+from core.state import RouteResponse
+
+
+class FakeModel:
+    """Model giả: with_structured_output trả về runnable sinh ra `output` (hoặc ném lỗi nếu là exception)."""
+
+    def __init__(self, output):
+        self.output = output
+        self.calls = 0
+
+    def _respond(self, prompt):
+        self.calls += 1
+        if isinstance(self.output, Exception):
+            raise self.output
+        return self.output
+
+    def with_structured_output(self, schema):
+        return RunnableLambda(self._respond)
+
+
+def _invalid_output() -> ValidationError:
+    try:
+        RouteResponse(reasoning="x", is_out_of_scope=False, confidence=2.0)
+    except ValidationError as e:
+        return e
+
+
+def _cascade(fast_output, enabled: bool = True):
+    fast = FakeModel(fast_output)
+    strong = FakeModel(RouteResponse(reasoning="strong", is_out_of_scope=True, confidence=0.95))
+    stats = EscalationStats()
+    return ModelCascade(fast, strong, enabled=enabled, min_confidence=0.7, stats=stats), fast, strong, stats
+
+
+def test_confident_fast_answer_is_kept():
+    cascade, fast, strong, stats = _cascade(RouteResponse(reasoning="fast", is_out_of_scope=False, confidence=0.9))
+
+    result = cascade.structured("agent_router", RouteResponse, "prompt")
+
+    assert result.reasoning == "fast"
+    assert (fast.calls, strong.calls) == (1, 0)
+    assert stats.snapshot()["agent_router"]["escalations"] == 0
+
+
+@pytest.mark.parametrize("confidence", [0.3, None])
+def test_low_or_missing_confidence_escalates(confidence):
+    cascade, fast, strong, stats = _cascade(RouteResponse(reasoning="fast", is_out_of_scope=False, confidence=confidence))
+
+    result = cascade.structured("agent_router", RouteResponse, "prompt")
+
+    assert result.reasoning == "strong"
+    assert stats.snapshot()["agent_router"]["reasons"] == {"low_confidence": 1}
+
+
+def test_invalid_output_escalates():
+    cascade, fast, strong, stats = _cascade(_invalid_output())
+
+    result = cascade.structured("agent_router", RouteResponse, "prompt")
+
+    assert result.reasoning == "strong"
+    assert stats.snapshot()["agent_router"]["reasons"] == {"invalid_output": 1}
+
+
+def test_disabled_cascade_uses_strong_without_escalating():
+    cascade, fast, strong, stats = _cascade(RouteResponse(reasoning="fast", is_out_of_scope=False), enabled=False)
+
+    result = cascade.structured("agent_router", RouteResponse, "prompt")
+
+    assert result.reasoning == "strong"
+    assert (fast.calls, strong.calls) == (0, 1)
+    assert stats.snapshot()["agent_router"]["escalations"] == 0
+
+
+def test_invalid_output_is_raised_when_node_cannot_escalate():
+    cascade, fast, strong, stats = _cascade(_invalid_output())
+    cascade.node_models = {"agent_router": "strong"}
+    strong.output = _invalid_output()
+
+    with pytest.raises(ValidationError):
+        cascade.structured("agent_router", RouteResponse, "prompt")
+    assert strong.calls == 1
+
+
+def test_node_models_are_validated():
+    with pytest.raises(ValueError):
+        ModelCascade(FakeModel(None), FakeModel(None), node_models={"unknown_node": "fast"})
+    with pytest.raises(ValueError):
+        ModelCascade(FakeModel(None), FakeModel(None), node_models={"agent": "huge"})
@@ -0,0 +1,50 @@
+import pytest
+from langchain_core.documents import Document
+
+from scripts.chunk_dedup import ChunkDeduplicator
+
+BASE = ("Nhân viên chính thức được nghỉ phép năm mười hai ngày làm việc mỗi năm và được cộng thêm một ngày "
+        "cho mỗi năm năm thâm niên tại công ty theo quy định của bộ luật lao động hiện hành")
+
+
+def _chunk(text: str, page: int, source: str = "policy.pdf") -> Document:
+    return Document(page_content=text, metadata={"source": source, "page": page})
+
+
+def test_signature_is_deterministic_for_same_seed():
+    a, b = ChunkDeduplicator(seed=7), ChunkDeduplicator(seed=7)
+    assert (a.signature(BASE) == b.signature(BASE)).all()
+    assert len(a.signature(BASE)) == a.num_perm
+
+
+def test_near_duplicate_is_dropped_and_citation_merged():
+    dedup = ChunkDeduplicator(threshold=0.8)
+    kept = dedup.filter([_chunk(BASE, 1), _chunk(BASE + " hiện nay", 5)])
+
+    assert len(kept) == 1
+    assert kept[0].metadata["citations"] == [["policy.pdf", 1], ["policy.pdf", 5]]
+    assert dedup.duplicates[0]["canonical_id"] == kept[0].id
+    assert [c["id"] for c in dedup.merged_canonicals()] == [kept[0].id]
+
+
+def test_distinct_chunks_are_kept_across_batches():
+    dedup = ChunkDeduplicator()
+    first = dedup.filter([_chunk(BASE, 1)])
+    second = dedup.filter([_chunk("Quy trình hoàn tiền cho khách hàng được xử lý trong vòng bảy ngày làm việc", 2)])
+
+    assert len(first) == len(second) == 1
+    assert dedup.stats == {"total_chunks": 2, "canonical_chunks": 2, "duplicates": 0, "reduction": 0.0}
+
+
+def test_exact_duplicate_from_same_page_keeps_single_citation():
+    dedup = ChunkDeduplicator()
+    kept = dedup.filter([_chunk(BASE, 3), _chunk(BASE, 3)])
+
+    assert len(kept) == 1
+    assert kept[0].metadata["citations"] == [["policy.pdf", 3]]
+    assert dedup.stats["reduction"] == 0.5
+
+
+def test_num_perm_must_be_divisible_by_bands():
+    with pytest.raises(ValueError):
+        ChunkDeduplicator(num_perm=100, bands=32)
@@ -0,0 +1,88 @@
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from agent.direct_answer import format_number, parse_sql_result, render_direct_answer
+
+
+def _turn(tool: str, result: str, answer: str, status: str = "success") -> list:
+    call = {"name": tool, "args": {}, "id": "call_1"}
+    return [
+        HumanMessage(content="câu hỏi cũ"),
+        AIMessage(content="trả lời cũ"),
+        HumanMessage(content="câu hỏi"),
+        AIMessage(content="", tool_calls=[call]),
+        ToolMessage(content=result, name=tool, tool_call_id="call_1", status=status),
+        AIMessage(content=answer),
+    ]
+
+
+@pytest.mark.parametrize("value, locale, expected", [
+    (1250000.5, "vi", "1.250.000,50"),
+    (1250000.5, "en", "1,250,000.50"),
+    (1250000, "vi", "1.250.000"),
+    (-1500, "en", "-1,500"),
+    (0.3, "vi", "0,30"),
+])
+def test_format_number(value, locale, expected):
+    assert format_number(value, locale) == expected
+
+
+def test_parse_sql_result_reads_literals_and_columns():
+    rows, columns = parse_sql_result("[('A', Decimal('12.50'), -3)]\nDATA_HANDLE: df_1 (cột: category, total, delta)")
+
+    assert rows == [["A", 12.5, -3]]
+    assert columns == ["category", "total", "delta"]
+    assert parse_sql_result("[(datetime.date(2024, 1, 1),)]\n(cột: day)") == ([[None]], ["day"])
+    assert parse_sql_result("Lỗi SQL: relation does not exist") is None
+
+
+def test_scalar_sql_answer_formats_number():
+    messages = _turn("query_sql_db", "[(Decimal('1250000.50'),)]\n(cột: total_revenue)",
+                     "Tổng doanh thu: 1250000.50")
+
+    assert render_direct_answer(messages, locale="vi") == "Tổng doanh thu là 1.250.000,50."
+
+
+def test_year_columns_are_not_formatted():
+    messages = _turn("query_sql_db", "[(2024, 1500000)]\n(cột: year, revenue)", "Năm 2024 có doanh thu 1500000")
+
+    assert render_direct_answer(messages, locale="en") == "Năm 2024 có doanh thu 1,500,000."
+
+
+def test_small_table_is_rendered_as_list():
+    result = "[('A', 1200), ('B', 900)]\nDATA_HANDLE: df_1 (cột: category, orders)"
+    messages = _turn("query_sql_db", result, "Số đơn theo danh mục:\n- A: 1200\n- B: 900")
+
+    assert render_direct_answer(messages, locale="vi") == "Số đơn theo danh mục:\n- A: 1.200\n- B: 900"
+
+
+def test_policy_answer_gets_citation_from_tool_result():
+    messages = _turn("search_policy_docs", "Nội dung... [NGUỒN: TRANG 4]",
+                     "Nhân viên được nghỉ phép 12 ngày mỗi năm.")
+
+    assert render_direct_answer(messages, locale="vi") == "Nhân viên được nghỉ phép 12 ngày mỗi năm [Trang 4]."
+
+
+def test_policy_answer_citing_unknown_page_falls_back():
+    messages = _turn("search_policy_docs", "Nội dung... [NGUỒN: TRANG 4]",
+                     "Nhân viên được nghỉ phép 12 ngày mỗi năm (trang 9).")
+
+    assert render_direct_answer(messages) is None
+
+
+def test_pii_is_masked():
+    messages = _turn("query_sql_db", "[('an.nguyen@gmail.com',)]\n(cột: email)",
+                     "Email khách hàng: an.nguyen@gmail.com")
+
+    assert render_direct_answer(messages, locale="vi") == "Email khách hàng là a***@gmail.com."
+
+
+@pytest.mark.parametrize("messages", [
+    _turn("query_sql_db", "Lỗi SQL: syntax error", "Không truy vấn được", status="error"),
+    _turn("python_chart_maker", "Đã vẽ biểu đồ", "Biểu đồ đã được tạo"),
+    _turn("query_sql_db", str([(i,) for i in range(50)]) + "\n(cột: n)", "Có 50 dòng"),
+    _turn("query_sql_db", "[(1,)]\n(cột: n)", "GENERAL_CHAT"),
+    [HumanMessage(content="câu hỏi"), AIMessage(content="", tool_calls=[{"name": "query_sql_db", "args": {}, "id": "c"}])],
+])
+def test_complex_turns_fall_back_to_final_answer(messages):
+    assert render_direct_answer(messages) is None
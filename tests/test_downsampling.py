@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+from config.settings import settings
+from tools import downsampling
+from tools.chart_renderer import OTHER_LABEL, ChartRenderer, ChartSpec
+
+
+def test_lttb_keeps_endpoints_and_requested_size():
+    x = np.arange(10_000)
+    y = np.sin(x / 200.0)
+    keep = downsampling.lttb_indices(x, y, 500)
+
+    assert len(keep) == 500
+    assert keep[0] == 0 and keep[-1] == len(x) - 1
+    assert np.all(np.diff(keep) > 0)
+
+
+def test_lttb_keeps_spike():
+    y = np.zeros(5_000)
+    y[1234] = 100.0
+    keep = downsampling.lttb_indices(np.arange(len(y)), y, 100)
+
+    assert 1234 in keep
+
+
+def test_lttb_returns_all_points_when_small_enough():
+    assert list(downsampling.lttb_indices([0, 1, 2], [1.0, 2.0, 3.0], 10)) == [0, 1, 2]
+
+
+def test_lttb_accepts_datetime_x():
+    x = pd.date_range("2024-01-01", periods=2_000, freq="h").values
+    keep = downsampling.lttb_indices(x, np.random.default_rng(0).normal(size=2_000), 200)
+
+    assert len(keep) == 200
+
+
+def test_reduce_plot_args_only_touches_simple_calls():
+    y = np.arange(5_000, dtype=float)
+    x_reduced, y_reduced, fmt = downsampling.reduce_plot_args((np.arange(5_000), y, "r-"), 300)
+
+    assert len(x_reduced) == len(y_reduced) == 300 and fmt == "r-"
+    assert downsampling.reduce_plot_args((np.ones((5_000, 2)),), 300)[0].shape == (5_000, 2)
+
+
+def test_top_n_indices_keeps_largest_in_original_order():
+    top, rest = downsampling.top_n_indices([5, 1, 9, 3, 7], 3)
+
+    assert list(top) == [0, 2, 4]
+    assert list(rest) == [1, 3]
+
+
+def test_bar_chart_groups_small_categories_into_other(monkeypatch):
+    monkeypatch.setattr(settings, "CHART_MAX_CATEGORIES", 4)
+    data = pd.DataFrame({"revenue": [50.0, 5.0, 40.0, 1.0, 30.0, 2.0]}, index=list("abcdef"))
+    spec = ChartSpec(chart_type="bar", x="category", y="revenue")
+
+    reduced, note = ChartRenderer(pool_size=1).reduce(spec, data)
+
+    assert list(reduced.index) == ["a", "c", "e", OTHER_LABEL]
+    assert reduced.loc[OTHER_LABEL, "revenue"] == 8.0
+    assert reduced["revenue"].sum() == data["revenue"].sum()
+    assert OTHER_LABEL in note
@@ -0,0 +1,100 @@
+import pytest
+from langchain_core.tools import tool
+
+from agent.planner import PlanExecutor
+from core.state import ToolPlan, ToolPlanStep
+
+
+@tool
+def query_sql_db(query: str) -> str:
+    """Chạy SQL."""
+    if "fail" in query:
+        return "Lỗi SQL: syntax error"
+    return "[(1,), (2,)]\nDATA_HANDLE: df_abc (cột: n)"
+
+
+@tool
+def render_chart(data_handle: str) -> str:
+    """Vẽ biểu đồ từ data handle."""
+    return f"chart:{data_handle}"
+
+
+def _plan(*steps) -> ToolPlan:
+    return ToolPlan(reasoning="", steps=[
+        ToolPlanStep(id=step_id, tool=name, args_json=args, depends_on=list(deps)) for step_id, name, args, deps in steps
+    ])
+
+
+@pytest.fixture
+def executor():
+    return PlanExecutor([query_sql_db, render_chart], max_steps=3, max_workers=2)
+
+
+def test_placeholders_become_dependencies(executor):
+    steps = executor.prepare(_plan(
+        ("s1", "query_sql_db", '{"query": "SELECT 1"}', ()),
+        ("s2", "render_chart", '{"data_handle": "{s1.data_handle}"}', ()),
+    ))
+
+    assert [step["depends_on"] for step in steps] == [[], ["s1"]]
+    assert steps[0]["call_id"] != steps[1]["call_id"]
+
+
+def test_cycle_is_rejected(executor):
+    with pytest.raises(ValueError, match="phụ thuộc vòng"):
+        executor.prepare(_plan(
+            ("s1", "query_sql_db", '{"query": "{s2}"}', ()),
+            ("s2", "query_sql_db", '{"query": "SELECT 1"}', ("s1",)),
+        ))
+
+
+def test_self_dependency_is_rejected(executor):
+    with pytest.raises(ValueError, match="s1"):
+        executor.prepare(_plan(("s1", "query_sql_db", '{"query": "SELECT 1"}', ("s1",))))
+
+
+def test_unknown_tool_is_rejected(executor):
+    with pytest.raises(ValueError, match="delete_everything"):
+        executor.prepare(_plan(("s1", "delete_everything", "{}", ())))
+
+
+def test_step_limit_is_enforced(executor):
+    with pytest.raises(ValueError, match="tối đa 3"):
+        executor.prepare(_plan(*[(f"s{i}", "query_sql_db", '{"query": "SELECT 1"}', ()) for i in range(4)]))
+
+
+@pytest.mark.parametrize("args_json", ["{not json", "[1, 2]"])
+def test_invalid_args_are_rejected(executor, args_json):
+    with pytest.raises(ValueError, match="args_json"):
+        executor.prepare(_plan(("s1", "query_sql_db", args_json, ())))
+
+
+def test_duplicate_ids_and_unknown_dependencies_are_rejected(executor):
+    with pytest.raises(ValueError, match="trùng"):
+        executor.prepare(_plan(("s1", "query_sql_db", "{}", ()), ("s1", "render_chart", "{}", ())))
+    with pytest.raises(ValueError, match="s9"):
+        executor.prepare(_plan(("s1", "query_sql_db", "{}", ("s9",))))
+
+
+def test_execute_passes_data_handle_to_dependent_step(executor):
+    steps = executor.prepare(_plan(
+        ("s1", "query_sql_db", '{"query": "SELECT n"}', ()),
+        ("s2", "render_chart", '{"data_handle": "{s1.data_handle}"}', ()),
+    ))
+    results = executor.execute(steps)
+
+    assert results[1].content == "chart:df_abc"
+    assert [message.tool_call_id for message in results] == [step["call_id"] for step in steps]
+
+
+def test_execute_skips_steps_depending_on_failed_step(executor):
+    steps = executor.prepare(_plan(
+        ("s1", "query_sql_db", '{"query": "fail"}', ()),
+        ("s2", "render_chart", '{"data_handle": "{s1.data_handle}"}', ()),
+        ("s3", "query_sql_db", '{"query": "SELECT n"}', ()),
+    ))
+    results = executor.execute(steps)
+
+    assert results[0].content.startswith("Lỗi SQL")
+    assert results[1].status == "error" and "s1" in results[1].content
+    assert results[2].content.startswith("[(1,)")
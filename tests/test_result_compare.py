@@ -0,0 +1,67 @@
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+
+from evaluation.evaluation_src.result_compare import compare_dataframes
+
+
+def test_ignores_row_order_and_column_names():
+    expected = pd.DataFrame({"category": ["A", "B", "C"], "total": [10, 20, 30]})
+    agent = pd.DataFrame({"cat": ["C", "A", "B"], "revenue": [30, 10, 20]})
+
+    assert compare_dataframes(expected, agent)[0]
+
+
+def test_decimal_and_float_are_equal():
+    expected = pd.DataFrame({"total": [Decimal("12.50"), Decimal("0.30")]})
+    agent = pd.DataFrame({"total": [12.5, 0.1 + 0.2]})
+
+    assert compare_dataframes(expected, agent)[0]
+
+
+def test_values_within_tolerance_match():
+    expected = pd.DataFrame({"k": ["a", "b"], "v": [1.0, 2.0]})
+    agent = pd.DataFrame({"k": ["a", "b"], "v": [1.0 + 4e-7, 2.0]})
+
+    matched, reason = compare_dataframes(expected, agent, decimals=9)
+    assert matched and "dung sai" in reason
+
+
+def test_duplicate_rows_are_counted():
+    expected = pd.DataFrame({"k": ["a", "a", "b"]})
+    agent = pd.DataFrame({"k": ["a", "b", "b"]})
+
+    assert not compare_dataframes(expected, agent)[0]
+
+
+def test_nulls_of_different_kinds_match():
+    expected = pd.DataFrame({"name": ["x", None], "v": [1.0, np.nan]})
+    agent = pd.DataFrame({"name": ["x", np.nan], "v": [1.0, None]})
+
+    assert compare_dataframes(expected, agent)[0]
+
+
+def test_datetimes_compare_across_timezones():
+    utc = pd.DataFrame({"ts": pd.to_datetime(["2024-01-01 07:00"]).tz_localize("UTC")})
+    local = pd.DataFrame({"ts": pd.to_datetime(["2024-01-01 14:00"]).tz_localize("Asia/Ho_Chi_Minh")})
+
+    assert compare_dataframes(utc, local)[0]
+
+
+def test_shape_and_type_mismatches_are_reported():
+    expected = pd.DataFrame({"v": [1, 2]})
+
+    matched, reason = compare_dataframes(expected, pd.DataFrame({"v": [1, 2, 3]}))
+    assert not matched and "Khác số lượng" in reason
+
+    matched, reason = compare_dataframes(expected, pd.DataFrame({"v": ["1", "2"]}))
+    assert not matched and "Kiểu dữ liệu" in reason
+
+
+def test_different_values_do_not_match():
+    expected = pd.DataFrame({"k": ["a", "b"], "v": [1.0, 2.0]})
+    agent = pd.DataFrame({"k": ["a", "b"], "v": [1.0, 2.5]})
+
+    matched, reason = compare_dataframes(expected, agent)
+    assert not matched and "1/2" in reason
@@ -1,13 +1,33 @@
 from .sql_tool import SQLDatabaseService
 from .rag_tool import PolicyRAGService
 from .python_tool import PythonChartService
+from .chart_spec_tool import ChartSpecService
+from .artifact_store import ArtifactStore
+from .data_handles import DataHandleStore
+from config.settings import settings
 
-sql_service = SQLDatabaseService()
+# Các service dưới đây KHÔNG mở kết nối khi import: phần nặng được khởi tạo ở lần dùng đầu
+# hoặc ở nền qua warm_up_services()
+artifact_store = ArtifactStore()
+data_handles = DataHandleStore()
+
+sql_service = SQLDatabaseService(data_handles=data_handles)
 rag_service = PolicyRAGService()
-python_service = PythonChartService()
+python_service = PythonChartService(artifacts=artifact_store, data_handles=data_handles)
 
 insight_tools = [
     sql_service.get_tool(),
     rag_service.get_tool(),
     python_service.get_tool()
-]
\ No newline at end of file
+]
+
+if settings.CHART_SPEC_ENABLED:
+    chart_spec_service = ChartSpecService(artifacts=artifact_store, data_handles=data_handles)
+    insight_tools.append(chart_spec_service.get_tool())
+
+lazy_services = [sql_service, rag_service, python_service]
+
+
+def warm_up_services() -> list:
+    """Khởi tạo các service ở luồng nền (không chặn khởi động app). Trả về danh sách thread."""
+    return [service.warm_up_async() for service in lazy_services]
\ No newline at end of file
@@ -0,0 +1,121 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from config.settings import settings
+
+
+class ArtifactStore:
+    """
+    Kho file định danh theo nội dung (content-addressed) trên đĩa.
+    ID = hash của các thành phần đầu vào (code đã chuẩn hóa, data handle...), nên cùng đầu vào
+    -> cùng file, phục vụ lại từ cache thay vì render lại.
+    Dọn dẹp: quá TTL (tính từ lúc tạo = mtime) bị xóa, sau đó xóa theo LRU (atime được cập nhật
+    mỗi lần đọc) cho tới khi thỏa giới hạn số file và tổng dung lượng.
+    Mỗi artifact có thể kèm metadata JSON (file `<id>.json` cạnh artifact), bị xóa cùng artifact.
+    """
+    METADATA_SUFFIX = ".json"
+
+    def __init__(self, root: str = settings.ARTIFACT_DIR, suffix: str = ".png",
+                 ttl_seconds: int = settings.ARTIFACT_TTL_SECONDS,
+                 max_files: int = settings.ARTIFACT_MAX_FILES,
+                 max_bytes: int = settings.ARTIFACT_MAX_BYTES):
+        self.root = root
+        self.suffix = suffix
+        self.ttl_seconds = ttl_seconds
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    @staticmethod
+    def make_id(*parts: str) -> str:
+        payload = "\x1f".join(parts)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+    def path(self, artifact_id: str) -> str:
+        return os.path.join(self.root, f"{artifact_id}{self.suffix}")
+
+    def metadata_path(self, artifact_id: str) -> str:
+        return os.path.join(self.root, f"{artifact_id}{self.METADATA_SUFFIX}")
+
+    def get_metadata(self, artifact_id: str):
+        """Metadata đã lưu cùng artifact, None nếu không có."""
+        try:
+            with open(self.metadata_path(artifact_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def temp_path(self, artifact_id: str) -> str:
+        """File tạm riêng cho mỗi lần render, tránh hai request cùng ID ghi đè nửa chừng."""
+        return os.path.join(self.root, f".{artifact_id}.{os.getpid()}.{threading.get_ident()}.tmp{self.suffix}")
+
+    def get(self, artifact_id: str):
+        """Trả về đường dẫn nếu artifact còn hạn (đồng thời đánh dấu vừa được dùng), ngược lại None."""
+        path = self.path(artifact_id)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        if time.time() - stat.st_mtime > self.ttl_seconds:
+            self._remove_artifact(path)
+            return None
+        os.utime(path, (time.time(), stat.st_mtime))
+        return path
+
+    def commit(self, artifact_id: str, temp_path: str, metadata: dict = None) -> str:
+        """Đổi tên file tạm thành artifact (atomic), ghi metadata (nếu có) rồi dọn dẹp theo giới hạn."""
+        path = self.path(artifact_id)
+        if metadata is not None:
+            meta_temp = f"{temp_path}{self.METADATA_SUFFIX}"
+            with open(meta_temp, "w", encoding="utf-8") as f:
+                json.dump(metadata, f, ensure_ascii=False)
+            os.replace(meta_temp, self.metadata_path(artifact_id))
+        os.replace(temp_path, path)
+        self.evict()
+        return path
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _remove_artifact(self, path: str):
+        self._remove(path)
+        self._remove(path[:-len(self.suffix)] + self.METADATA_SUFFIX)
+
+    def evict(self):
+        with self._lock:
+            now = time.time()
+            entries = []
+            for entry in os.scandir(self.root):
+                if not entry.is_file():
+                    continue
+                stat = entry.stat()
+                if entry.name.startswith("."):
+                    # File tạm bị bỏ lại (tiến trình chết giữa chừng)
+                    if now - stat.st_mtime > self.ttl_seconds:
+                        self._remove(entry.path)
+                    continue
+                if entry.name.endswith(self.METADATA_SUFFIX) and self.suffix != self.METADATA_SUFFIX:
+                    # Metadata mồ côi (artifact đã bị xóa)
+                    if not os.path.exists(entry.path[:-len(self.METADATA_SUFFIX)] + self.suffix):
+                        self._remove(entry.path)
+                    continue
+                if not entry.name.endswith(self.suffix):
+                    continue
+                if now - stat.st_mtime > self.ttl_seconds:
+                    self._remove_artifact(entry.path)
+                    continue
+                entries.append((stat.st_atime, stat.st_size, entry.path))
+
+            entries.sort()
+            total_bytes = sum(size for _, size, _ in entries)
+            while entries and (len(entries) > self.max_files or total_bytes > self.max_bytes):
+                _, size, path = entries.pop(0)
+                self._remove_artifact(path)
+                total_bytes -= size
@@ -1,3 +1,5 @@
+import time
+import threading
 from abc import ABC, abstractmethod
 from langchain_core.tools import StructuredTool
 
@@ -11,4 +13,55 @@ class BaseToolService(ABC):
         """
         Các class con override hàm này và trả về một LangChain StructuredTool.
         """
+        pass
+
+
+class LazyInitMixin(ABC):
+    """
+    Trì hoãn phần khởi tạo nặng (kết nối DB, client API, tiến trình con) tới lần dùng đầu tiên,
+    để import package `tools` không phải mở kết nối nào.
+    Lớp con khai báo LAZY_ATTRIBUTES và cài _initialize() gán đủ các thuộc tính đó;
+    truy cập bất kỳ thuộc tính nào trong danh sách sẽ tự kích hoạt khởi tạo (một lần, thread-safe).
+    """
+
+    LAZY_ATTRIBUTES: tuple = ()
+
+    def __getattr__(self, name):
+        # Chỉ được gọi khi thuộc tính chưa tồn tại -> sau khi khởi tạo không còn chi phí
+        if name in type(self).LAZY_ATTRIBUTES:
+            self.ensure_initialized()
+            return object.__getattribute__(self, name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+
+    @property
+    def initialized(self) -> bool:
+        return self.__dict__.get("_lazy_init_ms") is not None
+
+    def ensure_initialized(self):
+        lock = self.__dict__.setdefault("_lazy_lock", threading.Lock())
+        with lock:
+            if self.initialized:
+                return
+            start = time.perf_counter()
+            self._initialize()
+            self._lazy_init_ms = (time.perf_counter() - start) * 1000
+            print(f"[{type(self).__name__}] Khởi tạo xong sau {self._lazy_init_ms:.0f} ms")
+
+    def warm_up_async(self) -> threading.Thread:
+        """Khởi tạo ở luồng nền; lỗi (VD: DB chưa sẵn sàng) chỉ được ghi log, lần dùng thật sẽ thử lại."""
+        def _run():
+            try:
+                self.ensure_initialized()
+            except Exception as e:
+                print(f"[{type(self).__name__}] Warm-up thất bại, sẽ thử lại ở lần dùng đầu: {e}")
+
+        thread = threading.Thread(target=_run, daemon=True, name=f"warmup-{type(self).__name__}")
+        thread.start()
+        return thread
+
+    @abstractmethod
+    def _initialize(self):
+        """
+        Các class con override hàm này và gán đủ các thuộc tính trong LAZY_ATTRIBUTES.
+        """
         pass
\ No newline at end of file
@@ -0,0 +1,234 @@
+import queue
+from typing import List, Literal, Optional, Union
+import numpy as np
+import pandas as pd
+from pydantic import BaseModel, Field
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from config.settings import settings
+from . import downsampling
+
+OTHER_LABEL = "Khác"
+
+
+class ChartSpec(BaseModel):
+    """Đặc tả biểu đồ dạng khai báo (JSON) - không cần viết code matplotlib."""
+
+    chart_type: Literal["bar", "barh", "line", "area", "pie", "scatter", "hist"] = Field(
+        description=(
+            "Loại biểu đồ: bar (cột), barh (thanh ngang), line (đường), area (miền), pie (tròn), "
+            "scatter (phân tán), hist (phân phối giá trị của cột x, không cần y)."
+        )
+    )
+    x: str = Field(description="Tên cột dùng cho trục X (hoặc nhãn của biểu đồ tròn).")
+    y: Union[str, List[str]] = Field(
+        default="", description="Tên cột (hoặc danh sách cột) giá trị. Có thể bỏ trống khi agg='count'."
+    )
+    group_by: Optional[str] = Field(
+        default=None, description="Cột phân nhóm: mỗi giá trị của cột này là một series riêng (VD: category)."
+    )
+    agg: Literal["none", "sum", "mean", "count", "min", "max"] = Field(
+        default="none", description="Hàm gộp theo x (và group_by) trước khi vẽ. 'none' = vẽ dữ liệu như đã có."
+    )
+    sort: Literal["none", "x", "y_desc", "y_asc"] = Field(
+        default="none", description="Sắp xếp theo x hoặc theo giá trị y."
+    )
+    limit: Optional[int] = Field(default=None, description="Chỉ giữ N dòng đầu sau khi sắp xếp (VD: top 5).")
+    data_handle: str = Field(default="", description="DATA_HANDLE do query_sql_db trả về.")
+    rows: Optional[List[dict]] = Field(
+        default=None, description="Dữ liệu nhập trực tiếp (list các dict) khi không có data_handle."
+    )
+    title: str = Field(default="", description="Tiêu đề biểu đồ.")
+    x_label: str = Field(default="", description="Nhãn trục X.")
+    y_label: str = Field(default="", description="Nhãn trục Y.")
+
+    @property
+    def y_columns(self) -> list:
+        if isinstance(self.y, str):
+            return [self.y] if self.y else []
+        return [col for col in self.y if col]
+
+
+class ChartRenderer:
+    """
+    Bộ vẽ biểu đồ trong tiến trình cho ChartSpec (không exec code).
+    Dùng API hướng đối tượng của matplotlib (Figure + canvas Agg, không qua pyplot) nên an toàn
+    khi nhiều luồng cùng vẽ; các Figure được tạo sẵn và tái sử dụng qua một pool.
+    """
+
+    def __init__(self, pool_size: int = settings.CHART_RENDERER_FIGURES, figsize: tuple = (10, 6), dpi: int = 100,
+                 downsample: bool = settings.CHART_DOWNSAMPLE_ENABLED):
+        self.figsize = figsize
+        self.dpi = dpi
+        self.downsample = downsample
+        self._figures = queue.Queue()
+        for _ in range(pool_size):
+            figure = Figure(figsize=figsize, dpi=dpi)
+            FigureCanvasAgg(figure)
+            self._figures.put(figure)
+
+    @staticmethod
+    def _check_columns(df: pd.DataFrame, columns: list):
+        missing = [col for col in columns if col and col not in df.columns]
+        if missing:
+            raise ValueError(f"Lỗi: Không có cột {missing}. Các cột hiện có: {list(df.columns)}")
+
+    def prepare(self, spec: ChartSpec, df: pd.DataFrame) -> pd.DataFrame:
+        """Gộp / pivot / sắp xếp dữ liệu. Kết quả: index = x, mỗi cột là một series."""
+        y_columns = spec.y_columns
+        self._check_columns(df, [spec.x, spec.group_by] + y_columns)
+        if not y_columns and spec.agg != "count":
+            raise ValueError("Lỗi: Cần chỉ định y (hoặc dùng agg='count').")
+
+        keys = [spec.x] + ([spec.group_by] if spec.group_by else [])
+        if spec.agg == "count":
+            data = df.groupby(keys, sort=False).size().to_frame("count")
+        elif spec.agg != "none":
+            data = df.groupby(keys, sort=False)[y_columns].agg(spec.agg)
+        else:
+            data = df.set_index(keys)[y_columns]
+
+        if spec.group_by:
+            if len(data.columns) > 1:
+                raise ValueError("Lỗi: group_by chỉ dùng với một cột y.")
+            value_column = data.columns[0]
+            if spec.agg == "none" and data.index.duplicated().any():
+                raise ValueError("Lỗi: Có nhiều dòng trùng (x, group_by), hãy chọn agg (sum/mean/...).")
+            data = data[value_column].unstack(spec.group_by)
+
+        if spec.sort == "x":
+            data = data.sort_index()
+        elif spec.sort in ("y_desc", "y_asc"):
+            data = data.loc[data.sum(axis=1).sort_values(ascending=spec.sort == "y_asc").index]
+        if spec.limit:
+            data = data.head(spec.limit)
+        return data
+
+    @staticmethod
+    def histogram(values: pd.Series) -> pd.DataFrame:
+        """Đếm theo bin (vector hóa). Kết quả: index = cận trái của bin, cột count + bin_width."""
+        counts, edges = downsampling.histogram(values, max_bins=settings.CHART_HIST_MAX_BINS)
+        return pd.DataFrame({"count": counts, "bin_width": np.diff(edges)}, index=pd.Index(edges[:-1], name=values.name))
+
+    def reduce(self, spec: ChartSpec, data: pd.DataFrame) -> tuple:
+        """
+        Giảm dữ liệu quá lớn trước khi vẽ (số điểm trên ảnh vượt xa số pixel chỉ làm chậm và nặng file PNG).
+        Trả về (dữ liệu đã giảm, ghi chú cho LLM hoặc "" nếu giữ nguyên).
+        """
+        n = len(data)
+        if spec.chart_type in ("line", "area") and n > settings.CHART_MAX_LINE_POINTS:
+            x_values = data.index.values
+            keep = np.unique(np.concatenate([
+                downsampling.lttb_indices(x_values, data[column].to_numpy(dtype=float, na_value=np.nan), settings.CHART_MAX_LINE_POINTS)
+                for column in data.columns
+            ]))
+            data = data.iloc[keep]
+            return data, f"giảm {n:,} điểm còn {len(data):,} bằng LTTB (giữ hình dạng đường)"
+
+        if spec.chart_type == "scatter" and n > settings.CHART_MAX_SCATTER_POINTS:
+            keep = np.unique(np.concatenate([
+                downsampling.grid_thin_indices(data[spec.x].values, data[column].to_numpy(dtype=float, na_value=np.nan), settings.CHART_SCATTER_GRID)
+                for column in spec.y_columns
+            ]))
+            data = data.iloc[keep]
+            return data, f"giảm {n:,} điểm còn {len(data):,} (mỗi ô lưới {settings.CHART_SCATTER_GRID}x{settings.CHART_SCATTER_GRID} giữ một điểm)"
+
+        max_categories = settings.CHART_MAX_PIE_SLICES if spec.chart_type == "pie" else settings.CHART_MAX_CATEGORIES
+        if spec.chart_type in ("bar", "barh", "pie") and n > max_categories:
+            top, rest = downsampling.top_n_indices(data.fillna(0).sum(axis=1).to_numpy(), max_categories - 1)
+            other = data.iloc[rest].sum().to_frame(OTHER_LABEL).T
+            data = pd.concat([data.iloc[top], other])
+            return data, f"giữ {len(top)} nhóm lớn nhất, gộp {len(rest):,} nhóm còn lại vào '{OTHER_LABEL}'"
+        return data, ""
+
+    def _draw(self, ax, spec: ChartSpec, data: pd.DataFrame):
+        labels = [str(v) for v in data.index]
+        if spec.chart_type == "scatter":
+            for column in spec.y_columns:
+                ax.scatter(data[spec.x], data[column], s=12, alpha=0.6, label=column)
+        elif spec.chart_type == "hist":
+            ax.bar(data.index, data["count"], width=data["bin_width"], align="edge", edgecolor="white", linewidth=0.5)
+        elif spec.chart_type == "pie":
+            if len(data.columns) != 1:
+                raise ValueError("Lỗi: Biểu đồ tròn chỉ nhận một series (một cột y, không group_by).")
+            ax.pie(data.iloc[:, 0].fillna(0), labels=labels, autopct="%1.1f%%", startangle=90)
+            ax.axis("equal")
+        elif spec.chart_type in ("bar", "barh"):
+            n_series = len(data.columns)
+            width = 0.8 / n_series
+            positions = range(len(labels))
+            for i, column in enumerate(data.columns):
+                offsets = [p - 0.4 + width * (i + 0.5) for p in positions]
+                if spec.chart_type == "bar":
+                    ax.bar(offsets, data[column].fillna(0), width=width, label=str(column))
+                else:
+                    ax.barh(offsets, data[column].fillna(0), height=width, label=str(column))
+            if spec.chart_type == "bar":
+                ax.set_xticks(list(positions), labels, rotation=45 if len(labels) > 6 else 0, ha="right" if len(labels) > 6 else "center")
+            else:
+                ax.set_yticks(list(positions), labels)
+                ax.invert_yaxis()
+        else:
+            x_values = data.index
+            for column in data.columns:
+                if spec.chart_type == "area":
+                    ax.fill_between(x_values, data[column].fillna(0), alpha=0.4, label=str(column))
+                    ax.plot(x_values, data[column], linewidth=1)
+                else:
+                    ax.plot(x_values, data[column], marker="o" if len(data) <= 50 else None, label=str(column))
+            if len(data) > 6:
+                ax.tick_params(axis="x", labelrotation=45)
+
+        if spec.chart_type != "pie":
+            ax.set_xlabel(spec.x_label or spec.x)
+            default_y = ["count"] if spec.chart_type == "hist" else spec.y_columns or ["count"]
+            ax.set_ylabel(spec.y_label or ", ".join(default_y))
+            ax.grid(True, alpha=0.3)
+            if spec.chart_type == "hist":
+                n_series = 1
+            elif spec.chart_type == "scatter":
+                n_series = len(spec.y_columns)
+            else:
+                n_series = len(data.columns)
+            if n_series > 1:
+                ax.legend()
+
+    def render(self, spec: ChartSpec, df: pd.DataFrame, path: str) -> pd.DataFrame:
+        """
+        Vẽ và lưu PNG ra path. Trả về dữ liệu đã dùng để vẽ (để tool tóm tắt lại cho LLM);
+        nếu dữ liệu bị giảm trước khi vẽ, ghi chú nằm trong data.attrs["downsampling"].
+        """
+        if spec.chart_type == "scatter":
+            # Scatter vẽ từng điểm của dữ liệu gốc, không gộp
+            if spec.group_by or spec.agg != "none" or not spec.y_columns:
+                raise ValueError("Lỗi: Biểu đồ scatter cần y và không hỗ trợ group_by/agg.")
+            self._check_columns(df, [spec.x] + spec.y_columns)
+            data = df
+        elif spec.chart_type == "hist":
+            self._check_columns(df, [spec.x])
+            if not pd.api.types.is_numeric_dtype(df[spec.x]):
+                raise ValueError(f"Lỗi: Histogram cần cột x dạng số, cột '{spec.x}' có kiểu {df[spec.x].dtype}.")
+            data = self.histogram(df[spec.x].dropna())
+        else:
+            data = self.prepare(spec, df)
+        if data.empty:
+            raise ValueError("Lỗi: Không có dữ liệu để vẽ.")
+
+        note = ""
+        if self.downsample:
+            data, note = self.reduce(spec, data)
+
+        figure = self._figures.get()
+        try:
+            figure.clear()
+            ax = figure.add_subplot()
+            self._draw(ax, spec, data)
+            if spec.title:
+                ax.set_title(spec.title)
+            figure.tight_layout()
+            figure.savefig(path, format="png", dpi=self.dpi)
+        finally:
+            figure.clear()
+            self._figures.put(figure)
+        data.attrs["downsampling"] = note
+        return data
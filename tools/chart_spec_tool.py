@@ -0,0 +1,97 @@
+import json
+import time
+import threading
+import pandas as pd
+from langchain_core.tools import StructuredTool
+from .base_tool import BaseToolService
+from .artifact_store import ArtifactStore
+from .data_handles import DataHandleStore
+from .chart_renderer import ChartSpec, ChartRenderer
+
+class ChartSpecService(BaseToolService):
+    """
+    Tool vẽ biểu đồ từ đặc tả JSON (ChartSpec) bằng bộ vẽ dựng sẵn trong tiến trình.
+    Dành cho các biểu đồ phổ biến (bar/line/pie/scatter trên kết quả SQL); python_chart_maker
+    chỉ còn là phương án dự phòng cho biểu đồ tùy biến.
+    """
+
+    def __init__(self, renderer: ChartRenderer = None, artifacts: ArtifactStore = None,
+                 data_handles: DataHandleStore = None):
+        self.renderer = renderer or ChartRenderer()
+        self.artifacts = artifacts or ArtifactStore()
+        self.data_handles = data_handles or DataHandleStore()
+        self.stats = {"renders": 0, "cache_hits": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _load_data(self, spec: ChartSpec) -> pd.DataFrame:
+        if spec.data_handle:
+            path = self.data_handles.path(spec.data_handle)
+            if path is None:
+                raise ValueError(f"Lỗi: data_handle '{spec.data_handle}' không tồn tại hoặc đã hết hạn. Hãy chạy lại query_sql_db.")
+            return pd.read_pickle(path)
+        if spec.rows:
+            return DataHandleStore.to_dataframe(spec.rows)
+        raise ValueError("Lỗi: Cần data_handle hoặc rows để vẽ biểu đồ.")
+
+    @staticmethod
+    def _summarize(data: pd.DataFrame, max_rows: int = 10) -> str:
+        """Tóm tắt ngắn dữ liệu đã vẽ để LLM mô tả biểu đồ mà không cần đọc lại toàn bộ dữ liệu."""
+        preview = data.head(max_rows).round(2).to_string()
+        more = f"\n... ({len(data)} dòng)" if len(data) > max_rows else ""
+        note = data.attrs.get("downsampling")
+        return preview + more + (f"\n(Dữ liệu lớn đã được rút gọn trước khi vẽ: {note})" if note else "")
+
+    def render_chart(self, **kwargs) -> tuple:
+        print("[Chart Spec Tool] Rendering chart from spec...")
+        try:
+            spec = ChartSpec(**kwargs)
+            spec_key = json.dumps(spec.model_dump(exclude={"data_handle"}), sort_keys=True, ensure_ascii=False, default=str)
+            artifact_id = self.artifacts.make_id("spec", spec_key, spec.data_handle)
+
+            # Tóm tắt dữ liệu được lưu cùng artifact: cache hit trả về đúng nội dung như lần render đầu
+            cached_path = self.artifacts.get(artifact_id)
+            cached_meta = self.artifacts.get_metadata(artifact_id) if cached_path else None
+            if cached_path and cached_meta and "summary" in cached_meta:
+                self._count("cache_hits")
+                return (
+                    f"Đã vẽ biểu đồ thành công (artifact: {artifact_id}, lấy từ cache). Hãy hiển thị nó cho người dùng.\n"
+                    f"Dữ liệu trên biểu đồ:\n{cached_meta['summary']}",
+                    {"artifact_id": artifact_id, "path": cached_path, "mime_type": "image/png", "cached": True, "render_ms": 0.0},
+                )
+
+            start = time.perf_counter()
+            df = self._load_data(spec)
+            temp_path = self.artifacts.temp_path(artifact_id)
+            data = self.renderer.render(spec, df, temp_path)
+            summary = self._summarize(data)
+            path = self.artifacts.commit(artifact_id, temp_path, metadata={"summary": summary})
+            render_ms = (time.perf_counter() - start) * 1000
+            self._count("renders")
+        except Exception as e:
+            return f"Lỗi vẽ biểu đồ: {e}", None
+
+        return (
+            f"Đã vẽ biểu đồ thành công (artifact: {artifact_id}). Hãy hiển thị nó cho người dùng.\n"
+            f"Dữ liệu trên biểu đồ:\n{summary}",
+            {"artifact_id": artifact_id, "path": path, "mime_type": "image/png", "cached": False, "render_ms": round(render_ms, 1)},
+        )
+
+    def get_tool(self) -> StructuredTool:
+        return StructuredTool.from_function(
+            func=self.render_chart,
+            name="render_chart",
+            description=(
+                "Công cụ vẽ biểu đồ NHANH từ đặc tả JSON (bar, barh, line, area, pie, scatter, hist), KHÔNG cần viết code. "
+                "Ưu tiên dùng công cụ này cho các biểu đồ thông thường trên kết quả SQL: truyền data_handle "
+                "(DATA_HANDLE từ query_sql_db) hoặc rows, chọn cột x/y, group_by, agg, sort, limit, title. "
+                "Dữ liệu lớn được tự động rút gọn (LTTB / lưới / top-N + 'Khác'), không cần tự lọc bớt. "
+                "Chỉ dùng python_chart_maker khi biểu đồ cần tùy biến mà đặc tả này không diễn tả được. "
+                "Output: ID artifact của biểu đồ và bảng dữ liệu đã vẽ."
+            ),
+            args_schema=ChartSpec,
+            response_format="content_and_artifact",
+        )
@@ -0,0 +1,149 @@
+import time
+import threading
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from config.settings import settings
+
+
+class CollectionRouter:
+    """
+    Định tuyến câu hỏi tới các collection (shard) liên quan trước khi tìm kiếm vector.
+    - Câu hỏi chứa từ khóa gợi ý (settings.COLLECTION_KEYWORDS) -> chỉ tìm trong các collection đó.
+    - Ngược lại: so cosine giữa embedding câu hỏi và centroid của từng collection. Mọi collection
+      có điểm cách top-1 không quá `margin` đều được chọn (câu hỏi mơ hồ -> fan-out song song).
+    Centroid = AVG(embedding) tính trong Postgres, chỉ tính lại khi ingest_version của collection đổi.
+    """
+
+    VERSION_SQL = """
+        SELECT name, cmetadata ->> 'ingest_version' AS version
+        FROM langchain_pg_collection
+        WHERE name = ANY(:names)
+    """
+
+    CENTROID_SQL = """
+        SELECT AVG(e.embedding)::text
+        FROM langchain_pg_embedding e
+        JOIN langchain_pg_collection c ON e.collection_id = c.uuid
+        WHERE c.name = :name
+    """
+
+    def __init__(self, engine: Engine, collections: list, keywords: dict = None,
+                 margin: float = settings.ROUTER_MARGIN, max_fanout: int = settings.ROUTER_MAX_FANOUT,
+                 refresh_seconds: int = settings.ROUTER_REFRESH_SECONDS):
+        self.engine = engine
+        self.collections = list(collections)
+        self.keywords = {
+            name: [kw.lower() for kw in kws]
+            for name, kws in (settings.COLLECTION_KEYWORDS if keywords is None else keywords).items()
+        }
+        self.margin = margin
+        self.max_fanout = max_fanout
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._names = []
+        self._centroids = None
+        self._last_refresh = None
+        self.stats = {"queries": 0, "keyword": 0, "single": 0, "fanout": 0}
+
+    def set_centroids(self, centroids: dict):
+        """Nạp sẵn centroid {collection: vector} (benchmark / khi không cần đọc từ DB)."""
+        names = [name for name in self.collections if name in centroids]
+        matrix = None
+        if names:
+            matrix = np.array([centroids[name] for name in names], dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms == 0, 1.0, norms)
+        with self._lock:
+            self._names = names
+            self._centroids = matrix
+            self._last_refresh = float("inf")
+
+    def refresh(self):
+        """Đọc ingest_version của các collection, tính lại centroid cho collection đã thay đổi."""
+        with self.engine.connect() as conn:
+            versions = {
+                row.name: row.version
+                for row in conn.execute(text(self.VERSION_SQL), {"names": self.collections})
+            }
+            if versions == self._versions and self._centroids is not None:
+                self._last_refresh = time.monotonic()
+                return
+
+            current = dict(zip(self._names, self._centroids)) if self._centroids is not None else {}
+            centroids = {}
+            for name in self.collections:
+                if name not in versions:
+                    continue
+                if name in current and self._versions.get(name) == versions[name]:
+                    centroids[name] = current[name]
+                    continue
+                literal = conn.execute(text(self.CENTROID_SQL), {"name": name}).scalar()
+                if literal:
+                    centroids[name] = np.array(literal.strip("[]").split(","), dtype=np.float32)
+
+        self.set_centroids(centroids)
+        self._versions = versions
+        self._last_refresh = time.monotonic()
+
+    def _is_fresh(self) -> bool:
+        return self._last_refresh is not None and time.monotonic() - self._last_refresh < self.refresh_seconds
+
+    def _ensure_centroids(self):
+        if self._is_fresh():
+            return
+        with self._lock:
+            if self._is_fresh():
+                return
+            # Tránh nhiều luồng cùng tính lại: đánh dấu trước, lỗi thì giữ centroid cũ
+            self._last_refresh = time.monotonic()
+        try:
+            self.refresh()
+        except Exception as e:
+            if self._centroids is None:
+                raise
+            print(f"[Router] Không làm mới được centroid, dùng bản cũ: {e}")
+
+    def _match_keywords(self, query: str) -> list:
+        normalized = " ".join(query.lower().split())
+        return [
+            name for name in self.collections
+            if any(kw in normalized for kw in self.keywords.get(name, []))
+        ]
+
+    def score(self, query_embedding) -> list:
+        """Điểm cosine giữa câu hỏi và centroid từng collection, sắp giảm dần (rỗng nếu chưa có centroid)."""
+        self._ensure_centroids()
+        names, centroids = self._names, self._centroids
+        if centroids is None:
+            return []
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        sims = centroids @ query
+        order = np.argsort(-sims)
+        return [(names[i], float(sims[i])) for i in order]
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def route(self, query: str, query_embedding) -> list:
+        """Trả về danh sách collection cần tìm kiếm cho câu hỏi."""
+        self._count("queries")
+        if len(self.collections) == 1:
+            return list(self.collections)
+
+        matched = self._match_keywords(query)
+        if matched:
+            self._count("keyword")
+            return matched
+
+        scored = self.score(query_embedding)
+        if not scored:
+            self._count("fanout")
+            return list(self.collections)
+        best = scored[0][1]
+        selected = [name for name, sim in scored if best - sim <= self.margin][:self.max_fanout]
+        self._count("single" if len(selected) == 1 else "fanout")
+        return selected
@@ -0,0 +1,148 @@
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+import tiktoken
+from langchain_core.documents import Document
+from config.settings import settings
+
+
+class ContextCompressor:
+    """
+    Nén ngữ cảnh RAG theo kiểu trích xuất trước khi đưa vào prompt:
+    gộp các chunk chồng lấn trên cùng một trang của cùng nguồn, tách câu, chấm điểm câu theo độ tương đồng
+    với câu hỏi (embedding câu được cache) và giữ các câu tốt nhất trong ngân sách token.
+    """
+
+    SENTENCE_PATTERN = re.compile(r'(?<=[.!?;])\s+')
+    MIN_OVERLAP = 20
+    MAX_OVERLAP = 400
+
+    def __init__(self, embeddings, token_budget: int = settings.RAG_CONTEXT_TOKEN_BUDGET,
+                 cache_size: int = settings.SENTENCE_EMBEDDING_CACHE_SIZE):
+        self.embeddings = embeddings
+        self.token_budget = token_budget
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        try:
+            self.encoding = tiktoken.encoding_for_model(settings.LLM_MODEL)
+        except KeyError:
+            self.encoding = tiktoken.get_encoding("cl100k_base")
+        self.stats = {"calls": 0, "tokens_before": 0, "tokens_after": 0}
+
+    def count_tokens(self, text: str) -> int:
+        return len(self.encoding.encode(text))
+
+    @classmethod
+    def _merge_texts(cls, first: str, second: str):
+        """Gộp 2 đoạn nếu đuôi đoạn này trùng đầu đoạn kia (overlap của text splitter)."""
+        if second in first:
+            return first
+        if first in second:
+            return second
+        for left, right in ((first, second), (second, first)):
+            for size in range(min(len(left), len(right), cls.MAX_OVERLAP), cls.MIN_OVERLAP - 1, -1):
+                if left.endswith(right[:size]):
+                    return left + right[size:]
+        return None
+
+    @staticmethod
+    def _merge_metadata(first: dict, second: dict) -> dict:
+        """Metadata của chunk gộp: giữ của chunk đầu, hợp các trích dẫn [nguồn, trang] (của chunk đã dedup)."""
+        merged = dict(first)
+        if "citations" in first or "citations" in second:
+            citations = list(first.get("citations") or [])
+            citations += [c for c in second.get("citations") or [] if c not in citations]
+            merged["citations"] = sorted(citations)
+        return merged
+
+    @classmethod
+    def merge_overlapping(cls, docs: list) -> list:
+        """
+        Gộp các chunk chồng lấn trên cùng (nguồn, trang), giữ thứ tự xuất hiện; mỗi chunk kết quả giữ metadata
+        của chính các chunk tạo nên nó (cùng số trang ở hai file PDF khác nhau không bị gộp / gán nhầm nguồn).
+        """
+        groups = OrderedDict()
+        for doc in docs:
+            groups.setdefault((doc.metadata.get("source"), doc.metadata.get("page", 0)), []).append(doc)
+
+        merged = []
+        for group_docs in groups.values():
+            chunks = []
+            for doc in group_docs:
+                for i, (text, metadata) in enumerate(chunks):
+                    combined = cls._merge_texts(text, doc.page_content)
+                    if combined is not None:
+                        chunks[i] = (combined, cls._merge_metadata(metadata, doc.metadata))
+                        break
+                else:
+                    chunks.append((doc.page_content, dict(doc.metadata)))
+            merged.extend(Document(page_content=text, metadata=metadata) for text, metadata in chunks)
+        return merged
+
+    def _embed(self, texts: list, is_query: bool = False) -> np.ndarray:
+        """Embed có cache theo nội dung; chỉ gọi API một lần cho các câu chưa có trong cache."""
+        keys = [("q:" if is_query else "s:") + hashlib.sha1(t.encode("utf-8")).hexdigest() for t in texts]
+        vectors = [None] * len(texts)
+        missing = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    vectors[i] = self._cache[key]
+                else:
+                    missing.append(i)
+
+        if missing:
+            if is_query:
+                fresh = [self.embeddings.embed_query(texts[i]) for i in missing]
+            else:
+                fresh = self.embeddings.embed_documents([texts[i] for i in missing])
+            with self._lock:
+                for i, vec in zip(missing, fresh):
+                    vec = np.asarray(vec, dtype=np.float32)
+                    vec /= np.linalg.norm(vec) or 1.0
+                    vectors[i] = vec
+                    self._cache[keys[i]] = vec
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return np.vstack(vectors)
+
+    def compress(self, query: str, docs: list) -> list:
+        """Trả về danh sách Document đã nén (mỗi trang một Document, câu giữ thứ tự gốc)."""
+        if not docs:
+            return docs
+        merged = self.merge_overlapping(docs)
+
+        sentences = []
+        for doc_idx, doc in enumerate(merged):
+            for sent_idx, sentence in enumerate(self.SENTENCE_PATTERN.split(doc.page_content)):
+                sentence = sentence.strip()
+                if sentence:
+                    sentences.append((doc_idx, sent_idx, sentence, self.count_tokens(sentence)))
+
+        sentence_vectors = self._embed([s[2] for s in sentences])
+        query_vector = self._embed([query], is_query=True)[0]
+        scores = sentence_vectors @ query_vector
+
+        selected, used_tokens = set(), 0
+        for idx in np.argsort(-scores):
+            tokens = sentences[idx][3]
+            if used_tokens + tokens > self.token_budget and selected:
+                continue
+            selected.add(int(idx))
+            used_tokens += tokens
+
+        compressed = []
+        for doc_idx, doc in enumerate(merged):
+            kept = [s[2] for i, s in enumerate(sentences) if s[0] == doc_idx and i in selected]
+            if kept:
+                compressed.append(Document(page_content=" ".join(kept), metadata=doc.metadata))
+
+        with self._lock:
+            self.stats["calls"] += 1
+            self.stats["tokens_before"] += sum(self.count_tokens(d.page_content) for d in docs)
+            self.stats["tokens_after"] += sum(self.count_tokens(d.page_content) for d in compressed)
+        return compressed
@@ -0,0 +1,50 @@
+import decimal
+import pandas as pd
+from config.settings import settings
+from .artifact_store import ArtifactStore
+
+
+class DataHandleStore:
+    """
+    Lưu kết quả truy vấn SQL thành DataFrame trên đĩa và trả về một "data handle" ngắn
+    (df_<hash>) để các tool khác (vẽ biểu đồ) dùng lại dữ liệu mà LLM không phải chép số liệu vào code.
+    Handle được băm từ câu SQL + nội dung kết quả: dữ liệu đổi -> handle đổi.
+    """
+
+    PREFIX = "df_"
+
+    def __init__(self, store: ArtifactStore = None):
+        self.store = store or ArtifactStore(
+            root=settings.DATA_HANDLE_DIR,
+            suffix=".pkl",
+            ttl_seconds=settings.DATA_HANDLE_TTL_SECONDS,
+            max_files=settings.ARTIFACT_MAX_FILES,
+            max_bytes=settings.ARTIFACT_MAX_BYTES,
+        )
+
+    @staticmethod
+    def to_dataframe(rows: list) -> pd.DataFrame:
+        df = pd.DataFrame(rows)
+        # NUMERIC của Postgres trả về Decimal -> đổi sang float để pandas/matplotlib xử lý như số
+        for column in df.columns:
+            if df[column].dtype == object and df[column].map(lambda v: isinstance(v, decimal.Decimal) or v is None).all():
+                df[column] = df[column].astype(float)
+        return df
+
+    def register(self, query: str, rows: list) -> str:
+        """Lưu rows (list dict) và trả về handle. Cùng câu SQL + cùng dữ liệu -> cùng handle."""
+        df = self.to_dataframe(rows)
+        fingerprint = pd.util.hash_pandas_object(df.astype(str), index=False).values.tobytes().hex()
+        handle = self.PREFIX + ArtifactStore.make_id(" ".join(query.split()), fingerprint)[:16]
+        if self.store.get(handle) is None:
+            temp_path = self.store.temp_path(handle)
+            df.to_pickle(temp_path)
+            self.store.commit(handle, temp_path)
+        return handle
+
+    def path(self, handle: str):
+        """Đường dẫn file dữ liệu của handle, None nếu handle không hợp lệ hoặc đã hết hạn."""
+        handle = (handle or "").strip()
+        if not handle.startswith(self.PREFIX) or not handle[len(self.PREFIX):].isalnum():
+            return None
+        return self.store.get(handle)
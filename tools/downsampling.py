@@ -0,0 +1,130 @@
+"""
+Giảm kích thước dữ liệu trước khi vẽ biểu đồ (chỉ phụ thuộc NumPy để sandbox worker nạp trực tiếp).
+- Chuỗi thời gian / đường: LTTB (Largest-Triangle-Three-Buckets).
+- Scatter: chia lưới, mỗi ô giữ một điểm đại diện.
+- Histogram: đếm theo bin bằng np.histogram.
+- Cột theo danh mục: top-N + nhóm "Khác".
+"""
+import numpy as np
+
+
+def as_numeric(values) -> np.ndarray:
+    """Đổi datetime64 / số về float64 để tính hình học; giá trị khác (chuỗi) -> vị trí 0..n-1."""
+    arr = np.asarray(values)
+    if np.issubdtype(arr.dtype, np.datetime64) or np.issubdtype(arr.dtype, np.timedelta64):
+        return arr.astype("datetime64[ns]").astype(np.int64).astype(np.float64)
+    if np.issubdtype(arr.dtype, np.number) or arr.dtype == bool:
+        return arr.astype(np.float64)
+    return np.arange(len(arr), dtype=np.float64)
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """
+    Chỉ số các điểm được giữ theo LTTB, vector hóa hoàn toàn.
+    Khác bản gốc (tuần tự) ở chỗ đỉnh A của tam giác là trung bình bucket trước thay vì điểm
+    đã chọn ở bucket trước - cho phép tính mọi bucket cùng lúc, hình dạng đường gần như không đổi.
+    Luôn giữ điểm đầu và điểm cuối.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    xs = as_numeric(x)
+    ys = np.asarray(y, dtype=np.float64)
+    n_buckets = n_out - 2
+    edges = np.linspace(1, n - 1, n_buckets + 1).astype(np.int64)
+    sizes = np.diff(edges)
+    bucket_id = np.repeat(np.arange(n_buckets), sizes)
+
+    inner_x, inner_y = xs[1:-1], ys[1:-1]
+    starts = edges[:-1] - 1
+    mean_x = np.add.reduceat(inner_x, starts) / sizes
+    mean_y = np.add.reduceat(np.nan_to_num(inner_y), starts) / sizes
+
+    # Đỉnh A: trung bình bucket trước (bucket đầu dùng điểm đầu); đỉnh C: trung bình bucket sau (bucket cuối dùng điểm cuối)
+    a_x = np.concatenate(([xs[0]], mean_x[:-1]))[bucket_id]
+    a_y = np.concatenate(([ys[0]], mean_y[:-1]))[bucket_id]
+    c_x = np.concatenate((mean_x[1:], [xs[-1]]))[bucket_id]
+    c_y = np.concatenate((mean_y[1:], [ys[-1]]))[bucket_id]
+
+    area = np.abs((a_x - c_x) * (inner_y - a_y) - (a_x - inner_x) * (c_y - a_y))
+    area = np.where(np.isnan(area), -1.0, area)
+
+    best = np.maximum.reduceat(area, starts)
+    candidates = np.flatnonzero(area == best[bucket_id])
+    _, first = np.unique(bucket_id[candidates], return_index=True)
+    chosen = candidates[first] + 1
+    return np.concatenate(([0], chosen, [n - 1]))
+
+
+def grid_thin_indices(x, y, grid: int = 300) -> np.ndarray:
+    """
+    Chia mặt phẳng thành lưới grid x grid, mỗi ô có điểm chỉ giữ một điểm (theo thứ tự gốc).
+    Giữ nguyên vùng phủ và điểm ngoại lai, số điểm tối đa grid^2.
+    """
+    xs, ys = as_numeric(x), np.asarray(y, dtype=np.float64)
+    finite = np.isfinite(xs) & np.isfinite(ys)
+    idx = np.flatnonzero(finite)
+    if len(idx) == 0:
+        return idx
+    fx, fy = xs[idx], ys[idx]
+    span_x = (fx.max() - fx.min()) or 1.0
+    span_y = (fy.max() - fy.min()) or 1.0
+    cell_x = np.minimum(((fx - fx.min()) / span_x * grid).astype(np.int64), grid - 1)
+    cell_y = np.minimum(((fy - fy.min()) / span_y * grid).astype(np.int64), grid - 1)
+    _, first = np.unique(cell_x * grid + cell_y, return_index=True)
+    return idx[np.sort(first)]
+
+
+def histogram(values, max_bins: int = 60):
+    """Đếm theo bin (số bin theo quy tắc Freedman-Diaconis, giới hạn max_bins)."""
+    arr = as_numeric(values)
+    arr = arr[np.isfinite(arr)]
+    if len(arr) == 0:
+        return np.array([]), np.array([0.0, 1.0])
+    edges = np.histogram_bin_edges(arr, bins="fd" if len(arr) > 1 else 1)
+    if len(edges) - 1 > max_bins:
+        edges = np.linspace(arr.min(), arr.max(), max_bins + 1)
+    counts, edges = np.histogram(arr, bins=edges)
+    return counts, edges
+
+
+def top_n_indices(totals, n: int) -> tuple:
+    """Trả về (chỉ số top-N theo tổng giảm dần giữ thứ tự gốc, chỉ số phần còn lại)."""
+    totals = np.nan_to_num(np.asarray(totals, dtype=np.float64))
+    if len(totals) <= n:
+        return np.arange(len(totals)), np.array([], dtype=np.int64)
+    top = np.argpartition(-totals, n - 1)[:n]
+    mask = np.zeros(len(totals), dtype=bool)
+    mask[top] = True
+    return np.flatnonzero(mask), np.flatnonzero(~mask)
+
+
+def reduce_plot_args(args: tuple, max_points: int) -> tuple:
+    """
+    Áp LTTB cho lời gọi Axes.plot dạng đơn giản: plot(y), plot(x, y) hoặc plot(x, y, fmt).
+    Các dạng khác (nhiều đường trong một lời gọi, mảng 2 chiều...) giữ nguyên.
+    """
+    if not args or len(args) > 3:
+        return args
+    arrays = [a for a in args if not isinstance(a, str)]
+    fmt = args[-1] if isinstance(args[-1], str) else None
+    if len(arrays) not in (1, 2) or (fmt is not None and len(args) != len(arrays) + 1):
+        return args
+    try:
+        converted = [np.asarray(a) for a in arrays]
+    except Exception:
+        return args
+    if any(a.ndim != 1 for a in converted) or len({len(a) for a in converted}) != 1:
+        return args
+    n = len(converted[0])
+    if n <= max_points:
+        return args
+
+    y = converted[-1]
+    if not (np.issubdtype(y.dtype, np.number) or y.dtype == bool):
+        return args
+    x = converted[0] if len(converted) == 2 else np.arange(n)
+    keep = lttb_indices(x, y, max_points)
+    reduced = [a[keep] for a in converted]
+    return tuple(reduced) + ((fmt,) if fmt is not None else ())
@@ -0,0 +1,110 @@
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from langchain_core.documents import Document
+from config.settings import settings
+
+
+class HybridSearchIndex:
+    """
+    Truy xuất lai (full-text + vector) ngay trong Postgres.
+    Cột tsvector sinh tự động từ nội dung chunk (cấu hình bỏ dấu cho tiếng Việt) + index GIN,
+    hai danh sách ứng viên được hợp nhất bằng Reciprocal Rank Fusion trong một câu SQL.
+    """
+
+    TABLE_NAME = "langchain_pg_embedding"
+    TSV_COLUMN = "content_tsv"
+
+    # collection_id truyền vào như hằng số (không lấy qua subquery): planner mới khớp được partial index
+    # HNSW / IVFFlat của từng shard (WHERE collection_id = '<uuid>', xem VectorIndexManager)
+    SEARCH_SQL = """
+        WITH params AS (
+            SELECT
+                replace(plainto_tsquery(CAST(:ts_config AS regconfig), :query)::text, '&', '|')::tsquery AS tsq
+        ),
+        vector_hits AS (
+            SELECT id, row_number() OVER (ORDER BY distance) AS rank
+            FROM (
+                SELECT e.id, e.embedding <=> CAST(:embedding AS vector) AS distance
+                FROM langchain_pg_embedding e
+                WHERE e.collection_id = CAST(:collection_id AS uuid)
+                ORDER BY distance
+                LIMIT :candidate_k
+            ) v
+        ),
+        text_hits AS (
+            SELECT id, row_number() OVER (ORDER BY text_rank DESC) AS rank
+            FROM (
+                SELECT e.id, ts_rank_cd(e.content_tsv, p.tsq) AS text_rank
+                FROM langchain_pg_embedding e, params p
+                WHERE e.collection_id = CAST(:collection_id AS uuid) AND e.content_tsv @@ p.tsq
+                ORDER BY text_rank DESC
+                LIMIT :candidate_k
+            ) t
+        )
+        SELECT e.id, e.document, e.cmetadata,
+               COALESCE(1.0 / (:rrf_k + v.rank), 0) + COALESCE(1.0 / (:rrf_k + t.rank), 0) AS score
+        FROM vector_hits v
+        FULL OUTER JOIN text_hits t ON v.id = t.id
+        JOIN langchain_pg_embedding e ON e.id = COALESCE(v.id, t.id)
+        ORDER BY score DESC
+        LIMIT :k
+    """
+
+    def __init__(self, engine: Engine, collection_name: str = settings.COLLECTION_NAME,
+                 ts_config: str = settings.TEXT_SEARCH_CONFIG):
+        self.engine = engine
+        self.collection_name = collection_name
+        self.ts_config = ts_config
+
+    def setup(self):
+        """Tạo cấu hình full-text bỏ dấu, cột tsvector sinh tự động và index GIN (chạy lúc ingest)."""
+        print(f"[Hybrid Search] Đang dựng cột {self.TSV_COLUMN} ({self.ts_config}) + index GIN...")
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS unaccent"))
+            conn.execute(text(f"""
+                DO $$
+                BEGIN
+                    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{self.ts_config}') THEN
+                        CREATE TEXT SEARCH CONFIGURATION {self.ts_config} (COPY = simple);
+                        ALTER TEXT SEARCH CONFIGURATION {self.ts_config}
+                            ALTER MAPPING FOR hword, hword_part, word WITH unaccent, simple;
+                    END IF;
+                END
+                $$;
+            """))
+            conn.execute(text(f"""
+                ALTER TABLE {self.TABLE_NAME} ADD COLUMN IF NOT EXISTS {self.TSV_COLUMN} tsvector
+                GENERATED ALWAYS AS (to_tsvector('{self.ts_config}'::regconfig, coalesce(document, ''))) STORED
+            """))
+            conn.execute(text(
+                f"CREATE INDEX IF NOT EXISTS ix_{self.TABLE_NAME}_{self.TSV_COLUMN} "
+                f"ON {self.TABLE_NAME} USING gin ({self.TSV_COLUMN})"
+            ))
+
+    def similarity_search_with_score(self, query: str, embedding, k: int = 4,
+                                     candidate_k: int = settings.HYBRID_CANDIDATE_K,
+                                     rrf_k: int = settings.HYBRID_RRF_K):
+        """Trả về top-k (Document, điểm RRF) - điểm càng cao càng liên quan."""
+        params = {
+            "ts_config": self.ts_config,
+            "query": query,
+            "embedding": "[" + ",".join(str(float(v)) for v in embedding) + "]",
+            "candidate_k": max(candidate_k, k),
+            "rrf_k": rrf_k,
+            "k": k,
+        }
+        with self.engine.connect() as conn:
+            # uuid của collection đổi sau mỗi lần ingest lại -> tra mỗi lần tìm kiếm (truy vấn theo name, rất nhẹ)
+            collection_id = conn.execute(
+                text("SELECT uuid FROM langchain_pg_collection WHERE name = :name"), {"name": self.collection_name}
+            ).scalar()
+            if collection_id is None:
+                return []
+            rows = conn.execute(text(self.SEARCH_SQL), {**params, "collection_id": str(collection_id)}).fetchall()
+        return [
+            (Document(id=str(row.id), page_content=row.document, metadata=row.cmetadata or {}), float(row.score))
+            for row in rows
+        ]
+
+    def similarity_search(self, query: str, embedding, k: int = 4):
+        return [doc for doc, _ in self.similarity_search_with_score(query, embedding, k)]
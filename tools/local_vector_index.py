@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import threading
+import numpy as np
+from langchain_core.documents import Document
+from langchain_postgres import PGVector
+from config.settings import settings
+
+
+class LocalVectorIndex:
+    """
+    Index vector chạy trong tiến trình cho kho tài liệu nhỏ/vừa.
+    Toàn bộ embedding của collection được giữ trong một ma trận float32 liên tục
+    (file memory-mapped ghi lúc ingest), tìm top-k bằng brute-force + argpartition.
+    Postgres vẫn là nguồn dữ liệu gốc: khi ingest_version trong DB khác với bản local,
+    ma trận được dựng lại từ bảng langchain_pg_embedding.
+    """
+
+    MANIFEST_FILE = "manifest.json"
+
+    def __init__(self, vector_store: PGVector, index_dir: str = settings.LOCAL_INDEX_DIR,
+                 refresh_seconds: int = settings.LOCAL_INDEX_REFRESH_SECONDS):
+        self.vector_store = vector_store
+        self.index_dir = os.path.join(index_dir, vector_store.collection_name)
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._manifest_mtime = None
+        self._last_db_check = 0.0
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.index_dir, self.MANIFEST_FILE)
+
+    @property
+    def version(self):
+        return self._snapshot["version"] if self._snapshot else None
+
+    def get_db_version(self):
+        """Đọc ingest_version đang lưu trong metadata của collection trên Postgres."""
+        with self.vector_store.session_maker() as session:
+            collection = self.vector_store.get_collection(session)
+            if not collection:
+                raise ValueError(f"Không tìm thấy collection: {self.vector_store.collection_name}")
+            return (collection.cmetadata or {}).get("ingest_version")
+
+    def rebuild(self, version: str = None):
+        """Xuất toàn bộ embedding + metadata của collection từ Postgres ra file local."""
+        store = self.vector_store
+        with store.session_maker() as session:
+            collection = store.get_collection(session)
+            if not collection:
+                raise ValueError(f"Không tìm thấy collection: {store.collection_name}")
+            if version is None:
+                version = (collection.cmetadata or {}).get("ingest_version") or "unversioned"
+            rows = (
+                session.query(store.EmbeddingStore)
+                .filter(store.EmbeddingStore.collection_id == collection.uuid)
+                .order_by(store.EmbeddingStore.id)
+                .all()
+            )
+            records = [(r.id, r.document, r.cmetadata, r.embedding) for r in rows]
+
+        if not records:
+            raise ValueError(f"Collection {store.collection_name} chưa có dữ liệu để xuất.")
+
+        os.makedirs(self.index_dir, exist_ok=True)
+        dim = len(records[0][3])
+        matrix_file = f"embeddings-{version}.f32"
+        matrix = np.memmap(os.path.join(self.index_dir, matrix_file), dtype=np.float32, mode="w+", shape=(len(records), dim))
+        for i, record in enumerate(records):
+            matrix[i] = record[3]
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1.0, norms)
+        matrix.flush()
+        del matrix
+
+        metadata_file = f"metadata-{version}.json"
+        with open(os.path.join(self.index_dir, metadata_file), "w", encoding="utf-8") as f:
+            json.dump([{"id": r[0], "page_content": r[1], "metadata": r[2]} for r in records], f, ensure_ascii=False)
+
+        manifest = {
+            "version": version,
+            "count": len(records),
+            "dim": dim,
+            "matrix_file": matrix_file,
+            "metadata_file": metadata_file,
+            "created_at": time.time(),
+        }
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+        self._remove_stale_files(keep={matrix_file, metadata_file, self.MANIFEST_FILE})
+        print(f"[Local Index] Đã xuất {len(records)} vector ({dim} chiều), version={version}")
+        return manifest
+
+    def _remove_stale_files(self, keep: set):
+        for name in os.listdir(self.index_dir):
+            if name not in keep and (name.startswith("embeddings-") or name.startswith("metadata-")):
+                try:
+                    os.remove(os.path.join(self.index_dir, name))
+                except OSError:
+                    pass
+
+    def _load(self):
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        matrix = np.memmap(os.path.join(self.index_dir, manifest["matrix_file"]), dtype=np.float32,
+                           mode="r", shape=(manifest["count"], manifest["dim"]))
+        with open(os.path.join(self.index_dir, manifest["metadata_file"]), "r", encoding="utf-8") as f:
+            records = json.load(f)
+        documents = [Document(id=r["id"], page_content=r["page_content"], metadata=r["metadata"] or {}) for r in records]
+        self._snapshot = {"version": manifest["version"], "matrix": matrix, "documents": documents}
+        self._manifest_mtime = os.path.getmtime(self.manifest_path)
+        print(f"[Local Index] Đã nạp ma trận {manifest['count']}x{manifest['dim']}, version={manifest['version']}")
+
+    def ensure_fresh(self):
+        """
+        Nạp lại ma trận khi file manifest thay đổi (ingest vừa ghi bản mới),
+        và định kỳ đối chiếu ingest_version với Postgres để dựng lại nếu lệch.
+        """
+        manifest_exists = os.path.exists(self.manifest_path)
+        now = time.monotonic()
+        needs_db_check = self._snapshot is None or now - self._last_db_check >= self.refresh_seconds
+        manifest_changed = manifest_exists and os.path.getmtime(self.manifest_path) != self._manifest_mtime
+        if not (needs_db_check or manifest_changed):
+            return
+
+        with self._lock:
+            if manifest_exists and (self._snapshot is None or os.path.getmtime(self.manifest_path) != self._manifest_mtime):
+                self._load()
+            if now - self._last_db_check >= self.refresh_seconds or self._snapshot is None:
+                try:
+                    db_version = self.get_db_version()
+                except Exception as e:
+                    if self._snapshot is None:
+                        raise
+                    print(f"[Local Index] Không kiểm tra được version trên Postgres, dùng bản local: {e}")
+                    self._last_db_check = now
+                    return
+                self._last_db_check = now
+                if self._snapshot is None or (db_version and db_version != self._snapshot["version"]):
+                    self.rebuild(db_version)
+                    self._load()
+
+    def similarity_search_with_score_by_vector(self, embedding, k: int = 4):
+        """Tìm top-k theo cosine similarity (điểm càng cao càng giống)."""
+        self.ensure_fresh()
+        snapshot = self._snapshot
+        matrix, documents = snapshot["matrix"], snapshot["documents"]
+
+        query = np.array(embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        scores = matrix @ query
+
+        k = min(k, len(documents))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(documents[i], float(scores[i])) for i in top]
+
+    def similarity_search_by_vector(self, embedding, k: int = 4):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
@@ -1,49 +1,88 @@
 import os
-from langchain_experimental.utilities import PythonREPL
+import time
+import threading
+import textwrap
 from langchain_core.tools import StructuredTool
-from .base_tool import BaseToolService
+from .base_tool import BaseToolService, LazyInitMixin
+from .sandbox_pool import SandboxPool
+from .artifact_store import ArtifactStore
+from .data_handles import DataHandleStore
 
-class PythonChartService(BaseToolService):
-    def __init__(self, save_dir: str = "static"):
-        self.save_dir = save_dir
-        os.makedirs(self.save_dir, exist_ok=True)
-        self.repl = PythonREPL()
+class PythonChartService(LazyInitMixin, BaseToolService):
+    # Pool sandbox (tiến trình con) chỉ khởi động ở lần vẽ đầu tiên hoặc khi warm-up
+    LAZY_ATTRIBUTES = ("pool",)
 
-    def python_chart_maker(self, code: str) -> str:
+    def __init__(self, pool: SandboxPool = None, artifacts: ArtifactStore = None,
+                 data_handles: DataHandleStore = None):
+        # Code của LLM chạy trong pool tiến trình con đã nạp sẵn pandas/matplotlib (Agg),
+        # mỗi lần chạy có namespace riêng + giới hạn thời gian, CPU, bộ nhớ
+        self._pool_override = pool
+        # Mỗi biểu đồ là một artifact riêng (hash code + data handle) thay vì ghi đè một file chung
+        self.artifacts = artifacts or ArtifactStore()
+        self.data_handles = data_handles or DataHandleStore()
+        self.stats = {"renders": 0, "cache_hits": 0}
+        self._stats_lock = threading.Lock()
+
+    def _initialize(self):
+        self.pool = self._pool_override or SandboxPool()
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    @staticmethod
+    def normalize_code(code: str) -> str:
+        """Bỏ dòng trống, comment và khoảng trắng thừa để các đoạn code tương đương có cùng ID."""
+        lines = []
+        for line in textwrap.dedent(code).splitlines():
+            line = line.rstrip()
+            if line and not line.lstrip().startswith("#"):
+                lines.append(line)
+        return "\n".join(lines)
+
+    @staticmethod
+    def _artifact(artifact_id: str, path: str, cached: bool, render_ms: float = 0.0) -> dict:
+        return {"artifact_id": artifact_id, "path": path, "mime_type": "image/png", "cached": cached,
+                "render_ms": round(render_ms, 1)}
+
+    def python_chart_maker(self, code: str, data_handle: str = "") -> tuple:
         print("[Chart Tool] Executing Python code...")
-        
-        wrapped_code = f"""
-import matplotlib.pyplot as plt
-import pandas as pd
-import os
 
-# Code của AI bắt đầu
-{code}
-# Code của AI kết thúc
-
-# Force save file
-if plt.get_fignums():
-    save_path = '{self.save_dir}/chart_output.png'
-    if os.path.exists(save_path):
-        os.remove(save_path)
-    plt.savefig(save_path, bbox_inches='tight')
-    plt.close()
-    print(f"SUCCESSS_CHART_SAVED: {{save_path}}")
-else:
-    print("NO_CHART_CREATED")
-"""
-        try:
-            result = self.repl.run(wrapped_code)
-            
-            if "SUCCESSS_CHART_SAVED" in result:
-                return f"Đã vẽ biểu đồ thành công và lưu tại '{self.save_dir}/chart_output.png'. Hãy hiển thị nó cho người dùng."
-            elif "NO_CHART_CREATED" in result:
-                return f"Code đã chạy nhưng không tạo ra biểu đồ. Output: {result}"
-            else:
-                return f"Kết quả chạy code: {result}"
-                
-        except Exception as e:
-            return f"Lỗi Python: {str(e)}"
+        data_path = None
+        if data_handle:
+            data_path = self.data_handles.path(data_handle)
+            if data_path is None:
+                return f"Lỗi Python: data_handle '{data_handle}' không tồn tại hoặc đã hết hạn. Hãy chạy lại query_sql_db.", None
+
+        artifact_id = self.artifacts.make_id(self.normalize_code(code), data_handle.strip())
+        cached_path = self.artifacts.get(artifact_id)
+        if cached_path:
+            self._count("cache_hits")
+            return (
+                f"Đã vẽ biểu đồ thành công (artifact: {artifact_id}, lấy từ cache). Hãy hiển thị nó cho người dùng.",
+                self._artifact(artifact_id, cached_path, cached=True),
+            )
+
+        self._count("renders")
+        temp_path = self.artifacts.temp_path(artifact_id)
+        start = time.perf_counter()
+        # Worker chạy trong thư mục tạm riêng -> mọi đường dẫn gửi sang phải là tuyệt đối
+        result = self.pool.run(code, save_path=os.path.abspath(temp_path),
+                               data_path=os.path.abspath(data_path) if data_path else None)
+        output = result.get("stdout", "")
+        render_ms = (time.perf_counter() - start) * 1000
+
+        if not result["ok"]:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return f"Lỗi Python: {result['error']}\n{output}".strip(), None
+        if result["chart_saved"]:
+            path = self.artifacts.commit(artifact_id, temp_path)
+            return (
+                f"Đã vẽ biểu đồ thành công (artifact: {artifact_id}). Hãy hiển thị nó cho người dùng.",
+                self._artifact(artifact_id, path, cached=False, render_ms=render_ms),
+            )
+        return f"Code đã chạy nhưng không tạo ra biểu đồ. Output: {output}", None
 
     def get_tool(self) -> StructuredTool:
         return StructuredTool.from_function(
@@ -52,7 +91,9 @@ else:
             description=(
                 "Công cụ chạy code Python để phân tích dữ liệu hoặc vẽ biểu đồ. "
                 "Sử dụng thư viện: matplotlib, pandas. "
-                "Input: Đoạn code Python hợp lệ. "
-                "Output: Kết quả chạy code hoặc thông báo đã lưu ảnh."
-            )
+                "Input: code - đoạn code Python hợp lệ; data_handle (tùy chọn) - DATA_HANDLE do query_sql_db trả về, "
+                "khi truyền vào thì dữ liệu có sẵn trong biến df (pandas DataFrame), không cần chép số liệu vào code. "
+                "Output: Kết quả chạy code hoặc ID artifact của biểu đồ đã vẽ."
+            ),
+            response_format="content_and_artifact",
         )
\ No newline at end of file
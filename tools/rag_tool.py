@@ -1,43 +1,180 @@
+import os
 import cohere
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from langchain_openai import OpenAIEmbeddings
 from langchain_postgres import PGVector
 from langchain_core.tools import StructuredTool
 from config.settings import settings
-from .base_tool import BaseToolService
-
-class PolicyRAGService(BaseToolService):
-    def __init__(self):
-        self.embeddings = OpenAIEmbeddings(model=settings.EMBEDDING_MODEL)
-        self.vector_store = PGVector(
-            embeddings=self.embeddings,
-            collection_name=settings.COLLECTION_NAME,
-            connection=settings.DATABASE_URL,
-            use_jsonb=True,
-        )
-        self.co = cohere.Client(settings.COHERE_API_KEY)
+from core.database import get_engine, ROLE_VECTOR
+from .base_tool import BaseToolService, LazyInitMixin
+from .vector_index import VectorIndexManager
+from .local_vector_index import LocalVectorIndex
+from .hybrid_search import HybridSearchIndex
+from .rerank_cache import RerankCache
+from .context_compressor import ContextCompressor
+from .collection_router import CollectionRouter
 
-    def search_policy_docs(self, query: str) -> str:
-        """Tìm kiếm và rerank tài liệu."""
-        print(f"[RAG Tool] Searching: {query}")
-        initial_docs = self.vector_store.similarity_search(query, k=5)
-        
-        doc_contents = [d.page_content for d in initial_docs]
+class PolicyRAGService(LazyInitMixin, BaseToolService):
+    # Client embeddings, engine PGVector, Cohere... chỉ được tạo ở lần tìm kiếm đầu tiên (hoặc khi warm-up)
+    LAZY_ATTRIBUTES = ("embeddings", "engine", "vector_stores", "local_indexes", "hybrid_indexes",
+                       "router", "_shard_pool", "co", "compressor")
+
+    def __init__(self, retriever: str = None, use_rerank: bool = None, adaptive_rerank: bool = None,
+                 compress_context: bool = None, collections: list = None, embeddings=None, rerank_client=None):
+        self.retriever = retriever or settings.RAG_RETRIEVER
+        self.collections = list(collections or settings.RAG_COLLECTIONS)
+        self.use_rerank = settings.RAG_RERANK_ENABLED if use_rerank is None else use_rerank
+        self.adaptive_rerank = settings.RERANK_ADAPTIVE if adaptive_rerank is None else adaptive_rerank
+        self.use_compression = settings.RAG_COMPRESSION_ENABLED if compress_context is None else compress_context
+        self.rerank_cache = RerankCache(settings.RERANK_CACHE_SIZE, settings.RERANK_CACHE_TTL_SECONDS)
+        self.rerank_stats = {"queries": 0, "rerank_calls": 0, "skipped_by_margin": 0, "cache_hits": 0, "widened_pool": 0}
+        self._stats_lock = threading.Lock()
+        # Cho phép thay client embeddings / Cohere bằng bản giả lập (load test, benchmark)
+        self._embeddings_override = embeddings
+        self._rerank_override = rerank_client
+
+    def _initialize(self):
+        self.embeddings = self._embeddings_override or OpenAIEmbeddings(model=settings.EMBEDDING_MODEL)
+        self.engine = VectorIndexManager.attach_runtime_settings(get_engine(ROLE_VECTOR))
+        self.vector_stores = {
+            name: PGVector(
+                embeddings=self.embeddings,
+                collection_name=name,
+                connection=self.engine,
+                embedding_length=settings.EMBEDDING_DIMENSIONS,
+                use_jsonb=True,
+            )
+            for name in self.collections
+        }
+        self.local_indexes = {
+            name: LocalVectorIndex(store) for name, store in self.vector_stores.items()
+        } if self.retriever == "numpy" else {}
+        self.hybrid_indexes = {
+            name: HybridSearchIndex(self.engine, name) for name in self.collections
+        } if self.retriever == "hybrid" else {}
+        # Nhiều shard: router chọn collection liên quan, fan-out song song khi câu hỏi mơ hồ
+        self.router = CollectionRouter(self.engine, self.collections) if len(self.collections) > 1 else None
+        self._shard_pool = ThreadPoolExecutor(max_workers=len(self.collections)) if self.router else None
+        self.co = self._rerank_override or cohere.Client(settings.COHERE_API_KEY)
+        self.compressor = ContextCompressor(self.embeddings) if self.use_compression else None
+
+    def _retrieve_shard(self, collection: str, query: str, embedding: list, k: int):
+        if self.local_indexes:
+            return self.local_indexes[collection].similarity_search_with_score_by_vector(embedding, k=k)
+        if self.hybrid_indexes:
+            return self.hybrid_indexes[collection].similarity_search_with_score(query, embedding, k=k)
+        store = self.vector_stores[collection]
+        return [(doc, 1.0 - distance) for doc, distance in store.similarity_search_with_score_by_vector(embedding, k=k)]
+
+    def _retrieve(self, query: str, k: int):
+        """
+        Lấy k ứng viên từ backend đã cấu hình (pgvector / numpy / hybrid).
+        Trả về danh sách (Document, điểm liên quan) - điểm càng cao càng liên quan.
+        Với nhiều collection, chỉ tìm trong các shard router chọn rồi gộp theo điểm.
+        """
+        embedding = self.embeddings.embed_query(query)
+        targets = self.router.route(query, embedding) if self.router else self.collections
+        if len(targets) == 1:
+            return self._retrieve_shard(targets[0], query, embedding, k)
+
+        futures = [self._shard_pool.submit(self._retrieve_shard, name, query, embedding, k) for name in targets]
+        merged = [hit for future in futures for hit in future.result()]
+        merged.sort(key=lambda hit: hit[1], reverse=True)
+        return merged[:k]
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.rerank_stats[key] += 1
+
+    @staticmethod
+    def _doc_key(doc) -> str:
+        return doc.id or hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest()
+
+    def _rerank(self, query: str, docs: list, top_n: int) -> list:
+        by_key = {self._doc_key(d): d for d in docs}
+        cache_key = RerankCache.make_key(query, by_key)
+        # Cache lưu khóa tài liệu (không lưu vị trí): cùng tập ứng viên có thể về theo thứ tự khác
+        # (ANN không tất định, gộp nhiều shard), vị trí cũ sẽ trỏ sai chunk
+        cached_keys = self.rerank_cache.get(cache_key)
+        if cached_keys is not None:
+            self._count("cache_hits")
+            return [by_key[key] for key in cached_keys]
+
+        self._count("rerank_calls")
         rerank_results = self.co.rerank(
             query=query, 
-            documents=doc_contents, 
-            top_n=3, 
+            documents=[d.page_content for d in docs], 
+            top_n=top_n, 
             model=settings.RERANK_MODEL
         )
-        
+        reranked = [docs[res.index] for res in rerank_results.results]
+        self.rerank_cache.put(cache_key, [self._doc_key(d) for d in reranked])
+        return reranked
+
+    def _select_documents(self, query: str) -> list:
+        """
+        Chọn top-N tài liệu cho câu hỏi:
+        - Khoảng cách điểm giữa ứng viên thứ N và N+1 đủ lớn -> giữ thứ tự vector, không gọi rerank.
+        - Ranh giới của tập ứng viên còn mơ hồ -> mở rộng tập ứng viên đưa vào rerank.
+        Điểm RRF (hybrid) không cùng thang đo với cosine nên chỉ dùng cache, không dùng ngưỡng.
+        """
+        top_n, candidate_k = settings.RAG_TOP_N, settings.RAG_CANDIDATE_K
+        self._count("queries")
+
+        if not self.use_rerank:
+            return [doc for doc, _ in self._retrieve(query, k=candidate_k)[:top_n]]
+
+        use_margin = self.adaptive_rerank and self.retriever != "hybrid"
+        pool_k = max(settings.RERANK_WIDE_POOL_K, candidate_k) if use_margin else candidate_k
+        scored = self._retrieve(query, k=pool_k)
+        scores = [score for _, score in scored]
+
+        if use_margin and len(scored) > top_n and scores[top_n - 1] - scores[top_n] >= settings.RERANK_SKIP_MARGIN:
+            self._count("skipped_by_margin")
+            return [doc for doc, _ in scored[:top_n]]
+
+        candidates = scored[:candidate_k]
+        if use_margin and len(scored) > candidate_k and scores[candidate_k - 1] - scores[candidate_k] < settings.RERANK_POOL_MARGIN:
+            self._count("widened_pool")
+            candidates = scored
+
+        docs = [doc for doc, _ in candidates]
+        if len(docs) <= 1:
+            return docs
+        return self._rerank(query, docs, top_n)
+
+    @staticmethod
+    def _source_label(doc) -> str:
+        """"TRANG 3, 5 (a.pdf); TRANG 7 (b.pdf)" từ các trích dẫn [nguồn, trang] của chunk (đã dedup)."""
+        citations = doc.metadata.get("citations") or [[doc.metadata.get("source") or "", doc.metadata.get("page", 0)]]
+        by_source = OrderedDict()
+        for source, page in citations:
+            by_source.setdefault(source, []).append(page)
+        labels = []
+        for source, pages in by_source.items():
+            label = "TRANG " + ", ".join(str(page + 1) for page in sorted(set(pages)))
+            labels.append(f"{label} ({os.path.basename(source)})" if source else label)
+        return "; ".join(labels)
+
+    @classmethod
+    def _format_docs(cls, docs: list) -> str:
         formatted_results = []
-        for res in rerank_results.results:
-            original_doc = initial_docs[res.index]
-            page_num = original_doc.metadata.get("page", 0) + 1
-            chunk_text = f"[NGUỒN: TRANG {page_num}]\n{original_doc.page_content}\n"
+        for doc in docs:
+            chunk_text = f"[NGUỒN: {cls._source_label(doc)}]\n{doc.page_content}\n"
             formatted_results.append(chunk_text)
-            
         return "\n".join(formatted_results)
 
+    def search_policy_docs(self, query: str) -> str:
+        """Tìm kiếm và rerank tài liệu."""
+        print(f"[RAG Tool] Searching: {query}")
+        top_docs = self._select_documents(query)
+        if self.compressor is not None:
+            top_docs = self.compressor.compress(query, top_docs)
+        return self._format_docs(top_docs)
+
     def get_tool(self) -> StructuredTool:
         return StructuredTool.from_function(
             func=self.search_policy_docs,
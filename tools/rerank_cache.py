@@ -0,0 +1,39 @@
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+class RerankCache:
+    """Cache LRU có TTL cho kết quả rerank (danh sách ID đã xếp hạng), khóa theo (câu hỏi, tập ID ứng viên)."""
+
+    def __init__(self, max_size: int, ttl_seconds: int):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(query: str, candidate_ids) -> str:
+        normalized_query = " ".join(query.lower().split())
+        payload = normalized_query + "\x1f" + "\x1f".join(sorted(candidate_ids))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, value = entry
+            if time.monotonic() - created_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: str, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
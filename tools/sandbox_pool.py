@@ -0,0 +1,183 @@
+import os
+import sys
+import json
+import time
+import queue
+import select
+import shutil
+import threading
+import tempfile
+import subprocess
+from config.settings import settings
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+
+
+class SandboxWorker:
+    """Một tiến trình con đã nạp sẵn pandas + matplotlib (Agg), giao tiếp bằng JSON theo dòng."""
+
+    def __init__(self, memory_mb: int, startup_timeout: float = 60):
+        # Thư mục làm việc riêng: code do LLM sinh không đọc được file của repo (.env...) qua đường dẫn tương đối
+        self.workdir = tempfile.mkdtemp(prefix="insight-sandbox-")
+        self.process = subprocess.Popen(
+            [sys.executable, WORKER_SCRIPT, str(memory_mb), *self._downsampling_args()],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8",
+            env=self._sandbox_env(self.workdir),
+            cwd=self.workdir,
+        )
+        self.runs = 0
+        handshake = self._read_line(startup_timeout)
+        if not handshake or not json.loads(handshake).get("ready"):
+            self.kill()
+            raise RuntimeError("Sandbox worker không khởi động được")
+
+    @staticmethod
+    def _sandbox_env(workdir: str) -> dict:
+        """
+        Môi trường tối thiểu cho worker chạy code do LLM sinh: không kế thừa os.environ để code không đọc được
+        DATABASE_URL / API key của tiến trình chính.
+        """
+        return {
+            "PATH": os.environ.get("PATH", os.defpath),
+            "HOME": workdir,
+            "TMPDIR": workdir,
+            "MPLBACKEND": "Agg",
+            "MPLCONFIGDIR": os.path.join(tempfile.gettempdir(), "insight-sandbox-mpl"),
+            "PYTHONIOENCODING": "utf-8",
+        }
+
+    @staticmethod
+    def _downsampling_args() -> list:
+        if not settings.CHART_DOWNSAMPLE_ENABLED:
+            return ["0", "0", "0"]
+        return [str(settings.CHART_MAX_LINE_POINTS), str(settings.CHART_MAX_SCATTER_POINTS), str(settings.CHART_SCATTER_GRID)]
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def _read_line(self, timeout: float):
+        ready, _, _ = select.select([self.process.stdout], [], [], timeout)
+        if not ready:
+            return None
+        return self.process.stdout.readline()
+
+    def execute(self, job: dict, timeout: float) -> dict:
+        """Gửi job và chờ kết quả trong giới hạn wall-clock. Hết giờ / worker chết -> trả về lỗi."""
+        self.runs += 1
+        try:
+            self.process.stdin.write(json.dumps(job, ensure_ascii=False) + "\n")
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            return {"ok": False, "crashed": True, "error": "Sandbox worker đã dừng bất thường", "stdout": ""}
+
+        line = self._read_line(timeout)
+        if line is None:
+            self.kill()
+            return {"ok": False, "crashed": True, "timeout": True, "error": f"Hết thời gian chạy ({timeout:.0f}s)", "stdout": ""}
+        if not line:
+            return {"ok": False, "crashed": True, "error": "Sandbox worker đã dừng bất thường (crash / vượt bộ nhớ)", "stdout": ""}
+        return json.loads(line)
+
+    def kill(self):
+        if self.alive:
+            self.process.kill()
+        self.process.wait()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+class SandboxPool:
+    """
+    Pool tiến trình sandbox đã khởi động sẵn cho code Python do LLM sinh ra.
+    - Mỗi lần chạy có namespace riêng, không cần khởi động lại tiến trình.
+    - Giới hạn wall-clock (phía pool), CPU (RLIMIT_CPU) và bộ nhớ (RLIMIT_AS) cho mỗi lần chạy.
+    - Worker crash / hết giờ / RSS quá cao / đủ số lần chạy -> bị thay bằng worker mới ở nền.
+    """
+
+    def __init__(self, size: int = settings.SANDBOX_POOL_SIZE, timeout: float = settings.SANDBOX_TIMEOUT_SECONDS,
+                 cpu_seconds: int = settings.SANDBOX_CPU_SECONDS, memory_mb: int = settings.SANDBOX_MEMORY_MB,
+                 max_runs: int = settings.SANDBOX_MAX_RUNS_PER_WORKER,
+                 recycle_rss_mb: int = settings.SANDBOX_RECYCLE_RSS_MB,
+                 queue_timeout: float = settings.SANDBOX_QUEUE_TIMEOUT_SECONDS):
+        self.size = size
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.max_runs = max_runs
+        self.recycle_rss_mb = recycle_rss_mb
+        self.queue_timeout = queue_timeout
+        self._idle = queue.Queue()
+        self._closed = False
+        self.stats = {"runs": 0, "timeouts": 0, "crashes": 0, "recycled": 0}
+        self._stats_lock = threading.Lock()
+        for _ in range(size):
+            self._spawn_async()
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _spawn(self):
+        if self._closed:
+            return
+        try:
+            self._idle.put(SandboxWorker(self.memory_mb))
+        except Exception as e:
+            print(f"[Sandbox] Không khởi động được worker: {e}")
+
+    def _spawn_async(self):
+        threading.Thread(target=self._spawn, daemon=True).start()
+
+    def _retire(self, worker: SandboxWorker):
+        worker.kill()
+        self._spawn_async()
+
+    def warm_up(self, timeout: float = 60) -> int:
+        """Chờ tới khi đủ worker sẵn sàng (dùng cho benchmark / health check). Trả về số worker rảnh."""
+        deadline = time.monotonic() + timeout
+        while self._idle.qsize() < self.size and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return self._idle.qsize()
+
+    def run(self, code: str, save_path: str = None, data_path: str = None) -> dict:
+        """
+        Chạy code trong một worker rảnh. Trả về dict: ok, chart_saved, stdout, error.
+        """
+        deadline = time.monotonic() + self.queue_timeout
+        while True:
+            try:
+                worker = self._idle.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                return {"ok": False, "chart_saved": False, "stdout": "", "error": "Sandbox đang quá tải, thử lại sau"}
+            if worker.alive:
+                break
+            # Worker chết khi đang rảnh (vd: bị OOM killer) -> thay thế, lấy worker khác
+            self._count("crashes")
+            self._retire(worker)
+
+        self._count("runs")
+        job = {"code": code, "save_path": save_path, "data_path": data_path, "cpu_seconds": self.cpu_seconds}
+        result = worker.execute(job, self.timeout)
+
+        if result.get("crashed"):
+            self._count("timeouts" if result.get("timeout") else "crashes")
+            self._retire(worker)
+        elif worker.runs >= self.max_runs or result.get("rss_mb", 0) > self.recycle_rss_mb:
+            self._count("recycled")
+            self._retire(worker)
+        else:
+            self._idle.put(worker)
+        result.setdefault("chart_saved", False)
+        return result
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                break
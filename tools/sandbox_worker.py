@@ -0,0 +1,221 @@
+"""
+Tiến trình worker của sandbox Python (chạy trực tiếp bằng đường dẫn file, KHÔNG import qua package
+`tools` để tránh khởi tạo kết nối DB của tools/__init__).
+
+Giao thức: mỗi dòng stdin là một job JSON {"code", "save_path", "data_path", "cpu_seconds"},
+mỗi job trả về đúng một dòng JSON trên stdout gốc. Mọi output của code người dùng bị gom vào buffer.
+
+Tham số dòng lệnh: memory_mb [max_line_points scatter_max_points scatter_grid] (0 = không rút gọn dữ liệu).
+"""
+import io
+import os
+import sys
+import json
+import signal
+import resource
+import traceback
+import contextlib
+import importlib.util
+
+os.environ.setdefault("MPLBACKEND", "Agg")
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.axes import Axes
+import numpy as np
+import pandas as pd
+
+# Số ký tự tối đa của output (print / traceback) gửi về cho mỗi job
+MAX_OUTPUT_CHARS = 20000
+
+
+def _load_downsampling():
+    """Nạp tools/downsampling.py theo đường dẫn (chỉ phụ thuộc NumPy, không kéo theo package tools)."""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "downsampling.py")
+    spec = importlib.util.spec_from_file_location("sandbox_downsampling", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+downsampling = _load_downsampling()
+
+
+class CPULimitExceeded(Exception):
+    pass
+
+
+def _on_cpu_limit(signum, frame):
+    raise CPULimitExceeded("Vượt giới hạn CPU cho mỗi lần chạy")
+
+
+def _rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _vm_size_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def warm_up():
+    """Nạp sẵn font cache + đường render text để lần vẽ đầu tiên không phải trả chi phí khởi tạo."""
+    fig, ax = plt.subplots()
+    ax.plot([0, 1], [0, 1])
+    ax.set_title("Khởi động")
+    ax.set_xlabel("x")
+    fig.savefig(io.BytesIO(), format="png", bbox_inches="tight")
+    plt.close("all")
+    pd.DataFrame({"a": [1, 2]}).describe()
+
+
+def apply_memory_limit(memory_mb: int):
+    """Giới hạn không gian địa chỉ = phần đã nạp (pandas/matplotlib) + memory_mb cho code người dùng."""
+    if memory_mb <= 0:
+        return
+    limit = _vm_size_bytes() + memory_mb * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def set_cpu_budget(cpu_seconds: int):
+    """RLIMIT_CPU tính cộng dồn cho cả tiến trình -> đặt soft limit = CPU đã dùng + ngân sách của lần chạy."""
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if cpu_seconds <= 0:
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime) + cpu_seconds + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def install_downsampling(max_line_points: int, scatter_max_points: int, scatter_grid: int):
+    """
+    Bọc Axes.plot / Axes.scatter để dữ liệu quá lớn tự được rút gọn trước khi vẽ
+    (áp dụng cả cho plt.plot, df.plot vì đều đi qua Axes). Code của LLM không cần thay đổi.
+    """
+    original_plot, original_scatter = Axes.plot, Axes.scatter
+
+    def plot(self, *args, **kwargs):
+        if max_line_points > 0 and "data" not in kwargs:
+            args = downsampling.reduce_plot_args(args, max_line_points)
+        return original_plot(self, *args, **kwargs)
+
+    def scatter(self, x, y, s=None, c=None, *args, **kwargs):
+        try:
+            n = len(x)
+        except TypeError:
+            n = 0
+        if 0 < scatter_max_points < n and "data" not in kwargs:
+            try:
+                keep = downsampling.grid_thin_indices(np.asarray(x), np.asarray(y, dtype=float), scatter_grid)
+                x, y = np.asarray(x)[keep], np.asarray(y)[keep]
+                # Kích thước / màu theo từng điểm phải được lọc cùng chỉ số
+                if s is not None and np.ndim(s) == 1 and len(s) == n:
+                    s = np.asarray(s)[keep]
+                if c is not None and not isinstance(c, str) and np.ndim(c) >= 1 and len(c) == n:
+                    c = np.asarray(c)[keep]
+            except (TypeError, ValueError):
+                pass
+        return original_scatter(self, x, y, s, c, *args, **kwargs)
+
+    Axes.plot = plot
+    Axes.scatter = scatter
+
+
+class BoundedOutput(io.StringIO):
+    """Buffer stdout giới hạn kích thước: code in vô hạn không làm phình bộ nhớ / dòng JSON trả về."""
+
+    def __init__(self, limit: int = MAX_OUTPUT_CHARS):
+        super().__init__()
+        self.limit = limit
+        self.truncated = False
+
+    def write(self, text: str) -> int:
+        room = self.limit - self.tell()
+        if room <= 0:
+            self.truncated = True
+            return len(text)
+        if len(text) > room:
+            self.truncated = True
+            super().write(text[:room])
+            return len(text)
+        return super().write(text)
+
+    def getvalue(self) -> str:
+        value = super().getvalue()
+        return value + "\n...(output đã bị cắt bớt)" if self.truncated else value
+
+
+def run_job(job: dict, rc_defaults: dict) -> dict:
+    stdout = BoundedOutput()
+    # Namespace mới cho mỗi lần chạy: biến của người dùng trước không rò sang người dùng sau
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__, "plt": plt, "pd": pd}
+    result = {"ok": True, "chart_saved": False, "error": None}
+    set_cpu_budget(job.get("cpu_seconds", 0))
+    try:
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stdout):
+            if job.get("data_path"):
+                # Dữ liệu của data handle (kết quả SQL) có sẵn trong biến df
+                namespace["df"] = pd.read_pickle(job["data_path"])
+            exec(compile(job["code"], "<sandbox>", "exec"), namespace)
+            if plt.get_fignums() and job.get("save_path"):
+                plt.savefig(job["save_path"], bbox_inches="tight")
+                result["chart_saved"] = True
+    except CPULimitExceeded as e:
+        result.update(ok=False, error=str(e))
+    except MemoryError:
+        result.update(ok=False, error="Vượt giới hạn bộ nhớ cho mỗi lần chạy")
+    except BaseException as e:
+        result.update(ok=False, error=f"{type(e).__name__}: {e}")
+        stdout.write(traceback.format_exc(limit=3))
+    finally:
+        set_cpu_budget(0)
+        plt.close("all")
+        matplotlib.rcParams.update(rc_defaults)
+
+    result["stdout"] = stdout.getvalue()
+    result["rss_mb"] = round(_rss_mb(), 1)
+    return result
+
+
+def main():
+    memory_mb = int(sys.argv[1]) if len(sys.argv) > 1 else 0
+    if len(sys.argv) > 4:
+        install_downsampling(int(sys.argv[2]), int(sys.argv[3]), int(sys.argv[4]))
+
+    # Giữ stdout gốc cho giao thức, fd 1 trỏ sang stderr để output lạc không làm hỏng dòng JSON
+    protocol_out = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+
+    signal.signal(signal.SIGXCPU, _on_cpu_limit)
+    warm_up()
+    rc_defaults = matplotlib.rcParams.copy()
+    apply_memory_limit(memory_mb)
+
+    protocol_out.write(json.dumps({"ready": True, "pid": os.getpid()}) + "\n")
+    protocol_out.flush()
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        result = run_job(json.loads(line), rc_defaults)
+        protocol_out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        protocol_out.flush()
+
+
+if __name__ == "__main__":
+    main()
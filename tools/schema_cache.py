@@ -0,0 +1,57 @@
+import os
+import json
+import time
+import hashlib
+from sqlalchemy import text
+from config.settings import settings
+from core.database import get_engine, ROLE_READ
+
+
+class SchemaSnapshotCache:
+    """
+    Lưu schema (kết quả get_table_info: DDL + dòng mẫu) ra đĩa để khởi động không phải reflect
+    toàn bộ bảng và query dòng mẫu.
+    Snapshot được kiểm tra bằng một câu query catalog rẻ (fingerprint của bảng/cột/kiểu dữ liệu):
+    schema đổi -> fingerprint đổi -> dựng lại. Dòng mẫu có thể cũ, nên snapshot còn có TTL.
+    """
+
+    FINGERPRINT_SQL = text("""
+        SELECT md5(coalesce(string_agg(
+                   table_name || '.' || column_name || ':' || data_type || ':' || is_nullable,
+                   ',' ORDER BY table_name, ordinal_position), ''))
+        FROM information_schema.columns
+        WHERE table_schema = current_schema()
+    """)
+
+    def __init__(self, database_url: str = settings.DATABASE_URL, cache_dir: str = settings.SCHEMA_CACHE_DIR,
+                 ttl_seconds: int = settings.SCHEMA_CACHE_TTL_SECONDS):
+        self.database_url = database_url
+        self.ttl_seconds = ttl_seconds
+        # Tên file băm từ URL: mỗi DB một snapshot, không lộ thông tin đăng nhập ra tên file
+        url_hash = hashlib.sha256(database_url.encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(cache_dir, f"schema_{url_hash}.json")
+
+    def fingerprint(self) -> str:
+        # Kết nối mở ở đây được trả về pool chung và dùng lại cho query SQL đầu tiên
+        with get_engine(ROLE_READ, self.database_url).connect() as conn:
+            return conn.execute(self.FINGERPRINT_SQL).scalar()
+
+    def load(self, fingerprint: str):
+        """Schema đã lưu nếu khớp fingerprint và còn hạn, ngược lại None."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if snapshot.get("fingerprint") != fingerprint:
+            return None
+        if time.time() - snapshot.get("created_at", 0) > self.ttl_seconds:
+            return None
+        return snapshot.get("schema")
+
+    def save(self, fingerprint: str, schema: str):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "created_at": time.time(), "schema": schema}, f, ensure_ascii=False)
+        os.replace(temp_path, self.path)
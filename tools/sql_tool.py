@@ -1,24 +1,80 @@
 from langchain_community.utilities import SQLDatabase
+from langchain_community.utilities.sql_database import truncate_word
 from langchain_core.tools import StructuredTool
-from config.settings import settings
-from .base_tool import BaseToolService
+from core.database import get_engine, ROLE_READ
+from .base_tool import BaseToolService, LazyInitMixin
+from .data_handles import DataHandleStore
+from .schema_cache import SchemaSnapshotCache
 
-class SQLDatabaseService(BaseToolService):
-    def __init__(self):
-        self.db = SQLDatabase.from_uri(settings.DATABASE_URL)
+class SQLDatabaseService(LazyInitMixin, BaseToolService):
+    # SQLDatabase.from_uri reflect toàn bộ bảng -> chỉ chạy ở lần query đầu tiên (hoặc khi warm-up)
+    LAZY_ATTRIBUTES = ("db",)
+    # Kết quả ít dòng hơn (tra cứu một giá trị) không cần data handle để vẽ biểu đồ -> không ghi file xuống đĩa
+    DATA_HANDLE_MIN_ROWS = 2
+
+    def __init__(self, data_handles: DataHandleStore = None, schema_cache: SchemaSnapshotCache = None):
+        self.data_handles = data_handles or DataHandleStore()
+        self.schema_cache = schema_cache or SchemaSnapshotCache()
+
+    def _initialize(self):
+        self.db = SQLDatabase(get_engine(ROLE_READ))
+
+    def _fetch_rows(self, query: str) -> list:
+        """
+        Chạy SQL và trả về list dict (tên cột -> giá trị). SQLDatabase.run() chỉ trả về chuỗi nên phải dùng
+        SQLDatabase._execute (API nội bộ của langchain_community, fetch="all"): mọi chỗ gọi API nội bộ nằm ở đây.
+        """
+        return list(self.db._execute(query, fetch="all"))
+
+    def _format_rows(self, rows: list) -> str:
+        """Định dạng giống SQLDatabase.run() để LLM nhận kết quả như trước."""
+        res = [
+            tuple(truncate_word(value, length=self.db._max_string_length) for value in row.values())
+            for row in rows
+        ]
+        return str(res) if res else ""
 
     def query_sql_db(self, query: str) -> str:
         """Thực thi lệnh SQL truy vấn Database."""
         try:
             query = query.strip().rstrip(";")
             print(f"[SQL Tool] Running: {query}")
-            return self.db.run(query)
+            rows = self._fetch_rows(query)
         except Exception as e:
             return f"Lỗi SQL: {str(e)}. Hãy kiểm tra lại cú pháp hoặc tên bảng."
 
+        result = self._format_rows(rows)
+        if not rows:
+            return result
+        columns = ", ".join(rows[0].keys())
+        if len(rows) < self.DATA_HANDLE_MIN_ROWS:
+            return f"{result}\n(cột: {columns})"
+        try:
+            handle = self.data_handles.register(query, rows)
+        except Exception as e:
+            print(f"[SQL Tool] Không lưu được data handle: {e}")
+            return result
+        return f"{result}\nDATA_HANDLE: {handle} (cột: {columns})"
+
     def get_db_schema(self) -> str:
-        """Lấy schema để nhúng vào System Prompt."""
-        return self.db.get_table_info()
+        """Lấy schema để nhúng vào System Prompt (ưu tiên snapshot trên đĩa nếu schema không đổi)."""
+        fingerprint = None
+        try:
+            fingerprint = self.schema_cache.fingerprint()
+            cached = self.schema_cache.load(fingerprint)
+            if cached:
+                print("[SQL Tool] Dùng schema snapshot đã lưu")
+                return cached
+        except Exception as e:
+            print(f"[SQL Tool] Không kiểm tra được schema snapshot: {e}")
+
+        schema = self.db.get_table_info()
+        if fingerprint:
+            try:
+                self.schema_cache.save(fingerprint, schema)
+            except OSError as e:
+                print(f"[SQL Tool] Không lưu được schema snapshot: {e}")
+        return schema
 
     def get_tool(self) -> StructuredTool:
         """Trả về LangChain Tool để bind vào LLM."""
@@ -30,6 +86,6 @@ class SQLDatabaseService(BaseToolService):
                 "Chỉ sử dụng công cụ này khi cần lấy số liệu chính xác từ các bảng: "
                 "customers, products, orders, order_items, inventory. "
                 "Input: Câu lệnh SQL hợp lệ (PostgreSQL). "
-                "Output: Kết quả truy vấn dạng text."
+                "Output: Kết quả truy vấn dạng text kèm DATA_HANDLE để vẽ biểu đồ từ đúng dữ liệu này."
             )
         )
\ No newline at end of file
@@ -0,0 +1,170 @@
+import re
+import weakref
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.engine import Engine
+from langchain_postgres.vectorstores import DistanceStrategy
+from config.settings import settings
+
+
+class VectorIndexManager:
+    """
+    Class quản lý index ANN (HNSW / IVFFlat) của pgvector cho bảng embedding
+    và các tham số tinh chỉnh lúc truy vấn (hnsw.ef_search, ivfflat.probes).
+    Khi truyền collection_name, index là partial index chỉ phủ các dòng của collection đó
+    (mỗi shard một index riêng, truy vấn có lọc collection_id sẽ dùng đúng index của shard).
+    """
+
+    OPERATOR_CLASSES = {
+        DistanceStrategy.COSINE: "vector_cosine_ops",
+        DistanceStrategy.EUCLIDEAN: "vector_l2_ops",
+        DistanceStrategy.MAX_INNER_PRODUCT: "vector_ip_ops",
+    }
+
+    def __init__(
+        self,
+        engine: Engine,
+        index_type: str = settings.VECTOR_INDEX_TYPE,
+        distance_strategy: DistanceStrategy = DistanceStrategy.COSINE,
+        table_name: str = "langchain_pg_embedding",
+        column_name: str = "embedding",
+        collection_name: str = None,
+    ):
+        self.engine = engine
+        self.index_type = index_type
+        self.distance_strategy = distance_strategy
+        self.table_name = table_name
+        self.column_name = column_name
+        self.collection_name = collection_name
+
+    @property
+    def operator_class(self) -> str:
+        return self.OPERATOR_CLASSES[self.distance_strategy]
+
+    def index_name(self, index_type: str = None) -> str:
+        name = f"ix_{self.table_name}_{self.column_name}_{index_type or self.index_type}"
+        if self.collection_name:
+            name += "_" + re.sub(r"\W", "_", self.collection_name.lower())
+        return name[:63]
+
+    def _collection_id(self, conn) -> str:
+        collection_id = conn.execute(
+            text("SELECT uuid FROM langchain_pg_collection WHERE name = :name"), {"name": self.collection_name}
+        ).scalar()
+        if collection_id is None:
+            raise ValueError(f"Không tìm thấy collection: {self.collection_name}")
+        return str(collection_id)
+
+    def _index_options(self) -> dict:
+        if self.index_type == "hnsw":
+            return {"m": int(settings.HNSW_M), "ef_construction": int(settings.HNSW_EF_CONSTRUCTION)}
+        return {"lists": int(settings.IVFFLAT_LISTS)}
+
+    def _index_ddl(self, collection_id: str = None) -> str:
+        params = ", ".join(f"{key} = {value}" for key, value in self._index_options().items())
+        ddl = (
+            f"CREATE INDEX IF NOT EXISTS {self.index_name()} ON {self.table_name} "
+            f"USING {self.index_type} ({self.column_name} {self.operator_class}) WITH ({params})"
+        )
+        if collection_id:
+            ddl += f" WHERE collection_id = '{collection_id}'"
+        return ddl
+
+    def ensure_typed_column(self, dimensions: int = settings.EMBEDDING_DIMENSIONS):
+        """
+        HNSW / IVFFlat cần cột có số chiều cố định (vector(N)). Bảng tạo bởi phiên bản cũ (không truyền
+        embedding_length) có cột `vector` không khai báo chiều -> chuyển kiểu tại chỗ, giữ nguyên dữ liệu.
+        """
+        with self.engine.begin() as conn:
+            column_type = conn.execute(
+                text("SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+                     "WHERE attrelid = to_regclass(:table) AND attname = :column AND NOT attisdropped"),
+                {"table": self.table_name, "column": self.column_name},
+            ).scalar()
+            if column_type != "vector":
+                return
+            print(f"[Vector Index] Chuyển cột {self.table_name}.{self.column_name} sang vector({int(dimensions)})...")
+            try:
+                conn.execute(text(
+                    f"ALTER TABLE {self.table_name} ALTER COLUMN {self.column_name} TYPE vector({int(dimensions)})"
+                ))
+            except DBAPIError as e:
+                raise ValueError(
+                    f"Lỗi: Không chuyển được cột {self.column_name} sang vector({int(dimensions)}) "
+                    f"(có embedding khác số chiều?). Hãy xóa bảng {self.table_name} rồi nạp lại. Chi tiết: {e.orig}"
+                ) from e
+
+    def create_index(self):
+        """
+        Tạo index ANN theo cấu hình (xóa index của loại còn lại nếu có).
+        Với IVFFlat nên gọi SAU khi đã nạp dữ liệu vì các list được huấn luyện từ dữ liệu hiện có.
+        """
+        with self.engine.begin() as conn:
+            for other in ("hnsw", "ivfflat"):
+                if other != self.index_type:
+                    conn.execute(text(f"DROP INDEX IF EXISTS {self.index_name(other)}"))
+            if self.index_type == "none":
+                return
+            collection_id = None
+            if self.collection_name:
+                # uuid của collection đổi sau mỗi lần ingest lại -> dựng lại partial index
+                collection_id = self._collection_id(conn)
+                conn.execute(text(f"DROP INDEX IF EXISTS {self.index_name()}"))
+            else:
+                # CREATE INDEX IF NOT EXISTS giữ nguyên index cũ khi m / ef_construction / lists đổi -> so với reloptions
+                current = conn.execute(
+                    text("SELECT reloptions FROM pg_class WHERE relname = :name AND relkind = 'i'"),
+                    {"name": self.index_name()},
+                ).first()
+                wanted = sorted(f"{key}={value}" for key, value in self._index_options().items())
+                if current is not None and sorted(current[0] or []) != wanted:
+                    print(f"[Vector Index] Tham số index đổi ({current[0]} -> {wanted}), dựng lại index...")
+                    conn.execute(text(f"DROP INDEX IF EXISTS {self.index_name()}"))
+            scope = f"collection {self.collection_name}" if self.collection_name else self.table_name
+            print(f"[Vector Index] Đang tạo index {self.index_type.upper()} ({self.operator_class}) trên {scope}...")
+            conn.execute(text(self._index_ddl(collection_id)))
+            conn.execute(text(f"ANALYZE {self.table_name}"))
+
+    def drop_index(self):
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DROP INDEX IF EXISTS {self.index_name()}"))
+
+    @staticmethod
+    def runtime_statements(ef_search: int = None, probes: int = None) -> list:
+        """Các lệnh SET áp dụng cho mỗi session truy vấn vector."""
+        return [
+            f"SET hnsw.ef_search = {int(ef_search or settings.HNSW_EF_SEARCH)}",
+            f"SET ivfflat.probes = {int(probes or settings.IVFFLAT_PROBES)}",
+        ]
+
+    _attached_engines = weakref.WeakSet()
+
+    @classmethod
+    def attach_runtime_settings(cls, engine: Engine, ef_search: int = None, probes: int = None) -> Engine:
+        """
+        Gắn listener để mỗi kết nối mới của engine được SET sẵn tham số tìm kiếm ANN.
+        Chạy ở chế độ autocommit để giá trị không bị mất khi pool rollback kết nối.
+        Engine dùng chung (core.database) chỉ được gắn một lần, lần gắn đầu tiên quyết định tham số.
+        Kết nối đã nằm sẵn trong pool (mở trước khi gắn) không đi qua listener -> pool được dispose để mở lại.
+        """
+        if engine in cls._attached_engines:
+            return engine
+        cls._attached_engines.add(engine)
+        statements = cls.runtime_statements(ef_search, probes)
+
+        @event.listens_for(engine, "connect")
+        def _apply_runtime_settings(dbapi_connection, connection_record):
+            autocommit = dbapi_connection.autocommit
+            dbapi_connection.autocommit = True
+            cursor = dbapi_connection.cursor()
+            for statement in statements:
+                cursor.execute(statement)
+            cursor.close()
+            dbapi_connection.autocommit = autocommit
+
+        checkedin = getattr(engine.pool, "checkedin", None)
+        checkedout = getattr(engine.pool, "checkedout", None)
+        if (callable(checkedin) and checkedin()) or (callable(checkedout) and checkedout()):
+            # Kết nối đang được mượn sẽ bị bỏ khi trả về pool cũ, lần mượn sau lấy kết nối mới đã SET tham số
+            engine.dispose()
+        return engine